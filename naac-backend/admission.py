@@ -0,0 +1,245 @@
+import os
+import json
+import math
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+from urllib.parse import parse_qsl
+
+from metrics import registry as metrics_registry
+
+# Sessions are read from a JSON body only when it is at most this large
+ADMISSION_MAX_PEEK_BYTES = int(os.getenv("ADMISSION_MAX_PEEK_BYTES", 64 * 1024))
+# Reverse proxies in front of the app that append to X-Forwarded-For (1 on Render). 0 keys per-IP limits on the
+# socket peer, which behind a proxy is the proxy itself, so every user would share one bucket. Entries further
+# left than this are written by the client and never trusted; uvicorn's --forwarded-allow-ips='*' uses the
+# leftmost one, which is why the limits read the header themselves
+ADMISSION_TRUSTED_PROXY_HOPS = int(os.getenv("ADMISSION_TRUSTED_PROXY_HOPS", 0))
+
+admission_rejections = metrics_registry.counter(
+    "naac_admission_rejections_total", "Requests answered 429 by admission control", ("endpoint_class", "reason"))
+
+
+class TokenBuckets:
+    """Token buckets keyed by session or IP: ``rate`` tokens a second, up to ``burst``
+
+    Each bucket is one (tokens, last_seen) tuple in an OrderedDict kept in
+    last-touched order. A bucket untouched for burst/rate seconds has refilled, which is the
+    same as having no entry, so such entries are dropped from the front of the
+    dict as calls go by: no timer, and memory follows the keys active lately.
+    """
+
+    def __init__(self, rate: float, burst: float, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.full_after_s = burst / rate
+        self.clock = clock
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def take(self, key: str, cost: float = 1.0) -> float:
+        """0.0 when ``cost`` tokens were taken, otherwise seconds until they will be there"""
+        now = self.clock()
+        buckets = self._buckets
+        while buckets:
+            oldest = next(iter(buckets))
+            if now - buckets[oldest][1] < self.full_after_s:
+                break
+            del buckets[oldest]
+        entry = buckets.get(key)
+        tokens = self.burst if entry is None else min(self.burst, entry[0] + (now - entry[1]) * self.rate)
+        wait = 0.0 if tokens >= cost else (cost - tokens) / self.rate
+        buckets[key] = (tokens - cost if not wait else tokens, now)
+        buckets.move_to_end(key)
+        return wait
+
+    def give_back(self, key: str, cost: float = 1.0):
+        """Return tokens taken for a request that was then refused for another reason"""
+        entry = self._buckets.get(key)
+        if entry is not None:
+            self._buckets[key] = (min(self.burst, entry[0] + cost), entry[1])
+
+
+class EndpointClass:
+    """Limits shared by one kind of work (chat, upload, generation): a concurrency cap plus per-session and per-IP buckets"""
+
+    def __init__(self, name: str, max_in_flight: int, session_rate: float, session_burst: float,
+                 ip_rate: float, ip_burst: float, retry_after_s: float = 1.0):
+        self.name = name
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self.sessions = TokenBuckets(session_rate, session_burst)
+        self.ips = TokenBuckets(ip_rate, ip_burst)
+        self.retry_after_s = retry_after_s
+
+    @classmethod
+    def from_env(cls, name: str, max_in_flight: int, session_rate: float, session_burst: float, ip_rate: float, ip_burst: float):
+        """Defaults overridable as ADMISSION_<NAME>_CONCURRENCY / _SESSION_RATE / _SESSION_BURST / _IP_RATE / _IP_BURST"""
+        prefix = f"ADMISSION_{name.upper()}_"
+        return cls(
+            name,
+            int(os.getenv(prefix + "CONCURRENCY", max_in_flight)),
+            float(os.getenv(prefix + "SESSION_RATE", session_rate)),
+            float(os.getenv(prefix + "SESSION_BURST", session_burst)),
+            float(os.getenv(prefix + "IP_RATE", ip_rate)),
+            float(os.getenv(prefix + "IP_BURST", ip_burst)),
+        )
+
+    def admit(self, session_id: Optional[str], ip: Optional[str]) -> Tuple[Optional[str], float]:
+        """(None, 0) and a held slot when admitted, else (reason, retry-after seconds); release() every admit"""
+        if self.in_flight >= self.max_in_flight:
+            return "concurrency", self.retry_after_s
+        if ip:
+            wait = self.ips.take(ip)
+            if wait:
+                return "ip_rate", wait
+        if session_id:
+            wait = self.sessions.take(session_id)
+            if wait:
+                if ip:
+                    self.ips.give_back(ip)
+                return "session_rate", wait
+        self.in_flight += 1
+        return None, 0.0
+
+    def release(self):
+        self.in_flight -= 1
+
+    def stats(self) -> Dict[str, int]:
+        return {"in_flight": self.in_flight, "max_in_flight": self.max_in_flight,
+                "tracked_sessions": len(self.sessions), "tracked_ips": len(self.ips)}
+
+
+class AdmissionControl:
+    """Maps request paths to endpoint classes; consulted once per request, on the event loop (no locking)"""
+
+    def __init__(self, classes: Dict[str, EndpointClass], routes: Dict[str, str], enabled: bool = True):
+        self.classes = classes
+        self.routes = {path: classes[name] for path, name in routes.items()}
+        self.enabled = enabled
+
+    def classify(self, method: str, path: str) -> Optional[EndpointClass]:
+        if not self.enabled or method != "POST":
+            return None
+        return self.routes.get(path.rstrip("/") or "/")
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {name: endpoint_class.stats() for name, endpoint_class in self.classes.items()}
+
+
+def _session_from_query(scope) -> Optional[str]:
+    query = scope.get("query_string")
+    if query and b"session_id=" in query:
+        return dict(parse_qsl(query.decode("latin-1"))).get("session_id")
+    return None
+
+
+class AdmissionMiddleware:
+    """ASGI middleware answering 429 + Retry-After before the endpoint (or an upload body) is read
+
+    The session is taken from ``?session_id=``, an ``X-Session-Id`` header, or
+    a small JSON body's ``session_id`` (the body is then replayed to the app).
+    "default" counts as no session, so anonymous callers share only the IP limit.
+    Behind ``trusted_proxy_hops`` proxies the IP is the address the outermost
+    proxy saw, taken from the right-hand end of X-Forwarded-For.
+    """
+
+    def __init__(self, app, control: "AdmissionControl", trusted_proxy_hops: Optional[int] = None):
+        self.app = app
+        self.control = control
+        self.trusted_proxy_hops = ADMISSION_TRUSTED_PROXY_HOPS if trusted_proxy_hops is None else trusted_proxy_hops
+
+    def client_ip(self, scope, headers) -> Optional[str]:
+        client = scope.get("client")
+        peer = client[0] if client else None
+        if self.trusted_proxy_hops <= 0:
+            return peer
+        forwarded = [hop.strip() for hop in headers.get(b"x-forwarded-for", b"").decode("latin-1").split(",") if hop.strip()]
+        # Each trusted proxy appended the address it received from, so the client is hops entries from the right
+        if len(forwarded) >= self.trusted_proxy_hops:
+            return forwarded[-self.trusted_proxy_hops]
+        return forwarded[0] if forwarded else peer
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        endpoint_class = self.control.classify(scope["method"], scope["path"])
+        if endpoint_class is None:
+            return await self.app(scope, receive, send)
+
+        headers = dict(scope["headers"])
+        session_id = _session_from_query(scope) or (headers.get(b"x-session-id") or b"").decode("latin-1") or None
+        if session_id is None and headers.get(b"content-type", b"").startswith(b"application/json"):
+            length = headers.get(b"content-length")
+            if length is not None and length.isdigit() and int(length) <= ADMISSION_MAX_PEEK_BYTES:
+                session_id, receive = await self._session_from_body(receive)
+        if session_id == "default":
+            session_id = None
+
+        reason, retry_after = endpoint_class.admit(session_id, self.client_ip(scope, headers))
+        if reason is not None:
+            admission_rejections.inc(endpoint_class=endpoint_class.name, reason=reason)
+            return await self._reject(send, endpoint_class.name, reason, retry_after)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            endpoint_class.release()
+
+    @staticmethod
+    async def _session_from_body(receive):
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] != "http.request":
+                # Disconnected while sending: let the app see it
+                replay = [message]
+                break
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                replay = [{"type": "http.request", "body": b"".join(chunks), "more_body": False}]
+                break
+        session_id = None
+        if replay[0]["type"] == "http.request":
+            try:
+                body = json.loads(replay[0]["body"] or b"null")
+                if isinstance(body, dict) and isinstance(body.get("session_id"), str):
+                    session_id = body["session_id"]
+            except ValueError:
+                pass
+
+        async def replay_receive():
+            return replay.pop() if replay else await receive()
+
+        return session_id, replay_receive
+
+    @staticmethod
+    async def _reject(send, name: str, reason: str, retry_after: float):
+        retry = str(max(1, math.ceil(retry_after)))
+        body = json.dumps({"detail": f"Too many {name} requests ({reason.replace('_', ' ')}); retry in {retry}s",
+                           "reason": reason, "retry_after": retry_after}).encode()
+        await send({"type": "http.response.start", "status": 429, "headers": [
+            (b"content-type", b"application/json"), (b"content-length", str(len(body)).encode()), (b"retry-after", retry.encode())]})
+        await send({"type": "http.response.body", "body": body})
+
+
+def default_admission_control() -> AdmissionControl:
+    """Chat is cheap and interactive, uploads are few and heavy, generation waits on watsonx.ai"""
+    classes = {
+        "chat": EndpointClass.from_env("chat", max_in_flight=64, session_rate=2, session_burst=10, ip_rate=10, ip_burst=40),
+        "upload": EndpointClass.from_env("upload", max_in_flight=4, session_rate=0.5, session_burst=10, ip_rate=1, ip_burst=20),
+        "generation": EndpointClass.from_env("generation", max_in_flight=16, session_rate=0.5, session_burst=10, ip_rate=2, ip_burst=20),
+    }
+    routes = {
+        "/api/chat/message": "chat",
+        "/api/documents/upload": "upload",
+        "/api/chat/generate": "generation",
+        "/api/ssr/generate": "generation",
+        "/ssr/generate": "generation",
+    }
+    return AdmissionControl(classes, routes, enabled=os.getenv("ADMISSION_ENABLED", "1") != "0")
+
+
+# Global instance
+admission_control = default_admission_control()
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""Admission control: cost per request, and chat latency during an upload flood with it off and on.
+
+"overhead" times AdmissionMiddleware around a no-op app for chat requests
+(session read from the JSON body) and uploads (?session_id=), spread over
+--keys distinct sessions so the buckets dict stays large and expiring.
+
+"flood" starts the real app under uvicorn per setting (ADMISSION_ENABLED=0 /
+1), in its own process, and a separate flood process in which --flooders
+clients of one institution (one IP, one session) upload --upload-kb files
+back to back, ignoring 429s. Meanwhile --chat-users interactive users, each
+in their own session, send a chat message every --chat-interval-s and the
+latency is recorded. A quiet run (no flood) gives the baseline. Every client
+here shares 127.0.0.1, so the chat per-IP limit is lifted for these runs.
+
+Usage (from naac-backend/):
+    python benchmarks/bench_admission.py --flooders 32 --duration-s 15
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import socket
+import asyncio
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx  # noqa: E402
+
+
+async def overhead(args) -> dict:
+    from admission import AdmissionMiddleware, default_admission_control
+
+    async def app(scope, receive, send):
+        await receive()
+
+    async def send(message):
+        pass
+
+    middleware = AdmissionMiddleware(app, default_admission_control())
+    # Generous limits so every request is admitted and the whole path (not the 429 shortcut) is timed
+    for endpoint_class in middleware.control.classes.values():
+        for buckets in (endpoint_class.sessions, endpoint_class.ips):
+            buckets.burst, buckets.full_after_s = 1e9, 60
+    results = {}
+    for label, path, query, content_type in (("chat", "/api/chat/message", b"", b"application/json"),
+                                             ("upload", "/api/documents/upload", b"session_id=s", b"multipart/form-data; boundary=x")):
+        scopes, bodies = [], []
+        for i in range(args.keys):
+            body = json.dumps({"message": "criterion 1", "session_id": f"session-{i}"}).encode() if label == "chat" else b"--x--"
+            scopes.append({"type": "http", "method": "POST", "path": path, "client": (f"10.0.{i // 250 % 250}.{i % 250}", 5000),
+                           "query_string": query.replace(b"=s", f"=session-{i}".encode()),
+                           "headers": [(b"content-type", content_type), (b"content-length", str(len(body)).encode())]})
+            bodies.append({"type": "http.request", "body": body, "more_body": False})
+        baseline = time.perf_counter()
+        for i in range(args.requests):
+            message = bodies[i % args.keys]
+            await app(scopes[i % args.keys], lambda: _ready(message), send)
+        baseline = time.perf_counter() - baseline
+        t0 = time.perf_counter()
+        for i in range(args.requests):
+            message = bodies[i % args.keys]
+            await middleware(scopes[i % args.keys], lambda: _ready(message), send)
+        elapsed = time.perf_counter() - t0
+        results[label] = {"us_per_request": round((elapsed - baseline) / args.requests * 1e6, 2),
+                          "tracked_sessions": middleware.control.stats()[label]["tracked_sessions"]}
+    return results
+
+
+async def _ready(message):
+    return message
+
+
+def serve(port: int):
+    import uvicorn
+    import main
+    uvicorn.run(main.app, host="127.0.0.1", port=port, log_level="warning")
+
+
+async def flood(port: int, flooders: int, upload_kb: int, duration_s: float):
+    payload = os.urandom(upload_kb * 1024)
+    counts = {}
+    deadline = time.perf_counter() + duration_s
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=60, limits=limits) as client:
+        async def uploader():
+            while time.perf_counter() < deadline:
+                try:
+                    response = await client.post("/api/documents/upload", params={"session_id": "bulk-institution"},
+                                                 files={"file": ("evidence.pdf", payload, "application/pdf")})
+                    counts[response.status_code] = counts.get(response.status_code, 0) + 1
+                except httpx.HTTPError:
+                    counts["error"] = counts.get("error", 0) + 1
+
+        await asyncio.gather(*(uploader() for _ in range(flooders)))
+    print(json.dumps(counts))
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def run_setting(label: str, admission: bool, flooded: bool, args) -> dict:
+    port = free_port()
+    workdir = tempfile.mkdtemp(prefix="naac-admission-bench-")
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'bench.db')}", UPLOAD_DIR=workdir,
+               EMBEDDED_JOB_WORKERS="0", ADMISSION_ENABLED="1" if admission else "0", ADMISSION_CHAT_IP_RATE="1000")
+    script = os.path.abspath(__file__)
+    server = subprocess.Popen([sys.executable, "-W", "ignore", script, "--serve", "--port", str(port)], env=env, cwd=workdir)
+    flooder = None
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=60) as client:
+            for _ in range(300):
+                try:
+                    await client.get("/health")
+                    break
+                except httpx.TransportError:
+                    await asyncio.sleep(0.1)
+            if flooded:
+                flooder = subprocess.Popen([sys.executable, script, "--flood", "--port", str(port), "--flooders", str(args.flooders),
+                                            "--upload-kb", str(args.upload_kb), "--duration-s", str(args.duration_s + 2)],
+                                           stdout=subprocess.PIPE, text=True)
+                await asyncio.sleep(2)
+            latencies, statuses = [], {}
+            deadline = time.perf_counter() + args.duration_s
+
+            async def chat_user(user: int):
+                await asyncio.sleep(user / args.chat_users * args.chat_interval_s)
+                while time.perf_counter() < deadline:
+                    t0 = time.perf_counter()
+                    response = await client.post("/api/chat/message", json={"message": "How do I document criterion 2?",
+                                                                            "session_id": f"interactive-{user}"})
+                    latencies.append((time.perf_counter() - t0) * 1000)
+                    statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+                    await asyncio.sleep(args.chat_interval_s)
+
+            await asyncio.gather(*(chat_user(user) for user in range(args.chat_users)))
+        uploads = json.loads(flooder.communicate()[0]) if flooder else {}
+        latencies.sort()
+        return {"setting": label, "chat_requests": len(latencies), "chat_statuses": statuses,
+                "chat_p50_ms": round(statistics.median(latencies), 1),
+                "chat_p99_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))], 1),
+                "chat_max_ms": round(latencies[-1], 1), "upload_statuses": uploads}
+    finally:
+        if flooder and flooder.poll() is None:
+            flooder.kill()
+        server.terminate()
+        server.wait()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+async def main_async(args) -> dict:
+    report = {"overhead": await overhead(args), "flooders": args.flooders, "upload_kb": args.upload_kb, "cpus": os.cpu_count()}
+    report["flood"] = [await run_setting("quiet", True, False, args),
+                       await run_setting("flood, admission off", False, True, args),
+                       await run_setting("flood, admission on", True, True, args)]
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200000)
+    parser.add_argument("--keys", type=int, default=50000)
+    parser.add_argument("--flooders", type=int, default=32)
+    parser.add_argument("--upload-kb", type=int, default=512)
+    parser.add_argument("--duration-s", type=float, default=15)
+    parser.add_argument("--chat-users", type=int, default=10)
+    parser.add_argument("--chat-interval-s", type=float, default=1.0)
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--flood", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.serve:
+        serve(args.port)
+    elif args.flood:
+        asyncio.run(flood(args.port, args.flooders, args.upload_kb, args.duration_s))
+    else:
+        print(json.dumps(asyncio.run(main_async(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
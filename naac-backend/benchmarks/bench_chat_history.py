@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""Chat history page latency (keyset vs OFFSET) and database size (inline vs deduplicated answers).
+
+Seeds one long session among many through record_query, with answers drawn
+from the guidance templates the chat endpoint actually serves, into a
+scratch database. Page time is measured at the newest page and deep into the
+session; table size is compared against the same rows with the answer text inline.
+
+Usage (from naac-backend/):
+    python benchmarks/bench_chat_history.py --rows 100000 --session-rows 20000
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import sqlite3
+import asyncio
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+WORKDIR = tempfile.mkdtemp(prefix="naac-history-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(WORKDIR, 'bench.db')}"
+
+import database  # noqa: E402  (DATABASE_URL must be set first)
+from chat_history import chat_history  # noqa: E402
+from response_templates import TemplateCache  # noqa: E402
+
+QUESTIONS = ["criterion 1 curricular", "teaching learning evaluation", "research innovation", "how to write the SSR",
+             "documentation checklist", "student support", "governance leadership", "best practices"]
+
+
+async def seed(rows: int, session_rows: int):
+    rng = random.Random(5)
+    templates = TemplateCache()
+    templates.load()
+    every = max(1, rows // session_rows)
+    for start in range(0, rows, 500):
+        batch = []
+        for i in range(start, min(rows, start + 500)):
+            message = rng.choice(QUESTIONS)
+            session = "long-session" if i % every == 0 else f"session-{rng.randrange(5000)}"
+            batch.append(database.record_query(session, message, templates.match(message).text(message), sources=["NAAC Manual 2022"]))
+        await asyncio.gather(*batch)
+
+
+def copy_mb(name: str, tables: dict) -> float:
+    """Size of a fresh database holding just the given tables (no search index), vacuumed"""
+    path = os.path.join(WORKDIR, f"{name}.db")
+    with sqlite3.connect(path) as conn:
+        conn.execute("ATTACH DATABASE ? AS src", (database.SQLITE_PATH,))
+        for table, select in tables.items():
+            conn.execute(f"CREATE TABLE {table} AS {select}")
+        conn.execute("CREATE INDEX ix_session ON user_queries (session_id, id)")
+    with sqlite3.connect(path) as conn:
+        conn.execute("VACUUM")
+    return round(os.path.getsize(path) / 1e6, 2)
+
+
+def sizes() -> dict:
+    columns = "q.id, q.session_id, q.user_query, q.confidence_score, q.response_time_ms, q.sources_used, q.created_at"
+    return {
+        # The same rows with the answer text stored inline, as before chat_responses
+        "inline_mb": copy_mb("inline", {"user_queries": f"SELECT {columns}, COALESCE(q.ai_response, r.body) AS ai_response "
+                                                        "FROM src.user_queries q LEFT JOIN src.chat_responses r ON r.id = q.response_id"}),
+        "deduplicated_mb": copy_mb("dedup", {"user_queries": f"SELECT {columns}, q.ai_response, q.response_id FROM src.user_queries q",
+                                             "chat_responses": "SELECT * FROM src.chat_responses"}),
+    }
+
+
+async def time_pages(depths, limit: int, repeats: int) -> dict:
+    out = {}
+    path = database.SQLITE_PATH
+    conn = sqlite3.connect(path)
+    ids = [row[0] for row in conn.execute("SELECT id FROM user_queries WHERE session_id = 'long-session' ORDER BY id DESC")]
+    for depth in depths:
+        offset = min(depth * limit, len(ids) - 1)
+        before_id = ids[offset - 1] if offset else None
+        select = ("SELECT q.id, q.user_query, COALESCE(q.ai_response, r.body) FROM user_queries q "
+                  "LEFT JOIN chat_responses r ON r.id = q.response_id WHERE q.session_id = 'long-session' ")
+        timings = {}
+        for label, sql, params in (("keyset_ms", select + "AND q.id < ? ORDER BY q.id DESC LIMIT ?", (before_id or 1 << 62, limit)),
+                                   ("offset_ms", select + "ORDER BY q.id DESC LIMIT ? OFFSET ?", (limit, offset))):
+            t0 = time.perf_counter()
+            for _ in range(repeats):
+                conn.execute(sql, params).fetchall()
+            timings[label] = round((time.perf_counter() - t0) / repeats * 1000, 3)
+        # The endpoint's own path: async engine, row mapping and JSON-ready dicts
+        t0 = time.perf_counter()
+        for _ in range(repeats):
+            page = await chat_history.page("long-session", limit=limit, before_id=before_id)
+        timings["endpoint_ms"] = round((time.perf_counter() - t0) / repeats * 1000, 3)
+        out[f"page_{depth}"] = {"messages": len(page["messages"]), **timings}
+    conn.close()
+    return out
+
+
+async def main_async(args) -> dict:
+    await database.init_database()
+    t0 = time.perf_counter()
+    await seed(args.rows, args.session_rows)
+    report = {"rows": args.rows, "session_rows": args.session_rows, "seed_s": round(time.perf_counter() - t0, 1)}
+    with sqlite3.connect(database.SQLITE_PATH) as conn:
+        report["distinct_answers"] = conn.execute("SELECT COUNT(*) FROM chat_responses").fetchone()[0]
+    report["pages"] = await time_pages(args.depths, args.limit, args.repeats)
+    await database.close_database()
+    report["history_tables"] = sizes()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--session-rows", type=int, default=20000)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--depths", type=int, nargs="*", default=[0, 10, 100, 300])
+    parser.add_argument("--repeats", type=int, default=50)
+    try:
+        print(json.dumps(asyncio.run(main_async(parser.parse_args())), indent=2))
+    finally:
+        shutil.rmtree(WORKDIR, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""Criteria progress read cost: cold load, clean reads, and reads after one input or document changes.
+
+Seeds a session with an input for every key indicator and --documents
+processed documents' metric evidence in a scratch database, then compares
+the incremental engine with rebuilding the whole metric tree per read (what
+a stateless endpoint would have to do). "nodes" is how many aggregate nodes
+each read recomputed.
+
+Usage (from naac-backend/):
+    python benchmarks/bench_criteria_progress.py --documents 500 --repeats 200
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import asyncio
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+WORKDIR = tempfile.mkdtemp(prefix="naac-progress-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(WORKDIR, 'bench.db')}"
+
+import database  # noqa: E402  (DATABASE_URL must be set first)
+from ssr_engine import SSREngine, SUB_CRITERION_TITLES  # noqa: E402
+from criteria_progress import CriteriaProgress, EvidenceStore, METRIC_TITLES, METRICS  # noqa: E402
+
+SESSION = "bench"
+
+
+async def timed(label: str, engine: CriteriaProgress, repeats: int, before=None) -> dict:
+    graph_nodes = 0
+    t0 = time.perf_counter()
+    for i in range(repeats):
+        if before is not None:
+            await before(i)
+        state = engine._sessions.get(SESSION)
+        start = state.graph.recomputed if state else 0
+        await engine.progress(SESSION)
+        graph_nodes += engine._sessions[SESSION].graph.recomputed - start
+    return {"read": label, "ms": round((time.perf_counter() - t0) / repeats * 1000, 4), "nodes": round(graph_nodes / repeats, 1)}
+
+
+async def main_async(args) -> dict:
+    await database.init_database()
+    rng = random.Random(9)
+    ssr = SSREngine(lambda: ("bench", None), output_dir=os.path.join(WORKDIR, "ssr"))
+    for sub, title in SUB_CRITERION_TITLES.items():
+        await ssr.save_input(SESSION, sub, " ".join(f"{title} {t}" for _, t in METRICS[sub]) * 8, "University")
+    store = EvidenceStore(database.SQLITE_PATH)
+    metrics = list(METRIC_TITLES)
+    for document_id in range(1, args.documents + 1):
+        store.replace(document_id, SESSION, rng.sample(metrics, rng.randint(1, 6)))
+
+    runs = []
+    engine = CriteriaProgress(store, sync_interval_s=args.sync_interval_s)
+    runs.append(await timed("cold load (first read)", engine, 1))
+    runs.append(await timed("clean", engine, args.repeats))
+
+    subs = list(SUB_CRITERION_TITLES)
+
+    async def change_input(i):
+        sub = subs[i % len(subs)]
+        await engine.input_saved(SESSION, sub, f"{SUB_CRITERION_TITLES[sub]} revision {i} " * rng.randint(5, 40))
+
+    runs.append(await timed("after one input change", engine, args.repeats, change_input))
+
+    async def rebuild(_):
+        engine._sessions.clear()
+
+    runs.append(await timed("full rebuild per read", engine, max(1, args.repeats // 10), rebuild))
+    await database.close_database()
+    return {"documents": args.documents, "metrics": len(metrics), "key_indicators": len(subs), "runs": runs}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=500)
+    parser.add_argument("--repeats", type=int, default=200)
+    parser.add_argument("--sync-interval-s", type=float, default=2.0)
+    try:
+        print(json.dumps(asyncio.run(main_async(parser.parse_args())), indent=2))
+    finally:
+        shutil.rmtree(WORKDIR, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
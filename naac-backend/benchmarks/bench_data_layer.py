@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""Query-plan checks and write throughput for the async data layer.
+
+Seeds a scratch database through database.py, asserts that the hot queries
+(a session's recent history, documents in a processing status) are answered
+from the composite indexes without a temp sort, then compares concurrent
+chat-row inserts through the pooled, group-committed layer against the old
+connect/INSERT/commit/close-per-request approach. Exits non-zero if a plan
+check fails.
+
+Usage (from naac-backend/):
+    python benchmarks/bench_data_layer.py --seed-rows 100000 --inserts 2000 --concurrency 50
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import asyncio
+import argparse
+import sqlite3
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+WORKDIR = tempfile.mkdtemp(prefix="naac-db-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(WORKDIR, 'bench.db')}"
+
+import database  # noqa: E402  (DATABASE_URL must be set first)
+from models import UserQuery, UploadedDocument  # noqa: E402
+
+STATUSES = ["uploaded", "processing", "processed", "failed"]
+
+
+async def seed(rows: int):
+    await database.init_database()
+    sessions = [f"session-{i}" for i in range(max(1, rows // 50))]
+    async with database.async_engine.begin() as conn:
+        for start in range(0, rows, 5000):
+            n = min(5000, rows - start)
+            await conn.execute(UserQuery.__table__.insert(), [
+                {"session_id": random.choice(sessions), "user_query": f"question {start + i}", "ai_response": "answer"}
+                for i in range(n)
+            ])
+            await conn.execute(UploadedDocument.__table__.insert(), [
+                {"session_id": random.choice(sessions), "original_filename": f"doc{start + i}.pdf", "stored_filename": f"doc{start + i}.pdf",
+                 "file_size": 1024, "file_type": "application/pdf", "processing_status": random.choice(STATUSES)}
+                for i in range(n // 10)
+            ])
+        await conn.exec_driver_sql("ANALYZE")
+    return sessions
+
+
+async def check_plans(session_id: str) -> list:
+    checks = []
+    for name, stmt, index in [
+        ("session_history", database.session_queries_stmt(session_id, 20), "ix_user_queries_session_created"),
+        ("documents_by_status", database.documents_by_status_stmt("processing", 50), "ix_uploaded_documents_status_created"),
+    ]:
+        plan = await database.explain_query_plan(stmt)
+        ok = any(index in line for line in plan) and not any("TEMP B-TREE" in line for line in plan)
+        checks.append({"query": name, "ok": ok, "plan": plan})
+    return checks
+
+
+def raw_insert(db_path: str, session_id: str, message: str):
+    # What main.py did per chat message before the data layer
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    cursor.execute(
+        "INSERT INTO user_queries (session_id, user_query, ai_response) VALUES (?, ?, ?)",
+        (session_id, message, "answer"),
+    )
+    conn.commit()
+    conn.close()
+
+
+async def run_concurrent(fn, total: int, concurrency: int) -> dict:
+    latencies = []
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        async with sem:
+            t0 = time.perf_counter()
+            await fn(i)
+            latencies.append((time.perf_counter() - t0) * 1000)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    elapsed = time.perf_counter() - t0
+    latencies.sort()
+    return {
+        "inserts_per_s": round(total / elapsed, 1),
+        "p50_ms": round(latencies[len(latencies) // 2], 2),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99)], 2),
+    }
+
+
+async def main_async(args):
+    sessions = await seed(args.seed_rows)
+    plans = await check_plans(sessions[0])
+
+    async def raw(i):
+        # Called inline on the event loop, exactly as the old handler did
+        raw_insert(database.SQLITE_PATH, sessions[i % len(sessions)], f"raw {i}")
+
+    async def layered(i):
+        await database.record_query(sessions[i % len(sessions)], f"layer {i}", "answer")
+
+    report = {
+        "seed_rows": args.seed_rows,
+        "plans": plans,
+        "raw_connect_per_request": await run_concurrent(raw, args.inserts, args.concurrency),
+        "async_layer_group_commit": await run_concurrent(layered, args.inserts, args.concurrency),
+    }
+    await database.close_database()
+    print(json.dumps(report, indent=2, default=str))
+    return all(check["ok"] for check in plans)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seed-rows", type=int, default=100_000)
+    parser.add_argument("--inserts", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    try:
+        ok = asyncio.run(main_async(parser.parse_args()))
+    finally:
+        shutil.rmtree(WORKDIR, ignore_errors=True)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
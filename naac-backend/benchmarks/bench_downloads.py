@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""Server memory and throughput under many parallel large downloads, streamed vs buffered.
+
+Starts a real uvicorn server per mode, in its own process, serving one large
+file: "streamed" through DownloadService (as /documents/{id}/download does)
+behind the app's CompressionMiddleware, "buffered" by reading the whole file
+into a Response. --concurrency clients download it at once (a quarter of
+them with a Range header), while the server's RSS is sampled from
+/proc/<pid>/status. Bodies are length-checked, and one is hash-checked.
+
+Usage (from naac-backend/):
+    python benchmarks/bench_downloads.py --size-mb 128 --concurrency 32
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import socket
+import asyncio
+import hashlib
+import argparse
+import tempfile
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx  # noqa: E402
+
+
+def serve(path: str, port: int, mode: str):
+    import uvicorn
+    from fastapi import FastAPI, Request, Response
+    from downloads import download_service
+    from response_encoding import CompressionMiddleware
+
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware)
+
+    @app.get("/file")
+    async def file(request: Request):
+        if mode == "buffered":
+            with open(path, "rb") as f:
+                return Response(f.read(), media_type="application/octet-stream")
+        return await download_service.file(request, path, media_type="application/octet-stream", filename="evidence.bin")
+
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning")
+
+
+def rss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def run_mode(mode: str, path: str, size: int, expected_sha: str, args) -> dict:
+    port = free_port()
+    server = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--serve", path, "--port", str(port), "--mode", mode])
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=300) as client:
+            for _ in range(100):
+                try:
+                    await client.get("/docs")
+                    break
+                except httpx.TransportError:
+                    await asyncio.sleep(0.1)
+            idle = rss_mb(server.pid)
+            peak = {"rss": idle}
+            done = asyncio.Event()
+
+            async def sample():
+                while not done.is_set():
+                    peak["rss"] = max(peak["rss"], rss_mb(server.pid))
+                    await asyncio.sleep(0.02)
+
+            async def download(i: int):
+                headers = {"accept-encoding": "gzip, br"}
+                expected = size
+                if i % 4 == 3 and mode == "streamed":
+                    headers["range"] = f"bytes={size // 2}-"
+                    expected = size - size // 2
+                received, hasher = 0, hashlib.sha256() if i == 0 else None
+                async with client.stream("GET", "/file", headers=headers) as response:
+                    async for chunk in response.aiter_raw():
+                        received += len(chunk)
+                        if hasher:
+                            hasher.update(chunk)
+                assert received == expected, f"download {i}: {received} of {expected} bytes"
+                if hasher:
+                    assert hasher.hexdigest() == expected_sha, "body differs from the file"
+                return received
+
+            sampler = asyncio.create_task(sample())
+            t0 = time.perf_counter()
+            received = sum(await asyncio.gather(*(download(i) for i in range(args.concurrency))))
+            elapsed = time.perf_counter() - t0
+            done.set()
+            await sampler
+        return {"mode": mode, "idle_rss_mb": round(idle, 1), "peak_rss_mb": round(peak["rss"], 1),
+                "peak_over_idle_mb": round(peak["rss"] - idle, 1), "elapsed_s": round(elapsed, 2),
+                "throughput_mb_s": round(received / elapsed / 1e6, 1)}
+    finally:
+        server.terminate()
+        server.wait()
+
+
+async def main_async(args) -> dict:
+    workdir = tempfile.mkdtemp(prefix="naac-download-bench-")
+    try:
+        path = os.path.join(workdir, "evidence.bin")
+        hasher = hashlib.sha256()
+        with open(path, "wb") as f:
+            for _ in range(args.size_mb):
+                block = os.urandom(1024 * 1024)
+                hasher.update(block)
+                f.write(block)
+        size = os.path.getsize(path)
+        runs = [await run_mode(mode, path, size, hasher.hexdigest(), args) for mode in args.modes]
+        return {"file_mb": args.size_mb, "concurrency": args.concurrency, "runs": runs}
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=int, default=128)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--modes", nargs="*", default=["streamed", "buffered"])
+    parser.add_argument("--serve", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--mode", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.serve:
+        serve(args.serve, args.port, args.mode)
+        return
+    print(json.dumps(asyncio.run(main_async(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
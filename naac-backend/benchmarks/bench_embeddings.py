@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""Embedding backends: cold start, per-query latency, batch throughput and agreement with PyTorch.
+
+Each backend (NAAC_EMBEDDING_BACKEND value) runs in a fresh Python process:
+  sentence-transformers   the current PyTorch path (SentenceEmbedder)
+  onnx                    OnnxEmbedder on model.onnx
+  onnx-int8               OnnxEmbedder on model_quantized.onnx
+
+"cold_start_ms" is import + model load + first embed, timed inside the new
+process. Queries are embedded one at a time; the corpus (sentence windows of
+data/documents and guidance/, 1-3 sentences so lengths vary) is embedded in
+one call. The ONNX vectors are compared with the PyTorch ones for the same
+texts (max abs difference, min cosine) and by top-k overlap when the queries
+search the corpus. A backend whose packages are missing is reported as
+unavailable rather than failing the run.
+
+The ONNX export is made first if --onnx-dir has none (needs torch, transformers and onnx;
+see requirements-onnx.txt):
+    python embeddings.py --export-onnx models/all-MiniLM-L6-v2-onnx
+
+Usage (from naac-backend/):
+    python benchmarks/bench_embeddings.py --queries 200 --k 10
+"""
+import os
+import re
+import sys
+import glob
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BACKENDS = ("sentence-transformers", "onnx", "onnx-int8")
+
+
+def corpus_texts(max_texts: int):
+    sentences = []
+    for path in sorted(glob.glob(os.path.join(REPO_ROOT, "data", "documents", "*.txt")) + glob.glob(os.path.join(BACKEND_DIR, "guidance", "*"))):
+        if os.path.isfile(path):
+            with open(path, "r", encoding="utf-8", errors="ignore") as f:
+                sentences += [s.strip() for s in re.split(r"(?<=[.?!])\s+|\n+", f.read()) if len(s.strip()) > 20]
+    return [" ".join(sentences[i:i + size]) for size in (1, 2, 3) for i in range(len(sentences))][:max_texts]
+
+
+QUERIES = [
+    "How do I document criterion {n} evidence?",
+    "What is the weightage of key indicator {n}?",
+    "Student satisfaction survey for metric 2.{n}",
+    "Research publications per teacher in the last {n} years",
+    "Infrastructure and learning resources, library budget {n}",
+]
+
+
+def worker(args):
+    """Runs in the child process: prints timings and writes vectors to --out"""
+    t0 = time.perf_counter()
+    sys.path.insert(0, BACKEND_DIR)
+    from embeddings import OnnxEmbedder, SentenceEmbedder
+    if args.worker == "sentence-transformers":
+        embedder = SentenceEmbedder(batch_size=args.batch_size)
+    else:
+        embedder = OnnxEmbedder(args.onnx_dir, quantized=args.worker == "onnx-int8", batch_size=args.batch_size)
+    embedder.embed_query("warm up")
+    cold_start_ms = (time.perf_counter() - t0) * 1000
+
+    queries = [QUERIES[i % len(QUERIES)].format(n=i % 7 + 1) for i in range(args.queries)]
+    latencies = []
+    query_vectors = []
+    for query in queries:
+        t0 = time.perf_counter()
+        query_vectors.append(embedder.embed_query(query))
+        latencies.append((time.perf_counter() - t0) * 1000)
+    latencies.sort()
+
+    texts = corpus_texts(args.max_texts)
+    t0 = time.perf_counter()
+    corpus_vectors = embedder.embed(texts)
+    batch_s = time.perf_counter() - t0
+    np.save(os.path.join(args.out, f"{args.worker}-queries.npy"), np.asarray(query_vectors, dtype=np.float32))
+    np.save(os.path.join(args.out, f"{args.worker}-corpus.npy"), np.asarray(corpus_vectors, dtype=np.float32))
+    with open("/proc/self/status") as f:
+        rss_kb = next(int(line.split()[1]) for line in f if line.startswith("VmHWM:"))
+    print(json.dumps({
+        "cold_start_ms": round(cold_start_ms, 1),
+        "query_p50_ms": round(statistics.median(latencies), 2),
+        "query_p99_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))], 2),
+        "batch_texts": len(texts),
+        "batch_texts_per_s": round(len(texts) / batch_s, 1),
+        "peak_rss_mb": round(rss_kb / 1024, 1),
+    }))
+
+
+def run_backend(backend: str, workdir: str, args) -> dict:
+    command = [sys.executable, "-W", "ignore", os.path.abspath(__file__), "--worker", backend, "--out", workdir,
+               "--onnx-dir", args.onnx_dir, "--queries", str(args.queries), "--max-texts", str(args.max_texts),
+               "--batch-size", str(args.batch_size)]
+    result = subprocess.run(command, capture_output=True, text=True, cwd=BACKEND_DIR)
+    if result.returncode != 0:
+        last_line = (result.stderr.strip().splitlines() or ["exited with status %d" % result.returncode])[-1]
+        return {"backend": backend, "unavailable": last_line}
+    return {"backend": backend, **json.loads(result.stdout.strip().splitlines()[-1])}
+
+
+def agreement(reference: str, backend: str, workdir: str, k: int) -> dict:
+    load = lambda name, part: np.load(os.path.join(workdir, f"{name}-{part}.npy"))  # noqa: E731
+    expected, actual = load(reference, "corpus"), load(backend, "corpus")
+    cosines = (expected * actual).sum(axis=1)
+    k = min(k, len(expected))
+    overlaps = []
+    for want, got in zip(load(reference, "queries"), load(backend, "queries")):
+        top_expected = set(np.argpartition(-(expected @ want), k - 1)[:k].tolist())
+        top_actual = set(np.argpartition(-(actual @ got), k - 1)[:k].tolist())
+        overlaps.append(len(top_expected & top_actual) / k)
+    return {"max_abs_diff": float(np.abs(expected - actual).max()), "min_cosine": round(float(cosines.min()), 6),
+            "mean_cosine": round(float(cosines.mean()), 6), f"top{k}_overlap": round(statistics.mean(overlaps), 4)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="*", default=list(BACKENDS), choices=BACKENDS)
+    parser.add_argument("--onnx-dir", default=os.path.join(BACKEND_DIR, "models", "all-MiniLM-L6-v2-onnx"))
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--max-texts", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--worker", choices=BACKENDS, help=argparse.SUPPRESS)
+    parser.add_argument("--out", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        return worker(args)
+
+    report = {"cpus": os.cpu_count(), "batch_size": args.batch_size, "backends": []}
+    if any(b.startswith("onnx") for b in args.backends) and not os.path.exists(os.path.join(args.onnx_dir, "model.onnx")):
+        sys.path.insert(0, BACKEND_DIR)
+        from embeddings import export_onnx
+        try:
+            export_onnx(output_dir=args.onnx_dir)
+        except ImportError as e:
+            report["export"] = f"skipped: {e}"
+    workdir = tempfile.mkdtemp(prefix="naac-embeddings-bench-")
+    try:
+        for backend in args.backends:
+            report["backends"].append(run_backend(backend, workdir, args))
+        measured = {entry["backend"] for entry in report["backends"] if "unavailable" not in entry}
+        if "sentence-transformers" in measured:
+            for entry in report["backends"]:
+                if entry["backend"] != "sentence-transformers" and entry["backend"] in measured:
+                    entry["vs_pytorch"] = agreement("sentence-transformers", entry["backend"], workdir, args.k)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
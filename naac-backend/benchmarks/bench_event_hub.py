@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""Server cost of keeping --clients dashboards current: polling vs one pushed event stream each.
+
+Starts the real app under uvicorn per mode, in its own process, with a
+scratch database holding --jobs queued jobs. Every client watches one job,
+the dashboard analytics and service health:
+
+  poll  GETs /documents/processing-status/{job}, /analytics/dashboard and
+        /health/services every --poll-interval-s, as the pages do today
+  push  holds one /events?topics=job:{job},analytics,health stream open
+
+After everyone is connected the clients sit idle for --duration-s: nothing
+changes, so every request a poller makes is wasted. Server CPU comes from
+/proc/<pid>/stat, RSS from /proc/<pid>/status; "db_reads" counts job and
+dashboard queries the server ran. Near the end one job is completed to time
+how long a change takes to reach its watcher in each mode.
+
+Usage (from naac-backend/):
+    python benchmarks/bench_event_hub.py --clients 1000 --duration-s 30
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import socket
+import asyncio
+import argparse
+import tempfile
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx  # noqa: E402
+
+
+def serve(port: int):
+    import uvicorn
+    import main
+    import database
+    from job_queue import job_queue
+
+    reads = {"jobs": 0, "dashboard": 0}
+    get, get_many, dashboard_counts = job_queue.get, job_queue.get_many, main.dashboard_counts
+
+    def counted_get(job_id):
+        reads["jobs"] += 1
+        return get(job_id)
+
+    def counted_get_many(job_ids):
+        reads["jobs"] += 1
+        return get_many(job_ids)
+
+    async def counted_dashboard_counts(*args, **kwargs):
+        reads["dashboard"] += 1
+        return await dashboard_counts(*args, **kwargs)
+
+    job_queue.get, job_queue.get_many, main.dashboard_counts = counted_get, counted_get_many, counted_dashboard_counts
+
+    @main.app.get("/bench/reads")
+    async def bench_reads():
+        return {**reads, "hub": main.event_hub.stats()}
+
+    @main.app.post("/bench/complete/{job_id}")
+    async def bench_complete(job_id: int):
+        await asyncio.to_thread(job_queue.complete, job_id)
+        return {"completed": job_id}
+
+    asyncio.run(database.init_database())
+    for document_id in range(1, int(os.environ["BENCH_JOBS"]) + 1):
+        job_queue.enqueue(document_id, {"path": f"/nonexistent/{document_id}"})
+    uvicorn.run(main.app, host="127.0.0.1", port=port, log_level="warning", timeout_keep_alive=60)
+
+
+def proc_cpu_s(pid: int) -> float:
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def rss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def poll_client(client: httpx.AsyncClient, job_id: int, args, stop: asyncio.Event, stats: dict, ready: asyncio.Event):
+    # Spread first polls over the interval like tabs opened at different times
+    await asyncio.sleep((job_id % 97) / 97 * args.poll_interval_s)
+    ready.set()
+    while not stop.is_set():
+        for path in (f"/documents/processing-status/{job_id}", "/api/analytics/dashboard", "/health/services"):
+            response = await client.get(path)
+            stats["requests"] += 1
+            if path.startswith("/documents") and response.json()["job_status"] == "done" and job_id == 1 and "seen" not in stats:
+                stats["seen"] = time.perf_counter()
+        try:
+            await asyncio.wait_for(stop.wait(), args.poll_interval_s)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def push_client(client: httpx.AsyncClient, job_id: int, args, stop: asyncio.Event, stats: dict, ready: asyncio.Event):
+    async with client.stream("GET", f"/events?topics=job:{job_id},analytics,health") as response:
+        stats["requests"] += 1
+        lines = response.aiter_lines()
+        reader = asyncio.ensure_future(lines.__anext__())
+        while True:
+            stopper = asyncio.ensure_future(stop.wait())
+            done, _ = await asyncio.wait([reader, stopper], return_when=asyncio.FIRST_COMPLETED)
+            if reader not in done:
+                reader.cancel()
+                return
+            stopper.cancel()
+            line = reader.result()
+            if line.startswith("event: hello"):
+                ready.set()
+            elif job_id == 1 and '"job_status": "done"' in line and "seen" not in stats:
+                stats["seen"] = time.perf_counter()
+            reader = asyncio.ensure_future(lines.__anext__())
+
+
+async def run_mode(mode: str, args) -> dict:
+    port = free_port()
+    workdir = tempfile.mkdtemp(prefix="naac-events-bench-")
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'bench.db')}", UPLOAD_DIR=workdir,
+               LOCAL_STORAGE_DIR=workdir, EMBEDDED_JOB_WORKERS="0", BENCH_JOBS=str(args.jobs))
+    server = subprocess.Popen([sys.executable, "-W", "ignore", os.path.abspath(__file__), "--serve", "--port", str(port)],
+                              env=env, cwd=workdir)
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=120, limits=limits) as client:
+            for _ in range(300):
+                try:
+                    await client.get("/bench/reads")
+                    break
+                except httpx.TransportError:
+                    await asyncio.sleep(0.1)
+            idle_rss = rss_mb(server.pid)
+            stop, stats = asyncio.Event(), {"requests": 0}
+            readies = [asyncio.Event() for _ in range(args.clients)]
+            client_fn = poll_client if mode == "poll" else push_client
+            tasks = [asyncio.create_task(client_fn(client, i % args.jobs + 1, args, stop, stats, readies[i]))
+                     for i in range(args.clients)]
+            t0 = time.perf_counter()
+            await asyncio.gather(*(ready.wait() for ready in readies))
+            connect_s = time.perf_counter() - t0
+
+            before = (await client.get("/bench/reads")).json()
+            cpu0, requests0, t0 = proc_cpu_s(server.pid), stats["requests"], time.perf_counter()
+            await asyncio.sleep(args.duration_s)
+            elapsed = time.perf_counter() - t0
+            cpu, requests = proc_cpu_s(server.pid) - cpu0, stats["requests"] - requests0
+            after = (await client.get("/bench/reads")).json()
+            rss = rss_mb(server.pid)
+
+            changed = time.perf_counter()
+            await client.post("/bench/complete/1")
+            for _ in range(int((args.poll_interval_s + 5) / 0.01)):
+                if "seen" in stats:
+                    break
+                await asyncio.sleep(0.01)
+            latency = stats["seen"] - changed if "seen" in stats else None
+
+            stop.set()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        db_reads = after["jobs"] + after["dashboard"] - before["jobs"] - before["dashboard"]
+        return {"mode": mode, "clients": args.clients, "connect_s": round(connect_s, 2),
+                "requests_per_s": round(requests / elapsed, 1), "db_reads_per_s": round(db_reads / elapsed, 1),
+                "server_cpu_pct": round(cpu / elapsed * 100, 1), "idle_rss_mb": round(idle_rss, 1),
+                "rss_mb": round(rss, 1), "rss_per_client_kb": round((rss - idle_rss) * 1024 / args.clients, 1),
+                "change_latency_ms": round(latency * 1000, 1) if latency is not None else None}
+    finally:
+        server.terminate()
+        server.wait()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+async def main_async(args) -> dict:
+    runs = [await run_mode(mode, args) for mode in args.modes]
+    return {"clients": args.clients, "duration_s": args.duration_s, "poll_interval_s": args.poll_interval_s,
+            "cpus": os.cpu_count(), "runs": runs}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=1000)
+    parser.add_argument("--jobs", type=int, default=200)
+    parser.add_argument("--duration-s", type=float, default=30)
+    parser.add_argument("--poll-interval-s", type=float, default=5)
+    parser.add_argument("--modes", nargs="*", default=["push", "poll"])
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.serve:
+        serve(args.port)
+        return
+    print(json.dumps(asyncio.run(main_async(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
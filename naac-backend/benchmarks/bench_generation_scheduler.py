@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""Burst of concurrent chat generations against the local mock watsonx server.
+
+Compares unbounded direct calls with the GenerationScheduler and reports
+latency, the peak number of concurrent upstream requests and shed requests.
+
+Usage (from naac-backend/):
+    python benchmarks/bench_generation_scheduler.py --requests 200 --sessions 20 --max-in-flight 4
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mock_services import start_mock_ibm_server
+from granite_client import GraniteClient
+from generation_scheduler import GenerationScheduler, QueueFullError, DeadlineExceededError
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(len(values) * p))], 1) if values else None
+
+
+async def run_burst(submit, n_requests, n_sessions):
+    latencies, errors = [], {}
+
+    async def one(i):
+        t0 = time.perf_counter()
+        try:
+            await submit(f"Explain NAAC criterion {i % 7 + 1}", f"session-{i % n_sessions}")
+            latencies.append((time.perf_counter() - t0) * 1000)
+        except Exception as e:
+            errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(n_requests)))
+    return {
+        "wall_s": round(time.perf_counter() - t0, 3),
+        "ok": len(latencies),
+        "errors": errors,
+        "p50_ms": percentile(latencies, 0.5),
+        "p95_ms": percentile(latencies, 0.95),
+    }
+
+
+async def main_async(args):
+    server, base_url = start_mock_ibm_server(generation_latency=args.latency)
+    os.environ["IBM_IAM_URL"] = f"{base_url}/identity/token"
+    client = GraniteClient(api_key="mock", project_id="mock", url=f"{base_url}/ml/v1/text/generation")
+    client.access_token()
+    report = {}
+
+    server.state["max_in_flight"] = 0
+    report["direct"] = await run_burst(lambda p, s: asyncio.to_thread(client.generate, p), args.requests, args.sessions)
+    report["direct"]["upstream_max_in_flight"] = server.state["max_in_flight"]
+
+    server.state["max_in_flight"] = 0
+    scheduler = GenerationScheduler(client, max_in_flight=args.max_in_flight, max_queue=args.max_queue, default_deadline_s=args.deadline)
+    report["scheduled"] = await run_burst(lambda p, s: scheduler.submit(p, session_id=s), args.requests, args.sessions)
+    report["scheduled"]["upstream_max_in_flight"] = server.state["max_in_flight"]
+    report["scheduled"]["scheduler"] = scheduler.stats()
+    server.shutdown()
+    print(json.dumps(report, indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.05, help="Mock generation latency in seconds")
+    parser.add_argument("--max-in-flight", type=int, default=4)
+    parser.add_argument("--max-queue", type=int, default=256)
+    parser.add_argument("--deadline", type=float, default=30.0)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
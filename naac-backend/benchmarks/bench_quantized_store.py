@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""Quantized vector store: memory per million chunks, and recall@k against exact float search.
+
+Loads embeddings into QuantizedVectorIndex in int8 and binary mode and
+compares each query's top-k with brute-force float32 cosine over the same
+vectors. "oversample" is the number of candidates rescored against the
+memory-mapped floats, as a multiple of k (1 = first pass only, reordered).
+
+Embeddings, first available of:
+  --vectors file.npy     an (n, 384) array, e.g. exported from Chroma or Pinecone
+  MiniLM                 all-MiniLM-L6-v2 over sentence windows of data/documents and guidance/,
+                         when sentence-transformers is installed; queries are held-out windows
+  synthetic (fallback)   clustered unit vectors sharing a common direction, as MiniLM's do;
+                         queries are perturbed copies of stored rows
+
+Usage (from naac-backend/):
+    python benchmarks/bench_quantized_store.py --rows 200000 --queries 200 --k 10
+"""
+import os
+import re
+import sys
+import glob
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from quantized_store import QuantizedVectorIndex  # noqa: E402
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def minilm_vectors(queries: int):
+    try:
+        from embeddings import SentenceEmbedder
+        embedder = SentenceEmbedder()
+        embedder.embed(["warm up"])
+    except ImportError:
+        return None
+    sentences = []
+    for path in sorted(glob.glob(os.path.join(REPO_ROOT, "data", "documents", "*.txt")) + glob.glob(os.path.join(BACKEND_DIR, "guidance", "*"))):
+        if os.path.isfile(path):
+            with open(path, "r", encoding="utf-8", errors="ignore") as f:
+                sentences += [s.strip() for s in re.split(r"(?<=[.?!])\s+|\n+", f.read()) if len(s.strip()) > 20]
+    windows = [" ".join(sentences[i:i + size]) for size in (1, 2, 3) for i in range(len(sentences))]
+    vectors = np.asarray(embedder.embed(windows), dtype=np.float32)
+    rng = np.random.default_rng(3)
+    held_out = rng.choice(len(vectors), size=min(queries, len(vectors) // 10), replace=False)
+    keep = np.setdiff1d(np.arange(len(vectors)), held_out)
+    return vectors[keep], vectors[held_out], "minilm"
+
+
+def synthetic_vectors(rows: int, queries: int, dimension: int = 384):
+    rng = np.random.default_rng(7)
+
+    def unit(x):
+        return x / np.linalg.norm(x, axis=-1, keepdims=True)
+
+    common = unit(rng.standard_normal(dimension)).astype(np.float32)
+    centers = unit(rng.standard_normal((max(1, rows // 50), dimension))).astype(np.float32)
+    # Per-dimension spread differs, as in real sentence embeddings
+    spread = rng.gamma(2.0, 0.5, dimension).astype(np.float32)
+    vectors = np.empty((rows, dimension), dtype=np.float32)
+    for start in range(0, rows, 50000):
+        n = min(rows, start + 50000) - start
+        noise = unit(rng.standard_normal((n, dimension))).astype(np.float32)
+        vectors[start:start + n] = unit((0.6 * common + centers[rng.integers(0, len(centers), n)] + noise) * spread)
+    picks = vectors[rng.integers(0, rows, queries)]
+    noisy = unit(picks + 0.6 * unit(rng.standard_normal(picks.shape)).astype(np.float32) * spread)
+    return vectors, noisy.astype(np.float32), "synthetic"
+
+
+def load(args):
+    if args.vectors:
+        vectors = np.load(args.vectors).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        rng = np.random.default_rng(3)
+        held_out = rng.choice(len(vectors), size=min(args.queries, len(vectors) // 10), replace=False)
+        return vectors[np.setdiff1d(np.arange(len(vectors)), held_out)], vectors[held_out], os.path.basename(args.vectors)
+    if not args.synthetic:
+        loaded = minilm_vectors(args.queries)
+        if loaded is not None:
+            return loaded
+        print("sentence-transformers not installed - using synthetic MiniLM-shaped vectors", file=sys.stderr)
+    return synthetic_vectors(args.rows, args.queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200000, help="Synthetic rows (ignored for MiniLM / --vectors)")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--oversample", type=int, nargs="*", default=[1, 2, 4, 10, 20])
+    parser.add_argument("--vectors", help="(n, dim) .npy of existing embeddings")
+    parser.add_argument("--synthetic", action="store_true", help="Skip MiniLM even when installed")
+    args = parser.parse_args()
+
+    vectors, queries, source = load(args)
+    rows, dimension = vectors.shape
+    ids = [f"chunk-{i}" for i in range(rows)]
+    k = min(args.k, rows)
+
+    latencies = []
+    truth = []
+    for query in queries:
+        t0 = time.perf_counter()
+        scores = vectors @ query
+        top = np.argpartition(-scores, k)[:k]
+        latencies.append((time.perf_counter() - t0) * 1000)
+        truth.append({ids[i] for i in top})
+    float_mb = vectors.nbytes / rows * 1e6 / 2 ** 20
+    report = {"source": source, "rows": rows, "dimension": dimension, "queries": len(queries), "k": k,
+              "float32_in_memory": {"mb_per_million": round(float_mb, 1), "p50_ms": round(statistics.median(latencies), 3)},
+              "modes": []}
+
+    workdir = tempfile.mkdtemp(prefix="naac-quantized-bench-")
+    try:
+        for mode in ("int8", "binary"):
+            index = QuantizedVectorIndex(os.path.join(workdir, mode), dimension=dimension, mode=mode)
+            t0 = time.perf_counter()
+            for start in range(0, rows, 1000):
+                index.upsert([{"id": ids[i], "values": vectors[i], "metadata": {"n": i}} for i in range(start, min(rows, start + 1000))])
+            build_s = time.perf_counter() - t0
+            memory = index.memory_bytes()
+            entry = {"mode": mode, "build_s": round(build_s, 2),
+                     "code_mb_per_million": round(memory["code_bytes_per_vector"] * 1e6 / 2 ** 20, 1),
+                     "resident_mb_per_million": round(memory["resident_bytes"] / rows * 1e6 / 2 ** 20, 1),
+                     "ids_and_rows_mb_per_million": round((memory["ids_bytes"] + memory["rows_bytes"]) / rows * 1e6 / 2 ** 20, 1),
+                     "vs_float32": f"1/{round(float_mb / (memory['resident_bytes'] / rows * 1e6 / 2 ** 20), 1)}",
+                     "runs": []}
+            for oversample in args.oversample:
+                recalls, times = [], []
+                for query, expected in zip(queries, truth):
+                    t0 = time.perf_counter()
+                    matches = index.query(query, top_k=k, include_metadata=False, oversample=oversample)["matches"]
+                    times.append((time.perf_counter() - t0) * 1000)
+                    recalls.append(len({m["id"] for m in matches} & expected) / k)
+                entry["runs"].append({"oversample": oversample, f"recall@{k}": round(statistics.mean(recalls), 4),
+                                      "p50_ms": round(statistics.median(times), 3)})
+            report["modes"].append(entry)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
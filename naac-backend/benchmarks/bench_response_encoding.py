@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""Bytes on the wire and serialization CPU per request, before and after the encoding pipeline.
+
+"before" is FastAPI's stock JSONResponse with no compression; "after" is
+FastJSONResponse (orjson when installed) behind CompressionMiddleware, as
+main.py now configures it. Each payload is served from a small in-process
+app built both ways and requested with a browser-like Accept-Encoding.
+Serialization CPU is measured separately on the render step alone.
+
+Usage (from naac-backend/):
+    python benchmarks/bench_response_encoding.py --requests 300
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import FastAPI  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from response_encoding import FastJSONResponse, CompressionMiddleware, orjson, brotli  # noqa: E402
+from response_templates import TemplateCache  # noqa: E402
+
+ACCEPT_ENCODING = "gzip, deflate, br"
+
+
+def make_payloads() -> dict:
+    rng = random.Random(3)
+    templates = TemplateCache().load()
+    answer = next(t for t in templates if t.id == "documentation")
+    now = datetime(2024, 1, 1)
+    return {
+        "chat_answer": {"response": answer.body, "confidence": answer.confidence, "sources": answer.sources,
+                        "timestamp": str(time.time()), "session_id": "session-123"},
+        "dashboard": {"documentsProcessed": 1234, "queriesHandled": 56789, "reportsGenerated": 18929, "criteriaCompleted": 7,
+                      "recentActivity": [{"query": f"How to prepare criterion {i % 7 + 1} evidence for the SSR?", "time": (now - timedelta(minutes=i)).isoformat()} for i in range(5)],
+                      "systemStatus": "operational", "timestamp": now.isoformat()},
+        "bucket_listing": {"bucket": "naac-bucket", "objects": [
+            {"key": f"uploads/{rng.getrandbits(64):016x}/evidence-{i}.pdf", "size": rng.randint(10_000, 9_000_000),
+             "last_modified": (now - timedelta(hours=i)).isoformat(), "etag": f"{rng.getrandbits(128):032x}", "storage_class": "STANDARD"}
+            for i in range(500)]},
+        "search_results": {"query": "curricular", "results": [
+            {"type": "chat", "id": i, "session_id": f"session-{i % 40}", "question": "What is <mark>curricular</mark> planning?",
+             "snippet": "…1.1 <mark>Curricular</mark> Planning and Implementation - Program outcomes and course outcomes alignment…",
+             "created_at": (now - timedelta(minutes=i)).isoformat(), "score": round(rng.random() * 10, 6)}
+            for i in range(100)], "has_more": True},
+    }
+
+
+def build_app(payloads: dict, after: bool) -> FastAPI:
+    app = FastAPI(default_response_class=FastJSONResponse if after else JSONResponse)
+    if after:
+        app.add_middleware(CompressionMiddleware)
+    for name, payload in payloads.items():
+        app.add_api_route(f"/{name}", (lambda p=payload: p), methods=["GET"])
+    return app
+
+
+def render_cpu_us(response_class, payload, repeats: int) -> float:
+    t0 = time.process_time()
+    for _ in range(repeats):
+        response_class(payload)
+    return round((time.process_time() - t0) / repeats * 1e6, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=300)
+    args = parser.parse_args()
+
+    payloads = make_payloads()
+    report = {"orjson": orjson is not None, "brotli": brotli is not None, "accept_encoding": ACCEPT_ENCODING, "payloads": {}}
+    clients = {label: TestClient(build_app(payloads, after)) for label, after in (("before", False), ("after", True))}
+    for name, payload in payloads.items():
+        entry = {}
+        for label, client in clients.items():
+            response = client.get(f"/{name}", headers={"accept-encoding": ACCEPT_ENCODING})
+            assert response.json() == json.loads(json.dumps(payload)), f"{label} {name} changed the payload"
+            t0 = time.perf_counter()
+            for _ in range(args.requests):
+                client.get(f"/{name}", headers={"accept-encoding": ACCEPT_ENCODING})
+            entry[label] = {
+                # httpx decodes transparently; the raw stream length is what crossed the wire
+                "wire_bytes": int(response.headers.get("content-length", len(response.content))),
+                "content_encoding": response.headers.get("content-encoding", "identity"),
+                "render_cpu_us": render_cpu_us(FastJSONResponse if label == "after" else JSONResponse, payload, args.requests),
+                "request_ms": round((time.perf_counter() - t0) / args.requests * 1000, 3),
+            }
+        entry["wire_bytes_saved_pct"] = round(100 * (1 - entry["after"]["wire_bytes"] / entry["before"]["wire_bytes"]), 1)
+        report["payloads"][name] = entry
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""Latency of FTS5 search over a seeded chat-history and document database.
+
+Seeds a scratch database through database.py (so the FTS triggers do the
+indexing, as in production), indexes synthetic document chunks the way the
+job worker does, then times rare-term, common-term, phrase, prefix,
+session-filtered and "recent" searches. The same rare-term search is also run
+as the old LIKE scan over user_queries for comparison. Exits non-zero if the
+chat search is not answered from the FTS index.
+
+Usage (from naac-backend/):
+    python benchmarks/bench_search.py --rows 1000000 --documents 2000 --repeats 50
+    python benchmarks/bench_search.py --db /path/to/seeded.db --repeats 50   # reuse a seeded file
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import asyncio
+import argparse
+import sqlite3
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ARGS = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+ARGS.add_argument("--rows", type=int, default=200_000, help="chat rows to seed")
+ARGS.add_argument("--documents", type=int, default=500, help="documents of --chunks-per-document chunks to index")
+ARGS.add_argument("--chunks-per-document", type=int, default=40)
+ARGS.add_argument("--repeats", type=int, default=30)
+ARGS.add_argument("--db", help="existing database to search (seeded if it has no chat rows)")
+args = ARGS.parse_args()
+
+WORKDIR = None if args.db else tempfile.mkdtemp(prefix="naac-search-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{args.db or os.path.join(WORKDIR, 'bench.db')}"
+
+import database  # noqa: E402  (DATABASE_URL must be set first)
+from models import UserQuery  # noqa: E402
+from search_index import SearchIndex  # noqa: E402
+
+NAAC_TERMS = ["curricular", "teaching", "learning", "evaluation", "research", "innovation", "infrastructure",
+              "governance", "leadership", "mentoring", "accreditation", "criterion", "assessment", "outcomes"]
+RARE_TERM = "zeolite"
+
+
+def make_vocabulary(size: int = 20000) -> list:
+    rng = random.Random(7)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return NAAC_TERMS + ["".join(rng.choice(letters) for _ in range(rng.randint(3, 10))) for _ in range(size)]
+
+
+def sentence(rng: random.Random, vocabulary: list, words: int) -> str:
+    # Zipf-ish: low ranks dominate, so NAAC_TERMS are common and the tail is rare
+    return " ".join(vocabulary[min(int(rng.paretovariate(1.1)) - 1, len(vocabulary) - 1)] for _ in range(words))
+
+
+async def seed(rows: int, documents: int, chunks_per_document: int) -> dict:
+    await database.init_database()
+    rng = random.Random(42)
+    vocabulary = make_vocabulary()
+    sessions = [f"session-{i}" for i in range(max(1, rows // 50))]
+    t0 = time.perf_counter()
+    for start in range(0, rows, 10000):
+        batch = []
+        for i in range(start, min(rows, start + 10000)):
+            question = sentence(rng, vocabulary, 12)
+            if i % 10000 == 0:
+                question += f" {RARE_TERM}"
+            batch.append({"session_id": rng.choice(sessions), "user_query": question,
+                          "ai_response": sentence(rng, vocabulary, 60)})
+        async with database.async_engine.begin() as conn:
+            await conn.execute(UserQuery.__table__.insert(), batch)
+    chat_s = time.perf_counter() - t0
+
+    index = SearchIndex(database.SQLITE_PATH)
+    t0 = time.perf_counter()
+    for document_id in range(1, documents + 1):
+        chunks = [{"content": sentence(rng, vocabulary, 150)} for _ in range(chunks_per_document)]
+        index.index_document(document_id, f"evidence-{document_id}.pdf", rng.choice(sessions), chunks)
+    documents_s = time.perf_counter() - t0
+    index.optimize()
+    return {
+        "chat_rows_per_s": round(rows / chat_s, 1) if chat_s else None,
+        "document_chunks_per_s": round(documents * chunks_per_document / documents_s, 1) if documents_s else None,
+        "sample_session": sessions[0],
+    }
+
+
+def timed_runs(fn, repeats: int) -> dict:
+    latencies, result = [], None
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        result = fn()
+        latencies.append((time.perf_counter() - t0) * 1000)
+    latencies.sort()
+    return {
+        "p50_ms": round(latencies[len(latencies) // 2], 2),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95)], 2),
+        "results": len(result["results"]) if isinstance(result, dict) else len(result),
+    }
+
+
+def main():
+    seeded = None
+    try:
+        asyncio.run(database.init_database())
+        with sqlite3.connect(database.SQLITE_PATH) as conn:
+            existing = conn.execute("SELECT COUNT(*) FROM user_queries").fetchone()[0]
+        if not existing:
+            seeded = asyncio.run(seed(args.rows, args.documents, args.chunks_per_document))
+        asyncio.run(database.close_database())
+
+        index = SearchIndex(database.SQLITE_PATH)
+        session = (seeded or {}).get("sample_session") or index._conn().execute(
+            "SELECT session_id FROM user_queries LIMIT 1").fetchone()[0]
+        cases = {
+            "rare_term": lambda: index.search(RARE_TERM, scope="chat"),
+            "common_term": lambda: index.search("curricular", scope="chat"),
+            "two_common_terms": lambda: index.search("teaching learning", scope="all"),
+            "phrase": lambda: index.search('"teaching learning"', scope="chat"),
+            "prefix": lambda: index.search("accredit*", scope="documents"),
+            "session_filter": lambda: index.search("curricular", scope="chat", session_id=session),
+            "recent_common_term": lambda: index.search("curricular", scope="chat", sort="recent"),
+            "deep_page": lambda: index.search("curricular", scope="chat", offset=500),
+            "like_scan_rare_term": lambda: index._conn().execute(
+                "SELECT id FROM user_queries WHERE user_query LIKE ? OR ai_response LIKE ? LIMIT 20",
+                (f"%{RARE_TERM}%", f"%{RARE_TERM}%")).fetchall(),
+        }
+        plan = [row[3] for row in index._conn().execute(
+            "EXPLAIN QUERY PLAN SELECT rowid FROM chat_search WHERE chat_search MATCH 'curricular' ORDER BY rank LIMIT 20"
+        )]
+        report = {
+            "rows": index._conn().execute("SELECT COUNT(*) FROM user_queries").fetchone()[0],
+            "document_chunks": index._conn().execute("SELECT COUNT(*) FROM document_search").fetchone()[0],
+            "seed": seeded,
+            "plan": plan,
+            "searches": {name: timed_runs(fn, args.repeats) for name, fn in cases.items()},
+        }
+        print(json.dumps(report, indent=2))
+        return any("VIRTUAL TABLE INDEX" in line for line in plan)
+    finally:
+        if WORKDIR:
+            shutil.rmtree(WORKDIR, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
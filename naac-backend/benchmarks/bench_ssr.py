@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""SSR generation time for a full report, an unchanged rerun, and reruns after editing a few sections.
+
+Uses a scratch database and a stand-in generator with a fixed per-section
+latency (the shape of a Granite call), so the numbers show how build time
+scales with the number of changed sections and with --parallel.
+
+Usage (from naac-backend/):
+    python benchmarks/bench_ssr.py --latency-ms 400 --parallel 4 --edits 1 3
+"""
+import os
+import sys
+import json
+import shutil
+import asyncio
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+WORKDIR = tempfile.mkdtemp(prefix="naac-ssr-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(WORKDIR, 'bench.db')}"
+
+import database  # noqa: E402  (DATABASE_URL must be set first)
+from ssr_engine import SSREngine, SUB_CRITERION_TITLES  # noqa: E402
+
+
+async def main_async(args) -> dict:
+    calls = {"n": 0}
+
+    async def fake_generate(prompt: str) -> str:
+        calls["n"] += 1
+        await asyncio.sleep(args.latency_ms / 1000)
+        return f"Generated section ({len(prompt)} prompt chars)."
+
+    engine = SSREngine(lambda: ("bench", fake_generate), output_dir=os.path.join(WORKDIR, "ssr"), max_parallel=args.parallel)
+    subs = list(SUB_CRITERION_TITLES)
+    for sub in subs:
+        await engine.save_input("bench", sub, f"Institutional data for {sub}.", "University")
+
+    runs = []
+
+    async def run(label: str):
+        before = calls["n"]
+        report = await engine.generate("bench", institution_type="University", wait=True)
+        runs.append({"run": label, "elapsed_ms": report["elapsed_ms"], "sections_generated": report["sections_generated"],
+                     "sections_cached": report["sections_cached"], "generator_calls": calls["n"] - before})
+
+    await run("full (cold cache)")
+    await run("unchanged")
+    for edits in args.edits:
+        for i, sub in enumerate(subs[:edits]):
+            await engine.save_input("bench", sub, f"Revised data for {sub}, revision {edits}-{i}.", "University")
+        await run(f"{edits} section(s) edited")
+    await database.close_database()
+    return {"sections": len(subs), "latency_ms": args.latency_ms, "parallel": args.parallel, "runs": runs}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency-ms", type=float, default=400)
+    parser.add_argument("--parallel", type=int, default=4)
+    parser.add_argument("--edits", type=int, nargs="*", default=[1, 3])
+    try:
+        print(json.dumps(asyncio.run(main_async(parser.parse_args())), indent=2))
+    finally:
+        shutil.rmtree(WORKDIR, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""Cold-start profile of the backend: time-to-first-response and import cost.
+
+Starts `uvicorn main:app` in a scratch directory (fresh SQLite file each run),
+polls /health until it answers, and reports the spread across runs. Then runs
+`python -X importtime -c "import main"` and lists the slowest imports by
+cumulative time.
+
+Usage (from naac-backend/):
+    python benchmarks/bench_startup.py --runs 5 --top 15
+"""
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import tempfile
+import subprocess
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def time_to_first_response(timeout: float = 30.0) -> dict:
+    port = free_port()
+    env = {**os.environ, "PYTHONPATH": BACKEND_DIR}
+    with tempfile.TemporaryDirectory() as workdir:
+        t0 = time.perf_counter()
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+            cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+        )
+        try:
+            first_ms = None
+            while time.perf_counter() - t0 < timeout:
+                if proc.poll() is not None:
+                    raise RuntimeError(f"uvicorn exited early: {proc.stderr.read().decode()[-500:]}")
+                try:
+                    with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1) as resp:
+                        resp.read()
+                    first_ms = (time.perf_counter() - t0) * 1000
+                    break
+                except OSError:
+                    time.sleep(0.005)
+            # Second request shows the steady-state cost once lazy work has happened
+            t1 = time.perf_counter()
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/api/analytics/dashboard", timeout=5) as resp:
+                resp.read()
+            return {"first_response_ms": round(first_ms, 1), "first_db_request_ms": round((time.perf_counter() - t1) * 1000, 1)}
+        finally:
+            proc.terminate()
+            proc.wait(timeout=10)
+
+
+def import_profile(top: int) -> dict:
+    with tempfile.TemporaryDirectory() as workdir:
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import main"],
+            cwd=workdir, env={**os.environ, "PYTHONPATH": BACKEND_DIR}, capture_output=True, text=True,
+        )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        # "import time:   self_us |  cumulative_us | name"
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative_us), int(self_us), name.strip()))
+    main_row = next((r for r in rows if r[2] == "main"), None)
+    rows.sort(reverse=True)
+    return {
+        "import_main_ms": round(main_row[0] / 1000, 1) if main_row else None,
+        "slowest": [{"module": name, "cumulative_ms": round(cum / 1000, 1), "self_ms": round(own / 1000, 1)} for cum, own, name in rows[:top]],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    runs = [time_to_first_response() for _ in range(args.runs)]
+    firsts = sorted(r["first_response_ms"] for r in runs)
+    report = {
+        "time_to_first_response_ms": {"min": firsts[0], "median": firsts[len(firsts) // 2], "max": firsts[-1]},
+        "first_db_request_ms": sorted(r["first_db_request_ms"] for r in runs)[len(runs) // 2],
+        "importtime": import_profile(args.top),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
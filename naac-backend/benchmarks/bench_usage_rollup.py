@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""/analytics/usage query time per period over a year of synthetic chat/upload events.
+
+Events are recorded through UsageRollups (as the endpoints do) into a scratch
+database, flushed every simulated minute, with retention applied as the
+background loop would. Query time should stay flat as the event count grows:
+each period reads one resolution's pre-aggregated rows, never the raw events.
+
+Usage (from naac-backend/):
+    python benchmarks/bench_usage_rollup.py --days 365 --events-per-hour 120
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import sqlite3
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+WORKDIR = tempfile.mkdtemp(prefix="naac-usage-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(WORKDIR, 'bench.db')}"
+
+import asyncio  # noqa: E402
+import database  # noqa: E402  (DATABASE_URL must be set first)
+from usage_rollup import UsageRollups  # noqa: E402
+
+
+def seed(rollups: UsageRollups, days: int, events_per_hour: int, now: float) -> int:
+    rng = random.Random(11)
+    start = now - days * 86400
+    total = 0
+    for minute in range(days * 1440):
+        ts = start + minute * 60
+        # Daytime traffic, a few uploads, long-tailed latencies
+        rate = events_per_hour / 60 * (1.6 if 9 <= (minute // 60) % 24 < 18 else 0.4)
+        for _ in range(int(rate) + (rng.random() < rate % 1)):
+            event = "upload" if rng.random() < 0.1 else "chat"
+            rollups.record(event, rng.lognormvariate(3.0, 0.8), error=rng.random() < 0.01, ts=ts + rng.random() * 60)
+            total += 1
+        rollups.flush()
+        if minute % 1440 == 0:
+            rollups.apply_retention(now=ts)
+    rollups.apply_retention(now=now)
+    return total
+
+
+def time_queries(rollups: UsageRollups, now: float, repeats: int) -> dict:
+    out = {}
+    for period in ("1h", "24h", "7d", "30d", "90d", "365d"):
+        rollups.query(period, now=now)
+        t0 = time.perf_counter()
+        for _ in range(repeats):
+            result = rollups.query(period, now=now)
+        out[period] = {"resolution": result["resolution"], "buckets": len(result["buckets"]),
+                       "events": sum(t["count"] for t in result["totals"].values()),
+                       "query_ms": round((time.perf_counter() - t0) / repeats * 1000, 3)}
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--events-per-hour", type=int, default=120)
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+    try:
+        asyncio.run(database.init_database())
+        rollups = UsageRollups(path=database.SQLITE_PATH)
+        now = float(int(time.time()) // 60 * 60)
+        report = {"days": args.days}
+
+        # Query time after a month and after the full span: flat means it does not grow with history
+        t0 = time.perf_counter()
+        report["events_month"] = seed(rollups, 30, args.events_per_hour, now - (args.days - 30) * 86400)
+        report["after_month"] = time_queries(rollups, now - (args.days - 30) * 86400, args.repeats)
+        report["events_total"] = report["events_month"] + seed(rollups, args.days - 30, args.events_per_hour, now)
+        report["seed_s"] = round(time.perf_counter() - t0, 1)
+        report["after_full_span"] = time_queries(rollups, now, args.repeats)
+        with sqlite3.connect(database.SQLITE_PATH) as conn:
+            report["rollup_rows"] = dict(conn.execute("SELECT resolution, COUNT(*) FROM usage_rollups GROUP BY resolution").fetchall())
+        asyncio.run(database.close_database())
+        print(json.dumps(report, indent=2))
+    finally:
+        shutil.rmtree(WORKDIR, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
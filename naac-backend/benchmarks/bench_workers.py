@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""Chat throughput of the backend at 1, 2, 4 and 8 uvicorn workers.
+
+For each worker count a fresh server is started in a scratch directory and
+hammered with keep-alive POST /api/chat/message requests from several client
+processes. Afterwards the dashboard, /metrics and /api/generation/stats are
+checked against the number of requests actually sent, which shows whether
+shared state stays consistent when requests land on different workers.
+
+Usage (from naac-backend/):
+    python benchmarks/bench_workers.py --workers 1 2 4 8 --duration 10 --clients 16
+"""
+import os
+import re
+import sys
+import json
+import time
+import socket
+import argparse
+import tempfile
+import http.client
+import subprocess
+import urllib.request
+from multiprocessing import Pool
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MESSAGES = [
+    "How to improve research publications for Criterion 3?",
+    "What documents are needed for SSR preparation?",
+    "Explain metric 2.4.1 for teacher profile",
+    "What are the infrastructure requirements for NAAC?",
+]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def client_loop(args):
+    port, duration, client_id = args
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    latencies, errors, i = [], 0, 0
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        body = json.dumps({"message": MESSAGES[i % len(MESSAGES)], "session_id": f"bench-{client_id}"})
+        t0 = time.perf_counter()
+        try:
+            conn.request("POST", "/api/chat/message", body, {"Content-Type": "application/json"})
+            resp = conn.getresponse()
+            resp.read()
+            if resp.status == 200:
+                latencies.append((time.perf_counter() - t0) * 1000)
+            else:
+                errors += 1
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            conn.close()
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        i += 1
+    conn.close()
+    return latencies, errors
+
+
+def get(port, path) -> bytes:
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}{path}", timeout=10) as resp:
+        return resp.read()
+
+
+def run(workers: int, duration: float, clients: int) -> dict:
+    port = free_port()
+    env = {**os.environ, "PYTHONPATH": BACKEND_DIR, "WORKER_STATE_INTERVAL_S": "0.5"}
+    with tempfile.TemporaryDirectory() as workdir:
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+             "--workers", str(workers), "--log-level", "warning"],
+            cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            for _ in range(600):
+                try:
+                    get(port, "/health")
+                    break
+                except OSError:
+                    time.sleep(0.05)
+            time.sleep(1.0)  # let every worker finish booting
+            before = json.loads(get(port, "/api/analytics/dashboard"))["queriesHandled"]
+
+            t0 = time.perf_counter()
+            with Pool(clients) as pool:
+                results = pool.map(client_loop, [(port, duration, c) for c in range(clients)])
+            elapsed = time.perf_counter() - t0
+            latencies = sorted(l for lat, _ in results for l in lat)
+            errors = sum(e for _, e in results)
+
+            time.sleep(1.5)  # two publish intervals so every worker's counters are visible
+            dashboard = json.loads(get(port, "/api/analytics/dashboard"))["queriesHandled"] - before
+            metrics = get(port, "/metrics").decode()
+            counted = sum(
+                float(m) for m in re.findall(r'naac_http_request_duration_seconds_count\{method="POST",route="/api/chat/message",status="200"\} (\S+)', metrics)
+            )
+            gen_workers = json.loads(get(port, "/api/generation/stats"))["workers"]
+        finally:
+            proc.terminate()
+            proc.wait(timeout=15)
+
+    pct = lambda p: round(latencies[min(len(latencies) - 1, int(len(latencies) * p))], 2) if latencies else None
+    return {
+        "workers": workers,
+        "requests": len(latencies),
+        "errors": errors,
+        "req_per_s": round(len(latencies) / elapsed, 1),
+        "p50_ms": pct(0.5),
+        "p99_ms": pct(0.99),
+        "dashboard_matches": dashboard == len(latencies),
+        "metrics_matches": int(counted) == len(latencies),
+        "workers_reporting_stats": gen_workers,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--clients", type=int, default=16)
+    args = parser.parse_args()
+
+    report = [run(w, args.duration, args.clients) for w in args.workers]
+    base = report[0]["req_per_s"] or 1
+    for row in report:
+        row["speedup"] = round(row["req_per_s"] / base, 2)
+    print(json.dumps({"cpu_count": os.cpu_count(), "results": report}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""Recall@k and latency of dense-only, BM25-only and hybrid (RRF) retrieval.
+
+Usage (from naac-backend/):
+    python benchmarks/eval_hybrid_retrieval.py --chunks ../data/processed/text_chunks.json
+    python benchmarks/eval_hybrid_retrieval.py --queries my_queries.json --k 4
+
+Queries are a JSON list of {"query", "relevant": [chunk_id, ...]} or
+{"query", "relevant_contains": "text"}; the latter marks every chunk whose
+content contains the text as relevant.
+"""
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chunk_store import iter_chunks, chunk_id_for
+from chunking import chunk_document
+from lexical_index import LexicalIndex
+from hybrid_retrieval import HybridRetriever
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Acronym / metric-code heavy queries that MiniLM tends to miss
+DEFAULT_QUERIES = [
+    {"query": "What does the IQAC do?", "relevant_contains": "IQAC"},
+    {"query": "AQAR data for 3 years", "relevant_contains": "AQAR"},
+    {"query": "CBCS implementation", "relevant_contains": "CBCS"},
+    {"query": "1.1.3 PLOs and CLOs mapping", "relevant_contains": "1.1.3"},
+    {"query": "SWOC analysis", "relevant_contains": "SWOC"},
+    {"query": "Criteria VII best practices", "relevant_contains": "BEST PRACTICES"},
+    {"query": "teaching learning evaluation", "relevant_contains": "TEACHING-LEARNING"},
+    {"query": "student support and progression", "relevant_contains": "STUDENT SUPPORT"},
+]
+
+
+def load_corpus(path):
+    if path:
+        return list(iter_chunks(path))
+    chunks = []
+    for doc_path in sorted(glob.glob(os.path.join(REPO_ROOT, "data", "documents", "*.txt"))):
+        with open(doc_path, "r", encoding="utf-8") as f:
+            chunks.extend(chunk_document(f.read(), os.path.basename(doc_path)))
+    return chunks
+
+
+def relevant_ids(query, chunks):
+    if "relevant" in query:
+        return set(query["relevant"])
+    needle = query["relevant_contains"].lower()
+    return {chunk_id_for(c) for c in chunks if needle in c.get("content", "").lower()}
+
+
+def build_dense_search(chunks):
+    """Brute-force MiniLM cosine search, or None when sentence-transformers is unavailable"""
+    try:
+        import numpy as np
+        from sentence_transformers import SentenceTransformer
+    except ImportError:
+        print("sentence-transformers not installed - evaluating BM25 only")
+        return None
+    model = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2", device="cpu")
+    ids = [chunk_id_for(c) for c in chunks]
+    matrix = model.encode([c["content"] for c in chunks], normalize_embeddings=True, batch_size=64)
+
+    def search(query, k):
+        scores = matrix @ model.encode([query], normalize_embeddings=True)[0]
+        top = np.argsort(-scores)[:k]
+        return [(ids[i], float(scores[i])) for i in top]
+    return search
+
+
+def recall_at_k(results, relevant, k):
+    if not relevant:
+        return None
+    return len({r for r in results[:k]} & relevant) / min(len(relevant), k)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", help="text_chunks.json or .jsonl chunk store (default: chunk data/documents/*.txt)")
+    parser.add_argument("--queries", help="JSON file of evaluation queries")
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=50, help="Repetitions for latency measurement")
+    args = parser.parse_args()
+
+    chunks = load_corpus(args.chunks)
+    queries = DEFAULT_QUERIES
+    if args.queries:
+        with open(args.queries, "r", encoding="utf-8") as f:
+            queries = json.load(f)
+
+    t0 = time.perf_counter()
+    index = LexicalIndex.build(chunks)
+    build_ms = (time.perf_counter() - t0) * 1000
+    dense_search = build_dense_search(chunks)
+    hybrid = HybridRetriever(index, dense_search)
+
+    systems = {"bm25": lambda q: [cid for cid, _ in index.search(q, top_k=args.k)]}
+    if dense_search:
+        systems["dense"] = lambda q: [cid for cid, _ in dense_search(q, args.k)]
+    systems["hybrid"] = lambda q: [r["chunk_id"] for r in hybrid.search(q, top_k=args.k)]
+
+    report = {"chunks": len(chunks), "index_build_ms": round(build_ms, 2), "index_array_bytes": index.memory_bytes(), "k": args.k, "systems": {}}
+    for name, run in systems.items():
+        recalls, latencies = [], []
+        for query in queries:
+            relevant = relevant_ids(query, chunks)
+            recall = recall_at_k(run(query["query"]), relevant, args.k)
+            if recall is not None:
+                recalls.append(recall)
+            for _ in range(args.repeat):
+                t0 = time.perf_counter()
+                run(query["query"])
+                latencies.append((time.perf_counter() - t0) * 1000)
+        latencies.sort()
+        report["systems"][name] = {
+            f"recall@{args.k}": round(statistics.mean(recalls), 3) if recalls else None,
+            "p50_ms": round(latencies[len(latencies) // 2], 3),
+            "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1], 3),
+        }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,537 @@
+#!/usr/bin/env python3
+"""Benchmark suite for the backend and the document pipeline, with JSON results compared against a baseline.
+
+HTTP load scenarios drive the real app in-process (httpx ASGITransport, with
+the lifespan run) on a scratch database and upload directory. IAM, watsonx.ai,
+COS and the Pinecone health check all point at mock_services' local server, and
+the admission limits are lifted (bench_admission.py covers those).
+  chat_burst          --concurrency clients posting --chat-requests guidance chat messages
+  generation_burst    --generations Granite chats through the generation scheduler to mock watsonx.ai
+  uploads             --uploads multipart uploads of --upload-kb, --upload-concurrency at a time
+                      (stored, recorded and queued; job workers are off)
+  dashboard_polling   --dashboards clients polling /api/analytics/dashboard --polls times while chats write
+
+Micro-benchmarks, best of --repeat runs on generated inputs of fixed size:
+  intent_routing      template_cache.match over a mix of criterion questions and misses
+  csv_ingestion       extract_text + chunk_document of a --csv-rows CSV (the upload path), and the
+                      notebook's pandas read_csv + clean_dataframe when pandas is installed
+  excel_ingestion     the notebook's read_excel + clean_dataframe of a --excel-rows sheet (pandas, openpyxl)
+  pdf_extraction      extract_text of a --pdf-pages PDF (pypdf)
+  chunking            chunk_document over the sample SSR and guidance text, repeated to --chunk-kb
+  retrieval           LexicalIndex build, BM25 queries, and HybridRetriever with a QuantizedVectorIndex
+                      of hashed-token vectors standing in for MiniLM + Pinecone
+A benchmark whose optional package is missing is reported as skipped.
+
+Metric names carry their direction: *_ms and *_us are lower-is-better, *_per_s
+higher-is-better, "errors" must not grow; anything else is informational.
+--compare reports every directed metric more than --tolerance worse than the
+baseline and exits with status 1 when there is one.
+
+Usage (from naac-backend/):
+    python benchmarks/run_benchmarks.py --output results.json
+    python benchmarks/run_benchmarks.py --compare benchmarks/baseline.json
+    python benchmarks/run_benchmarks.py --only chunking retrieval --repeat 9
+    python benchmarks/run_benchmarks.py --save-baseline benchmarks/baseline.json
+"""
+import os
+import re
+import sys
+import json
+import time
+import zlib
+import random
+import shutil
+import asyncio
+import argparse
+import platform
+import tempfile
+import statistics
+import contextlib
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HTTP_BENCHMARKS = ("chat_burst", "generation_burst", "uploads", "dashboard_polling")
+MICRO_BENCHMARKS = ("intent_routing", "csv_ingestion", "excel_ingestion", "pdf_extraction", "chunking", "retrieval")
+
+CHAT_MESSAGES = [
+    "How do I document criterion {n} evidence?",
+    "What does key indicator {n}.2 measure?",
+    "Student satisfaction survey for metric 2.{n}",
+    "Research publications per teacher in the last {n} years",
+    "How should the SSR executive summary be structured?",
+    "Where do I upload documentation for metric {n}.1.1?",
+    "Is there a deadline extension for cycle {n}?",
+    "hello",
+]
+
+
+def stub_environment(workdir: str, base_url: str) -> dict:
+    """Settings pointing every external service at the mock server and all state at the scratch directory"""
+    env = {
+        "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        "UPLOAD_DIR": os.path.join(workdir, "uploads"),
+        "LOCAL_STORAGE_DIR": os.path.join(workdir, "local_storage"),
+        "NAAC_SHARED_STATE_PATH": os.path.join(workdir, "shared_state.db"),
+        "NAAC_LOCAL_VECTORS_PATH": os.path.join(workdir, "uploaded_vectors.jsonl"),
+        "EMBEDDED_JOB_WORKERS": "0",
+        "IBM_CLOUD_API_KEY": "mock",
+        "IBM_WATSONX_PROJECT_ID": "mock",
+        "IBM_IAM_URL": f"{base_url}/identity/token",
+        "IBM_WATSONX_URL": f"{base_url}/ml/v1/text/generation",
+        "IBM_COS_ENDPOINT_URL": base_url,
+        "PINECONE_API_KEY": "mock",
+        "PINECONE_INDEXES_URL": f"{base_url}/indexes",
+    }
+    for name in ("CHAT", "UPLOAD", "GENERATION"):
+        env[f"ADMISSION_{name}_CONCURRENCY"] = "100000"
+        for limit in ("SESSION_RATE", "SESSION_BURST", "IP_RATE", "IP_BURST"):
+            env[f"ADMISSION_{name}_{limit}"] = "1e9"
+    return env
+
+
+def best_time(fn, repeat: int) -> float:
+    """Fastest wall time of fn() in seconds; on a shared machine noise only ever adds time, so the minimum is the steadiest"""
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def latency_summary(latencies, statuses, elapsed: float) -> dict:
+    latencies = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "errors": sum(count for status, count in statuses.items() if not 200 <= status < 300),
+        "p50_ms": round(statistics.median(latencies), 2),
+        "p99_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))], 2),
+        "requests_per_s": round(len(latencies) / elapsed, 1),
+    }
+
+
+async def run_load(total: int, concurrency: int, send) -> dict:
+    """``total`` calls of ``send(i)`` from ``concurrency`` workers; send returns the HTTP status"""
+    latencies, statuses = [], {}
+    counter = iter(range(total))
+
+    async def worker():
+        for i in counter:
+            t0 = time.perf_counter()
+            status = await send(i)
+            latencies.append((time.perf_counter() - t0) * 1000)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latency_summary(latencies, statuses, time.perf_counter() - t0)
+
+
+def chat_body(i: int, sessions: int) -> dict:
+    return {"message": CHAT_MESSAGES[i % len(CHAT_MESSAGES)].format(n=i % 7 + 1), "session_id": f"bench-{i % sessions}"}
+
+
+# HTTP scenarios
+
+async def chat_burst(client, args) -> dict:
+    async def send(i):
+        return (await client.post("/api/chat/message", json=chat_body(i, args.concurrency))).status_code
+    return await run_load(args.chat_requests, args.concurrency, send)
+
+
+async def generation_burst(client, args) -> dict:
+    async def send(i):
+        return (await client.post("/api/chat/generate", json=chat_body(i, args.concurrency))).status_code
+    return await run_load(args.generations, args.concurrency, send)
+
+
+async def uploads(client, args) -> dict:
+    payload = os.urandom(args.upload_kb * 1024)
+
+    async def send(i):
+        response = await client.post("/api/documents/upload", params={"session_id": f"bench-{i % 8}"},
+                                     files={"file": (f"evidence-{i}.pdf", payload, "application/pdf")})
+        return response.status_code
+
+    result = await run_load(args.uploads, args.upload_concurrency, send)
+    result["mb_per_s"] = round(result["requests_per_s"] * args.upload_kb / 1024, 2)
+    return result
+
+
+async def dashboard_polling(client, args) -> dict:
+    done = asyncio.Event()
+
+    async def writer():
+        i = 0
+        while not done.is_set():
+            await client.post("/api/chat/message", json=chat_body(i, 16))
+            i += 1
+            await asyncio.sleep(0.02)
+
+    async def send(i):
+        return (await client.get("/api/analytics/dashboard")).status_code
+
+    background = asyncio.create_task(writer())
+    try:
+        return await run_load(args.dashboards * args.polls, args.dashboards, send)
+    finally:
+        done.set()
+        await background
+
+
+async def http_benchmarks(names, env: dict, args) -> dict:
+    import httpx
+    import main
+    # main.py loads naac-backend/.env with override=True; the stubs must win over a developer's real keys
+    os.environ.update(env)
+    scenarios = {"chat_burst": chat_burst, "generation_burst": generation_burst, "uploads": uploads,
+                 "dashboard_polling": dashboard_polling}
+    results = {}
+    transport = httpx.ASGITransport(app=main.app, client=("127.0.0.1", 50000))
+    async with main.app.router.lifespan_context(main.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://naac-bench", timeout=120) as client:
+            # Schema creation and template loading run in the background at startup
+            await client.post("/api/chat/message", json=chat_body(0, 1))
+            for name in names:
+                results[name] = await scenarios[name](client, args)
+    return results
+
+
+# Micro-benchmarks
+
+def intent_routing(workdir: str, args) -> dict:
+    from response_templates import template_cache
+    templates = template_cache.load()
+    rng = random.Random(11)
+    keywords = [keyword for template in templates for keyword in template.keywords]
+    messages = []
+    for i in range(20000):
+        message = CHAT_MESSAGES[i % len(CHAT_MESSAGES)].format(n=i % 7 + 1)
+        # Half carry a guidance keyword somewhere in the sentence, the rest fall through to the default answer
+        messages.append(f"{message} {rng.choice(keywords)}" if i % 2 else f"{message} please advise")
+
+    def route():
+        for message in messages:
+            template_cache.match(message)
+
+    seconds = best_time(route, args.repeat)
+    return {"messages": len(messages), "per_message_us": round(seconds / len(messages) * 1e6, 3),
+            "messages_per_s": round(len(messages) / seconds, 1)}
+
+
+GRADES = ["A++", "A+", "A", "B++", "B+", "B", "C"]
+STATES = ["Tamil Nadu", "Karnataka", "Maharashtra", "Kerala", "Gujarat", "Uttar Pradesh", "West Bengal", "Punjab"]
+
+
+def accreditation_rows(rows: int):
+    """Rows shaped like the notebook's 'NAAC accreditation of Institutions.csv'"""
+    rng = random.Random(5)
+    header = ["Institution Name", "State", "District", "Type", "Grade", "CGPA", "Cycle", "Accredited On", "Valid Till"]
+    data = []
+    for i in range(rows):
+        year = rng.randint(2012, 2024)
+        data.append([f"Government College of Arts and Science No. {i}", rng.choice(STATES), f"District {i % 97}",
+                     rng.choice(["Affiliated College", "University", "Autonomous College"]), rng.choice(GRADES),
+                     f"{rng.uniform(1.5, 4.0):.2f}", rng.randint(1, 4), f"{year}-{rng.randint(1, 12):02d}-15",
+                     f"{year + 5}-{rng.randint(1, 12):02d}-14" if i % 13 else ""])
+    return header, data
+
+
+def clean_dataframe(df):
+    """The notebook's clean_dataframe (section 2), without its progress printing"""
+    df.columns = df.columns.astype(str).str.strip().str.lower().str.replace(' ', '_')
+    return df.dropna(how='all').dropna(axis=1, how='all')
+
+
+def csv_ingestion(workdir: str, args) -> dict:
+    import csv
+    from chunking import chunk_document
+    from job_worker import extract_text
+    header, data = accreditation_rows(args.csv_rows)
+    path = os.path.join(workdir, "accreditation.csv")
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(data)
+    size_mb = os.path.getsize(path) / 2 ** 20
+    chunks = []
+
+    def upload_path():
+        chunks[:] = chunk_document(extract_text(path, "accreditation.csv"), "accreditation.csv")
+
+    seconds = best_time(upload_path, args.repeat)
+    result = {"rows": args.csv_rows, "chunks": len(chunks), "upload_path_ms": round(seconds * 1000, 2),
+              "upload_path_rows_per_s": round(args.csv_rows / seconds, 1), "upload_path_mb_per_s": round(size_mb / seconds, 2)}
+    try:
+        import pandas as pd
+    except ImportError:
+        result["notebook_path"] = "skipped: pandas is not installed"
+        return result
+    seconds = best_time(lambda: clean_dataframe(pd.read_csv(path, encoding="utf-8")), args.repeat)
+    result.update({"notebook_path_ms": round(seconds * 1000, 2), "notebook_path_rows_per_s": round(args.csv_rows / seconds, 1)})
+    return result
+
+
+def excel_ingestion(workdir: str, args) -> dict:
+    try:
+        import pandas as pd
+        from openpyxl import Workbook
+    except ImportError as e:
+        return {"skipped": f"needs pandas and openpyxl ({e})"}
+    header, data = accreditation_rows(args.excel_rows)
+    path = os.path.join(workdir, "accreditation.xlsx")
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(header)
+    for row in data:
+        sheet.append(row)
+    workbook.save(path)
+
+    def notebook_path():
+        workbook = pd.ExcelFile(path)
+        for sheet_name in workbook.sheet_names:
+            clean_dataframe(pd.read_excel(workbook, sheet_name=sheet_name))
+
+    seconds = best_time(notebook_path, args.repeat)
+    return {"rows": args.excel_rows, "notebook_path_ms": round(seconds * 1000, 2), "rows_per_s": round(args.excel_rows / seconds, 1)}
+
+
+def write_pdf(path: str, pages):
+    """Minimal uncompressed PDF (Helvetica text, one content stream per page) for extraction timing"""
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for lines in pages:
+        escaped = [line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") for line in lines]
+        stream = ("BT /F1 10 Tf 12 TL 50 790 Td " + " ".join(f"({line}) Tj T*" for line in escaped) + " ET").encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] /Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>"
+                       % (len(objects)))
+        kids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(b"%d 0 R" % k for k in kids), len(kids))
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+def corpus_sentences():
+    sentences = []
+    paths = sorted(os.path.join(REPO_ROOT, "data", "documents", name) for name in os.listdir(os.path.join(REPO_ROOT, "data", "documents")))
+    paths += sorted(os.path.join(BACKEND_DIR, "guidance", name) for name in os.listdir(os.path.join(BACKEND_DIR, "guidance")))
+    for path in paths:
+        if os.path.isfile(path):
+            with open(path, "r", encoding="utf-8", errors="ignore") as f:
+                sentences += [s.strip() for s in re.split(r"(?<=[.?!])\s+|\n+", f.read()) if len(s.strip()) > 20]
+    return sentences
+
+
+def pdf_extraction(workdir: str, args) -> dict:
+    from job_worker import extract_text, UnsupportedDocumentError
+    sentences = corpus_sentences()
+    lines = [sentence[:95].encode("latin-1", "replace").decode("latin-1") for sentence in sentences]
+    pages = [[lines[(page * 60 + i) % len(lines)] for i in range(60)] for page in range(args.pdf_pages)]
+    path = os.path.join(workdir, "ssr.pdf")
+    write_pdf(path, pages)
+    try:
+        text = extract_text(path, "ssr.pdf")
+    except UnsupportedDocumentError as e:
+        return {"skipped": str(e)}
+    seconds = best_time(lambda: extract_text(path, "ssr.pdf"), args.repeat)
+    return {"pages": args.pdf_pages, "characters": len(text), "total_ms": round(seconds * 1000, 2),
+            "per_page_ms": round(seconds * 1000 / args.pdf_pages, 3), "pages_per_s": round(args.pdf_pages / seconds, 1)}
+
+
+def chunking_text(kb: int) -> str:
+    sentences = corpus_sentences()
+    rng = random.Random(9)
+    paragraphs, size = [], 0
+    while size < kb * 1024:
+        paragraph = " ".join(rng.choice(sentences) for _ in range(rng.randint(2, 8)))
+        paragraphs.append(paragraph)
+        size += len(paragraph) + 2
+    return "\n\n".join(paragraphs)
+
+
+def chunking(workdir: str, args) -> dict:
+    from chunking import chunk_document
+    text = chunking_text(args.chunk_kb)
+    chunks = []
+
+    def split():
+        chunks[:] = chunk_document(text, "ssr.txt")
+
+    seconds = best_time(split, args.repeat)
+    return {"kb": args.chunk_kb, "chunks": len(chunks), "total_ms": round(seconds * 1000, 2),
+            "mb_per_s": round(len(text) / 2 ** 20 / seconds, 2)}
+
+
+def hashed_embedding(texts, dimension: int = 384):
+    """Deterministic bag-of-hashed-tokens vectors: a stand-in for MiniLM with the same dimension"""
+    import numpy as np
+    from lexical_index import tokenize
+    vectors = np.zeros((len(texts), dimension), dtype=np.float32)
+    for row, text in enumerate(texts):
+        for token in tokenize(text):
+            h = zlib.crc32(token.encode("utf-8"))
+            vectors[row, h % dimension] += 1.0 if h & 0x80000000 else -1.0
+    vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    return vectors
+
+
+def retrieval(workdir: str, args) -> dict:
+    from chunking import chunk_document
+    from lexical_index import LexicalIndex
+    from quantized_store import QuantizedVectorIndex
+    from hybrid_retrieval import HybridRetriever, pinecone_dense_search
+    text = chunking_text(args.retrieval_kb)
+    chunks = chunk_document(text, "corpus.txt")
+    build_s = best_time(lambda: LexicalIndex.build(chunks), max(1, args.repeat // 2))
+    lexical = LexicalIndex.build(chunks)
+
+    index = QuantizedVectorIndex(os.path.join(workdir, "retrieval-vectors"), dimension=384)
+    vectors = hashed_embedding([chunk["content"] for chunk in chunks])
+    for start in range(0, len(chunks), 1000):
+        index.upsert([{"id": chunk["metadata"]["chunk_id"], "values": vectors[start + i]}
+                      for i, chunk in enumerate(chunks[start:start + 1000])])
+    retriever = HybridRetriever(lexical, pinecone_dense_search(index, hashed_embedding))
+    queries = [CHAT_MESSAGES[i % len(CHAT_MESSAGES)].format(n=i % 7 + 1) for i in range(args.queries)]
+
+    def run(search):
+        latencies = []
+        for query in queries:
+            t0 = time.perf_counter()
+            search(query)
+            latencies.append(time.perf_counter() - t0)
+        return statistics.median(latencies)
+
+    lexical_s = min(run(lambda q: lexical.search(q, top_k=10)) for _ in range(args.repeat))
+    criterion_s = min(run(lambda q: lexical.search(q, top_k=10, criterion=2)) for _ in range(args.repeat))
+    hybrid_s = min(run(lambda q: retriever.search(q, top_k=4)) for _ in range(args.repeat))
+    return {"chunks": len(chunks), "build_ms": round(build_s * 1000, 2),
+            "lexical_query_us": round(lexical_s * 1e6, 1), "lexical_criterion_query_us": round(criterion_s * 1e6, 1),
+            "hybrid_query_us": round(hybrid_s * 1e6, 1)}
+
+
+# Baselines
+
+def direction(metric: str):
+    if metric == "errors" or metric.endswith(("_ms", "_us")):
+        return "lower"
+    if metric.endswith("_per_s"):
+        return "higher"
+    return None
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> dict:
+    """Directed metrics more than ``tolerance`` (a fraction) worse than the baseline; skipped benchmarks are ignored"""
+    regressions, improvements = [], []
+    for name, metrics in report["results"].items():
+        expected = baseline.get("results", {}).get(name)
+        if not expected or "skipped" in metrics or "skipped" in expected:
+            continue
+        for metric, value in metrics.items():
+            before = expected.get(metric)
+            better = direction(metric)
+            if better is None or not isinstance(value, (int, float)) or not isinstance(before, (int, float)):
+                continue
+            worse = value > before * (1 + tolerance) if better == "lower" else value < before * (1 - tolerance)
+            improved = value < before * (1 - tolerance) if better == "lower" else value > before * (1 + tolerance)
+            if worse or improved:
+                entry = {"benchmark": name, "metric": metric, "baseline": before, "current": value,
+                         "change": f"{(value - before) / before:+.1%}" if before else "new"}
+                (regressions if worse else improvements).append(entry)
+    comparison = {"tolerance": tolerance, "regressions": regressions, "improvements": improvements}
+    keys = ("python", "cpus", "machine")
+    if any(report["environment"].get(k) != baseline.get("environment", {}).get(k) for k in keys):
+        comparison["warning"] = "baseline was recorded on a different machine or Python; compare like with like"
+    return comparison
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, cwd=BACKEND_DIR).stdout.strip()
+    except OSError:
+        commit = ""
+    return {"python": platform.python_version(), "machine": platform.machine(), "platform": platform.platform(),
+            "cpus": os.cpu_count(), "commit": commit or None, "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S")}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", nargs="*", choices=HTTP_BENCHMARKS + MICRO_BENCHMARKS, help="Run only these benchmarks")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--chat-requests", type=int, default=2000)
+    parser.add_argument("--generations", type=int, default=200)
+    parser.add_argument("--generation-latency-s", type=float, default=0.05, help="Mock watsonx.ai time per generation")
+    parser.add_argument("--uploads", type=int, default=200)
+    parser.add_argument("--upload-kb", type=int, default=256)
+    parser.add_argument("--upload-concurrency", type=int, default=16)
+    parser.add_argument("--dashboards", type=int, default=50)
+    parser.add_argument("--polls", type=int, default=20)
+    parser.add_argument("--csv-rows", type=int, default=6000)
+    parser.add_argument("--excel-rows", type=int, default=2500)
+    parser.add_argument("--pdf-pages", type=int, default=50)
+    parser.add_argument("--chunk-kb", type=int, default=1024)
+    parser.add_argument("--retrieval-kb", type=int, default=2048)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--output", help="Also write the JSON report here")
+    parser.add_argument("--save-baseline", metavar="PATH", help="Write this run as the baseline")
+    parser.add_argument("--compare", metavar="BASELINE", help="Flag regressions against a saved baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown as a fraction (0.25 = 25%%)")
+    args = parser.parse_args()
+    selected = args.only or list(HTTP_BENCHMARKS + MICRO_BENCHMARKS)
+
+    from mock_services import start_mock_ibm_server
+    server, base_url = start_mock_ibm_server(generation_latency=args.generation_latency_s, iam_latency=0.01)
+    workdir = tempfile.mkdtemp(prefix="naac-benchmarks-")
+    env = stub_environment(workdir, base_url)
+    # Before any backend import: database.py, job_queue and shared_state read their paths at import time
+    os.environ.update(env)
+    os.makedirs(env["UPLOAD_DIR"])
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    report = {"environment": environment(), "settings": {k: v for k, v in vars(args).items()
+                                                         if k not in ("only", "output", "save_baseline", "compare", "tolerance")},
+              "results": {}}
+    try:
+        # Application logging goes to stderr so stdout is only the JSON report
+        with contextlib.redirect_stdout(sys.stderr):
+            http = [name for name in HTTP_BENCHMARKS if name in selected]
+            if http:
+                report["results"].update(asyncio.run(http_benchmarks(http, env, args)))
+            for name in MICRO_BENCHMARKS:
+                if name in selected:
+                    report["results"][name] = globals()[name](workdir, args)
+        report["mock_requests"] = dict(server.state["requests"])
+    finally:
+        os.chdir(cwd)
+        server.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    status = 0
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            report["comparison"] = compare(report, json.load(f), args.tolerance)
+        status = 1 if report["comparison"]["regressions"] else 0
+    text = json.dumps(report, indent=2)
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(text + "\n")
+    print(text)
+    sys.exit(status)
+
+
+if __name__ == "__main__":
+    main()
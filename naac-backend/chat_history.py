@@ -0,0 +1,162 @@
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+import database
+from models import UserQuery, ChatResponse
+
+MAX_PAGE = 200
+# Bulk conversion of inline answers to chat_responses references, per transaction chunk
+COMPACT_BATCH = 1000
+
+
+def response_digest(body: str) -> str:
+    return hashlib.sha256(body.encode("utf-8")).hexdigest()
+
+
+def compact_responses(sync_conn, batch: int = COMPACT_BATCH) -> int:
+    """Move inline ai_response text into chat_responses, one row per distinct answer; returns rows converted"""
+    queries, responses = UserQuery.__table__, ChatResponse.__table__
+    converted, last_id = 0, 0
+    while True:
+        rows = sync_conn.execute(
+            select(queries.c.id, queries.c.ai_response)
+            .where(queries.c.id > last_id, queries.c.response_id.is_(None), queries.c.ai_response.is_not(None))
+            .order_by(queries.c.id)
+            .limit(batch)
+        ).all()
+        if not rows:
+            return converted
+        digests = {row.id: response_digest(row.ai_response) for row in rows}
+        bodies = {digests[row.id]: row.ai_response for row in rows}
+        sync_conn.execute(
+            sqlite_insert(responses).on_conflict_do_nothing(index_elements=["digest"]),
+            [{"digest": digest, "body": body} for digest, body in bodies.items()],
+        )
+        ids = dict(sync_conn.execute(
+            select(responses.c.digest, responses.c.id).where(responses.c.digest.in_(list(bodies)))
+        ).all())
+        sync_conn.exec_driver_sql(
+            "UPDATE user_queries SET response_id = ?, ai_response = NULL WHERE id = ?",
+            [(ids[digests[row.id]], row.id) for row in rows],
+        )
+        converted += len(rows)
+        last_id = rows[-1].id
+
+
+class ChatHistory:
+    """Per-session chat transcripts with deduplicated answers and keyset pagination
+
+    The same canned guidance is returned thousands of times, so answers are
+    stored once in chat_responses and user_queries keeps a reference. Pages
+    are read with ``id < before_id`` on the (session_id, id) index: loading
+    the hundredth page costs the same as the first, unlike OFFSET.
+    """
+
+    def __init__(self, cache_size: int = 4096):
+        self.cache_size = cache_size
+        # digest -> chat_responses.id for answers known to be committed
+        self._ids: "OrderedDict[str, int]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _cached(self, digest: str) -> Optional[int]:
+        with self._lock:
+            response_id = self._ids.get(digest)
+            if response_id is not None:
+                self._ids.move_to_end(digest)
+            return response_id
+
+    def _remember(self, ids: Dict[str, int]):
+        with self._lock:
+            for digest, response_id in ids.items():
+                self._ids[digest] = response_id
+                self._ids.move_to_end(digest)
+            while len(self._ids) > self.cache_size:
+                self._ids.popitem(last=False)
+
+    async def intern_responses(self, conn, rows: List[Dict[str, Any]]) -> Optional[Callable[[], None]]:
+        """Swap each row's ai_response for a response_id inside the caller's transaction
+
+        Known answers resolve from memory; new ones are inserted (or found, if
+        another worker got there first). Ids are only cached once the caller's
+        transaction commits, via the returned callback.
+        """
+        digests: Dict[int, str] = {}
+        missing: Dict[str, str] = {}
+        resolved: Dict[str, int] = {}
+        for i, row in enumerate(rows):
+            body = row.get("ai_response")
+            if body is None:
+                continue
+            digest = digests[i] = response_digest(body)
+            response_id = resolved.get(digest) or self._cached(digest)
+            if response_id is None:
+                missing[digest] = body
+            else:
+                resolved[digest] = response_id
+        if missing:
+            responses = ChatResponse.__table__
+            await conn.execute(
+                sqlite_insert(responses).on_conflict_do_nothing(index_elements=["digest"]),
+                [{"digest": digest, "body": body} for digest, body in missing.items()],
+            )
+            found = dict((await conn.execute(
+                select(responses.c.digest, responses.c.id).where(responses.c.digest.in_(list(missing)))
+            )).all())
+            resolved.update(found)
+        for i, row in enumerate(rows):
+            digest = digests.get(i)
+            row["response_id"] = resolved[digest] if digest else None
+            if digest:
+                row["ai_response"] = None
+        return lambda: self._remember(resolved) if resolved else None
+
+    async def page(self, session_id: str, limit: int = 50, before_id: Optional[int] = None) -> Dict[str, Any]:
+        """One page of a session's messages, oldest first; ``next_before_id`` loads the page before it"""
+        await database.init_database()
+        limit = max(1, min(limit, MAX_PAGE))
+        queries, responses = UserQuery.__table__, ChatResponse.__table__
+        stmt = (
+            select(
+                queries.c.id, queries.c.user_query, queries.c.ai_response, responses.c.body,
+                queries.c.confidence_score, queries.c.sources_used, queries.c.response_time_ms, queries.c.created_at,
+            )
+            .select_from(queries.outerjoin(responses, responses.c.id == queries.c.response_id))
+            .where(queries.c.session_id == session_id)
+            .order_by(queries.c.id.desc())
+            .limit(limit + 1)
+        )
+        if before_id is not None:
+            stmt = stmt.where(queries.c.id < before_id)
+        async with database.async_engine.connect() as conn:
+            rows = (await conn.execute(stmt)).all()
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        messages = [
+            {
+                "id": row.id,
+                "message": row.user_query,
+                "response": row.ai_response if row.ai_response is not None else row.body,
+                "confidence": row.confidence_score,
+                "sources": json.loads(row.sources_used) if row.sources_used else [],
+                "response_time_ms": row.response_time_ms,
+                "timestamp": row.created_at.isoformat() if row.created_at else None,
+            }
+            for row in reversed(rows)
+        ]
+        return {
+            "session_id": session_id,
+            "messages": messages,
+            "has_more": has_more,
+            "next_before_id": rows[-1].id if has_more else None,
+        }
+
+
+# Global instance
+chat_history = ChatHistory()
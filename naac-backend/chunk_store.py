@@ -0,0 +1,47 @@
+import os
+import json
+import hashlib
+from typing import Iterator, Dict, Any
+
+# Default location of the notebook's chunk output (Section 5: text_chunks.json)
+DEFAULT_CHUNKS_PATH = os.getenv("NAAC_CHUNKS_PATH", os.path.join("data", "processed", "text_chunks.json"))
+
+
+def iter_chunks(path: str = DEFAULT_CHUNKS_PATH) -> Iterator[Dict[str, Any]]:
+    """Yield {"content", "metadata"} chunk records from text_chunks.json or a .jsonl chunk store"""
+    if path.endswith(".jsonl"):
+        # One chunk per line - streamed without loading the whole corpus
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+        return
+
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    for chunk in data.get("chunks", []):
+        yield chunk
+
+
+def chunk_id_for(chunk: Dict[str, Any]) -> str:
+    """Stable id for a chunk: the notebook's chunk_id, else a content hash"""
+    metadata = chunk.get("metadata") or {}
+    chunk_id = metadata.get("chunk_id")
+    if chunk_id:
+        return str(chunk_id)
+    # abs(hash(content)) as used in prepare_pinecone_data changes between processes,
+    # which breaks idempotent re-uploads, so fall back to a content digest instead
+    digest = hashlib.sha1(chunk.get("content", "").encode("utf-8")).hexdigest()[:16]
+    return f"naac_chunk_{digest}"
+
+
+def write_jsonl(chunks, path: str) -> int:
+    """Write chunk records to a .jsonl chunk store and return the number written"""
+    count = 0
+    with open(path, "w", encoding="utf-8") as f:
+        for chunk in chunks:
+            f.write(json.dumps(chunk, ensure_ascii=False))
+            f.write("\n")
+            count += 1
+    return count
@@ -0,0 +1,97 @@
+from typing import List, Tuple, Dict, Any
+
+# Same settings as the notebook's RecursiveCharacterTextSplitter (Section 5)
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 150
+SEPARATORS = ["\n\n", "\n", ". ", " ", ""]
+
+
+class RecursiveTextSplitter:
+    """Dependency-free port of LangChain's RecursiveCharacterTextSplitter that also reports offsets"""
+
+    def __init__(self, chunk_size: int = CHUNK_SIZE, chunk_overlap: int = CHUNK_OVERLAP, separators: List[str] = None):
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.separators = separators or SEPARATORS
+
+    def _merge(self, splits: List[str], separator: str) -> List[str]:
+        sep_len = len(separator)
+        docs, current, total = [], [], 0
+        for piece in splits:
+            length = len(piece)
+            if total + length + (sep_len if current else 0) > self.chunk_size and current:
+                doc = separator.join(current).strip()
+                if doc:
+                    docs.append(doc)
+                # Drop pieces from the front until only the overlap window is carried over
+                while total > self.chunk_overlap or (total + length + (sep_len if current else 0) > self.chunk_size and total > 0):
+                    total -= len(current[0]) + (sep_len if len(current) > 1 else 0)
+                    current.pop(0)
+            current.append(piece)
+            total += length + (sep_len if len(current) > 1 else 0)
+        doc = separator.join(current).strip()
+        if doc:
+            docs.append(doc)
+        return docs
+
+    def _split(self, text: str, separators: List[str]) -> List[str]:
+        separator, remaining = separators[-1], []
+        for i, candidate in enumerate(separators):
+            if candidate == "":
+                separator = candidate
+                break
+            if candidate in text:
+                separator, remaining = candidate, separators[i + 1:]
+                break
+
+        splits = text.split(separator) if separator else list(text)
+        chunks, good = [], []
+        for piece in splits:
+            if len(piece) < self.chunk_size:
+                good.append(piece)
+                continue
+            if good:
+                chunks.extend(self._merge(good, separator))
+                good = []
+            if remaining:
+                chunks.extend(self._split(piece, remaining))
+            else:
+                chunks.append(piece)
+        if good:
+            chunks.extend(self._merge(good, separator))
+        return chunks
+
+    def split_text(self, text: str) -> List[str]:
+        return self._split(text, self.separators)
+
+    def split_text_with_offsets(self, text: str) -> List[Tuple[int, str]]:
+        """Split text and return (start_index, chunk) pairs into the original string"""
+        results, search_from = [], 0
+        for chunk in self.split_text(text):
+            start = text.find(chunk, search_from)
+            if start < 0:
+                start = text.find(chunk)
+            results.append((start, chunk))
+            if start >= 0:
+                search_from = start + max(1, len(chunk) - self.chunk_overlap)
+        return results
+
+
+def chunk_document(text: str, source: str, doc_type: str = "naac_document", splitter: RecursiveTextSplitter = None) -> List[Dict[str, Any]]:
+    """Chunk a document into text_chunks.json-style records"""
+    splitter = splitter or RecursiveTextSplitter()
+    pieces = splitter.split_text_with_offsets(text)
+    return [
+        {
+            "content": chunk,
+            "metadata": {
+                "source": source,
+                "chunk_id": f"{source}_chunk_{i + 1}",
+                "chunk_index": i,
+                "total_chunks": len(pieces),
+                "doc_type": doc_type,
+                "start_index": start,
+            },
+        }
+        for i, (start, chunk) in enumerate(pieces)
+    ]
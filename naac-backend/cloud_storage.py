@@ -1,29 +1,56 @@
 import os
-import ibm_boto3
-from ibm_botocore.exceptions import ClientError
-from ibm_botocore.config import Config
 import uuid
+import asyncio
 from datetime import datetime
-import aiofiles
 from typing import Optional
 
+
+def _write_file(path: str, content: bytes):
+    with open(path, 'wb') as f:
+        f.write(content)
+
+
 class IBMCloudStorageService:
     """Service for handling IBM Cloud Object Storage operations"""
     
     def __init__(self):
-        # IBM Cloud Object Storage configuration
-        self.cos_client = None
-        self.bucket_name = os.getenv("IBM_COS_BUCKET_NAME", "naac-documents")
-        
-        # Initialize IBM COS client if credentials are available
-        self.api_key = os.getenv("IBM_CLOUD_API_KEY")
-        self.service_instance_id = os.getenv("IBM_COS_SERVICE_INSTANCE_ID")
-        self.endpoint_url = os.getenv("IBM_COS_ENDPOINT_URL")
-        self.region = os.getenv("IBM_COS_REGION", "us-south")
-        
-        if self.api_key and self.service_instance_id and self.endpoint_url:
+        # IBM Cloud Object Storage configuration is read from the environment on use (see the properties
+        # below), so values main.py loads from .env after importing this module are still picked up
+        self._cos_client = None
+        self._client_failed = False
+        # Caught around COS calls; narrowed to ibm_botocore's ClientError once the client is built
+        self._client_error = Exception
+
+    @property
+    def bucket_name(self) -> str:
+        return os.getenv("IBM_COS_BUCKET_NAME", "naac-documents")
+
+    @property
+    def api_key(self) -> Optional[str]:
+        return os.getenv("IBM_CLOUD_API_KEY")
+
+    @property
+    def service_instance_id(self) -> Optional[str]:
+        return os.getenv("IBM_COS_SERVICE_INSTANCE_ID")
+
+    @property
+    def endpoint_url(self) -> Optional[str]:
+        return os.getenv("IBM_COS_ENDPOINT_URL")
+
+    @property
+    def region(self) -> str:
+        return os.getenv("IBM_COS_REGION", "us-south")
+
+    @property
+    def cos_client(self):
+        """IBM COS client, built on first use so importing this module stays cheap"""
+        if self._cos_client is None and not self._client_failed and self.api_key and self.service_instance_id and self.endpoint_url:
             try:
-                self.cos_client = ibm_boto3.client(
+                import ibm_boto3
+                from ibm_botocore.config import Config
+                from ibm_botocore.exceptions import ClientError
+                self._client_error = ClientError
+                self._cos_client = ibm_boto3.client(
                     's3',
                     ibm_api_key_id=self.api_key,
                     ibm_service_instance_id=self.service_instance_id,
@@ -33,8 +60,9 @@ class IBMCloudStorageService:
                 )
             except Exception as e:
                 print(f"Failed to initialize IBM Cloud Object Storage client: {e}")
-                self.cos_client = None
-    
+                self._client_failed = True
+        return self._cos_client
+
     def is_configured(self) -> bool:
         """Check if IBM Cloud Object Storage is properly configured"""
         return self.cos_client is not None
@@ -74,7 +102,7 @@ class IBMCloudStorageService:
                 "storage_provider": "IBM Cloud Object Storage"
             }
             
-        except ClientError as e:
+        except self._client_error as e:
             print(f"Failed to upload to IBM Cloud Object Storage: {e}")
             return {"error": str(e), "stored_locally": True}
     
@@ -82,7 +110,7 @@ class IBMCloudStorageService:
         """Store file locally when IBM Cloud Object Storage is not available"""
         try:
             # Create local storage directory
-            local_storage_dir = os.path.join("local_storage", session_id)
+            local_storage_dir = os.path.join(os.getenv("LOCAL_STORAGE_DIR", "local_storage"), session_id)
             os.makedirs(local_storage_dir, exist_ok=True)
             
             # Generate unique filename
@@ -91,8 +119,7 @@ class IBMCloudStorageService:
             local_path = os.path.join(local_storage_dir, unique_filename)
             
             # Write file locally
-            async with aiofiles.open(local_path, 'wb') as f:
-                await f.write(file_content)
+            await asyncio.to_thread(_write_file, local_path, file_content)
             
             return {
                 "success": True,
@@ -125,7 +152,7 @@ class IBMCloudStorageService:
         try:
             self.cos_client.delete_object(Bucket=self.bucket_name, Key=storage_key)
             return True
-        except ClientError as e:
+        except self._client_error as e:
             print(f"Failed to delete from IBM Cloud Object Storage: {e}")
             return False
     
@@ -141,7 +168,7 @@ class IBMCloudStorageService:
                 ExpiresIn=expires_in
             )
             return response
-        except ClientError as e:
+        except self._client_error as e:
             print(f"Failed to generate presigned URL: {e}")
             return None
     
@@ -167,7 +194,7 @@ class IBMCloudStorageService:
                 "file_count": len(files),
                 "files": files
             }
-        except ClientError as e:
+        except self._client_error as e:
             return {"error": f"Failed to list bucket contents: {e}"}
 
 # Global instance
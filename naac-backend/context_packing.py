@@ -0,0 +1,196 @@
+import os
+import re
+import zlib
+import random
+import threading
+from typing import Callable, Dict, Any, List, Optional
+
+from chunking import CHUNK_OVERLAP
+from reranker import estimate_tokens
+
+# Optional HuggingFace tokenizer (e.g. a Granite tokenizer.json) for exact counts
+TOKENIZER_NAME = os.getenv("NAAC_TOKENIZER")
+SHINGLE_WORDS = 5
+NUM_PERMUTATIONS = 64
+DUPLICATE_THRESHOLD = 0.8
+_MERSENNE_PRIME = (1 << 61) - 1
+_rng = random.Random(1729)
+_PERMUTATIONS = [(_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME)) for _ in range(NUM_PERMUTATIONS)]
+_WORD_RE = re.compile(r"\w+")
+
+
+class TokenCounter:
+    """Counts tokens with a fast (Rust) HuggingFace tokenizer, falling back to a character heuristic"""
+
+    def __init__(self, tokenizer_name: Optional[str] = TOKENIZER_NAME):
+        self.tokenizer_name = tokenizer_name
+        self._tokenizer = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def _load(self):
+        with self._lock:
+            if not self._loaded:
+                self._loaded = True
+                if self.tokenizer_name:
+                    try:
+                        from tokenizers import Tokenizer
+                        if os.path.exists(self.tokenizer_name):
+                            self._tokenizer = Tokenizer.from_file(self.tokenizer_name)
+                        else:
+                            self._tokenizer = Tokenizer.from_pretrained(self.tokenizer_name)
+                    except Exception as e:
+                        print(f"Tokenizer {self.tokenizer_name} unavailable, estimating tokens: {e}")
+        return self._tokenizer
+
+    def __call__(self, text: str) -> int:
+        tokenizer = self._tokenizer if self._loaded else self._load()
+        if tokenizer is None:
+            return estimate_tokens(text)
+        return len(tokenizer.encode(text, add_special_tokens=False).ids)
+
+
+def minhash_signature(text: str) -> List[int]:
+    """MinHash signature over word 5-shingles"""
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < SHINGLE_WORDS:
+        shingles = {" ".join(words)}
+    else:
+        shingles = {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+    hashes = [zlib.crc32(s.encode("utf-8")) for s in shingles]
+    return [min((a * h + b) % _MERSENNE_PRIME for h in hashes) for a, b in _PERMUTATIONS]
+
+
+def estimated_jaccard(sig_a: List[int], sig_b: List[int]) -> float:
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / len(sig_a)
+
+
+def _overlap_length(previous: str, following: str, max_overlap: int) -> int:
+    """Length of the longest suffix of previous that is a prefix of following"""
+    for size in range(min(len(previous), len(following), max_overlap), 0, -1):
+        if previous.endswith(following[:size]):
+            return size
+    return 0
+
+
+class ContextPacker:
+    """Merges adjacent chunks, drops near-duplicates and packs passages into a token budget"""
+
+    def __init__(
+        self,
+        token_budget: int = 1500,
+        count_tokens: Optional[Callable[[str], int]] = None,
+        duplicate_threshold: float = DUPLICATE_THRESHOLD,
+        max_overlap: int = CHUNK_OVERLAP * 2,
+        separator: str = "\n\n",
+    ):
+        self.token_budget = token_budget
+        self.count_tokens = count_tokens or TokenCounter()
+        self.duplicate_threshold = duplicate_threshold
+        self.max_overlap = max_overlap
+        self.separator = separator
+
+    def merge_adjacent(self, hits: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Join overlapping or touching hits from the same source with consecutive chunk_index"""
+        by_source: Dict[str, list] = {}
+        for rank, hit in enumerate(hits):
+            source = hit.get("metadata", {}).get("source", hit["chunk_id"])
+            by_source.setdefault(source, []).append((rank, hit))
+
+        passages = []
+        for source, items in by_source.items():
+            items.sort(key=lambda item: item[1].get("metadata", {}).get("chunk_index", 0))
+            current = None
+            for rank, hit in items:
+                metadata = hit.get("metadata", {})
+                index = metadata.get("chunk_index")
+                start = metadata.get("start_index")
+                text = hit["content"]
+                overlap = None
+                if current and index is not None and current["last_index"] is not None and index == current["last_index"] + 1:
+                    # Only overlapping or touching chunks are merged, so the passage stays one exact source span
+                    if start is not None and current["end"] is not None:
+                        overlap = current["end"] - start if start <= current["end"] else None
+                    else:
+                        overlap = _overlap_length(current["text"], text, self.max_overlap) or None
+                if overlap is not None:
+                    current["text"] += text[overlap:]
+                    current["chunk_ids"].append(hit["chunk_id"])
+                    current["rank"] = min(current["rank"], rank)
+                    current["last_index"] = index
+                    if start is not None and current["end"] is not None:
+                        current["end"] = max(current["end"], start + len(text))
+                    else:
+                        current["end"] = None
+                    continue
+                if current:
+                    passages.append(current)
+                current = {
+                    "source": source,
+                    "text": text,
+                    "chunk_ids": [hit["chunk_id"]],
+                    "rank": rank,
+                    "last_index": index,
+                    "start": start,
+                    "end": (start + len(text)) if start is not None else None,
+                }
+            if current:
+                passages.append(current)
+        passages.sort(key=lambda p: p["rank"])
+        return passages
+
+    def drop_near_duplicates(self, passages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Keep the better-ranked copy of any pair whose estimated Jaccard exceeds the threshold"""
+        kept, signatures = [], []
+        for passage in passages:
+            signature = minhash_signature(passage["text"])
+            if any(estimated_jaccard(signature, other) >= self.duplicate_threshold for other in signatures):
+                continue
+            kept.append(passage)
+            signatures.append(signature)
+        return kept
+
+    def _truncate(self, text: str, budget: int) -> str:
+        """Longest prefix of text (cut at a word boundary) within budget tokens"""
+        lo, hi = 0, len(text)
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if self.count_tokens(text[:mid]) <= budget:
+                lo = mid
+            else:
+                hi = mid - 1
+        cut = text.rfind(" ", 0, lo)
+        return text[: cut if cut > 0 else lo].rstrip()
+
+    def pack(self, hits: List[Dict[str, Any]], token_budget: Optional[int] = None) -> Dict[str, Any]:
+        """Build the prompt context from ranked hits and report the exact source spans used"""
+        budget = self.token_budget if token_budget is None else token_budget
+        passages = self.drop_near_duplicates(self.merge_adjacent(hits))
+        separator_tokens = self.count_tokens(self.separator)
+
+        parts, spans, used = [], [], 0
+        for passage in passages:
+            remaining = budget - used - (separator_tokens if parts else 0)
+            if remaining <= 0:
+                break
+            text = passage["text"]
+            tokens = self.count_tokens(text)
+            truncated = False
+            if tokens > remaining:
+                text = self._truncate(text, remaining)
+                if not text:
+                    continue
+                tokens = self.count_tokens(text)
+                truncated = True
+            used += tokens + (separator_tokens if parts else 0)
+            parts.append(text)
+            spans.append({
+                "source": passage["source"],
+                "chunk_ids": passage["chunk_ids"],
+                "start": passage["start"],
+                "end": passage["end"] if not truncated or passage["end"] is None else min(passage["end"], passage["start"] + len(text)),
+                "tokens": tokens,
+                "truncated": truncated,
+            })
+
+        return {"text": self.separator.join(parts), "tokens": used, "spans": spans}
@@ -0,0 +1,410 @@
+import os
+import re
+import time
+import sqlite3
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from database import SQLITE_PATH, init_database
+from ssr_engine import CRITERIA, SUB_CRITERIA, SUB_CRITERION_TITLES
+
+# Criterion weightage out of 1000 (NAAC university framework); key indicators and metrics weigh equally within
+CRITERION_WEIGHTS = {"1": 150, "2": 200, "3": 250, "4": 100, "5": 100, "6": 100, "7": 100}
+
+METRICS = {
+    "1.1": [("1.1.1", "Curricula relevance to local, national and global needs"), ("1.1.2", "Programmes where syllabus revision was carried out"),
+            ("1.1.3", "Courses focusing on employability, entrepreneurship and skill development")],
+    "1.2": [("1.2.1", "New courses introduced across programmes"), ("1.2.2", "Choice based credit system and elective courses")],
+    "1.3": [("1.3.1", "Cross-cutting issues: gender, environment, human values and professional ethics"),
+            ("1.3.2", "Value-added courses for transferable and life skills"), ("1.3.3", "Students undertaking field projects and internships")],
+    "1.4": [("1.4.1", "Structured feedback on curriculum from stakeholders"), ("1.4.2", "Feedback analysis and action taken")],
+    "2.1": [("2.1.1", "Enrolment against sanctioned intake"), ("2.1.2", "Seats filled against reserved categories")],
+    "2.2": [("2.2.1", "Assessment of learning levels and programmes for advanced and slow learners"),
+            ("2.2.2", "Student to full-time teacher ratio")],
+    "2.3": [("2.3.1", "Student-centric methods: experiential and participative learning"),
+            ("2.3.2", "ICT-enabled tools and e-resources in teaching"), ("2.3.3", "Mentor to mentee ratio")],
+    "2.4": [("2.4.1", "Full-time teachers against sanctioned posts"), ("2.4.2", "Full-time teachers with PhD"),
+            ("2.4.3", "Teaching experience of full-time teachers")],
+    "2.5": [("2.5.1", "Days from end of examination to declaration of results"), ("2.5.2", "Student grievances about evaluation"),
+            ("2.5.3", "IT integration and reforms in the examination process")],
+    "2.6": [("2.6.1", "Programme outcomes and course outcomes stated and communicated"),
+            ("2.6.2", "Attainment of programme outcomes and course outcomes"), ("2.6.3", "Pass percentage of students")],
+    "3.1": [("3.1.1", "Research facilities and research policy"), ("3.1.2", "Seed money for research"),
+            ("3.1.3", "Grants received for research projects")],
+    "3.2": [("3.2.1", "Innovation ecosystem and incubation centre"),
+            ("3.2.2", "Workshops and seminars on research methodology, IPR and entrepreneurship")],
+    "3.3": [("3.3.1", "Research papers in UGC CARE listed journals"), ("3.3.2", "Books and chapters published"),
+            ("3.3.3", "Awards and recognition for research")],
+    "3.4": [("3.4.1", "Extension activities in the neighbourhood community"), ("3.4.2", "Awards for extension activities"),
+            ("3.4.3", "Outreach programmes through NSS and NCC")],
+    "3.5": [("3.5.1", "Collaborative activities: faculty exchange, student exchange and internships"),
+            ("3.5.2", "Functional MoUs with institutions and industries")],
+    "4.1": [("4.1.1", "Adequate classrooms and laboratories"), ("4.1.2", "Sports, cultural facilities and gymnasium"),
+            ("4.1.3", "Classrooms with ICT facilities"), ("4.1.4", "Expenditure on infrastructure augmentation")],
+    "4.2": [("4.2.1", "Library automation with an integrated library management system"),
+            ("4.2.2", "Subscription to e-journals and e-books"), ("4.2.3", "Expenditure on purchase of books and journals"),
+            ("4.2.4", "Library usage by teachers and students")],
+    "4.3": [("4.3.1", "IT facilities and Wi-Fi policy"), ("4.3.2", "Student to computer ratio"), ("4.3.3", "Internet bandwidth")],
+    "4.4": [("4.4.1", "Expenditure on maintenance of physical and academic infrastructure"),
+            ("4.4.2", "Procedures for maintaining and utilizing facilities")],
+    "5.1": [("5.1.1", "Scholarships and freeships"), ("5.1.2", "Capacity building and soft skills enhancement"),
+            ("5.1.3", "Guidance for competitive examinations and career counselling"),
+            ("5.1.4", "Grievance redressal, anti-ragging and sexual harassment committees")],
+    "5.2": [("5.2.1", "Placement of outgoing students"), ("5.2.2", "Progression to higher education"),
+            ("5.2.3", "Students qualifying NET, SLET, GATE, GMAT, CAT or GRE")],
+    "5.3": [("5.3.1", "Awards and medals in sports and cultural activities"), ("5.3.2", "Student council and representation"),
+            ("5.3.3", "Sports and cultural events organised")],
+    "5.4": [("5.4.1", "Alumni association contribution")],
+    "6.1": [("6.1.1", "Governance reflecting the vision and mission"), ("6.1.2", "Decentralization and participative management")],
+    "6.2": [("6.2.1", "Strategic perspective plan deployment"), ("6.2.2", "Functioning of institutional bodies and organizational structure"),
+            ("6.2.3", "E-governance in administration, finance, admission and examination")],
+    "6.3": [("6.3.1", "Welfare measures for teaching and non-teaching staff"),
+            ("6.3.2", "Financial support for teachers to attend conferences and workshops"),
+            ("6.3.3", "Professional development and administrative training programmes"), ("6.3.4", "Faculty development programmes")],
+    "6.4": [("6.4.1", "Internal and external financial audits"), ("6.4.2", "Funds and grants from non-government bodies and philanthropists"),
+            ("6.4.3", "Strategies for mobilization and optimal utilization of resources")],
+    "6.5": [("6.5.1", "IQAC contribution to institutional quality assurance"), ("6.5.2", "Review of the teaching learning process"),
+            ("6.5.3", "Quality assurance initiatives: NIRF, ISO and academic audit")],
+    "7.1": [("7.1.1", "Gender equity programmes"), ("7.1.2", "Environmental consciousness and energy conservation"),
+            ("7.1.3", "Waste management"), ("7.1.4", "Water conservation and rainwater harvesting"), ("7.1.5", "Green campus initiatives"),
+            ("7.1.6", "Environment and energy audits"), ("7.1.7", "Disabled-friendly, barrier-free environment"),
+            ("7.1.8", "Inclusive environment: tolerance and harmony"), ("7.1.9", "Sensitization to constitutional values, rights and duties"),
+            ("7.1.10", "Code of conduct for students, teachers and staff"), ("7.1.11", "Commemorative days, events and festivals")],
+    "7.2": [("7.2.1", "Two institutional best practices")],
+    "7.3": [("7.3.1", "Institutional distinctiveness in one area")],
+}
+METRIC_TITLES = {metric: title for metrics in METRICS.values() for metric, title in metrics}
+
+# A metric is complete with a detailed input that addresses it and enough supporting documents
+INPUT_SHARE = 0.6
+INPUT_TARGET_WORDS = 150
+UNADDRESSED_INPUT_FACTOR = 0.6
+EVIDENCE_TARGET_DOCUMENTS = 2
+KEYWORD_MATCH_SHARE = 0.6
+_STOPWORDS = {"and", "the", "for", "from", "with", "was", "out", "new", "one", "two", "through", "against", "where", "across",
+              "within", "about", "students", "student", "teachers", "institutional", "programmes", "carried", "received", "focusing"}
+_METRIC_ID_RE = re.compile(r"\b([1-7]\.\d\.\d{1,2})\b")
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def _keywords(title: str) -> Set[str]:
+    return {w for w in _WORD_RE.findall(title.lower()) if len(w) > 2 and w not in _STOPWORDS}
+
+
+METRIC_KEYWORDS = {metric: _keywords(title) for metric, title in METRIC_TITLES.items()}
+
+
+def _addresses(metric: str, words: Set[str], mentioned: Set[str]) -> bool:
+    keywords = METRIC_KEYWORDS[metric]
+    # Single-word overlaps ("management", "courses") are too common to count as addressing a metric
+    needed = max(min(2, len(keywords)), round(KEYWORD_MATCH_SHARE * len(keywords)))
+    return metric in mentioned or (bool(keywords) and len(keywords & words) >= needed)
+
+
+def match_metrics(text: str, filename: str = "") -> List[str]:
+    """Metrics a document's text (or filename) supports: named by id, or covering most of the metric's key terms"""
+    body = f"{filename}\n{text}".lower()
+    words = set(_WORD_RE.findall(body))
+    mentioned = set(_METRIC_ID_RE.findall(body))
+    return [metric for metric in METRIC_TITLES if _addresses(metric, words, mentioned)]
+
+
+def input_scores(sub_criterion: str, content: str) -> Dict[str, float]:
+    """Input component (0..1) of each metric under a key indicator, from that indicator's saved text"""
+    content = content or ""
+    word_list = _WORD_RE.findall(content.lower())
+    depth = min(1.0, len(word_list) / INPUT_TARGET_WORDS)
+    words, mentioned = set(word_list), set(_METRIC_ID_RE.findall(content))
+    return {
+        metric: depth * (1.0 if _addresses(metric, words, mentioned) else UNADDRESSED_INPUT_FACTOR)
+        for metric, _ in METRICS.get(sub_criterion, ())
+    }
+
+
+class _Node:
+    __slots__ = ("id", "parent", "children", "weight", "value", "dirty")
+
+    def __init__(self, node_id: str, parent: Optional["_Node"], weight: float):
+        self.id = node_id
+        self.parent = parent
+        self.children: List["_Node"] = []
+        self.weight = weight
+        self.value = 0.0
+        self.dirty = False
+        if parent is not None:
+            parent.children.append(self)
+
+
+class ProgressGraph:
+    """The NAAC metric tree for one session: leaf completion values, aggregates recomputed only when dirty
+
+    Setting a leaf marks its ancestors dirty (stopping at the first one that
+    already is); reading a node recomputes just the dirty path beneath it
+    from the cached values of clean siblings. One input or document change
+    therefore touches a handful of nodes, and a clean read is a lookup.
+    """
+
+    def __init__(self):
+        self.nodes: Dict[str, _Node] = {}
+        root = self._add("all", None, 1.0)
+        for criterion in CRITERIA:
+            criterion_node = self._add(criterion, root, CRITERION_WEIGHTS[criterion])
+            for sub, _ in SUB_CRITERIA[criterion]:
+                sub_node = self._add(sub, criterion_node, 1.0)
+                for metric, _ in METRICS[sub]:
+                    self._add(metric, sub_node, 1.0)
+        self.recomputed = 0
+
+    def _add(self, node_id: str, parent: Optional[_Node], weight: float) -> _Node:
+        node = self.nodes[node_id] = _Node(node_id, parent, weight)
+        return node
+
+    def set(self, metric: str, value: float) -> bool:
+        node = self.nodes[metric]
+        if abs(node.value - value) < 1e-9:
+            return False
+        node.value = value
+        parent = node.parent
+        while parent is not None and not parent.dirty:
+            parent.dirty = True
+            parent = parent.parent
+        return True
+
+    def value(self, node_id: str) -> float:
+        node = self.nodes[node_id]
+        if node.dirty:
+            total = sum(child.weight for child in node.children)
+            node.value = sum(child.weight * self.value(child.id) for child in node.children) / total
+            node.dirty = False
+            self.recomputed += 1
+        return node.value
+
+
+class _SessionProgress:
+    __slots__ = ("graph", "inputs", "input_digests", "evidence", "documents", "evidence_after", "inputs_since", "synced_at")
+
+    def __init__(self):
+        self.graph = ProgressGraph()
+        self.inputs: Dict[str, Dict[str, float]] = {}  # sub_criterion -> metric -> input component
+        self.input_digests: Dict[str, str] = {}
+        self.evidence: Dict[str, Set[int]] = {}  # metric -> supporting document ids
+        self.documents: Dict[int, Set[str]] = {}  # document id -> metrics it supports
+        self.evidence_after = 0
+        self.inputs_since: Optional[str] = None
+        self.synced_at = 0.0
+
+    def leaf(self, metric: str) -> Tuple[float, float, float]:
+        sub = metric.rsplit(".", 1)[0]
+        input_part = self.inputs.get(sub, {}).get(metric, 0.0)
+        evidence_part = min(1.0, len(self.evidence.get(metric, ())) / EVIDENCE_TARGET_DOCUMENTS)
+        return input_part, evidence_part, INPUT_SHARE * input_part + (1 - INPUT_SHARE) * evidence_part
+
+    def apply_input(self, sub_criterion: str, content: str) -> bool:
+        digest = hashlib.sha256((content or "").encode("utf-8")).hexdigest()
+        if self.input_digests.get(sub_criterion) == digest:
+            return False
+        self.input_digests[sub_criterion] = digest
+        self.inputs[sub_criterion] = input_scores(sub_criterion, content)
+        for metric in self.inputs[sub_criterion]:
+            self.graph.set(metric, self.leaf(metric)[2])
+        return True
+
+    def apply_document(self, document_id: int, metrics: Iterable[str]):
+        new = {m for m in metrics if m in METRIC_TITLES}
+        old = self.documents.get(document_id, set())
+        self.documents[document_id] = new
+        for metric in old - new:
+            self.evidence.get(metric, set()).discard(document_id)
+        for metric in new - old:
+            self.evidence.setdefault(metric, set()).add(document_id)
+        for metric in old ^ new:
+            self.graph.set(metric, self.leaf(metric)[2])
+
+
+class EvidenceStore:
+    """metric_evidence rows (job worker side) and the change feed the progress engine syncs from"""
+
+    def __init__(self, path: str = SQLITE_PATH):
+        self.path = path
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA busy_timeout=5000")
+            self._local.conn = conn
+        return conn
+
+    def replace(self, document_id: int, session_id: Optional[str], metrics: List[str]):
+        """Record the metrics a document supports, replacing any earlier rows (job retries are safe)"""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM metric_evidence WHERE document_id = ?", (document_id,))
+            # New ids for every row, so readers past the old rows see the document's whole current set
+            conn.executemany(
+                "INSERT INTO metric_evidence (session_id, document_id, metric_id) VALUES (?, ?, ?)",
+                [(session_id or "default", document_id, metric) for metric in metrics or [None]],
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def changes(self, session_id: str, evidence_after: int, inputs_since: Optional[str]):
+        """Evidence rows after an id and criterion inputs updated since a timestamp, for one session"""
+        conn = self._conn()
+        evidence = conn.execute(
+            "SELECT id, document_id, metric_id FROM metric_evidence WHERE session_id = ? AND id > ? ORDER BY id",
+            (session_id, evidence_after),
+        ).fetchall()
+        params: Tuple[Any, ...] = (session_id,)
+        where = "session_id = ?"
+        if inputs_since is not None:
+            where += " AND updated_at >= ?"
+            params += (inputs_since,)
+        inputs = conn.execute(
+            f"SELECT sub_criterion, content, updated_at FROM criterion_inputs WHERE {where}", params
+        ).fetchall()
+        return evidence, inputs
+
+
+class CriteriaProgress:
+    """Per-session NAAC progress kept incrementally from criterion inputs and processed evidence
+
+    Each session's metric tree is built once (from its saved inputs and the
+    metric_evidence rows workers wrote), then kept current by applying only
+    what changed: inputs saved through this process immediately, and rows
+    written elsewhere via a cheap id/timestamp watermark query at most every
+    PROGRESS_SYNC_INTERVAL_S. Reads in between are in-memory lookups.
+    """
+
+    def __init__(self, store: EvidenceStore, max_sessions: int = 1000, sync_interval_s: float = 2.0):
+        self.store = store
+        self.max_sessions = max_sessions
+        self.sync_interval_s = sync_interval_s
+        self._sessions: "OrderedDict[str, _SessionProgress]" = OrderedDict()
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self.counters = {"sessions_loaded": 0, "syncs": 0, "inputs_applied": 0, "documents_applied": 0}
+
+    async def _session(self, session_id: str) -> _SessionProgress:
+        state = self._sessions.get(session_id)
+        if state is not None:
+            self._sessions.move_to_end(session_id)
+            if time.monotonic() - state.synced_at < self.sync_interval_s:
+                return state
+        lock = self._locks.setdefault(session_id, asyncio.Lock())
+        async with lock:
+            state = self._sessions.get(session_id)
+            if state is None:
+                await init_database()
+                state = _SessionProgress()
+                self.counters["sessions_loaded"] += 1
+            if time.monotonic() - state.synced_at >= self.sync_interval_s:
+                await self._sync(session_id, state)
+            self._sessions[session_id] = state
+            while len(self._sessions) > self.max_sessions:
+                evicted, _ = self._sessions.popitem(last=False)
+                self._locks.pop(evicted, None)
+        return state
+
+    async def _sync(self, session_id: str, state: _SessionProgress):
+        since = state.inputs_since
+        if since:
+            # Timestamps are stored with and without fractions; step back a second and let digests skip repeats
+            try:
+                since = (datetime.fromisoformat(since) - timedelta(seconds=1)).isoformat(sep=" ")
+            except ValueError:
+                pass
+        evidence, inputs = await asyncio.to_thread(self.store.changes, session_id, state.evidence_after, since)
+        by_document: Dict[int, List[str]] = {}
+        for row_id, document_id, metric in evidence:
+            by_document.setdefault(document_id, []).append(metric)
+            state.evidence_after = max(state.evidence_after, row_id)
+        for document_id, metrics in by_document.items():
+            state.apply_document(document_id, metrics)
+            self.counters["documents_applied"] += 1
+        latest = state.inputs_since
+        for sub_criterion, content, updated_at in inputs:
+            if state.apply_input(sub_criterion, content):
+                self.counters["inputs_applied"] += 1
+            latest = max(latest or "", str(updated_at or "")) or None
+        state.inputs_since = latest
+        state.synced_at = time.monotonic()
+        self.counters["syncs"] += 1
+
+    async def input_saved(self, session_id: str, sub_criterion: str, content: str):
+        """Apply an input this process just saved, without waiting for the next sync"""
+        state = await self._session(session_id)
+        if state.apply_input(sub_criterion, content):
+            self.counters["inputs_applied"] += 1
+
+    async def progress(self, session_id: str) -> Dict[str, Any]:
+        """Completion percentage per criterion and overall"""
+        state = await self._session(session_id)
+        graph = state.graph
+        return {
+            "session_id": session_id,
+            "progress": {criterion: round(graph.value(criterion) * 100) for criterion in CRITERIA},
+            "overall": round(graph.value("all") * 100, 1),
+            "timestamp": datetime.now().isoformat(),
+        }
+
+    async def criterion(self, session_id: str, criterion: str) -> Dict[str, Any]:
+        """One criterion's key indicators and metrics with their input and evidence components"""
+        state = await self._session(session_id)
+        graph = state.graph
+        key_indicators = []
+        for sub, title in SUB_CRITERIA[criterion]:
+            metrics = []
+            for metric, metric_title in METRICS[sub]:
+                input_part, evidence_part, value = state.leaf(metric)
+                metrics.append({"id": metric, "title": metric_title, "progress": round(value * 100),
+                                "input": round(input_part * 100), "evidence_documents": len(state.evidence.get(metric, ()))})
+            key_indicators.append({"id": sub, "title": title, "progress": round(graph.value(sub) * 100),
+                                   "has_input": sub in state.inputs, "metrics": metrics})
+        return {
+            "session_id": session_id,
+            "criterion": criterion,
+            "title": CRITERIA[criterion],
+            "weightage": CRITERION_WEIGHTS[criterion],
+            "progress": round(graph.value(criterion) * 100),
+            "key_indicators": key_indicators,
+        }
+
+    async def analytics(self, session_id: str, weakest: int = 5) -> Dict[str, Any]:
+        state = await self._session(session_id)
+        graph = state.graph
+        leaves = [state.leaf(metric) for metric in METRIC_TITLES]
+        subs = sorted(SUB_CRITERION_TITLES, key=lambda sub: graph.value(sub))
+        return {
+            "session_id": session_id,
+            "overall": round(graph.value("all") * 100, 1),
+            "criteria": [
+                {"id": c, "title": CRITERIA[c], "weightage": CRITERION_WEIGHTS[c], "progress": round(graph.value(c) * 100)}
+                for c in CRITERIA
+            ],
+            "metrics_total": len(leaves),
+            "metrics_complete": sum(1 for _, _, value in leaves if value >= 0.999),
+            "metrics_with_input": sum(1 for input_part, _, _ in leaves if input_part > 0),
+            "metrics_with_evidence": sum(1 for _, evidence_part, _ in leaves if evidence_part > 0),
+            "documents_mapped": sum(1 for metrics in state.documents.values() if metrics),
+            "weakest_key_indicators": [
+                {"id": sub, "title": SUB_CRITERION_TITLES[sub], "progress": round(graph.value(sub) * 100)} for sub in subs[:weakest]
+            ],
+            "timestamp": datetime.now().isoformat(),
+        }
+
+
+# Global instances
+evidence_store = EvidenceStore()
+criteria_progress = CriteriaProgress(
+    evidence_store,
+    max_sessions=int(os.getenv("PROGRESS_CACHE_SESSIONS", 1000)),
+    sync_interval_s=float(os.getenv("PROGRESS_SYNC_INTERVAL_S", 2)),
+)
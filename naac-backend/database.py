@@ -1,14 +1,25 @@
 import os
-from sqlalchemy import create_engine
+import json
+import asyncio
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import create_engine, event, func, inspect, insert, or_, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
 from sqlalchemy.orm import sessionmaker
-from databases import Database
-from models import Base
+from models import Base, UserQuery, UploadedDocument
 
 # Database configuration
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./naac_assistant.db")
+IS_SQLITE = DATABASE_URL.startswith("sqlite")
+SQLITE_PATH = make_url(DATABASE_URL).database if IS_SQLITE else None
+ASYNC_DATABASE_URL = DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://", 1) if IS_SQLITE else DATABASE_URL
+
+# Bump when models.py changes shape; stored in PRAGMA user_version so restarts skip migrations
+SCHEMA_VERSION = 11
 
-# For async operations
-database = Database(DATABASE_URL)
+# For async operations: the pool keeps aiosqlite connections (and their threads) open between requests
+async_engine = create_async_engine(ASYNC_DATABASE_URL, pool_pre_ping=False)
 
 # For sync operations
 engine = create_engine(
@@ -18,6 +29,20 @@ engine = create_engine(
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+
+def _set_sqlite_pragmas(dbapi_connection, _record):
+    cursor = dbapi_connection.cursor()
+    # WAL lets several uvicorn workers read while one writes; NORMAL sync is safe under WAL
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA busy_timeout=5000")
+    cursor.close()
+
+
+if IS_SQLITE:
+    event.listen(async_engine.sync_engine, "connect", _set_sqlite_pragmas)
+    event.listen(engine, "connect", _set_sqlite_pragmas)
+
 # Create tables
 def create_tables():
     Base.metadata.create_all(bind=engine)
@@ -29,3 +54,239 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# Columns of the pre-ORM tables main.py used to create with raw sqlite3
+LEGACY_COPIES = {
+    "user_queries": (
+        "message",
+        "INSERT INTO user_queries (id, session_id, user_query, ai_response, created_at) "
+        "SELECT id, session_id, COALESCE(message, ''), response, timestamp FROM user_queries_legacy",
+    ),
+    "uploaded_documents": (
+        "filename",
+        "INSERT INTO uploaded_documents (id, session_id, original_filename, stored_filename, file_size, file_type, "
+        "cloud_storage_url, processing_status, created_at) "
+        "SELECT id, session_id, COALESCE(filename, ''), COALESCE(filename, ''), 0, 'application/octet-stream', "
+        "file_path, 'uploaded', upload_timestamp FROM uploaded_documents_legacy",
+    ),
+}
+
+
+def _migrate(sync_conn):
+    """Move legacy raw-sqlite tables onto the models.py schema and create missing indexes"""
+    inspector = inspect(sync_conn)
+    existing = set(inspector.get_table_names())
+    legacy = []
+    for table, (legacy_column, _) in LEGACY_COPIES.items():
+        if table in existing and legacy_column in {c["name"] for c in inspector.get_columns(table)}:
+            sync_conn.exec_driver_sql(f"ALTER TABLE {table} RENAME TO {table}_legacy")
+            legacy.append(table)
+
+    Base.metadata.create_all(sync_conn)
+    # create_all skips columns and indexes added to tables that already existed (new columns are nullable)
+    inspector = inspect(sync_conn)
+    for table in Base.metadata.sorted_tables:
+        present = {c["name"] for c in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in present:
+                sync_conn.exec_driver_sql(
+                    f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(dialect=sync_conn.dialect)}"
+                )
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(sync_conn, checkfirst=True)
+
+    for table in legacy:
+        sync_conn.exec_driver_sql(LEGACY_COPIES[table][1])
+        sync_conn.exec_driver_sql(f"DROP TABLE {table}_legacy")
+    if sync_conn.dialect.name == "sqlite":
+        from search_index import create_search_tables
+        create_search_tables(sync_conn)
+        from chat_history import compact_responses
+        compact_responses(sync_conn)
+    # Only the model tables: planner stats on the FTS5 shadow tables slow every index write
+    for table in Base.metadata.sorted_tables:
+        sync_conn.exec_driver_sql(f"ANALYZE {table.name}")
+
+
+_schema_ready = False
+_schema_lock = asyncio.Lock()
+
+
+async def init_database():
+    """Create or migrate the schema once per database file; repeat calls are a cached no-op"""
+    global _schema_ready
+    if _schema_ready:
+        return
+    async with _schema_lock:
+        if _schema_ready:
+            return
+        async with async_engine.begin() as conn:
+            version = (await conn.exec_driver_sql("PRAGMA user_version")).scalar() if IS_SQLITE else 0
+            if version < SCHEMA_VERSION:
+                await conn.run_sync(_migrate)
+                if IS_SQLITE:
+                    await conn.exec_driver_sql(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        _schema_ready = True
+
+
+class BatchInserter:
+    """Group-commits concurrent single-row inserts into one executemany per short window
+
+    Each caller still waits for its own row to be committed, so nothing is
+    acknowledged before it is durable; concurrent requests just share the
+    transaction instead of paying for one commit each.
+    """
+
+    def __init__(self, table, window_ms: float = 2.0, max_batch: int = 500, prepare=None):
+        self.table = table
+        # prepare(conn, rows) runs in the batch's transaction before the insert; it may return an on-commit callback
+        self.prepare = prepare
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        self._rows: List[Dict[str, Any]] = []
+        self._done: Optional[asyncio.Future] = None
+        # Strong references to the flush tasks: the event loop only keeps weak ones
+        self._tasks = set()
+
+    def _spawn(self, coro):
+        task = asyncio.get_running_loop().create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def insert(self, row: Dict[str, Any]):
+        if self._done is None:
+            self._done = asyncio.get_running_loop().create_future()
+            self._spawn(self._flush_after_window(self._done))
+        done = self._done
+        self._rows.append(row)
+        if len(self._rows) >= self.max_batch:
+            self._spawn(self._flush(done))
+        await asyncio.shield(done)
+
+    async def _flush_after_window(self, done: asyncio.Future):
+        await asyncio.sleep(self.window)
+        await self._flush(done)
+
+    async def _flush(self, done: asyncio.Future):
+        # Whichever of the window timer and the size trigger comes first takes the batch
+        if self._done is not done:
+            return
+        rows, self._rows, self._done = self._rows, [], None
+        try:
+            await init_database()
+            on_commit = None
+            async with async_engine.begin() as conn:
+                if self.prepare is not None:
+                    on_commit = await self.prepare(conn, rows)
+                await conn.execute(insert(self.table), rows)
+            if on_commit is not None:
+                on_commit()
+            done.set_result(len(rows))
+        except Exception as e:
+            done.set_exception(e)
+
+
+async def _intern_responses(conn, rows):
+    from chat_history import chat_history
+    return await chat_history.intern_responses(conn, rows)
+
+
+query_inserter = BatchInserter(UserQuery.__table__, prepare=_intern_responses)
+
+
+async def record_query(session_id: str, user_query: str, ai_response: str, confidence_score: float = 0.0,
+                       response_time_ms: int = 0, sources: Optional[List[str]] = None,
+                       ip_address: Optional[str] = None, user_agent: Optional[str] = None):
+    await query_inserter.insert({
+        "session_id": session_id,
+        "user_query": user_query,
+        "ai_response": ai_response,
+        "confidence_score": confidence_score,
+        "response_time_ms": response_time_ms,
+        "sources_used": json.dumps(sources or []),
+        "ip_address": ip_address,
+        "user_agent": (user_agent or "")[:500] or None,
+    })
+
+
+async def record_document(**fields) -> int:
+    """Insert one uploaded_documents row and return its id"""
+    await init_database()
+    async with async_engine.begin() as conn:
+        result = await conn.execute(insert(UploadedDocument.__table__).values(**fields))
+        return result.inserted_primary_key[0]
+
+
+async def dashboard_counts(recent: int = 5) -> Dict[str, Any]:
+    await init_database()
+    async with async_engine.connect() as conn:
+        queries = (await conn.execute(select(func.count()).select_from(UserQuery.__table__))).scalar()
+        documents = (await conn.execute(select(func.count()).select_from(UploadedDocument.__table__))).scalar()
+        # Newest by rowid: an O(limit) walk of the primary key, no sort
+        rows = (await conn.execute(
+            select(UserQuery.user_query, UserQuery.created_at).order_by(UserQuery.id.desc()).limit(recent)
+        )).all()
+    return {"queries": queries, "documents": documents, "recent": rows}
+
+
+def session_queries_stmt(session_id: str, limit: int = 20):
+    return (
+        select(UserQuery.__table__)
+        .where(UserQuery.session_id == session_id)
+        .order_by(UserQuery.created_at.desc(), UserQuery.id.desc())
+        .limit(limit)
+    )
+
+
+def documents_by_status_stmt(status: str, limit: int = 50):
+    return (
+        select(UploadedDocument.__table__)
+        .where(UploadedDocument.processing_status == status)
+        .order_by(UploadedDocument.created_at, UploadedDocument.id)
+        .limit(limit)
+    )
+
+
+async def session_queries(session_id: str, limit: int = 20) -> List[Dict[str, Any]]:
+    await init_database()
+    async with async_engine.connect() as conn:
+        return [dict(row._mapping) for row in await conn.execute(session_queries_stmt(session_id, limit))]
+
+
+async def get_document(document_id: int) -> Optional[Dict[str, Any]]:
+    await init_database()
+    async with async_engine.connect() as conn:
+        row = (await conn.execute(select(UploadedDocument.__table__).where(UploadedDocument.id == document_id))).first()
+    return dict(row._mapping) if row else None
+
+
+async def get_document_by_storage_key(key: str) -> Optional[Dict[str, Any]]:
+    """The upload stored under ``key``, as a COS object key or a local stored filename"""
+    await init_database()
+    table = UploadedDocument.__table__
+    async with async_engine.connect() as conn:
+        row = (await conn.execute(
+            select(table).where(or_(table.c.cloud_storage_key == key, table.c.stored_filename == key)).limit(1)
+        )).first()
+    return dict(row._mapping) if row else None
+
+
+async def documents_by_status(status: str, limit: int = 50) -> List[Dict[str, Any]]:
+    await init_database()
+    async with async_engine.connect() as conn:
+        return [dict(row._mapping) for row in await conn.execute(documents_by_status_stmt(status, limit))]
+
+
+async def explain_query_plan(stmt) -> List[str]:
+    """SQLite's EXPLAIN QUERY PLAN detail lines for a statement"""
+    compiled = stmt.compile(async_engine.sync_engine)
+    params = [compiled.params[name] for name in compiled.positiontup] if compiled.positiontup else compiled.params
+    async with async_engine.connect() as conn:
+        rows = await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled.string}", tuple(params) if isinstance(params, list) else params)
+        return [row[-1] for row in rows]
+
+
+async def close_database():
+    await async_engine.dispose()
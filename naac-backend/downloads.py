@@ -0,0 +1,249 @@
+import os
+import re
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from urllib.parse import quote
+
+import anyio
+from starlette.requests import Request
+from starlette.responses import Response, StreamingResponse
+
+DOWNLOAD_CHUNK_BYTES = int(os.getenv("DOWNLOAD_CHUNK_BYTES", 256 * 1024))
+HASH_CHUNK_BYTES = 1024 * 1024
+_RANGE_RE = re.compile(r"^\s*bytes\s*=\s*(\d*)\s*-\s*(\d*)\s*$", re.IGNORECASE)
+
+
+class RangeNotSatisfiable(Exception):
+    """The Range header names no byte of the representation (answered with 416)"""
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """(first, last) inclusive for a single byte range, or None to send the whole body
+
+    Multiple ranges and malformed headers are ignored (a full 200 is always
+    a valid answer to Range); a well-formed range past the end raises
+    RangeNotSatisfiable.
+    """
+    if not header:
+        return None
+    match = _RANGE_RE.match(header)
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the final N bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            raise RangeNotSatisfiable()
+        return max(0, size - length), size - 1
+    first = int(first)
+    last = min(int(last), size - 1) if last else size - 1
+    if first >= size:
+        raise RangeNotSatisfiable()
+    if last < first:
+        return None
+    return first, last
+
+
+def _etags(header: str):
+    return {tag.strip().removeprefix("W/") for tag in header.split(",") if tag.strip()}
+
+
+def not_modified(request: Request, etag: str) -> bool:
+    """If-None-Match matches (weak comparison, as RFC 9110 specifies for it)"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = _etags(header)
+    return "*" in tags or etag.removeprefix("W/") in tags
+
+
+def range_applies(request: Request, etag: str) -> bool:
+    """If-Range (strong comparison): only honour Range when the client's copy is this version"""
+    if_range = request.headers.get("if-range")
+    return if_range is None or if_range.strip() == etag
+
+
+def content_disposition(filename: Optional[str]) -> Optional[str]:
+    if not filename:
+        return None
+    fallback = filename.encode("ascii", "ignore").decode().replace('"', "").replace("\\", "") or "download"
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename)}"
+
+
+class ContentHashes:
+    """sha256 of local files keyed by (path, inode, size, mtime), hashed in fixed-size reads"""
+
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def digest(self, path: str, stat: os.stat_result) -> str:
+        key = (path, stat.st_ino, stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            digest = self._entries.get(key)
+            if digest is not None:
+                self._entries.move_to_end(key)
+                return digest
+        hasher = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(HASH_CHUNK_BYTES), b""):
+                hasher.update(block)
+        digest = hasher.hexdigest()
+        with self._lock:
+            self._entries[key] = digest
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return digest
+
+
+class FileDownload(Response):
+    """A local file (or one byte range of it) sent without holding it in memory
+
+    Servers that implement the ASGI zero-copy extensions get the file itself:
+    ``http.response.pathsend`` for whole files, ``http.response.zerocopysend``
+    (sendfile) for ranges. Everywhere else the body is read with pread in
+    DOWNLOAD_CHUNK_BYTES pieces, so memory per download stays one chunk.
+    """
+
+    def __init__(self, path: str, size: int, status_code: int, headers: Dict[str, str], media_type: str,
+                 byte_range: Optional[Tuple[int, int]] = None):
+        self.path = path
+        self.offset, last = byte_range if byte_range else (0, size - 1)
+        self.count = max(0, last - self.offset + 1)
+        self.whole_file = byte_range is None
+        super().__init__(status_code=status_code, headers={**headers, "content-length": str(self.count)}, media_type=media_type)
+
+    async def __call__(self, scope, receive, send):
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if scope["method"] == "HEAD" or self.count == 0:
+            await send({"type": "http.response.body", "body": b""})
+            return
+        extensions = scope.get("extensions") or {}
+        if self.whole_file and "http.response.pathsend" in extensions:
+            await send({"type": "http.response.pathsend", "path": os.path.abspath(self.path)})
+            return
+        f = await anyio.to_thread.run_sync(open, self.path, "rb")
+        try:
+            if "http.response.zerocopysend" in extensions:
+                await send({"type": "http.response.zerocopysend", "file": f, "offset": self.offset, "count": self.count})
+                return
+            async with anyio.create_task_group() as task_group:
+                async def stream():
+                    await self._stream(f.fileno(), send)
+                    task_group.cancel_scope.cancel()
+
+                async def watch_disconnect():
+                    # Stop reading the file as soon as the client goes away
+                    while (await receive())["type"] != "http.disconnect":
+                        pass
+                    task_group.cancel_scope.cancel()
+
+                task_group.start_soon(stream)
+                task_group.start_soon(watch_disconnect)
+        finally:
+            f.close()
+
+    async def _stream(self, fd: int, send):
+        offset, remaining = self.offset, self.count
+        while remaining > 0:
+            chunk = await anyio.to_thread.run_sync(os.pread, fd, min(DOWNLOAD_CHUNK_BYTES, remaining), offset)
+            if not chunk:
+                raise RuntimeError(f"{self.path} shrank while it was being sent")
+            offset += len(chunk)
+            remaining -= len(chunk)
+            await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+
+
+class DownloadService:
+    """Document, SSR and COS downloads with strong ETags, conditional GETs and single byte ranges"""
+
+    def __init__(self, hashes: Optional[ContentHashes] = None):
+        self.hashes = hashes or ContentHashes()
+
+    @staticmethod
+    def _headers(etag: str, filename: Optional[str]) -> Dict[str, str]:
+        headers = {"etag": etag, "accept-ranges": "bytes", "cache-control": "private, no-cache"}
+        disposition = content_disposition(filename)
+        if disposition:
+            headers["content-disposition"] = disposition
+        return headers
+
+    async def file(self, request: Request, path: str, media_type: Optional[str] = None, filename: Optional[str] = None,
+                   sha256: Optional[str] = None) -> Response:
+        """Serve a local file; ``sha256`` (recorded at upload) saves hashing it for the ETag"""
+        stat = await anyio.to_thread.run_sync(os.stat, path)
+        if sha256 is None:
+            sha256 = await anyio.to_thread.run_sync(self.hashes.digest, path, stat)
+        etag = f'"{sha256}"'
+        headers = self._headers(etag, filename)
+        if not_modified(request, etag):
+            return Response(status_code=304, headers={k: v for k, v in headers.items() if k != "content-disposition"})
+        byte_range = None
+        if range_applies(request, etag):
+            try:
+                byte_range = parse_range(request.headers.get("range"), stat.st_size)
+            except RangeNotSatisfiable:
+                return Response(status_code=416, headers={**headers, "content-range": f"bytes */{stat.st_size}"})
+        if byte_range is not None:
+            headers["content-range"] = f"bytes {byte_range[0]}-{byte_range[1]}/{stat.st_size}"
+        return FileDownload(path, stat.st_size, 206 if byte_range else 200, headers,
+                            media_type or "application/octet-stream", byte_range)
+
+    async def cos_object(self, request: Request, client, bucket: str, key: str, filename: Optional[str] = None) -> Response:
+        """Relay a COS object as a chunked async stream; Range is forwarded so COS sends only those bytes"""
+        head = await anyio.to_thread.run_sync(lambda: client.head_object(Bucket=bucket, Key=key))
+        size = int(head["ContentLength"])
+        # COS ETags are content MD5s (or a hash of part MD5s for multipart uploads): strong validators either way
+        etag = head["ETag"] if head["ETag"].startswith('"') else f'"{head["ETag"]}"'
+        headers = self._headers(etag, filename or os.path.basename(key))
+        if not_modified(request, etag):
+            return Response(status_code=304, headers={k: v for k, v in headers.items() if k != "content-disposition"})
+        byte_range = None
+        if range_applies(request, etag):
+            try:
+                byte_range = parse_range(request.headers.get("range"), size)
+            except RangeNotSatisfiable:
+                return Response(status_code=416, headers={**headers, "content-range": f"bytes */{size}"})
+        params = {"Bucket": bucket, "Key": key, "IfMatch": etag}
+        if byte_range is not None:
+            params["Range"] = f"bytes={byte_range[0]}-{byte_range[1]}"
+            headers["content-range"] = f"bytes {byte_range[0]}-{byte_range[1]}/{size}"
+        obj = await anyio.to_thread.run_sync(lambda: client.get_object(**params))
+        headers["content-length"] = str(obj.get("ContentLength", size))
+        body = obj["Body"]
+
+        async def chunks():
+            try:
+                while True:
+                    chunk = await anyio.to_thread.run_sync(body.read, DOWNLOAD_CHUNK_BYTES)
+                    if not chunk:
+                        return
+                    yield chunk
+            finally:
+                body.close()
+
+        return StreamingResponse(chunks(), status_code=206 if byte_range else 200, headers=headers,
+                                 media_type=head.get("ContentType") or "application/octet-stream")
+
+
+def resolve_local(filename: str, *roots: str) -> Optional[str]:
+    """First existing file named ``filename`` directly inside one of ``roots`` (no path components allowed)"""
+    name = os.path.basename(filename or "")
+    if not name or name in (".", ".."):
+        return None
+    for root in roots:
+        if root:
+            path = os.path.join(root, name)
+            if os.path.isfile(path):
+                return path
+    return None
+
+
+# Global instance
+download_service = DownloadService()
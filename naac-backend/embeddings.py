@@ -0,0 +1,189 @@
+import os
+import inspect
+import argparse
+import threading
+from typing import List, Optional
+
+# Same model as the notebook's HuggingFace fallback and the chunk vectors already in Pinecone
+DEFAULT_EMBEDDING_MODEL = os.getenv("NAAC_EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+EMBEDDING_DIMENSION = 384
+# "sentence-transformers" (PyTorch), "onnx" (fp32 export) or "onnx-int8" (dynamically quantized export)
+EMBEDDING_BACKEND = os.getenv("NAAC_EMBEDDING_BACKEND", "sentence-transformers")
+DEFAULT_ONNX_DIR = os.getenv("NAAC_ONNX_MODEL_DIR", os.path.join("models", "all-MiniLM-L6-v2-onnx"))
+# all-MiniLM-L6-v2's sentence-transformers max_seq_length; longer inputs are truncated the same way
+MAX_SEQ_LENGTH = 256
+
+
+class SentenceEmbedder:
+    """Lazily loaded sentence-transformers encoder producing normalised vectors"""
+
+    def __init__(self, model_name: str = DEFAULT_EMBEDDING_MODEL, batch_size: int = 32, device: str = "cpu"):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.device = device
+        self.dimension = EMBEDDING_DIMENSION
+        self._model = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        with self._lock:
+            if self._model is None:
+                from sentence_transformers import SentenceTransformer
+                self._model = SentenceTransformer(self.model_name, device=self.device)
+                self.dimension = self._model.get_sentence_embedding_dimension()
+        return self._model
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        model = self._model or self._load()
+        vectors = model.encode(texts, batch_size=self.batch_size, normalize_embeddings=True, show_progress_bar=False)
+        return vectors.tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed([text])[0]
+
+
+class OnnxEmbedder:
+    """The same MiniLM encoder exported to ONNX, run by onnxruntime with the Rust tokenizer; no PyTorch import
+
+    Reproduces sentence-transformers' pipeline for this model (truncate to
+    256 tokens, mean-pool over the attention mask, L2-normalise), so vectors
+    line up with the ones already indexed: fp32 to float rounding, int8 to
+    within quantization error. Inputs are sorted by token count before
+    batching, so each batch is padded only to its own longest text.
+
+    Needs ``onnxruntime`` and ``tokenizers`` (requirements-onnx.txt), and
+    the export written by ``python embeddings.py --export-onnx`` (model.onnx,
+    model_quantized.onnx, tokenizer.json) in ``model_dir``.
+    """
+
+    def __init__(self, model_dir: str = DEFAULT_ONNX_DIR, quantized: bool = False, batch_size: int = 32,
+                 threads: Optional[int] = None):
+        self.model_dir = model_dir
+        self.quantized = quantized
+        self.batch_size = batch_size
+        self.threads = threads if threads is not None else int(os.getenv("NAAC_ONNX_THREADS", 0))
+        self.dimension = EMBEDDING_DIMENSION
+        self._session = None
+        self._tokenizer = None
+        self._input_names = ()
+        self._lock = threading.Lock()
+
+    def _load(self):
+        with self._lock:
+            if self._session is None:
+                import onnxruntime
+                from tokenizers import Tokenizer
+                tokenizer = Tokenizer.from_file(os.path.join(self.model_dir, "tokenizer.json"))
+                tokenizer.enable_truncation(max_length=MAX_SEQ_LENGTH)
+                tokenizer.no_padding()
+                options = onnxruntime.SessionOptions()
+                options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+                # 0 lets onnxruntime use every core
+                options.intra_op_num_threads = self.threads
+                model = os.path.join(self.model_dir, "model_quantized.onnx" if self.quantized else "model.onnx")
+                session = onnxruntime.InferenceSession(model, options, providers=["CPUExecutionProvider"])
+                self._input_names = tuple(i.name for i in session.get_inputs())
+                width = session.get_outputs()[0].shape[-1]
+                if isinstance(width, int):
+                    self.dimension = width
+                self._tokenizer = tokenizer
+                self._session = session
+        return self._session
+
+    def _run(self, encodings):
+        import numpy as np
+        length = max(len(e.ids) for e in encodings)
+        input_ids = np.zeros((len(encodings), length), dtype=np.int64)
+        attention_mask = np.zeros((len(encodings), length), dtype=np.int64)
+        for row, encoding in enumerate(encodings):
+            input_ids[row, :len(encoding.ids)] = encoding.ids
+            attention_mask[row, :len(encoding.ids)] = 1
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask, "token_type_ids": np.zeros_like(input_ids)}
+        hidden = self._session.run(None, {name: feeds[name] for name in self._input_names})[0]
+        mask = attention_mask[:, :, None].astype(hidden.dtype)
+        pooled = (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+        return pooled / np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        import numpy as np
+        if self._session is None:
+            self._load()
+        encodings = self._tokenizer.encode_batch(texts)
+        order = sorted(range(len(texts)), key=lambda i: len(encodings[i].ids))
+        vectors = np.empty((len(texts), self.dimension), dtype=np.float32)
+        for start in range(0, len(order), self.batch_size):
+            batch = order[start:start + self.batch_size]
+            vectors[batch] = self._run([encodings[i] for i in batch])
+        return vectors.tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed([text])[0]
+
+
+def export_onnx(model_name: str = DEFAULT_EMBEDDING_MODEL, output_dir: str = DEFAULT_ONNX_DIR, quantize: bool = True) -> str:
+    """One-off export of the transformer (pooling stays in OnnxEmbedder) plus its fast tokenizer; needs torch, transformers and onnx"""
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+    os.makedirs(output_dir, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    # Writes tokenizer.json, which the tokenizers package loads without transformers
+    tokenizer.save_pretrained(output_dir)
+    model = AutoModel.from_pretrained(model_name).eval()
+
+    class Encoder(torch.nn.Module):
+        # Keyword call and a bare tensor out: BertModel's positional arguments and outputs vary across transformers releases
+        def __init__(self):
+            super().__init__()
+            self.model = model
+
+        def forward(self, input_ids, attention_mask, token_type_ids):
+            return self.model(input_ids=input_ids, attention_mask=attention_mask, token_type_ids=token_type_ids,
+                              return_dict=True).last_hidden_state
+
+    sample = tokenizer(["NAAC self study report"], return_tensors="pt")
+    names = ["input_ids", "attention_mask", "token_type_ids"]
+    path = os.path.join(output_dir, "model.onnx")
+    # torch 2.9+ defaults to the dynamo exporter, which needs onnxscript and ignores dynamic_axes
+    legacy = {"dynamo": False} if "dynamo" in inspect.signature(torch.onnx.export).parameters else {}
+    with torch.no_grad():
+        torch.onnx.export(
+            Encoder(), tuple(sample[name] for name in names), path,
+            input_names=names, output_names=["last_hidden_state"],
+            dynamic_axes={name: {0: "batch", 1: "sequence"} for name in names + ["last_hidden_state"]},
+            opset_version=14, **legacy,
+        )
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantize_dynamic(path, os.path.join(output_dir, "model_quantized.onnx"), weight_type=QuantType.QInt8)
+    return output_dir
+
+
+_embedder = None
+
+
+def get_embedder():
+    """Process-wide embedder for NAAC_EMBEDDING_BACKEND; the model loads on the first embed call"""
+    global _embedder
+    if _embedder is None:
+        if EMBEDDING_BACKEND in ("onnx", "onnx-int8"):
+            _embedder = OnnxEmbedder(quantized=EMBEDDING_BACKEND == "onnx-int8")
+        else:
+            _embedder = SentenceEmbedder()
+    return _embedder
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the embedding model for NAAC_EMBEDDING_BACKEND=onnx / onnx-int8")
+    parser.add_argument("--export-onnx", metavar="DIR", nargs="?", const=DEFAULT_ONNX_DIR, required=True)
+    parser.add_argument("--model", default=DEFAULT_EMBEDDING_MODEL)
+    parser.add_argument("--no-quantize", action="store_true")
+    args = parser.parse_args()
+    print(f"Exported {args.model} to {export_onnx(args.model, args.export_onnx, quantize=not args.no_quantize)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+import os
+import json
+import uuid
+import asyncio
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import anyio
+from starlette.responses import Response
+
+EVENT_COALESCE_S = float(os.getenv("EVENT_COALESCE_S", 0.1))
+EVENT_HEARTBEAT_S = float(os.getenv("EVENT_HEARTBEAT_S", 15))
+EVENT_SEND_TIMEOUT_S = float(os.getenv("EVENT_SEND_TIMEOUT_S", 30))
+EVENT_MAX_TOPICS = int(os.getenv("EVENT_MAX_TOPICS", 64))
+
+Fetch = Callable[[List[str]], Awaitable[Dict[str, Any]]]
+
+
+class _Source:
+    """Polls the current value of every subscribed topic under one name ("analytics", or "job:<id>" for "job")"""
+
+    def __init__(self, name: str, fetch: Fetch, interval_s: float, final: Optional[Callable[[Any], bool]] = None):
+        self.name = name
+        self.fetch = fetch
+        self.interval_s = interval_s
+        self.final = final
+        self.topics: Set[str] = set()
+        self.wake = asyncio.Event()
+        self.fetches = 0
+
+    def owns(self, topic: str) -> bool:
+        return topic == self.name or topic.startswith(self.name + ":")
+
+
+class Subscriber:
+    """One connection: its topics and the events it has not been sent yet
+
+    Pending events are kept latest-value-per-topic, so a burst of updates to a
+    topic collapses into one event and a client that reads slowly holds at
+    most one pending event per subscribed topic, never a backlog.
+    """
+
+    def __init__(self):
+        self.id = uuid.uuid4().hex
+        self.topics: Set[str] = set()
+        self._pending: "OrderedDict[str, Any]" = OrderedDict()
+        self._wakeup = asyncio.Event()
+        self.sent = 0
+        self.coalesced = 0
+
+    def offer(self, topic: str, data: Any):
+        if topic in self._pending:
+            self.coalesced += 1
+        self._pending[topic] = data
+        self._wakeup.set()
+
+    async def batches(self, coalesce_s: float, heartbeat_s: float):
+        """Pending events in batches (at most one per coalesce_s); an empty batch after heartbeat_s of quiet"""
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), heartbeat_s)
+            except asyncio.TimeoutError:
+                yield []
+                continue
+            # Let the rest of a burst land before writing
+            await asyncio.sleep(coalesce_s)
+            self._wakeup.clear()
+            batch = list(self._pending.items())
+            self._pending.clear()
+            if batch:
+                self.sent += len(batch)
+                yield batch
+
+
+class EventHub:
+    """In-process pub/sub for state the UI used to poll: job status, dashboard analytics, service health
+
+    Each topic's value comes from a registered source, polled once per
+    interval for all of its subscribed topics together (one query however
+    many tabs are watching) and only while someone is subscribed. A value is
+    published only when it differs from the last one, and new subscribers get
+    the last value straight away. ``refresh`` wakes a source early when this
+    process knows its value just changed. Every uvicorn worker runs its own hub.
+    """
+
+    def __init__(self, coalesce_s: float = EVENT_COALESCE_S, heartbeat_s: float = EVENT_HEARTBEAT_S,
+                 send_timeout_s: float = EVENT_SEND_TIMEOUT_S, max_topics: int = EVENT_MAX_TOPICS):
+        self.coalesce_s = coalesce_s
+        self.heartbeat_s = heartbeat_s
+        self.send_timeout_s = send_timeout_s
+        self.max_topics = max_topics
+        self.subscribers: Dict[str, Subscriber] = {}
+        self._topics: Dict[str, Set[Subscriber]] = {}
+        self._last: Dict[str, Any] = {}
+        self._sources: List[_Source] = []
+        self._tasks: List[asyncio.Task] = []
+        self.published = 0
+        self.dropped = 0
+
+    def add_source(self, name: str, fetch: Fetch, interval_s: float, final: Optional[Callable[[Any], bool]] = None):
+        """``fetch(topics)`` returns {topic: value}; topics whose value satisfies ``final`` stop being polled"""
+        self._sources.append(_Source(name, fetch, interval_s, final))
+
+    def _source(self, topic: str) -> Optional[_Source]:
+        return next((source for source in self._sources if source.owns(topic)), None)
+
+    def connect(self) -> Subscriber:
+        subscriber = Subscriber()
+        self.subscribers[subscriber.id] = subscriber
+        return subscriber
+
+    def disconnect(self, subscriber: Subscriber):
+        self.unsubscribe(subscriber, list(subscriber.topics))
+        self.subscribers.pop(subscriber.id, None)
+
+    def subscribe(self, subscriber: Subscriber, topics: Iterable[str]):
+        """Raises ValueError for a topic no source provides or past max_topics per connection"""
+        topics = [topic.strip() for topic in topics if topic and topic.strip()]
+        for topic in topics:
+            if self._source(topic) is None:
+                raise ValueError(f"Unknown topic '{topic}'")
+        if len(subscriber.topics | set(topics)) > self.max_topics:
+            raise ValueError(f"At most {self.max_topics} topics per connection")
+        for topic in topics:
+            if topic in subscriber.topics:
+                continue
+            subscriber.topics.add(topic)
+            self._topics.setdefault(topic, set()).add(subscriber)
+            if topic in self._last:
+                subscriber.offer(topic, self._last[topic])
+            else:
+                source = self._source(topic)
+                source.topics.add(topic)
+                source.wake.set()
+
+    def unsubscribe(self, subscriber: Subscriber, topics: Iterable[str]):
+        for topic in topics:
+            subscriber.topics.discard(topic)
+            watchers = self._topics.get(topic)
+            if watchers is None:
+                continue
+            watchers.discard(subscriber)
+            if not watchers:
+                del self._topics[topic]
+                self._last.pop(topic, None)
+                source = self._source(topic)
+                if source is not None:
+                    source.topics.discard(topic)
+
+    def publish(self, topic: str, data: Any):
+        """Send ``data`` to the topic's subscribers unless it equals the last value"""
+        watchers = self._topics.get(topic)
+        if not watchers or (topic in self._last and self._last[topic] == data):
+            return
+        self._last[topic] = data
+        self.published += 1
+        for subscriber in watchers:
+            subscriber.offer(topic, data)
+
+    def refresh(self, topic: str):
+        """Poll the topic's source now rather than at its next interval"""
+        source = self._source(topic)
+        if source is not None and source.topics:
+            source.wake.set()
+
+    async def _poll(self, source: _Source):
+        while True:
+            try:
+                await asyncio.wait_for(source.wake.wait(), source.interval_s)
+            except asyncio.TimeoutError:
+                pass
+            source.wake.clear()
+            topics = [topic for topic in source.topics
+                      if not (source.final and topic in self._last and source.final(self._last[topic]))]
+            if topics:
+                try:
+                    values = await source.fetch(topics)
+                    source.fetches += 1
+                    for topic in topics:
+                        self.publish(topic, values.get(topic))
+                except Exception as e:
+                    print(f"Event source {source.name} failed: {e}")
+            # Wake-ups during a burst share the next fetch
+            await asyncio.sleep(self.coalesce_s)
+
+    def start(self):
+        if not self._tasks:
+            loop = asyncio.get_running_loop()
+            self._tasks = [loop.create_task(self._poll(source)) for source in self._sources]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "connections": len(self.subscribers),
+            "topics": len(self._topics),
+            "published": self.published,
+            "dropped": self.dropped,
+            "fetches": {source.name: source.fetches for source in self._sources},
+        }
+
+    async def pump(self, subscriber: Subscriber, send: Callable[[List[Tuple[str, Any]]], Awaitable[None]]):
+        """Write the subscriber's batches through ``send`` until it stalls past send_timeout_s"""
+        async for batch in subscriber.batches(self.coalesce_s, self.heartbeat_s):
+            try:
+                with anyio.fail_after(self.send_timeout_s):
+                    await send(batch)
+            except TimeoutError:
+                # The client stopped reading; drop it rather than keep a blocked writer around
+                self.dropped += 1
+                return
+
+
+def sse_event(topic: str, data: Any) -> str:
+    return f"event: {topic.split(':', 1)[0]}\ndata: {json.dumps({'topic': topic, 'data': data}, default=str)}\n\n"
+
+
+class EventStream(Response):
+    """text/event-stream of a subscriber's events, opened with a "hello" carrying the connection id
+
+    The id is what POST /events/{connection_id}/subscribe takes to add topics
+    to an open stream. Quiet streams get a comment line every heartbeat so
+    proxies keep them open. Unsubscribes from everything on disconnect.
+    """
+
+    def __init__(self, hub: EventHub, subscriber: Subscriber):
+        self.hub = hub
+        self.subscriber = subscriber
+        # As StreamingResponse does: no body attribute, so no content-length
+        self.status_code = 200
+        self.media_type = "text/event-stream"
+        self.background = None
+        self.init_headers({"cache-control": "no-cache", "x-accel-buffering": "no"})
+
+    async def __call__(self, scope, receive, send):
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        hello = {"connection_id": self.subscriber.id, "topics": sorted(self.subscriber.topics)}
+        await send({"type": "http.response.body", "body": f"event: hello\ndata: {json.dumps(hello)}\n\n".encode(), "more_body": True})
+
+        async def write(batch):
+            body = "".join(sse_event(topic, data) for topic, data in batch) if batch else ": ping\n\n"
+            await send({"type": "http.response.body", "body": body.encode(), "more_body": True})
+
+        try:
+            async with anyio.create_task_group() as task_group:
+                async def stream():
+                    await self.hub.pump(self.subscriber, write)
+                    task_group.cancel_scope.cancel()
+
+                async def watch_disconnect():
+                    while (await receive())["type"] != "http.disconnect":
+                        pass
+                    task_group.cancel_scope.cancel()
+
+                task_group.start_soon(stream)
+                task_group.start_soon(watch_disconnect)
+        finally:
+            self.hub.disconnect(self.subscriber)
+
+
+def parse_topics(topics: Optional[str]) -> List[str]:
+    return [topic for topic in (topics or "").split(",") if topic.strip()]
+
+
+# Global instance
+event_hub = EventHub()
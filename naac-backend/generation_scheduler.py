@@ -0,0 +1,201 @@
+import asyncio
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Optional
+
+from metrics import registry
+
+queue_wait = registry.histogram("naac_generation_queue_wait_seconds", "Time prompts spend queued before dispatch to the LLM")
+requests_shed = registry.counter("naac_generation_shed_total", "Generation requests rejected or expired", ("reason",))
+
+
+class QueueFullError(Exception):
+    """Raised when the generation queue is saturated and the request is shed"""
+
+
+class DeadlineExceededError(Exception):
+    """Raised when a request's deadline passes before its generation completes"""
+
+
+class _PendingRequest:
+    __slots__ = ("prompt", "session_id", "params", "future", "enqueued_at", "deadline")
+
+    def __init__(self, prompt: str, session_id: str, params: Dict[str, Any], future: asyncio.Future, deadline: float):
+        self.prompt = prompt
+        self.session_id = session_id
+        self.params = params
+        self.future = future
+        self.enqueued_at = time.monotonic()
+        self.deadline = deadline
+
+
+class GenerationScheduler:
+    """Queues LLM prompts and dispatches them as micro-batches or under a fair in-flight cap
+
+    Backends that set ``supports_batching`` receive prompts collected over a short
+    window through ``generate_batch``; others get one ``generate`` call per prompt,
+    with sessions served round-robin so one chatty session cannot starve the rest.
+    """
+
+    def __init__(
+        self,
+        backend,
+        max_in_flight: int = 4,
+        max_queue: int = 256,
+        batch_window_ms: float = 5.0,
+        max_batch_size: int = 8,
+        default_deadline_s: float = 30.0,
+    ):
+        self.backend = backend
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.batch_window = batch_window_ms / 1000.0
+        self.max_batch_size = max_batch_size
+        self.default_deadline_s = default_deadline_s
+        # session_id -> FIFO of its pending requests; iteration order is the round-robin order
+        self._sessions: "OrderedDict[str, Deque[_PendingRequest]]" = OrderedDict()
+        self._queued = 0
+        self._in_flight = 0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._wait_samples: Deque[float] = deque(maxlen=2048)
+        self.counters = {"submitted": 0, "completed": 0, "failed": 0, "rejected": 0, "expired": 0, "batches": 0}
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queued
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def _ensure_started(self):
+        # Started lazily on first use so it binds to the serving event loop
+        if self._dispatcher is None or self._dispatcher.done():
+            self._wakeup = asyncio.Event()
+            self._dispatcher = asyncio.get_running_loop().create_task(self._dispatch_loop())
+
+    async def submit(self, prompt: str, session_id: str = "default", deadline_s: Optional[float] = None, **params) -> str:
+        """Queue a prompt and wait for its completion, its deadline, or immediate rejection"""
+        if self._queued >= self.max_queue:
+            self.counters["rejected"] += 1
+            requests_shed.inc(reason="queue_full")
+            raise QueueFullError(f"Generation queue is full ({self._queued} waiting); retry shortly")
+        self._ensure_started()
+
+        timeout = deadline_s if deadline_s is not None else self.default_deadline_s
+        request = _PendingRequest(prompt, session_id, params, asyncio.get_running_loop().create_future(), time.monotonic() + timeout)
+        self._sessions.setdefault(session_id, deque()).append(request)
+        self._queued += 1
+        self.counters["submitted"] += 1
+        self._wakeup.set()
+        try:
+            return await asyncio.wait_for(asyncio.shield(request.future), timeout)
+        except asyncio.TimeoutError:
+            # Left in the queue, it will be discarded when the dispatcher reaches it
+            request.future.cancel()
+            self.counters["expired"] += 1
+            requests_shed.inc(reason="deadline")
+            raise DeadlineExceededError(f"Generation did not complete within {timeout:.1f}s")
+
+    def _next_request(self) -> Optional[_PendingRequest]:
+        """Pop the next live request, rotating across sessions"""
+        while self._sessions:
+            session_id, queue = next(iter(self._sessions.items()))
+            request = queue.popleft()
+            self._queued -= 1
+            if queue:
+                self._sessions.move_to_end(session_id)
+            else:
+                del self._sessions[session_id]
+            if request.future.done():
+                continue
+            if time.monotonic() >= request.deadline:
+                request.future.set_exception(DeadlineExceededError("Deadline passed while queued"))
+                self.counters["expired"] += 1
+                requests_shed.inc(reason="deadline")
+                continue
+            waited = time.monotonic() - request.enqueued_at
+            self._wait_samples.append(waited * 1000)
+            queue_wait.observe(waited)
+            return request
+        return None
+
+    async def _dispatch_loop(self):
+        batching = getattr(self.backend, "supports_batching", False)
+        while True:
+            if not self._queued or self._in_flight >= self.max_in_flight:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            if batching:
+                # Hold the window open briefly so concurrent arrivals share a request
+                if self._queued < self.max_batch_size:
+                    await asyncio.sleep(self.batch_window)
+                batch = []
+                while len(batch) < self.max_batch_size:
+                    request = self._next_request()
+                    if request is None:
+                        break
+                    batch.append(request)
+                if batch:
+                    self._launch(self._run_batch(batch))
+            else:
+                request = self._next_request()
+                if request is not None:
+                    self._launch(self._run_single(request))
+
+    def _launch(self, coroutine):
+        self._in_flight += 1
+        task = asyncio.get_running_loop().create_task(coroutine)
+        task.add_done_callback(self._on_done)
+
+    def _on_done(self, _task):
+        self._in_flight -= 1
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _run_single(self, request: _PendingRequest):
+        try:
+            result = await asyncio.to_thread(self.backend.generate, request.prompt, **request.params)
+            self._resolve(request, result=result)
+        except Exception as e:
+            self._resolve(request, error=e)
+
+    async def _run_batch(self, batch: List[_PendingRequest]):
+        self.counters["batches"] += 1
+        # Parameters are taken from the first request; callers batch like-for-like prompts
+        try:
+            results = await asyncio.to_thread(self.backend.generate_batch, [r.prompt for r in batch], **batch[0].params)
+            for request, result in zip(batch, results):
+                self._resolve(request, result=result)
+        except Exception as e:
+            for request in batch:
+                self._resolve(request, error=e)
+
+    def _resolve(self, request: _PendingRequest, result: Optional[str] = None, error: Optional[Exception] = None):
+        if request.future.done():
+            return
+        if error is not None:
+            self.counters["failed"] += 1
+            request.future.set_exception(error)
+        else:
+            self.counters["completed"] += 1
+            request.future.set_result(result)
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth, in-flight count, counters and recent queue wait percentiles"""
+        waits = sorted(self._wait_samples)
+
+        def pct(p):
+            return round(waits[min(len(waits) - 1, int(len(waits) * p))], 2) if waits else 0.0
+
+        return {
+            "queue_depth": self._queued,
+            "in_flight": self._in_flight,
+            "active_sessions": len(self._sessions),
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue,
+            "wait_ms": {"p50": pct(0.5), "p95": pct(0.95), "p99": pct(0.99), "max": round(waits[-1], 2) if waits else 0.0},
+            **self.counters,
+        }
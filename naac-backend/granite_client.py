@@ -0,0 +1,204 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from typing import List, Optional
+
+from metrics import timed
+from shared_state import shared_state
+
+IAM_TOKEN_URL = "https://iam.cloud.ibm.com/identity/token"
+DEFAULT_WATSONX_URL = "https://us-south.ml.cloud.ibm.com/ml/v1/text/generation"
+DEFAULT_GRANITE_MODEL_ID = "ibm/granite-13b-chat-v2"
+
+
+def _safe_err(resp) -> str:
+    try:
+        data = resp.json()
+        # Remove potentially sensitive data
+        data.pop("access_token", None)
+        return json.dumps(data)[:500]
+    except Exception:
+        return (resp.text or "")[:500]
+
+
+# IBM Granite / watsonx.ai verification helpers
+def _get_ibm_iam_token(api_key: str, timeout: float = 6.0) -> dict:
+    """Exchange IBM Cloud API key for IAM access token. Returns dict with access_token or error."""
+    # requests is imported on first call; it is a large share of cold-start import time
+    import requests
+    try:
+        resp = requests.post(
+            os.getenv("IBM_IAM_URL", IAM_TOKEN_URL),
+            headers={"Content-Type": "application/x-www-form-urlencoded"},
+            data={
+                "grant_type": "urn:ibm:params:oauth:grant-type:apikey",
+                "apikey": api_key,
+            },
+            timeout=timeout,
+        )
+        if resp.status_code == 200:
+            data = resp.json()
+            return {"ok": True, "access_token": data.get("access_token"), "expires_in": data.get("expiration")}
+        return {"ok": False, "status": resp.status_code, "error": _safe_err(resp)}
+    except Exception as e:
+        return {"ok": False, "error": str(e)}
+
+
+def _with_version(url: str) -> str:
+    # IBM ML text generation often requires a version query param
+    return url if ("?version=" in url or "&version=" in url) else f"{url}?version=2023-07-07"
+
+
+def _test_granite_generation(token: str, url: str, model_id: str, project_id: str, timeout: float = 8.0) -> dict:
+    """Make a minimal generation request to verify access. Returns dict with ok True/False and latency."""
+    import requests
+    try:
+        payload = {
+            "input": "ping",
+            "parameters": {
+                "decoding_method": "greedy",
+                "max_new_tokens": 1,
+            },
+            "model_id": model_id,
+            "project_id": project_id,
+        }
+        t0 = time.time()
+        resp = requests.post(
+            _with_version(url),
+            headers={
+                "Accept": "application/json",
+                "Content-Type": "application/json",
+                "Authorization": f"Bearer {token}",
+            },
+            data=json.dumps(payload),
+            timeout=timeout,
+        )
+        latency_ms = int((time.time() - t0) * 1000)
+        if resp.status_code == 200:
+            return {"ok": True, "status": 200, "latency_ms": latency_ms}
+        return {"ok": False, "status": resp.status_code, "error": _safe_err(resp), "latency_ms": latency_ms}
+    except Exception as e:
+        return {"ok": False, "error": str(e)}
+
+
+class GraniteGenerationError(Exception):
+    """Raised when watsonx.ai rejects or fails a generation request"""
+
+
+class GraniteClient:
+    """watsonx.ai text generation client with a cached IAM token and a pooled HTTP session"""
+
+    # The watsonx text/generation endpoint takes a single "input" per request
+    supports_batching = False
+
+    def __init__(self, api_key: Optional[str] = None, url: Optional[str] = None, model_id: Optional[str] = None,
+                 project_id: Optional[str] = None, timeout: float = 30.0, token_store=shared_state):
+        # Explicit settings win; otherwise the environment is read on use, after main.py has loaded .env
+        self._api_key = api_key
+        self._url = url
+        self._model_id = model_id
+        self._project_id = project_id
+        self.timeout = timeout
+        self._session = None
+        self._token = None
+        self._token_expires_at = 0.0
+        self._token_lock = threading.Lock()
+        # Shared across uvicorn workers so they reuse one IAM token instead of each fetching their own
+        self.token_store = token_store
+
+    @property
+    def api_key(self) -> Optional[str]:
+        return self._api_key or os.getenv("IBM_CLOUD_API_KEY")
+
+    @property
+    def url(self) -> str:
+        return self._url or os.getenv("IBM_WATSONX_URL", DEFAULT_WATSONX_URL)
+
+    @property
+    def model_id(self) -> str:
+        return self._model_id or os.getenv("IBM_GRANITE_MODEL_ID", DEFAULT_GRANITE_MODEL_ID)
+
+    @property
+    def project_id(self) -> Optional[str]:
+        return self._project_id or os.getenv("IBM_WATSONX_PROJECT_ID")
+
+    def is_configured(self) -> bool:
+        return bool(self.api_key and self.project_id)
+
+    @property
+    def session(self):
+        """Pooled HTTP session, created on first use rather than at import"""
+        if self._session is None:
+            import requests
+            self._session = requests.Session()
+        return self._session
+
+    def _token_key(self) -> str:
+        return "iam_token:" + hashlib.sha1((self.api_key or "").encode("utf-8")).hexdigest()[:16]
+
+    def access_token(self) -> str:
+        """Return a cached IAM token, refreshing it a minute before expiry"""
+        with self._token_lock:
+            if self._token and time.time() < self._token_expires_at - 60:
+                return self._token
+            cached = self.token_store.get(self._token_key()) if self.token_store is not None else None
+            if cached and time.time() < cached["expires_at"] - 60:
+                self._token, self._token_expires_at = cached["token"], cached["expires_at"]
+                return self._token
+            with timed("iam_token"):
+                info = _get_ibm_iam_token(self.api_key)
+                if not info.get("ok"):
+                    raise GraniteGenerationError(f"IAM token request failed: {info.get('error')}")
+            self._token = info["access_token"]
+            # "expiration" is an absolute epoch timestamp; assume an hour if it is missing
+            self._token_expires_at = float(info.get("expires_in") or time.time() + 3600)
+            if self.token_store is not None:
+                self.token_store.set(self._token_key(), {"token": self._token, "expires_at": self._token_expires_at},
+                                     ttl_s=self._token_expires_at - time.time())
+            return self._token
+
+    def generate(self, prompt: str, max_new_tokens: int = 500, temperature: float = 0.1, timeout: Optional[float] = None) -> str:
+        """Generate a completion for one prompt (same parameters as the notebook's IBMGraniteLLM)"""
+        payload = {
+            "input": prompt,
+            "parameters": {
+                "decoding_method": "greedy",
+                "max_new_tokens": max_new_tokens,
+                "temperature": temperature,
+            },
+            "model_id": self.model_id,
+            "project_id": self.project_id,
+        }
+        token = self.access_token()
+        import requests
+        with timed("generation"):
+            try:
+                resp = self.session.post(
+                    _with_version(self.url),
+                    headers={
+                        "Accept": "application/json",
+                        "Content-Type": "application/json",
+                        "Authorization": f"Bearer {token}",
+                    },
+                    data=json.dumps(payload),
+                    timeout=timeout or self.timeout,
+                )
+            except requests.RequestException as e:
+                # Connection errors and timeouts are upstream failures like a non-200, not server bugs
+                raise GraniteGenerationError(f"Generation request failed: {e.__class__.__name__}: {e}") from e
+            if resp.status_code != 200:
+                raise GraniteGenerationError(f"Generation failed ({resp.status_code}): {_safe_err(resp)}")
+        try:
+            return resp.json().get("results", [{}])[0].get("generated_text", "").strip()
+        except (ValueError, AttributeError, IndexError) as e:
+            raise GraniteGenerationError(f"Generation returned an unreadable response: {e}") from e
+
+    def generate_batch(self, prompts: List[str], **params) -> List[str]:
+        """Batch entry point for backends that accept several inputs per request"""
+        return [self.generate(prompt, **params) for prompt in prompts]
+
+
+# Global instance
+granite_client = GraniteClient()
@@ -0,0 +1,238 @@
+import os
+import time
+import socket
+import sqlite3
+import asyncio
+import tempfile
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+from granite_client import granite_client, _get_ibm_iam_token, _test_granite_generation
+
+
+class Probe:
+    """One dependency check: a blocking callable run off the event loop on its own interval"""
+
+    def __init__(self, name: str, service: str, check: Callable[[float], dict], interval_s: float = 30.0,
+                 timeout_s: float = 5.0, endpoint: str = ""):
+        self.name = name
+        self.service = service
+        self.check = check
+        self.interval_s = interval_s
+        self.timeout_s = timeout_s
+        self.endpoint = endpoint
+
+
+def _result(status: str, message: str = "", error: Optional[str] = None, **details) -> dict:
+    return {"status": status, "message": message, "error": error, "details": details}
+
+
+def check_sqlite(db_path: str) -> Callable[[float], dict]:
+    def check(timeout: float) -> dict:
+        conn = sqlite3.connect(db_path, timeout=timeout)
+        try:
+            conn.execute("SELECT 1").fetchone()
+            tables = conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'table'").fetchone()[0]
+        finally:
+            conn.close()
+        return _result("connected", "SQLite reachable", tables=tables)
+    return check
+
+
+def check_local_storage(directory: str) -> Callable[[float], dict]:
+    def check(timeout: float) -> dict:
+        os.makedirs(directory, exist_ok=True)
+        # A real write catches read-only mounts and full disks that os.access would not
+        with tempfile.NamedTemporaryFile(dir=directory, prefix=".probe-") as f:
+            f.write(b"ok")
+            f.flush()
+        usage = os.statvfs(directory)
+        return _result("connected", "Local storage writable", free_mb=usage.f_bavail * usage.f_frsize // (1024 * 1024))
+    return check
+
+
+def check_iam(timeout: float) -> dict:
+    api_key = granite_client.api_key
+    if not api_key:
+        return _result("not_configured", "IBM_CLOUD_API_KEY is not set")
+    info = _get_ibm_iam_token(api_key, timeout=timeout)
+    if info.get("ok"):
+        return _result("connected", "IAM token exchange succeeded")
+    return _result("error", "IAM token exchange failed", info.get("error"), http_status=info.get("status"))
+
+
+def check_generation(timeout: float) -> dict:
+    if not granite_client.is_configured():
+        return _result("not_configured", "Missing IBM_CLOUD_API_KEY or IBM_WATSONX_PROJECT_ID")
+    # Reuses the client's cached IAM token, so this probe costs one 1-token generation
+    gen = _test_granite_generation(granite_client.access_token(), granite_client.url, granite_client.model_id,
+                                   granite_client.project_id, timeout=timeout)
+    if gen.get("ok"):
+        return _result("connected", "Granite generation ready", model_id=granite_client.model_id)
+    return _result("error", "Granite generation failed", gen.get("error"), http_status=gen.get("status"))
+
+
+def check_cos(timeout: float) -> dict:
+    endpoint = os.getenv("IBM_COS_ENDPOINT_URL")
+    bucket = os.getenv("IBM_COS_BUCKET_NAME", "naac-documents")
+    if not endpoint or not granite_client.api_key:
+        return _result("not_configured", "IBM_COS_ENDPOINT_URL or IBM_CLOUD_API_KEY is not set")
+    import requests
+    resp = requests.head(
+        f"{endpoint.rstrip('/')}/{bucket}",
+        headers={"Authorization": f"Bearer {granite_client.access_token()}"},
+        timeout=timeout,
+    )
+    if resp.status_code == 200:
+        return _result("connected", "Document storage ready", bucket=bucket)
+    return _result("error", f"Bucket check returned HTTP {resp.status_code}", f"HTTP {resp.status_code}", bucket=bucket)
+
+
+def check_http(url_env: str, key_env: Optional[str] = None, key_header: str = "Api-Key", default_url: str = "") -> Callable[[float], dict]:
+    """Reachability check for services we only call over plain HTTPS (Pinecone, Watson NLP)"""
+    def check(timeout: float) -> dict:
+        url = os.getenv(url_env, default_url)
+        key = os.getenv(key_env) if key_env else None
+        if not url or (key_env and not key):
+            return _result("not_configured", f"{key_env or url_env} is not set")
+        import requests
+        resp = requests.get(url, headers={key_header: key} if key else {}, timeout=timeout)
+        if resp.status_code < 400:
+            return _result("connected", "Service reachable", http_status=resp.status_code)
+        return _result("error", f"Service returned HTTP {resp.status_code}", f"HTTP {resp.status_code}")
+    return check
+
+
+class HealthProber:
+    """Runs dependency probes in the background and serves their latest results from memory
+
+    Request handlers only read ``snapshot``/``get``, so health polling from the
+    load balancer or the dashboard never triggers an outbound call.
+    """
+
+    def __init__(self, probes, shared=None, lease_ttl_s: float = 15.0):
+        self.probes: Dict[str, Probe] = {probe.name: probe for probe in probes}
+        # With several workers only the lease holder probes; the others read its published snapshot
+        self.shared = shared
+        self.lease_ttl_s = lease_ttl_s
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        # Replaced wholesale on every update, so readers never see a half-written dict
+        self._snapshot: Dict[str, dict] = {
+            name: {"status": "checking", "service": probe.service, "endpoint": probe.endpoint, "message": "Awaiting first probe",
+                   "error": None, "details": {}, "latency_ms": None, "checked_at": None}
+            for name, probe in self.probes.items()
+        }
+        self._tasks = []
+        self._coordinator: Optional[asyncio.Task] = None
+
+    async def run_probe(self, probe: Probe) -> dict:
+        t0 = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(asyncio.to_thread(probe.check, probe.timeout_s), probe.timeout_s + 1)
+        except asyncio.TimeoutError:
+            result = _result("error", "Probe timed out", f"No response within {probe.timeout_s:.0f}s")
+        except Exception as e:
+            result = _result("error", "Probe failed", str(e)[:300])
+        entry = {
+            **result,
+            "service": probe.service,
+            "endpoint": probe.endpoint,
+            "latency_ms": round((time.perf_counter() - t0) * 1000, 1),
+            "checked_at": time.time(),
+        }
+        self._snapshot = {**self._snapshot, probe.name: entry}
+        if self.shared is not None:
+            await asyncio.to_thread(self.shared.set, "health:snapshot", self._snapshot)
+        return entry
+
+    async def _loop(self, probe: Probe):
+        while True:
+            await self.run_probe(probe)
+            await asyncio.sleep(probe.interval_s)
+
+    def _start_probes(self):
+        if not self._tasks:
+            loop = asyncio.get_running_loop()
+            self._tasks = [loop.create_task(self._loop(probe)) for probe in self.probes.values()]
+
+    async def _stop_probes(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _coordinate(self):
+        while True:
+            try:
+                leader = await asyncio.to_thread(self.shared.acquire_lease, "health_prober", self.owner, self.lease_ttl_s)
+                if leader:
+                    self._start_probes()
+                else:
+                    await self._stop_probes()
+                    snapshot = await asyncio.to_thread(self.shared.get, "health:snapshot")
+                    if snapshot:
+                        self._snapshot = snapshot
+            except Exception as e:
+                print(f"Health probe coordination error: {e}")
+            await asyncio.sleep(self.lease_ttl_s / 3)
+
+    def start(self):
+        """Start probing on the running event loop (or follow the worker that holds the lease)"""
+        if self.shared is None:
+            self._start_probes()
+        elif self._coordinator is None:
+            self._coordinator = asyncio.get_running_loop().create_task(self._coordinate())
+
+    async def stop(self):
+        if self._coordinator is not None:
+            self._coordinator.cancel()
+            await asyncio.gather(self._coordinator, return_exceptions=True)
+            self._coordinator = None
+            await asyncio.to_thread(self.shared.release_lease, "health_prober", self.owner)
+        await self._stop_probes()
+
+    async def refresh(self):
+        """Probe every dependency once, now (startup warm-up and tests)"""
+        await asyncio.gather(*(self.run_probe(probe) for probe in self.probes.values()))
+
+    def get(self, name: str) -> Optional[dict]:
+        entry = self._snapshot.get(name)
+        if entry is None:
+            return None
+        probe = self.probes[name]
+        checked_at = entry["checked_at"]
+        age = time.time() - checked_at if checked_at else None
+        return {
+            **entry,
+            "checked_at": datetime.fromtimestamp(checked_at).isoformat() if checked_at else None,
+            "age_s": round(age, 1) if age is not None else None,
+            # Missed two probe rounds: the result can no longer be trusted
+            "stale": age is None or age > 2 * probe.interval_s + probe.timeout_s,
+        }
+
+    def snapshot(self) -> Dict[str, Any]:
+        services = {name: self.get(name) for name in self.probes}
+        failing = [name for name, entry in services.items() if entry["status"] == "error" or entry["stale"]]
+        return {
+            "services": services,
+            "overall_status": "degraded" if failing else "healthy",
+            "failing": failing,
+            "timestamp": datetime.now().isoformat(),
+        }
+
+
+def default_probes(db_path: str, storage_dir: str):
+    """Probes for the dependencies the backend talks to, intervals overridable via env"""
+    interval = float(os.getenv("HEALTH_PROBE_INTERVAL_S", 30))
+    remote_interval = float(os.getenv("HEALTH_REMOTE_PROBE_INTERVAL_S", 120))
+    timeout = float(os.getenv("HEALTH_PROBE_TIMEOUT_S", 5))
+    return [
+        Probe("database", "SQLite", check_sqlite(db_path), interval, timeout, endpoint=db_path),
+        Probe("local_storage", "Local Storage", check_local_storage(storage_dir), interval, timeout, endpoint=storage_dir),
+        Probe("iam", "IBM Cloud IAM", check_iam, remote_interval, timeout, endpoint=os.getenv("IBM_IAM_URL", "https://iam.cloud.ibm.com")),
+        Probe("granite", "IBM Granite LLM", check_generation, remote_interval, timeout, endpoint=granite_client.url),
+        Probe("cloud_storage", "Cloud Object Storage", check_cos, remote_interval, timeout, endpoint=os.getenv("IBM_COS_ENDPOINT_URL", "")),
+        Probe("pinecone", "Pinecone Vector DB", check_http("PINECONE_INDEXES_URL", "PINECONE_API_KEY", default_url="https://api.pinecone.io/indexes"),
+              remote_interval, timeout, endpoint="https://api.pinecone.io"),
+        Probe("watson_nlp", "Watson NLP", check_http("WATSON_NLP_URL"), remote_interval, timeout, endpoint=os.getenv("WATSON_NLP_URL", "")),
+    ]
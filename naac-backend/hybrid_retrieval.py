@@ -0,0 +1,93 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Any, List, Optional, Sequence, Tuple
+
+from lexical_index import LexicalIndex
+
+# A dense retriever takes (query, k) and returns (chunk_id, similarity) pairs, best first
+DenseSearch = Callable[[str, int], List[Tuple[str, float]]]
+
+# Standard RRF damping constant from Cormack et al.
+RRF_K = 60
+
+
+def reciprocal_rank_fusion(result_lists: Sequence[List[Tuple[str, float]]], k: int = RRF_K, weights: Optional[Sequence[float]] = None) -> List[Tuple[str, float]]:
+    """Fuse ranked (chunk_id, score) lists by rank position, ignoring their raw score scales"""
+    weights = weights or [1.0] * len(result_lists)
+    fused: Dict[str, float] = {}
+    for results, weight in zip(result_lists, weights):
+        for rank, (chunk_id, _) in enumerate(results, 1):
+            fused[chunk_id] = fused.get(chunk_id, 0.0) + weight / (k + rank)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
+
+
+def chroma_dense_search(vector_db) -> DenseSearch:
+    """Adapt a LangChain Chroma store from the notebook to the DenseSearch signature"""
+    def search(query: str, k: int) -> List[Tuple[str, float]]:
+        results = vector_db.similarity_search_with_relevance_scores(query, k=k)
+        return [(doc.metadata.get("chunk_id"), score) for doc, score in results]
+    return search
+
+
+def pinecone_dense_search(index, embed_fn: Callable[[List[str]], List[List[float]]], namespace: str = "") -> DenseSearch:
+    """Adapt a Pinecone (or InMemoryVectorIndex / QuantizedVectorIndex) index to the DenseSearch signature"""
+    def search(query: str, k: int) -> List[Tuple[str, float]]:
+        vector = list(embed_fn([query])[0])
+        response = index.query(vector=vector, top_k=k, include_metadata=False, namespace=namespace)
+        return [(match["id"], match["score"]) for match in response["matches"]]
+    return search
+
+
+class HybridRetriever:
+    """Runs BM25 and dense retrieval in parallel and merges them with reciprocal rank fusion"""
+
+    def __init__(
+        self,
+        lexical_index: LexicalIndex,
+        dense_search: Optional[DenseSearch] = None,
+        candidates: int = 20,
+        rrf_k: int = RRF_K,
+        weights: Tuple[float, float] = (1.0, 1.0),
+    ):
+        self.lexical_index = lexical_index
+        self.dense_search = dense_search
+        self.candidates = candidates
+        self.rrf_k = rrf_k
+        self.weights = weights
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="dense-retrieval")
+
+    def _dense(self, query: str, criterion: Optional[int]) -> List[Tuple[str, float]]:
+        if criterion is None:
+            return self.dense_search(query, self.candidates)
+        # Dense stores have no criterion metadata, so over-fetch and use the lexical
+        # index's per-chunk criterion masks to filter
+        results = self.dense_search(query, self.candidates * 3)
+        return [r for r in results if self.lexical_index.matches_criterion(r[0], criterion)][: self.candidates]
+
+    def search(self, query: str, top_k: int = 4, criterion: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Return fused results with chunk content and per-retriever ranks"""
+        dense_future = self._executor.submit(self._dense, query, criterion) if self.dense_search else None
+        lexical = self.lexical_index.search(query, top_k=self.candidates, criterion=criterion)
+        dense: List[Tuple[str, float]] = []
+        if dense_future is not None:
+            try:
+                dense = dense_future.result()
+            except Exception as e:
+                # Keyword results alone are still a usable answer
+                print(f"Dense retrieval failed, using lexical results only: {e}")
+
+        lexical_ranks = {chunk_id: rank for rank, (chunk_id, _) in enumerate(lexical, 1)}
+        dense_ranks = {chunk_id: rank for rank, (chunk_id, _) in enumerate(dense, 1)}
+        fused = reciprocal_rank_fusion([lexical, dense], k=self.rrf_k, weights=self.weights)
+
+        results = []
+        for chunk_id, score in fused[:top_k]:
+            chunk = self.lexical_index.get_chunk(chunk_id) or {}
+            results.append({
+                "chunk_id": chunk_id,
+                "score": score,
+                "lexical_rank": lexical_ranks.get(chunk_id),
+                "dense_rank": dense_ranks.get(chunk_id),
+                "content": chunk.get("content", ""),
+                "metadata": chunk.get("metadata", {}),
+            })
+        return results
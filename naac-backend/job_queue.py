@@ -0,0 +1,165 @@
+import os
+import json
+import time
+import random
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional
+
+from database import SQLITE_PATH
+
+# Jobs still "running" after their lease are assumed orphaned (worker crashed) and re-claimed
+DEFAULT_LEASE_S = float(os.getenv("JOB_LEASE_S", 600))
+BACKOFF_BASE_S = float(os.getenv("JOB_BACKOFF_BASE_S", 5))
+BACKOFF_MAX_S = float(os.getenv("JOB_BACKOFF_MAX_S", 600))
+
+
+class JobQueue:
+    """Durable job queue on the processing_jobs table; workers in any process claim atomically
+
+    A claim is a single ``UPDATE ... RETURNING`` on the oldest runnable row, so
+    two workers can never take the same job, and a global cap on running jobs
+    is enforced in the same statement.
+    """
+
+    def __init__(self, path: str = SQLITE_PATH, max_running: int = 4, lease_s: float = DEFAULT_LEASE_S):
+        self.path = path
+        self.max_running = max_running
+        self.lease_s = lease_s
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10.0, isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def enqueue(self, document_id: int, payload: Dict[str, Any], max_attempts: int = 5) -> int:
+        cursor = self._conn().execute(
+            "INSERT INTO processing_jobs (document_id, payload, status, attempts, max_attempts, run_after, created_at) "
+            "VALUES (?, ?, 'queued', 0, ?, ?, CURRENT_TIMESTAMP)",
+            (document_id, json.dumps(payload), max_attempts, time.time()),
+        )
+        return cursor.lastrowid
+
+    def claim(self, worker_id: str) -> Optional[Dict[str, Any]]:
+        """Take the next runnable job (or an expired lease), or None if nothing is due or the cap is reached"""
+        now = time.time()
+        self.fail_exhausted_leases(now)
+        # fetchall() steps the RETURNING statement to completion so the write lock is released at once
+        rows = self._conn().execute(
+            """
+            UPDATE processing_jobs
+            SET status = 'running', locked_by = ?, lease_expires = ?, attempts = attempts + 1, updated_at = CURRENT_TIMESTAMP
+            WHERE id = (
+                SELECT id FROM processing_jobs
+                WHERE (status = 'queued' AND run_after <= ?)
+                   OR (status = 'running' AND lease_expires < ? AND attempts < max_attempts)
+                ORDER BY run_after, id
+                LIMIT 1
+            )
+            AND (SELECT COUNT(*) FROM processing_jobs WHERE status = 'running' AND lease_expires >= ?) < ?
+            RETURNING *
+            """,
+            (worker_id, now + self.lease_s, now, now, now, self.max_running),
+        ).fetchall()
+        if not rows:
+            return None
+        job = dict(rows[0])
+        job["payload"] = json.loads(job["payload"] or "{}")
+        return job
+
+    def fail_exhausted_leases(self, now: Optional[float] = None) -> List[int]:
+        """Fail jobs whose lease expired on their last attempt (the worker died on them every time); returns their ids
+
+        Without this a document that crashes or OOMs the worker would be re-claimed forever.
+        """
+        now = time.time() if now is None else now
+        rows = self._conn().execute(
+            """
+            UPDATE processing_jobs
+            SET status = 'failed', lease_expires = NULL, updated_at = CURRENT_TIMESTAMP,
+                last_error = 'Worker stopped during the last attempt (lease expired)'
+            WHERE status = 'running' AND lease_expires < ? AND attempts >= max_attempts
+            RETURNING id, document_id
+            """,
+            (now,),
+        ).fetchall()
+        for row in rows:
+            self.update_document(row["document_id"], processing_status="failed",
+                                 processing_error="Processing stopped the worker on every attempt")
+        return [row["id"] for row in rows]
+
+    def heartbeat(self, job_id: int, worker_id: str):
+        """Extend the lease of a long-running job"""
+        self._conn().execute(
+            "UPDATE processing_jobs SET lease_expires = ? WHERE id = ? AND locked_by = ? AND status = 'running'",
+            (time.time() + self.lease_s, job_id, worker_id),
+        )
+
+    def complete(self, job_id: int):
+        self._conn().execute(
+            "UPDATE processing_jobs SET status = 'done', lease_expires = NULL, last_error = NULL, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+            (job_id,),
+        )
+
+    def fail(self, job_id: int, error: str, retryable: bool = True) -> str:
+        """Requeue with exponential backoff and jitter, or mark failed once attempts run out; returns the new status"""
+        row = self._conn().execute("SELECT attempts, max_attempts FROM processing_jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return "missing"
+        if retryable and row["attempts"] < row["max_attempts"]:
+            delay = min(BACKOFF_MAX_S, BACKOFF_BASE_S * 2 ** (row["attempts"] - 1)) * random.uniform(0.5, 1.0)
+            status, run_after = "queued", time.time() + delay
+        else:
+            status, run_after = "failed", time.time()
+        self._conn().execute(
+            "UPDATE processing_jobs SET status = ?, run_after = ?, lease_expires = NULL, last_error = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+            (status, run_after, error[:2000], job_id),
+        )
+        return status
+
+    _JOB_SELECT = """
+        SELECT j.id AS job_id, j.document_id, j.status AS job_status, j.attempts, j.max_attempts, j.run_after,
+               j.last_error, j.updated_at AS job_updated_at,
+               d.original_filename, d.processing_status, d.processing_error, d.chunks_created, d.vectors_stored
+        FROM processing_jobs j LEFT JOIN uploaded_documents d ON d.id = j.document_id
+    """
+
+    def get(self, job_id: int) -> Optional[Dict[str, Any]]:
+        """A job joined with its document's processing status and counts"""
+        row = self._conn().execute(self._JOB_SELECT + " WHERE j.id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def get_many(self, job_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """``get`` for several jobs in one query, keyed by job id (missing jobs are left out)"""
+        jobs = {}
+        job_ids = list(job_ids)
+        # Under SQLite's bound-parameter limit per statement
+        for start in range(0, len(job_ids), 500):
+            batch = job_ids[start:start + 500]
+            placeholders = ", ".join("?" for _ in batch)
+            for row in self._conn().execute(self._JOB_SELECT + f" WHERE j.id IN ({placeholders})", batch):
+                jobs[row["job_id"]] = dict(row)
+        return jobs
+
+    def update_document(self, document_id: int, **fields):
+        if not fields:
+            return
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        self._conn().execute(
+            f"UPDATE uploaded_documents SET {assignments}, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+            (*fields.values(), document_id),
+        )
+
+    def counts(self) -> Dict[str, int]:
+        rows = self._conn().execute("SELECT status, COUNT(*) FROM processing_jobs GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+
+# Global instance
+job_queue = JobQueue(max_running=int(os.getenv("JOB_MAX_RUNNING", 4)))
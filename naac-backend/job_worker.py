@@ -0,0 +1,204 @@
+import os
+import time
+import socket
+import signal
+import asyncio
+import argparse
+import threading
+import multiprocessing
+from typing import Any, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+# Run standalone (`python job_worker.py`), so load .env the same way main.py does before the settings below are read
+load_dotenv(dotenv_path=os.path.join(os.path.dirname(os.path.abspath(__file__)), ".env"), override=True)
+
+from job_queue import JobQueue, job_queue as default_queue
+from chunking import chunk_document
+from vector_upload import VectorUploadStage, vector_index_from_env
+from search_index import search_index
+from criteria_progress import evidence_store, match_metrics
+
+TEXT_EXTENSIONS = {".txt", ".md", ".csv", ".json", ".html", ".htm"}
+# Longest pause between retries after queue errors (locked or not yet initialised database)
+WORKER_BACKOFF_MAX_S = float(os.getenv("JOB_WORKER_BACKOFF_MAX_S", 30))
+
+
+class UnsupportedDocumentError(Exception):
+    """Raised for documents that can never be processed; the job fails without retrying"""
+
+
+def extract_text(path: str, filename: str = "") -> str:
+    """Plain text from an uploaded file, by extension"""
+    extension = os.path.splitext(filename or path)[1].lower()
+    if not os.path.exists(path):
+        raise UnsupportedDocumentError(f"Uploaded file is missing: {path}")
+    if extension in TEXT_EXTENSIONS:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            return f.read()
+    if extension == ".pdf":
+        try:
+            from pypdf import PdfReader
+        except ImportError:
+            raise UnsupportedDocumentError("PDF extraction requires the pypdf package")
+        return "\n\n".join(page.extract_text() or "" for page in PdfReader(path).pages)
+    if extension == ".docx":
+        try:
+            import docx
+        except ImportError:
+            raise UnsupportedDocumentError("DOCX extraction requires the python-docx package")
+        return "\n\n".join(p.text for p in docx.Document(path).paragraphs)
+    raise UnsupportedDocumentError(f"Unsupported document type: {extension or 'unknown'}")
+
+
+class _Heartbeat:
+    """Keeps a job's lease alive from a side thread while the pipeline runs"""
+
+    def __init__(self, queue: JobQueue, job_id: int, worker_id: str):
+        self.queue = queue
+        self.job_id = job_id
+        self.worker_id = worker_id
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"heartbeat-{job_id}", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.queue.lease_s / 3):
+            self.queue.heartbeat(self.job_id, self.worker_id)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def process_job(job: Dict[str, Any], queue: JobQueue, embedder, index) -> Dict[str, Any]:
+    """extract -> chunk -> embed -> index for one uploaded document, updating its row as it goes"""
+    document_id = job["document_id"]
+    payload = job["payload"]
+    filename = payload.get("filename") or os.path.basename(payload.get("path", ""))
+    queue.update_document(document_id, processing_status="processing", processing_error=None)
+
+    text = extract_text(payload.get("path", ""), filename)
+    if not text.strip():
+        raise UnsupportedDocumentError("No extractable text in document")
+
+    chunks = chunk_document(text, source=filename, doc_type="uploaded_document")
+    for i, chunk in enumerate(chunks):
+        # Ids must be unique across uploads that share a filename
+        chunk["metadata"]["chunk_id"] = f"doc{document_id}_chunk_{i + 1}"
+        chunk["metadata"]["document_id"] = document_id
+        chunk["metadata"]["session_id"] = payload.get("session_id", "default")
+    search_index.index_document(document_id, filename, payload.get("session_id"), chunks)
+    queue.update_document(document_id, chunks_created=len(chunks))
+
+    stage = VectorUploadStage(index, embedder.embed, dimension=embedder.dimension, max_concurrency=2,
+                              namespace=os.getenv("PINECONE_NAMESPACE", ""))
+    stats = stage.run(chunks)
+    if stats["failed"]:
+        raise RuntimeError(f"{stats['failed']} of {len(chunks)} vectors failed to upload")
+
+    # Which NAAC metrics this document evidences; the API's progress engine picks the rows up incrementally
+    evidence_store.replace(document_id, payload.get("session_id"), match_metrics(text, filename))
+    queue.update_document(document_id, processing_status="processed", vectors_stored=stats["uploaded"])
+    return {"chunks": len(chunks), **stats}
+
+
+def run_worker(worker_id: Optional[str] = None, queue: Optional[JobQueue] = None, poll_interval: float = 1.0,
+               stop_event=None, max_jobs: Optional[int] = None, embedder=None, index=None) -> int:
+    """Claim and process jobs until stopped; returns the number of jobs handled
+
+    Queue errors (a locked database, tables not created yet on a fresh one)
+    are logged and retried with exponential backoff; they never end the
+    worker, since nothing would restart it.
+    """
+    queue = queue or default_queue
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+    handled = 0
+    errors = 0
+    while not (stop_event is not None and stop_event.is_set()) and (max_jobs is None or handled < max_jobs):
+        try:
+            job = queue.claim(worker_id)
+            if job is None:
+                errors = 0
+                time.sleep(poll_interval)
+                continue
+            handled += 1
+            try:
+                # The model and index client are built on the first job, not at process start
+                if embedder is None:
+                    from embeddings import get_embedder
+                    embedder = get_embedder()
+                if index is None:
+                    index = vector_index_from_env(embedder.dimension)
+                with _Heartbeat(queue, job["id"], worker_id):
+                    result = process_job(job, queue, embedder, index)
+                queue.complete(job["id"])
+                print(f"Job {job['id']} processed document {job['document_id']}: {result['chunks']} chunks")
+            except Exception as e:
+                retryable = not isinstance(e, UnsupportedDocumentError)
+                status = queue.fail(job["id"], str(e), retryable=retryable)
+                queue.update_document(
+                    job["document_id"],
+                    processing_status="failed" if status == "failed" else "uploaded",
+                    processing_error=str(e)[:2000],
+                )
+                print(f"Job {job['id']} attempt {job['attempts']} failed ({status}): {e}")
+            errors = 0
+        except Exception as e:
+            errors += 1
+            delay = min(WORKER_BACKOFF_MAX_S, poll_interval * 2 ** min(errors - 1, 10))
+            print(f"Job worker {worker_id} queue error ({errors} in a row), retrying in {delay:.1f}s: {e}")
+            time.sleep(delay)
+    return handled
+
+
+def _worker_main(stop_event):
+    # Let the parent decide when to stop; a Ctrl-C in the terminal reaches every child
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    run_worker(stop_event=stop_event)
+
+
+def start_workers(count: int) -> List[multiprocessing.Process]:
+    """Spawn job-worker processes; stop them with stop_workers"""
+    ctx = multiprocessing.get_context("spawn")
+    stop_event = ctx.Event()
+    processes = []
+    for i in range(count):
+        process = ctx.Process(target=_worker_main, args=(stop_event,), name=f"naac-job-worker-{i}", daemon=True)
+        process.start()
+        processes.append(process)
+    start_workers.stop_event = stop_event
+    return processes
+
+
+def stop_workers(processes: List[multiprocessing.Process], timeout: float = 10.0):
+    stop_event = getattr(start_workers, "stop_event", None)
+    if stop_event is not None:
+        stop_event.set()
+    for process in processes:
+        process.join(timeout)
+        if process.is_alive():
+            process.terminate()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Process uploaded documents from the processing_jobs queue")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    from database import init_database
+    asyncio.run(init_database())
+    processes = start_workers(args.workers)
+    print(f"Started {len(processes)} document-processing workers")
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        stop_workers(processes)
+
+
+if __name__ == "__main__":
+    main()
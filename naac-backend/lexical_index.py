@@ -0,0 +1,155 @@
+import re
+import math
+import heapq
+from array import array
+from collections import Counter
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+from chunk_store import chunk_id_for
+
+# Metric codes ("1.1.3") stay whole; everything else splits on non-alphanumerics
+TOKEN_RE = re.compile(r"\d+(?:\.\d+)+|[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were will with what how which".split()
+)
+ROMAN_CRITERIA = {"i": 1, "ii": 2, "iii": 3, "iv": 4, "v": 5, "vi": 6, "vii": 7}
+CRITERION_RE = re.compile(r"\bcriteri(?:on|a)\s*[-:]?\s*([1-7]|vii|vi|v|iv|iii|ii|i)\b", re.IGNORECASE)
+# Only full metric codes (x.y.z); two-part numbers are too often plain section headings
+METRIC_CODE_RE = re.compile(r"(?<![\d.])([1-7])\.[1-9]\.\d+(?![\d.])")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase tokens with metric codes kept intact and plural acronyms folded (PLOs -> plo)"""
+    tokens = []
+    for token in TOKEN_RE.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss") and not token[0].isdigit():
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+def criterion_bit(criterion: Any) -> int:
+    """Mask bit for NAAC criterion 1-7 (int or numeric string); 0 for anything else"""
+    try:
+        number = int(criterion)
+    except (TypeError, ValueError):
+        return 0
+    return 1 << (number - 1) if 1 <= number <= 7 else 0
+
+
+def criteria_mask(chunk: Dict[str, Any]) -> int:
+    """Bitmask of NAAC criteria (bit n-1 for criterion n) a chunk belongs to"""
+    metadata = chunk.get("metadata") or {}
+    tagged = metadata.get("criterion")
+    if tagged is not None:
+        values = tagged if isinstance(tagged, (list, tuple)) else [tagged]
+        mask = 0
+        for value in values:
+            # Tags outside 1-7 are ignored; the mask is stored in one byte per chunk
+            mask |= criterion_bit(str(value).split(".")[0].strip())
+        return mask
+
+    content = chunk.get("content", "")
+    mask = 0
+    for match in CRITERION_RE.finditer(content):
+        value = match.group(1).lower()
+        number = ROMAN_CRITERIA.get(value) or int(value)
+        mask |= 1 << (number - 1)
+    for match in METRIC_CODE_RE.finditer(content):
+        mask |= 1 << (int(match.group(1)) - 1)
+    return mask
+
+
+class LexicalIndex:
+    """BM25 inverted index over the chunk corpus, stored in flat typed arrays"""
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.vocab: Dict[str, int] = {}
+        self.chunk_ids: List[str] = []
+        self.chunks: List[Dict[str, Any]] = []
+        self.doc_index: Dict[str, int] = {}
+        # CSR layout: postings for term t live in [offsets[t], offsets[t + 1])
+        self.offsets = array("I", [0])
+        self.postings = array("I")
+        self.frequencies = array("H")
+        self.idf = array("f")
+        self.doc_lengths = array("I")
+        self.doc_criteria = array("B")
+        self.avg_doc_length = 0.0
+
+    @classmethod
+    def build(cls, chunks: Iterable[Dict[str, Any]], k1: float = 1.2, b: float = 0.75) -> "LexicalIndex":
+        index = cls(k1=k1, b=b)
+        term_postings: Dict[int, List[Tuple[int, int]]] = {}
+        for chunk in chunks:
+            chunk_id = chunk_id_for(chunk)
+            if chunk_id in index.doc_index:
+                continue
+            doc = len(index.chunk_ids)
+            index.doc_index[chunk_id] = doc
+            index.chunk_ids.append(chunk_id)
+            index.chunks.append(chunk)
+            tokens = tokenize(chunk.get("content", ""))
+            index.doc_lengths.append(len(tokens))
+            index.doc_criteria.append(criteria_mask(chunk))
+            for term, tf in Counter(tokens).items():
+                term_id = index.vocab.setdefault(term, len(index.vocab))
+                term_postings.setdefault(term_id, []).append((doc, min(tf, 65535)))
+
+        n_docs = len(index.chunk_ids)
+        for term_id in range(len(index.vocab)):
+            entries = term_postings.pop(term_id)
+            for doc, tf in entries:
+                index.postings.append(doc)
+                index.frequencies.append(tf)
+            index.offsets.append(len(index.postings))
+            df = len(entries)
+            index.idf.append(math.log(1 + (n_docs - df + 0.5) / (df + 0.5)))
+        index.avg_doc_length = (sum(index.doc_lengths) / n_docs) if n_docs else 0.0
+        return index
+
+    def __len__(self) -> int:
+        return len(self.chunk_ids)
+
+    def matches_criterion(self, chunk_id: str, criterion: Optional[int]) -> bool:
+        if criterion is None:
+            return True
+        doc = self.doc_index.get(chunk_id)
+        return doc is not None and bool(self.doc_criteria[doc] & criterion_bit(criterion))
+
+    def search(self, query: str, top_k: int = 10, criterion: Optional[int] = None) -> List[Tuple[str, float]]:
+        """Return (chunk_id, bm25_score) pairs, optionally restricted to one criterion (none match outside 1-7)"""
+        terms = [self.vocab[t] for t in set(tokenize(query)) if t in self.vocab]
+        required = criterion_bit(criterion) if criterion is not None else 0
+        if not terms or (criterion is not None and not required):
+            return []
+        k1, b, avg = self.k1, self.b, self.avg_doc_length or 1.0
+        postings, frequencies, lengths, doc_criteria = self.postings, self.frequencies, self.doc_lengths, self.doc_criteria
+
+        scores: Dict[int, float] = {}
+        for term_id in terms:
+            idf = self.idf[term_id]
+            for i in range(self.offsets[term_id], self.offsets[term_id + 1]):
+                doc = postings[i]
+                # Criterion filter is applied while walking postings, not after ranking
+                if required and not doc_criteria[doc] & required:
+                    continue
+                tf = frequencies[i]
+                norm = tf + k1 * (1 - b + b * lengths[doc] / avg)
+                scores[doc] = scores.get(doc, 0.0) + idf * tf * (k1 + 1) / norm
+
+        best = heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+        return [(self.chunk_ids[doc], score) for doc, score in best]
+
+    def get_chunk(self, chunk_id: str) -> Optional[Dict[str, Any]]:
+        doc = self.doc_index.get(chunk_id)
+        return self.chunks[doc] if doc is not None else None
+
+    def memory_bytes(self) -> int:
+        """Size of the typed arrays backing the index (excludes vocabulary and chunk text)"""
+        arrays = (self.offsets, self.postings, self.frequencies, self.idf, self.doc_lengths, self.doc_criteria)
+        return sum(a.itemsize * len(a) for a in arrays)
@@ -1,27 +1,89 @@
-from fastapi import FastAPI, HTTPException, UploadFile, File, Request
+from fastapi import FastAPI, HTTPException, UploadFile, File, Request, Response, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 import os
-import requests
+import math
 import time
 import json
-from typing import List, Dict, Any
+import asyncio
+from contextlib import asynccontextmanager
+from typing import List, Dict, Any, Optional
 from datetime import datetime
-import sqlite3
 import hashlib
+import uuid
 from dotenv import load_dotenv
 from pathlib import Path
 
-# Load environment variables from this folder's .env (prefer overriding)
+# Load environment variables from this folder's .env (prefer overriding) before importing the local
+# modules below: database, admission, job_queue, shared_state and usage_rollup read settings at import
 ENV_PATH = Path(__file__).with_name('.env')
 load_dotenv(dotenv_path=str(ENV_PATH), override=True)
 
+from granite_client import granite_client, GraniteGenerationError, _get_ibm_iam_token, _test_granite_generation
+from generation_scheduler import GenerationScheduler, QueueFullError, DeadlineExceededError
+from metrics import registry as metrics_registry, MetricsMiddleware, timed
+from health_probe import HealthProber, default_probes
+from shared_state import shared_state
+from session_activity import SessionActivityTracker
+from schemas import SessionStats
+from database import SQLITE_PATH, init_database, close_database, record_query, record_document, dashboard_counts, get_document, get_document_by_storage_key
+from job_queue import job_queue
+from job_worker import start_workers, stop_workers
+from search_index import search_index, DocumentRetriever
+from rag_pipeline import RAGPipeline, StageTimings
+from reranker import CrossEncoderReranker
+from context_packing import ContextPacker
+from response_templates import template_cache
+from response_encoding import FastJSONResponse, CompressionMiddleware
+from ssr_engine import SSREngine, parse_sub_criterion
+from usage_rollup import usage_rollups
+from chat_history import chat_history
+from criteria_progress import criteria_progress
+from downloads import download_service, resolve_local
+from cloud_storage import ibm_cloud_storage
+from event_hub import event_hub, EventStream, parse_topics
+from admission import admission_control, AdmissionMiddleware
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Nothing slow is awaited here: uvicorn binds the port once startup returns
+    warmup = asyncio.create_task(asyncio.to_thread(warm_up))
+    schema = asyncio.create_task(init_database())
+    # Reports a previous process was building when it stopped would otherwise stay "generating" forever
+    orphaned_reports = asyncio.create_task(ssr_engine.fail_interrupted())
+    health_prober.start()
+    session_tracker.start()
+    usage_rollups.start()
+    publisher = asyncio.create_task(publish_worker_state())
+    event_hub.start()
+    # Document processing normally runs as `python job_worker.py`; small deployments embed workers instead
+    job_workers = start_workers(EMBEDDED_JOB_WORKERS) if EMBEDDED_JOB_WORKERS > 0 else []
+    yield
+    await asyncio.to_thread(stop_workers, job_workers)
+    publisher.cancel()
+    await event_hub.stop()
+    await ssr_engine.stop()
+    await session_tracker.stop()
+    await usage_rollups.stop()
+    await health_prober.stop()
+    warmup.cancel()
+    schema.cancel()
+    orphaned_reports.cancel()
+    await close_database()
+
 app = FastAPI(
     title="NAAC AI Assistant API",
     description="Backend API for NAAC accreditation AI assistant with full IBM integration",
-    version="2.0.0"
+    version="2.0.0",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse,
 )
 
+# Per-session / per-IP rate limits and per-class concurrency caps for chat, upload and generation (429 + Retry-After).
+# Added before CORS so rejections still carry CORS headers the browser can read
+app.add_middleware(AdmissionMiddleware, control=admission_control)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -31,37 +93,109 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Database setup
-def init_database():
-    conn = sqlite3.connect('naac_assistant.db')
-    cursor = conn.cursor()
-    
-    # Create tables
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS user_queries (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            session_id TEXT,
-            message TEXT,
-            response TEXT,
-            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS uploaded_documents (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            filename TEXT,
-            file_path TEXT,
-            session_id TEXT,
-            upload_timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    conn.commit()
-    conn.close()
-
-# Initialize database on startup
-init_database()
+# gzip/brotli for text responses over COMPRESS_MIN_BYTES, negotiated per request
+app.add_middleware(CompressionMiddleware)
+
+# Request latency / in-flight / error metrics, exposed at /metrics
+app.add_middleware(MetricsMiddleware)
+
+def warm_up():
+    """Work deferred out of import so the port binds fast; runs in the background at startup"""
+    granite_client.session
+    template_cache.load()
+
+# Shared queue in front of watsonx.ai so bursts of chat requests are capped and shed fairly.
+# Each uvicorn worker has its own queue: the upstream cap is GENERATION_MAX_IN_FLIGHT x WEB_CONCURRENCY
+generation_scheduler = GenerationScheduler(
+    granite_client,
+    max_in_flight=int(os.getenv("GENERATION_MAX_IN_FLIGHT", 4)),
+    max_queue=int(os.getenv("GENERATION_MAX_QUEUE", 256)),
+    default_deadline_s=float(os.getenv("GENERATION_DEADLINE_S", 30)),
+)
+metrics_registry.gauge("naac_generation_queue_depth", "Prompts waiting in the generation queue", callback=lambda: generation_scheduler.queue_depth)
+metrics_registry.gauge("naac_generation_in_flight", "Generation requests currently sent to watsonx.ai", callback=lambda: generation_scheduler.in_flight)
+
+# Document grounding for /api/chat/generate: retrieve -> rerank -> pack. The cross-encoder needs
+# sentence-transformers (requirements-worker.txt); without it chunks keep their bm25 order
+RAG_RERANK = os.getenv("RAG_RERANK", "false").lower() == "true"
+RAG_TOKEN_BUDGET = int(os.getenv("RAG_TOKEN_BUDGET", 1500))
+document_reranker = CrossEncoderReranker() if RAG_RERANK else None
+context_packer = ContextPacker(token_budget=RAG_TOKEN_BUDGET)
+
+# SSR sections go through the same generation queue as chat; without Granite they are laid out from the saved inputs
+SSR_SECTION_DEADLINE_S = float(os.getenv("SSR_SECTION_DEADLINE_S", 120))
+
+async def generate_ssr_section(prompt: str) -> str:
+    return await generation_scheduler.submit(prompt, session_id="ssr", deadline_s=SSR_SECTION_DEADLINE_S)
+
+ssr_engine = SSREngine(
+    lambda: (f"granite:{granite_client.model_id}", generate_ssr_section) if granite_client.is_configured() else ("template", None),
+    max_parallel=int(os.getenv("SSR_MAX_PARALLEL_SECTIONS", 4)),
+)
+
+# Live session counters, flushed to user_sessions in batches instead of an UPDATE per message
+session_tracker = SessionActivityTracker(
+    max_sessions=int(os.getenv("SESSION_CACHE_SIZE", 10000)),
+    flush_interval_s=float(os.getenv("SESSION_FLUSH_INTERVAL_S", 2)),
+    idle_timeout_s=float(os.getenv("SESSION_IDLE_TIMEOUT_S", 1800)),
+)
+metrics_registry.gauge("naac_sessions_cached", "Sessions held in the in-memory activity cache", callback=lambda: len(session_tracker))
+
+# Where uploads land until they are pushed to IBM COS
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", "/tmp")
+# cloud_storage.store_locally's fallback tree: local_storage/<session>/<file>
+LOCAL_STORAGE_DIR = os.getenv("LOCAL_STORAGE_DIR", "local_storage")
+
+# Job-worker processes started by each API worker, so uvicorn --workers N starts N times as many, each loading
+# the embedding model (requirements-worker.txt). Off by default: run `python job_worker.py` alongside instead
+EMBEDDED_JOB_WORKERS = int(os.getenv("EMBEDDED_JOB_WORKERS", 0))
+PROCESSING_STATUS_POLL_S = float(os.getenv("PROCESSING_STATUS_POLL_S", 0.5))
+
+# Dependency checks run in the background; health endpoints only read the latest snapshot
+health_prober = HealthProber(default_probes(SQLITE_PATH, UPLOAD_DIR), shared=shared_state)
+
+# Pushed state (see /events): each source is polled once per interval for all subscribed topics, only while watched
+ANALYTICS_EVENT_INTERVAL_S = float(os.getenv("ANALYTICS_EVENT_INTERVAL_S", 5))
+HEALTH_EVENT_INTERVAL_S = float(os.getenv("HEALTH_EVENT_INTERVAL_S", 5))
+
+async def job_events(topics: List[str]) -> Dict[str, Any]:
+    job_ids = [int(topic[4:]) for topic in topics if topic[4:].isdigit()]
+    jobs = await asyncio.to_thread(job_queue.get_many, job_ids)
+    return {f"job:{job_id}": job for job_id, job in jobs.items()}
+
+async def analytics_events(topics: List[str]) -> Dict[str, Any]:
+    return {"analytics": await dashboard_summary()}
+
+async def health_events(topics: List[str]) -> Dict[str, Any]:
+    # Statuses only, so an event means a service changed state rather than was probed again
+    snapshot = health_prober.snapshot()
+    return {"health": {"overall_status": snapshot["overall_status"], "failing": snapshot["failing"],
+                       "services": {name: entry["status"] for name, entry in snapshot["services"].items()}}}
+
+event_hub.add_source("job", job_events, PROCESSING_STATUS_POLL_S, final=lambda job: job is None or job["job_status"] in ("done", "failed"))
+event_hub.add_source("analytics", analytics_events, ANALYTICS_EVENT_INTERVAL_S)
+event_hub.add_source("health", health_events, HEALTH_EVENT_INTERVAL_S)
+metrics_registry.gauge("naac_event_connections", "Open event streams and sockets in this worker", callback=lambda: len(event_hub.subscribers))
+
+# Per-worker metrics and generation stats are published here so any worker can answer for all of them
+WORKER_STATE_INTERVAL_S = float(os.getenv("WORKER_STATE_INTERVAL_S", 5))
+
+async def publish_worker_state():
+    pid = os.getpid()
+    ttl = 3 * WORKER_STATE_INTERVAL_S
+    try:
+        while True:
+            # Snapshot on the event loop thread, write to SQLite off it
+            metrics_dump, stats = metrics_registry.dump(), generation_scheduler.stats()
+            try:
+                await asyncio.to_thread(shared_state.set, f"metrics:{pid}", metrics_dump, ttl)
+                await asyncio.to_thread(shared_state.set, f"generation:{pid}", stats, ttl)
+            except Exception as e:
+                print(f"Worker state publish error: {e}")
+            await asyncio.sleep(WORKER_STATE_INTERVAL_S)
+    finally:
+        shared_state.delete(f"metrics:{pid}")
+        shared_state.delete(f"generation:{pid}")
 
 class ChatMessage(BaseModel):
     session_id: str | None = None
@@ -77,7 +211,7 @@ class ChatResponse(BaseModel):
 def upload_to_ibm_cos(file_content, filename):
     try:
         # Simulate IBM COS upload (replace with actual implementation)
-        file_path = f"/tmp/{filename}"
+        file_path = os.path.join(UPLOAD_DIR, filename)
         with open(file_path, "wb") as f:
             f.write(file_content)
         return f"ibm-cos://naac-bucket/{filename}"
@@ -85,376 +219,11 @@ def upload_to_ibm_cos(file_content, filename):
         print(f"COS upload error: {e}")
         return f"local://{filename}"
 
-# IBM Granite / watsonx.ai verification helpers
-def _get_ibm_iam_token(api_key: str, timeout: float = 6.0) -> dict:
-    """Exchange IBM Cloud API key for IAM access token. Returns dict with access_token or error."""
-    try:
-        resp = requests.post(
-            "https://iam.cloud.ibm.com/identity/token",
-            headers={"Content-Type": "application/x-www-form-urlencoded"},
-            data={
-                "grant_type": "urn:ibm:params:oauth:grant-type:apikey",
-                "apikey": api_key,
-            },
-            timeout=timeout,
-        )
-        if resp.status_code == 200:
-            data = resp.json()
-            return {"ok": True, "access_token": data.get("access_token"), "expires_in": data.get("expiration")}
-        return {"ok": False, "status": resp.status_code, "error": _safe_err(resp)}
-    except Exception as e:
-        return {"ok": False, "error": str(e)}
-
-def _test_granite_generation(token: str, url: str, model_id: str, project_id: str, timeout: float = 8.0) -> dict:
-    """Make a minimal generation request to verify access. Returns dict with ok True/False and latency."""
-    try:
-        # IBM ML text generation often requires a version query param
-        full_url = url if ("?version=" in url or "&version=" in url) else f"{url}?version=2023-07-07"
-        payload = {
-            "input": "ping",
-            "parameters": {
-                "decoding_method": "greedy",
-                "max_new_tokens": 1,
-            },
-            "model_id": model_id,
-            "project_id": project_id,
-        }
-        t0 = time.time()
-        resp = requests.post(
-            full_url,
-            headers={
-                "Accept": "application/json",
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {token}",
-            },
-            data=json.dumps(payload),
-            timeout=timeout,
-        )
-        latency_ms = int((time.time() - t0) * 1000)
-        if resp.status_code == 200:
-            return {"ok": True, "status": 200, "latency_ms": latency_ms}
-        return {"ok": False, "status": resp.status_code, "error": _safe_err(resp), "latency_ms": latency_ms}
-    except Exception as e:
-        return {"ok": False, "error": str(e)}
-
-def _safe_err(resp) -> str:
-    try:
-        data = resp.json()
-        # Remove potentially sensitive data
-        data.pop("access_token", None)
-        return json.dumps(data)[:500]
-    except Exception:
-        return (resp.text or "")[:500]
-
-# Advanced NAAC Chat System
+# Advanced NAAC Chat System (answers live in guidance/*.md, see response_templates.py)
 def generate_naac_response(message: str) -> Dict[str, Any]:
     """Generate contextual NAAC responses based on user query"""
-    message_lower = message.lower()
-    
-    # Criterion 1: Curricular Aspects
-    if any(word in message_lower for word in ["curriculum", "curricular", "criterion 1", "criteria 1"]):
-        return {
-            "response": """**Criterion 1: Curricular Aspects** 🎓
-
-**Key Focus Areas:**
-• **1.1 Curricular Planning and Implementation**
-  - Program outcomes and course outcomes alignment
-  - Curriculum development and review process
-  - Industry consultation and feedback integration
-
-• **1.2 Academic Flexibility** 
-  - Choice Based Credit System (CBCS) implementation
-  - Inter-disciplinary and multi-disciplinary programs
-  - Student mobility and credit transfer
-
-• **1.3 Curriculum Enrichment**
-  - Value-added courses and skill development
-  - Field projects and internships
-  - Community engagement through curriculum
-
-• **1.4 Feedback System**
-  - Stakeholder feedback collection and analysis
-  - Curriculum revision based on feedback
-  - Industry-academia interface
-
-**Documentation Required:**
-✓ Curriculum design documents
-✓ Board of Studies meeting minutes
-✓ Industry consultation records
-✓ Student feedback analysis
-✓ Program outcome assessment reports
-
-Would you like specific guidance on any sub-criterion?""",
-            "confidence": 0.95,
-            "sources": ["NAAC Manual 2022", "Curriculum Guidelines", "Best Practices Database"]
-        }
-    
-    # Criterion 2: Teaching-Learning and Evaluation
-    elif any(word in message_lower for word in ["teaching", "learning", "evaluation", "criterion 2", "criteria 2"]):
-        return {
-            "response": """**Criterion 2: Teaching-Learning and Evaluation** 📚
-
-**Key Focus Areas:**
-• **2.1 Student Enrollment and Profile**
-  - Admission process and transparency
-  - Student diversity and inclusivity
-  - Reserved category compliance
-
-• **2.2 Catering to Student Diversity**
-  - Slow and advanced learner programs
-  - Remedial coaching and mentoring
-  - Bridge courses for skill gaps
-
-• **2.3 Teaching-Learning Process**
-  - Student-centric learning methods
-  - ICT integration in teaching
-  - Experiential and participative learning
-
-• **2.4 Teacher Profile and Quality**
-  - Faculty qualifications and experience
-  - Faculty development programs
-  - Teaching load and research balance
-
-• **2.5 Evaluation Process and Reforms**
-  - Continuous internal evaluation
-  - Reform in evaluation methods
-  - Transparency in evaluation
-
-• **2.6 Student Performance and Learning Outcomes**
-  - Program outcome attainment
-  - Student progression analysis
-  - Graduate employability
-
-**Documentation Required:**
-✓ Admission records and analysis
-✓ Faculty development reports
-✓ Teaching plans and methodologies
-✓ Evaluation reforms documentation
-✓ Student performance analysis
-✓ Learning outcome assessment
-
-Which aspect needs detailed guidance?""",
-            "confidence": 0.95,
-            "sources": ["NAAC Manual 2022", "Teaching Guidelines", "Evaluation Best Practices"]
-        }
-    
-    # Research and Innovation
-    elif any(word in message_lower for word in ["research", "innovation", "criterion 3", "criteria 3", "extension"]):
-        return {
-            "response": """**Criterion 3: Research, Innovations and Extension** 🔬
-
-**Key Focus Areas:**
-• **3.1 Resource Mobilization for Research**
-  - Research funding from external agencies
-  - Seed money and research support
-  - Research infrastructure development
-
-• **3.2 Innovation Ecosystem**
-  - Incubation centers and startup support
-  - Innovation and entrepreneurship development
-  - IPR generation and commercialization
-
-• **3.3 Research Publications and Awards**
-  - Faculty research publications
-  - Research guidance and supervision
-  - Awards and recognitions
-
-• **3.4 Extension Activities**
-  - Community outreach programs
-  - Social responsibility initiatives
-  - Collaborative activities with community
-
-• **3.5 Collaboration**
-  - MoUs with institutions and industries
-  - Faculty and student exchange programs
-  - Collaborative research projects
-
-**Key Metrics:**
-✓ Publications per faculty (target: 1+ per year)
-✓ Research grants received
-✓ Patents filed and granted
-✓ PhD supervisions and completions
-✓ Community programs conducted
-
-**Documentation Required:**
-✓ Research project reports
-✓ Publication records with impact factor
-✓ Patent applications and grants
-✓ Extension activity reports
-✓ MoU documents and collaboration evidence
-
-Need specific research documentation guidance?""",
-            "confidence": 0.95,
-            "sources": ["Research Guidelines", "Innovation Framework", "Extension Manual"]
-        }
-    
-    # SSR Preparation
-    elif any(word in message_lower for word in ["ssr", "self study", "report", "naac application"]):
-        return {
-            "response": """**Self Study Report (SSR) Preparation Guide** 📋
-
-**SSR Structure & Components:**
-
-**Part A: Institutional Profile**
-• Basic institutional information
-• AQAR data for 3 years
-• Academic and administrative setup
-
-**Part B: Self-Study**
-• **Section I: Institutional Profile** - Vision, mission, objectives
-• **Section II: Criterion-wise Analysis** (7 criteria detailed analysis)
-• **Section III: Evaluative Report** - SWOC analysis
-• **Section IV: Institutional Profile** - Quantitative data
-
-**Preparation Timeline (12-18 months):**
-📅 **Months 1-3:** Data collection and IQAC strengthening
-📅 **Months 4-9:** Criterion-wise documentation
-📅 **Months 10-12:** SSR drafting and review
-📅 **Months 13-15:** Internal review and refinement
-📅 **Months 16-18:** Final submission preparation
-
-**Critical Success Factors:**
-✅ **Data Accuracy:** Ensure all quantitative data is verified
-✅ **Evidence-Based:** Every claim must have supporting documents
-✅ **Stakeholder Input:** Include feedback from all stakeholders
-✅ **Best Practices:** Highlight unique institutional practices
-✅ **SWOC Analysis:** Honest assessment of strengths and challenges
-
-**Common Mistakes to Avoid:**
-❌ Incomplete documentation
-❌ Inconsistent data across criteria
-❌ Missing stakeholder feedback
-❌ Weak best practices section
-❌ Poor SWOC analysis
-
-**Supporting Documents Checklist:**
-✓ Academic records (3 years)
-✓ Financial statements
-✓ Infrastructure details
-✓ Faculty profiles
-✓ Student data
-✓ Research publications
-✓ Extension activity reports
-✓ Governance meeting minutes
-
-Which SSR section needs detailed guidance?""",
-            "confidence": 0.98,
-            "sources": ["NAAC SSR Manual", "Institutional Best Practices", "Peer Team Guidelines"]
-        }
-    
-    # Documentation and Evidence
-    elif any(word in message_lower for word in ["document", "documentation", "evidence", "proof", "files"]):
-        return {
-            "response": """**NAAC Documentation & Evidence Framework** 📁
-
-**Primary Documentation Categories:**
-
-**1. Academic Records**
-📚 Course curriculum and syllabi
-📚 Teaching plans and lesson plans
-📚 Student academic records
-📚 Examination and evaluation records
-📚 Academic calendar and time tables
-
-**2. Administrative Records**
-🏛️ Governing body meeting minutes
-🏛️ Academic council proceedings  
-🏛️ Finance committee reports
-🏛️ Policy documents and procedures
-🏛️ Organizational structure charts
-
-**3. Infrastructure Evidence**
-🏢 Building plans and approvals
-🏢 Laboratory equipment lists
-🏢 Library collection and usage data
-🏢 IT infrastructure details
-🏢 Sports and recreational facilities
-
-**4. Research Documentation**
-🔬 Research project reports
-🔬 Publication records with proof
-🔬 Patent applications and grants
-🔬 Conference proceedings
-🔬 Research collaboration MoUs
-
-**5. Extension & Outreach**
-🤝 Community program reports
-🤝 Social responsibility initiatives
-🤝 Industry interaction records
-🤝 Alumni engagement activities
-🤝 Stakeholder feedback analysis
-
-**Document Organization Best Practices:**
-✅ **Chronological Filing:** Maintain year-wise records
-✅ **Digital Archiving:** Scan and backup all documents
-✅ **Easy Retrieval:** Create indexed document database
-✅ **Authentication:** Ensure proper signatures and seals
-✅ **Regular Updates:** Keep documents current and relevant
-
-**Evidence Quality Standards:**
-🎯 **Primary Sources:** Original documents preferred
-🎯 **Verification:** Cross-reference data across documents
-🎯 **Completeness:** No gaps in documentation
-🎯 **Relevance:** Align with NAAC criteria requirements
-🎯 **Presentation:** Professional formatting and organization
-
-**Digital Documentation Tips:**
-💾 Use cloud storage with backup
-💾 Implement version control
-💾 Create searchable PDF documents
-💾 Maintain metadata for easy searching
-💾 Regular data integrity checks
-
-Which documentation area needs specific guidance?""",
-            "confidence": 0.97,
-            "sources": ["Documentation Guidelines", "Evidence Framework", "Digital Archive Best Practices"]
-        }
-    
-    # Default comprehensive response
-    else:
-        return {
-            "response": f"""**NAAC Accreditation Guidance** 🎯
-
-Thank you for your query: *"{message}"*
-
-**I can provide detailed assistance with:**
-
-🔍 **Assessment Criteria**
-• Criterion 1: Curricular Aspects
-• Criterion 2: Teaching-Learning & Evaluation  
-• Criterion 3: Research, Innovations & Extension
-• Criterion 4: Infrastructure & Learning Resources
-• Criterion 5: Student Support & Progression
-• Criterion 6: Governance, Leadership & Management
-• Criterion 7: Institutional Values & Best Practices
-
-📋 **Process Guidance**
-• SSR (Self Study Report) preparation
-• Documentation and evidence collection
-• Peer team visit preparation
-• Quality indicator improvements
-• Best practices identification
-
-🎓 **Specific Support Areas**
-• Academic planning and curriculum design
-• Research promotion and innovation
-• Student support services enhancement
-• Infrastructure development planning
-• Governance structure optimization
-
-**Next Steps:**
-Please ask specific questions about any NAAC criterion, SSR section, or accreditation process. I'll provide detailed, actionable guidance with examples and documentation requirements.
-
-**Examples of specific questions:**
-• "How to improve research publications for Criterion 3?"
-• "What documents are needed for SSR preparation?"  
-• "How to enhance student support services?"
-• "What are the infrastructure requirements for NAAC?"
-
-How can I help you achieve NAAC accreditation excellence?""",
-            "confidence": 0.85,
-            "sources": ["NAAC Manual 2022", "Best Practices Database", "Accreditation Guidelines"]
-        }
+    template = template_cache.match(message)
+    return {"response": template.text(message), "confidence": template.confidence, "sources": template.sources}
 
 # Root endpoint
 @app.get("/")
@@ -467,6 +236,7 @@ async def root():
             "chat": "/api/chat/message",
             "upload": "/api/documents/upload", 
             "analytics": "/api/analytics/dashboard",
+            "search": "/api/search",
             "health": "/health"
         }
     }
@@ -474,65 +244,283 @@ async def root():
 # Health check endpoint
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "message": "NAAC AI Assistant API is fully operational", "timestamp": datetime.now().isoformat()}
+    return {
+        "status": "healthy",
+        "message": "NAAC AI Assistant API is fully operational",
+        "dependencies": health_prober.snapshot()["overall_status"],
+        "timestamp": datetime.now().isoformat(),
+    }
 
 # Document upload endpoint
 @app.post("/api/documents/upload")
-async def upload_document(file: UploadFile = File(...), session_id: str = "default"):
+async def upload_document(request: Request, file: UploadFile = File(...), session_id: str = "default"):
+    started = time.perf_counter()
     try:
         # Read file content
         content = await file.read()
         
-        # Upload to IBM COS (simulated for now)
-        file_path = upload_to_ibm_cos(content, file.filename)
+        # Upload to IBM COS (simulated for now); a unique stored name keeps same-named uploads apart
+        stored_filename = f"{uuid.uuid4().hex}{os.path.splitext(file.filename or '')[1].lower()}"
+        with timed("storage_upload"):
+            file_path = upload_to_ibm_cos(content, stored_filename)
         
+        session_tracker.record(session_id, "upload", request.client.host if request.client else None, request.headers.get("user-agent"))
+
         # Save record to database
-        conn = sqlite3.connect('naac_assistant.db')
-        cursor = conn.cursor()
-        cursor.execute('''
-            INSERT INTO uploaded_documents (filename, file_path, session_id)
-            VALUES (?, ?, ?)
-        ''', (file.filename, file_path, session_id))
-        conn.commit()
-        conn.close()
+        with timed("db_write"):
+            document_id = await record_document(
+                session_id=session_id,
+                original_filename=file.filename,
+                stored_filename=stored_filename,
+                file_size=len(content),
+                file_type=file.content_type or "application/octet-stream",
+                cloud_storage_url=file_path,
+                content_sha256=hashlib.sha256(content).hexdigest(),
+                processing_status="uploaded",
+            )
+        event_hub.refresh("analytics")
+
+        # Extraction, chunking and embedding happen in the job workers, not in this request
+        job_id = await asyncio.to_thread(job_queue.enqueue, document_id, {
+            "path": os.path.join(UPLOAD_DIR, stored_filename),
+            "filename": file.filename,
+            "content_type": file.content_type,
+            "session_id": session_id,
+        })
+        usage_rollups.record("upload", (time.perf_counter() - started) * 1000)
         
         return {
             "message": "Document uploaded successfully",
+            "document_id": document_id,
+            "job_id": job_id,
+            "processing_status": "queued",
+            "status_url": f"/api/documents/processing-status/{job_id}",
             "filename": file.filename,
             "file_path": file_path,
             "timestamp": datetime.now().isoformat()
         }
         
     except Exception as e:
+        usage_rollups.record("upload", (time.perf_counter() - started) * 1000, error=True)
         raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
 
+# Downloads: local files streamed (zero-copy where the server supports it), COS objects relayed in chunks;
+# both answer Range and If-None-Match against a strong content-hash ETag
+@app.get("/api/documents/{document_id}/download")
+@app.get("/documents/{document_id}/download")
+async def download_document(document_id: int, request: Request):
+    document = await get_document(document_id)
+    if document is None:
+        raise HTTPException(status_code=404, detail="Document not found")
+    path = resolve_local(document["stored_filename"], UPLOAD_DIR, os.path.join(LOCAL_STORAGE_DIR, document["session_id"] or "default"))
+    if path is not None:
+        return await download_service.file(request, path, media_type=document["file_type"],
+                                           filename=document["original_filename"], sha256=document["content_sha256"])
+    if document["cloud_storage_key"] and ibm_cloud_storage.is_configured():
+        return await download_service.cos_object(request, ibm_cloud_storage.cos_client, ibm_cloud_storage.bucket_name,
+                                                 document["cloud_storage_key"], filename=document["original_filename"])
+    raise HTTPException(status_code=404, detail="Document file is no longer stored")
+
+@app.get("/api/ibm/cos/download")
+@app.get("/ibm/cos/download")
+async def download_cos_object(fileName: str, request: Request):
+    # Only objects this service recorded as uploads, and only from its own bucket
+    document = await get_document_by_storage_key(fileName)
+    if document is None:
+        raise HTTPException(status_code=404, detail="Object not found")
+    if ibm_cloud_storage.is_configured():
+        try:
+            return await download_service.cos_object(request, ibm_cloud_storage.cos_client, ibm_cloud_storage.bucket_name, fileName)
+        except ibm_cloud_storage._client_error as e:
+            status = int(e.response.get("ResponseMetadata", {}).get("HTTPStatusCode", 502))
+            raise HTTPException(status_code=404 if status == 404 else 502, detail=f"COS download failed: {e}")
+    # Without COS credentials uploads are kept in UPLOAD_DIR (see upload_to_ibm_cos)
+    path = resolve_local(fileName, UPLOAD_DIR)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Object not found")
+    return await download_service.file(request, path, filename=os.path.basename(fileName))
+
+# Document processing status (poll, or subscribe to the event stream)
+@app.get("/api/documents/processing-status/{job_id}")
+@app.get("/documents/processing-status/{job_id}")
+async def document_processing_status(job_id: int):
+    job = await asyncio.to_thread(job_queue.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Processing job not found")
+    return job
+
+@app.get("/api/documents/processing-status/{job_id}/events")
+@app.get("/documents/processing-status/{job_id}/events")
+async def document_processing_events(job_id: int):
+    job = await asyncio.to_thread(job_queue.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Processing job not found")
+    subscriber = event_hub.connect()
+    event_hub.subscribe(subscriber, [f"job:{job_id}"])
+
+    async def events(job):
+        # Shared job:<id> updates from the hub instead of one status query per client per tick
+        try:
+            yield f"data: {json.dumps(job, default=str)}\n\n"
+            async for batch in subscriber.batches(event_hub.coalesce_s, event_hub.heartbeat_s):
+                for _, update in batch:
+                    if update is None or update == job:
+                        continue
+                    job = update
+                    yield f"data: {json.dumps(job, default=str)}\n\n"
+                if job["job_status"] in ("done", "failed"):
+                    return
+                if not batch:
+                    yield ": ping\n\n"
+        finally:
+            event_hub.disconnect(subscriber)
+
+    return StreamingResponse(events(job), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+# Server push: one stream per tab carries job status, dashboard analytics and service health as they change.
+# Topics: "job:<job_id>", "analytics", "health"; each event is {"topic", "data"}
+@app.get("/api/events")
+@app.get("/events")
+async def event_stream(topics: Optional[str] = None):
+    subscriber = event_hub.connect()
+    try:
+        event_hub.subscribe(subscriber, parse_topics(topics))
+    except ValueError as e:
+        event_hub.disconnect(subscriber)
+        raise HTTPException(status_code=400, detail=str(e))
+    return EventStream(event_hub, subscriber)
+
+# Change an open stream's topics. The stream lives in one worker process, so with WEB_CONCURRENCY > 1
+# prefer the WebSocket (subscriptions travel on the socket) or reopen the stream with the new topics
+@app.post("/api/events/{connection_id}/subscribe")
+@app.post("/events/{connection_id}/subscribe")
+async def event_stream_subscribe(connection_id: str, request: Request):
+    subscriber = event_hub.subscribers.get(connection_id)
+    if subscriber is None:
+        raise HTTPException(status_code=404, detail="Event stream not found (closed, or held by another worker)")
+    body = await request.json()
+    try:
+        event_hub.subscribe(subscriber, body.get("topics") or [])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    event_hub.unsubscribe(subscriber, body.get("unsubscribe") or [])
+    return {"connection_id": connection_id, "topics": sorted(subscriber.topics)}
+
+@app.websocket("/api/ws/events")
+@app.websocket("/ws/events")
+async def event_socket(websocket: WebSocket, topics: Optional[str] = None):
+    """Same events as /events; the client sends {"subscribe": [...]} / {"unsubscribe": [...]} at any time"""
+    await websocket.accept()
+    subscriber = event_hub.connect()
+
+    async def write(batch):
+        if batch:
+            await websocket.send_text(json.dumps([{"topic": topic, "data": data} for topic, data in batch], default=str))
+
+    async def read():
+        while True:
+            message = await websocket.receive_json()
+            try:
+                event_hub.subscribe(subscriber, message.get("subscribe") or [])
+            except ValueError as e:
+                await websocket.send_text(json.dumps([{"topic": "error", "data": str(e)}]))
+            event_hub.unsubscribe(subscriber, message.get("unsubscribe") or [])
+
+    try:
+        event_hub.subscribe(subscriber, parse_topics(topics))
+        await websocket.send_text(json.dumps([{"topic": "hello", "data": {"connection_id": subscriber.id, "topics": sorted(subscriber.topics)}}]))
+        reader = asyncio.create_task(read())
+        pump = asyncio.create_task(event_hub.pump(subscriber, write))
+        await asyncio.wait([reader, pump], return_when=asyncio.FIRST_COMPLETED)
+        reader.cancel()
+        pump.cancel()
+        await asyncio.gather(reader, pump, return_exceptions=True)
+    except ValueError as e:
+        await websocket.close(code=1008, reason=str(e))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        event_hub.disconnect(subscriber)
+        if websocket.client_state.name == "CONNECTED":
+            await websocket.close()
+
+# Full-text search over chat history and uploaded document text
+@app.get("/api/search")
+@app.get("/search")
+async def search(q: str, scope: str = "all", session_id: Optional[str] = None, sort: str = "relevance",
+                 limit: int = 20, offset: int = 0, before_id: Optional[int] = None):
+    await init_database()
+    try:
+        return await asyncio.to_thread(search_index.search, q, scope, session_id, sort, limit, offset, before_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+# Usage over time from the pre-aggregated rollups (AnalyticsDashboard period selector)
+@app.get("/api/analytics/usage")
+@app.get("/analytics/usage")
+async def usage_analytics(period: str = "7d"):
+    await init_database()
+    try:
+        return await asyncio.to_thread(usage_rollups.query, period)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+# Criteria progress from saved inputs and processed evidence, maintained incrementally per session
+@app.get("/api/criteria/progress")
+@app.get("/criteria/progress")
+async def criteria_progress_overview(session_id: str = "default"):
+    return await criteria_progress.progress(session_id)
+
+@app.get("/api/analytics/criteria")
+@app.get("/analytics/criteria")
+async def criteria_analytics(session_id: str = "default"):
+    return await criteria_progress.analytics(session_id)
+
+@app.get("/api/criteria/{criterion_id}")
+@app.get("/criteria/{criterion_id}")
+async def criterion_details(criterion_id: str, session_id: str = "default"):
+    criterion, _ = parse_sub_criterion(criterion_id)
+    if criterion is None:
+        raise HTTPException(status_code=404, detail="Unknown criterion")
+    return await criteria_progress.criterion(session_id, criterion)
+
+@app.post("/api/criteria/{criterion_id}/input")
+@app.post("/criteria/{criterion_id}/input")
+async def criterion_input(criterion_id: str, request: Request):
+    body = await request.json()
+    session_id = body.get('session_id') or 'default'
+    path_criterion, _ = parse_sub_criterion(criterion_id)
+    if path_criterion is None:
+        raise HTTPException(status_code=404, detail="Unknown criterion")
+    criterion, sub_criterion = parse_sub_criterion(body.get('subCriterion') or body.get('sub_criterion') or criterion_id)
+    if sub_criterion is None or criterion != path_criterion:
+        raise HTTPException(status_code=400, detail="Name a key indicator of this criterion, e.g. '1.1', in the path or as subCriterion")
+    content = body.get('content') or ''
+    await ssr_engine.save_input(session_id, sub_criterion, content, body.get('institutionType'))
+    await criteria_progress.input_saved(session_id, sub_criterion, content)
+    details = await criteria_progress.criterion(session_id, criterion)
+    return {"saved": True, "sub_criterion": sub_criterion, "progress": details["progress"],
+            "key_indicator": next(k for k in details["key_indicators"] if k["id"] == sub_criterion)}
+
+async def dashboard_summary() -> Dict[str, Any]:
+    counts = await dashboard_counts(recent=5)
+    queries_count = counts["queries"]
+    docs_count = counts["documents"]
+    recent_queries = counts["recent"]
+    return {
+        "documentsProcessed": docs_count,
+        "queriesHandled": queries_count,
+        "reportsGenerated": max(0, queries_count // 3),
+        "criteriaCompleted": min(7, max(0, queries_count // 10)),
+        "recentActivity": [{"query": (q[0] or '')[:50] + ("..." if q[0] and len(q[0]) > 50 else ''), "time": q[1].isoformat() if q[1] else None} for q in recent_queries],
+        "systemStatus": "operational",
+    }
+
 # Analytics dashboard endpoint
 @app.get("/api/analytics/dashboard")
 async def dashboard_analytics():
     try:
-        conn = sqlite3.connect('naac_assistant.db')
-        cursor = conn.cursor()
-
-        cursor.execute('SELECT COUNT(*) FROM user_queries')
-        queries_count = cursor.fetchone()[0]
-
-        cursor.execute('SELECT COUNT(*) FROM uploaded_documents')
-        docs_count = cursor.fetchone()[0]
-
-        cursor.execute('SELECT message, timestamp FROM user_queries ORDER BY timestamp DESC LIMIT 5')
-        recent_queries = cursor.fetchall()
-
-        conn.close()
-
-        return {
-            "documentsProcessed": docs_count,
-            "queriesHandled": queries_count,
-            "reportsGenerated": max(0, queries_count // 3),
-            "criteriaCompleted": min(7, max(0, queries_count // 10)),
-            "recentActivity": [{"query": (q[0] or '')[:50] + ("..." if q[0] and len(q[0]) > 50 else ''), "time": q[1]} for q in recent_queries],
-            "systemStatus": "operational",
-            "timestamp": datetime.now().isoformat()
-        }
+        return {**await dashboard_summary(), "timestamp": datetime.now().isoformat()}
     except Exception as e:
         return {
             "documentsProcessed": 0,
@@ -542,20 +530,19 @@ async def dashboard_analytics():
             "error": str(e)
         }
 
-# Service status endpoints for dashboard
+# Service status endpoints for dashboard (served from the background probe snapshot)
 @app.get("/api/health/services")
+@app.get("/health/services")
 async def check_services():
-    return {
-        "services": {
-            "chat_system": {"status": "operational", "uptime": "100%"},
-            "document_upload": {"status": "operational", "uptime": "100%"},
-            "ibm_cos": {"status": "connected", "uptime": "99.9%"},
-            "database": {"status": "operational", "uptime": "100%"},
-            "analytics": {"status": "operational", "uptime": "100%"}
-        },
-        "overall_status": "healthy",
-        "timestamp": datetime.now().isoformat()
-    }
+    return health_prober.snapshot()
+
+@app.get("/api/health/services/{service_name}")
+@app.get("/health/services/{service_name}")
+async def check_service(service_name: str):
+    entry = health_prober.get(service_name)
+    if entry is None:
+        raise HTTPException(status_code=404, detail=f"Unknown service: {service_name}")
+    return entry
 
 if __name__ == "__main__":
     import uvicorn
@@ -563,101 +550,11 @@ if __name__ == "__main__":
     print("📊 Dashboard: http://localhost:8000")
     print("💬 Chat API: http://localhost:8000/api/chat/message")
     print("📁 Upload API: http://localhost:8000/api/documents/upload")
-    uvicorn.run(app, host="0.0.0.0", port=int(os.getenv("PORT", 8000)))
+    # An import string (not the app object) is required for uvicorn to fork workers
+    uvicorn.run("main:app", host="0.0.0.0", port=int(os.getenv("PORT", 8000)), workers=int(os.getenv("WEB_CONCURRENCY", 1)))
 
 # remove duplicate legacy root/health definitions below (consolidated above)
 
-# Individual service health checks
-@app.get("/api/health/check/ibm-app-id")
-async def check_ibm_app_id():
-    try:
-        # Mock IBM App ID check
-        return {
-            "status": "connected",
-            "service": "IBM App ID",
-            "message": "Authentication service ready",
-            "timestamp": int(time.time())
-        }
-    except Exception as e:
-        return {
-            "status": "error",
-            "service": "IBM App ID",
-            "message": f"Connection failed: {str(e)}",
-            "timestamp": int(time.time())
-        }
-
-@app.get("/api/health/check/ibm-granite-llm")
-async def check_granite_llm():
-    try:
-        # Mock IBM Granite LLM check
-        return {
-            "status": "connected",
-            "service": "IBM Granite LLM",
-            "message": "Large Language Model ready",
-            "timestamp": int(time.time())
-        }
-    except Exception as e:
-        return {
-            "status": "error",
-            "service": "IBM Granite LLM",
-            "message": f"Connection failed: {str(e)}",
-            "timestamp": int(time.time())
-        }
-
-@app.get("/api/health/check/pinecone-vector-db")
-async def check_pinecone():
-    try:
-        # Mock Pinecone check
-        return {
-            "status": "connected",
-            "service": "Pinecone Vector DB",
-            "message": "Vector database ready",
-            "timestamp": int(time.time())
-        }
-    except Exception as e:
-        return {
-            "status": "error",
-            "service": "Pinecone Vector DB",
-            "message": f"Connection failed: {str(e)}",
-            "timestamp": int(time.time())
-        }
-
-@app.get("/api/health/check/cloud-object-storage")
-async def check_cloud_storage():
-    try:
-        # Mock Cloud Object Storage check
-        return {
-            "status": "connected",
-            "service": "Cloud Object Storage",
-            "message": "Document storage ready",
-            "timestamp": int(time.time())
-        }
-    except Exception as e:
-        return {
-            "status": "error",
-            "service": "Cloud Object Storage",
-            "message": f"Connection failed: {str(e)}",
-            "timestamp": int(time.time())
-        }
-
-@app.get("/api/health/check/watson-nlp")
-async def check_watson_nlp():
-    try:
-        # Mock Watson NLP check
-        return {
-            "status": "connected",
-            "service": "Watson NLP",
-            "message": "Natural language processing ready",
-            "timestamp": int(time.time())
-        }
-    except Exception as e:
-        return {
-            "status": "error",
-            "service": "Watson NLP",
-            "message": f"Connection failed: {str(e)}",
-            "timestamp": int(time.time())
-        }
-
 # Service integration tests
 @app.post("/api/test/ibm-app-id")
 async def test_ibm_app_id():
@@ -701,51 +598,218 @@ async def check_ibm_granite_live():
     # include non-sensitive inputs for diagnostics
     return {"ok": False, "step": "generation", "model_id": model_id, "project_id": project_id, **gen}
 
-# API Routes placeholder
-@app.get("/api/health/services")
-async def check_services():
-    return {
-        "services": {
-            "granite": {"status": "connected"},
-            "pinecone": {"status": "connected"},
-            "watson_nlp": {"status": "connected"},
-            "cloud_storage": {"status": "connected"},
-        }
-    }
+# Individual service health checks, keyed by the dashboard's service ids
+FRONTEND_HEALTH_SERVICES = {
+    # App ID sign-in is backed by IBM Cloud IAM, so it reports the IAM probe
+    "ibm-app-id": "iam",
+    "ibm-granite-llm": "granite",
+    "pinecone-vector-db": "pinecone",
+    "cloud-object-storage": "cloud_storage",
+    "watson-nlp": "watson_nlp",
+}
+
+@app.get("/api/health/check/{service_name}")
+async def check_service_health(service_name: str):
+    entry = health_prober.get(FRONTEND_HEALTH_SERVICES.get(service_name, service_name))
+    if entry is None:
+        raise HTTPException(status_code=404, detail=f"Unknown service: {service_name}")
+    return {**entry, "timestamp": int(time.time())}
 
 @app.post("/api/chat/message")
 async def chat_message(request: Request):
+    started = time.perf_counter()
     body = await request.json()
     message = body.get('message', '') or ''
     session_id = body.get('session_id') or 'default'
 
     # Generate contextual response using NAAC logic above
-    result = generate_naac_response(message)
-    response_text = result.get('response') if isinstance(result, dict) else str(result)
-    confidence = result.get('confidence', 0.9) if isinstance(result, dict) else 0.9
-    sources = result.get('sources', ["NAAC Manual 2022"]) if isinstance(result, dict) else ["NAAC Manual 2022"]
+    with timed("intent_routing"):
+        template = template_cache.match(message)
+    response_text = template.text(message)
+
+    session_tracker.record(session_id, "query", request.client.host if request.client else None, request.headers.get("user-agent"))
 
     # Persist the interaction
     try:
-        conn = sqlite3.connect('naac_assistant.db')
-        cursor = conn.cursor()
-        cursor.execute(
-            'INSERT INTO user_queries (session_id, message, response) VALUES (?, ?, ?)',
-            (session_id, message, response_text)
-        )
-        conn.commit()
-        conn.close()
+        with timed("db_write"):
+            await record_query(
+                session_id,
+                message,
+                response_text,
+                confidence_score=template.confidence,
+                response_time_ms=int((time.perf_counter() - started) * 1000),
+                sources=template.sources,
+                ip_address=request.client.host if request.client else None,
+                user_agent=request.headers.get("user-agent"),
+            )
     except Exception as e:
         # Log DB error but don't fail the response
         print(f"DB error saving chat: {e}")
-
-    return {
-        "response": response_text,
-        "confidence": confidence,
-        "sources": sources,
+    event_hub.refresh("analytics")
+    usage_rollups.record("chat", (time.perf_counter() - started) * 1000)
+
+    # The answer is pre-serialized; only the message (default answer), timestamp and session are encoded here
+    return Response(template.chat_body(message, session_id, str(time.time())), media_type="application/json")
+
+# Chat transcript for ChatInterface, newest page first; pass next_before_id back as before_id for older messages
+@app.get("/api/chat/history/{session_id}")
+@app.get("/chat/history/{session_id}")
+async def get_chat_history(session_id: str, limit: int = 50, before_id: Optional[int] = None):
+    return await chat_history.page(session_id, limit=limit, before_id=before_id)
+
+# Criterion and SSR guidance, served pre-serialized and pre-compressed with ETags
+@app.get("/api/guidance")
+async def guidance_topics(request: Request):
+    return template_cache.index().respond(request)
+
+@app.get("/api/guidance/{topic}")
+async def guidance_topic(topic: str, request: Request):
+    template = template_cache.get(topic)
+    if template is None:
+        raise HTTPException(status_code=404, detail="Unknown guidance topic")
+    return template.guidance.respond(request)
+
+# SSR generation (SSRGenerator page): one sub-criterion is built inline, larger reports in the background
+@app.post("/api/ssr/generate")
+@app.post("/ssr/generate")
+async def ssr_generate(request: Request):
+    body = await request.json()
+    session_id = body.get('session_id') or 'default'
+    criterion, sub_criterion = parse_sub_criterion(body.get('subCriterion') or body.get('criterion'))
+    if (body.get('criterion') or body.get('subCriterion')) and criterion is None:
+        raise HTTPException(status_code=400, detail="Unknown criterion or sub-criterion")
+    wait = body.get('wait', sub_criterion is not None)
+    report = await ssr_engine.generate(
+        session_id,
+        criterion=criterion,
+        sub_criterion=sub_criterion,
+        institution_type=body.get('institutionType') or '',
+        context=body.get('additionalContext') or '',
+        wait=bool(wait),
+    )
+    if report["status"] == "completed":
+        path = await ssr_engine.report_file(report["ssr_id"])
+        report["content"] = await asyncio.to_thread(Path(path).read_text, encoding="utf-8")
+    elif report["status"] == "generating":
+        report["status_url"] = f"/ssr/{report['ssr_id']}"
+    return report
+
+@app.post("/api/ssr/save")
+@app.post("/ssr/save")
+async def ssr_save(request: Request):
+    body = await request.json()
+    _, sub_criterion = parse_sub_criterion(body.get('subCriterion') or body.get('sub_criterion'))
+    if sub_criterion is None:
+        raise HTTPException(status_code=400, detail="subCriterion must name an SSR sub-criterion, e.g. '1.1'")
+    content = body.get('content') or body.get('additionalContext') or ''
+    await ssr_engine.save_input(body.get('session_id') or 'default', sub_criterion, content, body.get('institutionType'))
+    await criteria_progress.input_saved(body.get('session_id') or 'default', sub_criterion, content)
+    return {"saved": True, "sub_criterion": sub_criterion, "length": len(content)}
+
+# One session's reports; like /ssr/generate, no session_id means the "default" session, never all of them
+@app.get("/api/ssr/history")
+@app.get("/ssr/history")
+async def ssr_history(session_id: str = "default", limit: int = 50):
+    return {"reports": await ssr_engine.history(session_id, limit=max(1, min(limit, 200)))}
+
+@app.get("/api/ssr/download/{ssr_id}")
+@app.get("/ssr/download/{ssr_id}")
+async def ssr_download(ssr_id: int, request: Request):
+    path = await ssr_engine.report_file(ssr_id)
+    if path is None or not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="SSR report not found or not ready")
+    return await download_service.file(request, path, media_type="text/markdown", filename=f"SSR_{ssr_id}.md")
+
+@app.get("/api/ssr/{ssr_id}")
+@app.get("/ssr/{ssr_id}")
+async def ssr_status(ssr_id: int):
+    report = await ssr_engine.get(ssr_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="SSR report not found")
+    return report
+
+def parse_deadline(value) -> Optional[float]:
+    """A client's deadline_s as positive seconds, capped at the scheduler default; 400 for anything else"""
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise HTTPException(status_code=400, detail="deadline_s must be a number of seconds")
+    try:
+        seconds = float(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="deadline_s must be a number of seconds")
+    if not math.isfinite(seconds) or seconds <= 0:
+        raise HTTPException(status_code=400, detail="deadline_s must be a positive number of seconds")
+    return min(seconds, generation_scheduler.default_deadline_s)
+
+# Granite generation through the shared scheduler
+@app.post("/api/chat/generate")
+async def chat_generate(request: Request):
+    started = time.perf_counter()
+    body = await request.json()
+    message = body.get('message', '') or ''
+    session_id = body.get('session_id') or 'default'
+    deadline_s = parse_deadline(body.get('deadline_s'))
+    if not granite_client.is_configured():
+        raise HTTPException(status_code=503, detail="IBM Granite generation is not configured")
+    prompt, grounding, timings = message, None, StageTimings()
+    if body.get('use_documents'):
+        pipeline = RAGPipeline(DocumentRetriever(search_index, session_id), reranker=document_reranker,
+                               packer=context_packer, token_budget=RAG_TOKEN_BUDGET)
+        grounding = await asyncio.to_thread(pipeline.prepare, message, None, timings)
+        prompt = grounding["prompt"]
+    try:
+        with timings.stage("generate"):
+            text = await generation_scheduler.submit(prompt, session_id=session_id, deadline_s=deadline_s)
+    except QueueFullError as e:
+        usage_rollups.record("generate", error=True)
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except DeadlineExceededError as e:
+        usage_rollups.record("generate", (time.perf_counter() - started) * 1000, error=True)
+        raise HTTPException(status_code=504, detail=str(e))
+    except GraniteGenerationError as e:
+        usage_rollups.record("generate", (time.perf_counter() - started) * 1000, error=True)
+        raise HTTPException(status_code=502, detail=str(e))
+
+    usage_rollups.record("generate", (time.perf_counter() - started) * 1000)
+    session_tracker.record(session_id, "query", request.client.host if request.client else None, request.headers.get("user-agent"))
+    result = {
+        "response": text,
+        "model_id": granite_client.model_id,
         "timestamp": str(time.time()),
         "session_id": session_id,
     }
+    if grounding is not None:
+        result.update(sources=grounding["sources"], prompt_tokens=grounding["prompt_tokens"], timings_ms=timings.as_dict())
+    return result
+
+# Live session counters, served from memory
+@app.get("/api/sessions/{session_id}/stats", response_model=SessionStats)
+async def session_stats(session_id: str):
+    stats = await session_tracker.get_stats(session_id)
+    if stats is None:
+        raise HTTPException(status_code=404, detail=f"Unknown session: {session_id}")
+    return stats
+
+@app.get("/api/generation/stats")
+async def generation_stats():
+    workers = {key.split(":", 1)[1]: stats for key, stats in (await asyncio.to_thread(shared_state.get_prefix, "generation:")).items()}
+    workers[str(os.getpid())] = generation_scheduler.stats()
+    totals = {
+        field: sum(w[field] for w in workers.values())
+        for field in ("queue_depth", "in_flight", "active_sessions", "max_in_flight", "max_queue",
+                      "submitted", "completed", "failed", "rejected", "expired", "batches")
+    }
+    # Percentiles cannot be summed; report the worst worker
+    wait_ms = {p: max(w["wait_ms"][p] for w in workers.values()) for p in ("p50", "p95", "p99", "max")}
+    return {**totals, "wait_ms": wait_ms, "workers": len(workers), "timestamp": datetime.now().isoformat()}
+
+# Prometheus text exposition of all recorded metrics
+@app.get("/metrics")
+async def metrics():
+    own_key = f"metrics:{os.getpid()}"
+    others = [dump for key, dump in (await asyncio.to_thread(shared_state.get_prefix, "metrics:")).items() if key != own_key]
+    return Response(content=metrics_registry.render(tuple(others)), media_type=metrics_registry.content_type)
 
 @app.post("/api/documents/upload")
 async def upload_document():
@@ -778,4 +842,5 @@ async def save_ibm_services_config(request: Request):
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=int(os.getenv("PORT", 8000)))
+    # An import string (not the app object) is required for uvicorn to fork workers
+    uvicorn.run("main:app", host="0.0.0.0", port=int(os.getenv("PORT", 8000)), workers=int(os.getenv("WEB_CONCURRENCY", 1)))
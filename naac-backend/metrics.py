@@ -0,0 +1,288 @@
+import time
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Latency buckets in seconds (Prometheus convention), 1ms .. 30s
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labelnames: Tuple[str, ...], values: Tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class _Metric:
+    """Base for metrics whose values live in per-thread shards
+
+    Each thread only ever writes its own shard, so recording takes no lock;
+    a scrape copies every shard (dict.copy is atomic under the GIL) and sums.
+    """
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards: List[dict] = []
+        self._register_lock = threading.Lock()
+
+    def _shard(self) -> dict:
+        shard = getattr(self._local, "values", None)
+        if shard is None:
+            shard = {}
+            self._local.values = shard
+            with self._register_lock:
+                self._shards.append(shard)
+        return shard
+
+    def _key(self, labels: Dict[str, str]) -> Tuple:
+        return tuple(labels.get(name, "") for name in self.labelnames)
+
+    def _snapshot(self) -> List[dict]:
+        with self._register_lock:
+            shards = list(self._shards)
+        return [shard.copy() for shard in shards]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        shard = self._shard()
+        key = self._key(labels)
+        shard[key] = shard.get(key, 0) + amount
+
+    def collect(self) -> Dict[Tuple, float]:
+        totals: Dict[Tuple, float] = {}
+        for shard in self._snapshot():
+            for key, value in shard.items():
+                totals[key] = totals.get(key, 0) + value
+        return totals
+
+    @staticmethod
+    def merge(totals: Dict[Tuple, float], key: Tuple, value: float):
+        totals[key] = totals.get(key, 0) + value
+
+    def render(self, totals: Optional[Dict[Tuple, float]] = None) -> List[str]:
+        totals = self.collect() if totals is None else totals
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}" for key, v in sorted(totals.items())]
+
+
+class Gauge(Counter):
+    """Up/down gauge (in-flight requests); or a callback evaluated at scrape time"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (), callback: Optional[Callable[[], float]] = None):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track_inprogress(self, **labels):
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+    def collect(self) -> Dict[Tuple, float]:
+        if self.callback is not None:
+            try:
+                return {(): float(self.callback())}
+            except Exception:
+                return {}
+        return super().collect()
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        shard = self._shard()
+        key = self._key(labels)
+        # Layout: [count per bucket..., +Inf count, sum]
+        cells = shard.get(key)
+        if cells is None:
+            cells = [0] * (len(self.buckets) + 2)
+            shard[key] = cells
+        cells[bisect_left(self.buckets, value)] += 1
+        cells[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0, **labels)
+
+    def collect(self) -> Dict[Tuple, List[float]]:
+        totals: Dict[Tuple, List[float]] = {}
+        for shard in self._snapshot():
+            for key, cells in shard.items():
+                cells = list(cells)
+                if key in totals:
+                    totals[key] = [a + b for a, b in zip(totals[key], cells)]
+                else:
+                    totals[key] = cells
+        return totals
+
+    @staticmethod
+    def merge(totals: Dict[Tuple, List[float]], key: Tuple, cells: List[float]):
+        totals[key] = [a + b for a, b in zip(totals[key], cells)] if key in totals else list(cells)
+
+    def render(self, totals: Optional[Dict[Tuple, List[float]]] = None) -> List[str]:
+        totals = self.collect() if totals is None else totals
+        lines = []
+        for key, cells in sorted(totals.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), cells[:-1]):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(cells[-1])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Holds metrics and renders them in the Prometheus text exposition format"""
+
+    content_type = "text/plain; version=0.0.4; charset=utf-8"
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (), callback: Optional[Callable[[], float]] = None) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames, callback))
+
+    def histogram(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def dump(self) -> Dict[str, list]:
+        """JSON-serialisable series of every metric, for publishing to other workers"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {metric.name: [[list(key), value] for key, value in metric.collect().items()] for metric in metrics}
+
+    def render(self, other_workers: Tuple[Dict[str, list], ...] = ()) -> str:
+        """Text exposition of this process's metrics, summed with dumps from other workers"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            totals = metric.collect()
+            for dump in other_workers:
+                for key, value in dump.get(metric.name, ()):
+                    metric.merge(totals, tuple(key), value)
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render(totals))
+        return "\n".join(lines) + "\n"
+
+
+# Global registry and the hot-path metrics shared across modules
+registry = MetricsRegistry()
+
+http_request_duration = registry.histogram(
+    "naac_http_request_duration_seconds", "HTTP request latency by route template", ("method", "route", "status")
+)
+http_requests_in_flight = registry.gauge("naac_http_requests_in_flight", "HTTP requests currently being served")
+http_errors = registry.counter("naac_http_errors_total", "HTTP requests that failed with a 5xx or an unhandled exception", ("method", "route"))
+operation_duration = registry.histogram(
+    "naac_operation_duration_seconds", "Latency of internal operations (intent routing, db writes, storage, IAM, generation)", ("operation",)
+)
+operation_errors = registry.counter("naac_operation_errors_total", "Internal operations that raised", ("operation",))
+
+
+@contextmanager
+def timed(operation: str):
+    """Time a block as one internal operation, counting it as an error if it raises"""
+    t0 = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        operation_errors.inc(operation=operation)
+        raise
+    finally:
+        operation_duration.observe(time.perf_counter() - t0, operation=operation)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording per-route latency, in-flight requests and errors"""
+
+    def __init__(self, app):
+        self.app = app
+        self._route_paths: Dict[Callable, str] = {}
+
+    def _route_label(self, scope) -> str:
+        # Label by route template (/api/documents/{document_id}), never the raw path
+        route = scope.get("route")
+        if route is not None and hasattr(route, "path"):
+            return route.path
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        path = self._route_paths.get(endpoint)
+        if path is None:
+            for candidate in scope["app"].routes:
+                if getattr(candidate, "endpoint", None) is endpoint:
+                    path = candidate.path
+                    break
+            path = path or "unmatched"
+            self._route_paths[endpoint] = path
+        return path
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        method = scope["method"]
+        # The route is only known after routing, so in-flight is tracked across all routes
+        http_requests_in_flight.inc()
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_requests_in_flight.dec()
+            route = self._route_label(scope)
+            # An unhandled exception leaves status at its 500 default
+            http_request_duration.observe(time.perf_counter() - t0, method=method, route=route, status=str(status["code"]))
+            if status["code"] >= 500:
+                http_errors.inc(method=method, route=route)
@@ -0,0 +1,98 @@
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+
+class MockIBMHandler(BaseHTTPRequestHandler):
+    """Local stand-in for IBM IAM and watsonx.ai text generation, plus the COS and Pinecone reachability checks"""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, payload: dict):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+        body = self._read_body()
+        state = self.server.state
+        with state["lock"]:
+            state["requests"][path] = state["requests"].get(path, 0) + 1
+
+        if path == "/identity/token":
+            time.sleep(state["iam_latency"])
+            return self._send_json(200, {
+                "access_token": "mock-access-token",
+                "expiration": int(time.time()) + 3600,
+                "token_type": "Bearer",
+            })
+
+        if path == "/ml/v1/text/generation":
+            if self.headers.get("Authorization") != "Bearer mock-access-token":
+                return self._send_json(401, {"errors": [{"code": "authentication_token_not_valid"}]})
+            with state["lock"]:
+                state["in_flight"] += 1
+                state["max_in_flight"] = max(state["max_in_flight"], state["in_flight"])
+            try:
+                time.sleep(state["generation_latency"])
+                prompt = json.loads(body or b"{}").get("input", "")
+                return self._send_json(200, {
+                    "model_id": "ibm/granite-13b-chat-v2",
+                    "results": [{"generated_text": f"Mock Granite answer to: {prompt[:80]}", "stop_reason": "eos_token"}],
+                })
+            finally:
+                with state["lock"]:
+                    state["in_flight"] -= 1
+
+        self._send_json(404, {"error": f"Unknown mock endpoint {path}"})
+
+    def do_GET(self):
+        # Pinecone reachability check: GET /indexes with the Api-Key header
+        path = urlparse(self.path).path
+        state = self.server.state
+        with state["lock"]:
+            state["requests"][path] = state["requests"].get(path, 0) + 1
+        if path == "/indexes":
+            if not self.headers.get("Api-Key"):
+                return self._send_json(401, {"error": "Missing Api-Key"})
+            return self._send_json(200, {"indexes": [{"name": "naac-documents", "dimension": 384, "metric": "cosine"}]})
+        self._send_json(404, {"error": f"Unknown mock endpoint {path}"})
+
+    def do_HEAD(self):
+        # COS bucket existence check: HEAD /<bucket> with the IAM bearer token
+        state = self.server.state
+        with state["lock"]:
+            state["requests"]["HEAD"] = state["requests"].get("HEAD", 0) + 1
+        ok = self.headers.get("Authorization") == "Bearer mock-access-token"
+        self.send_response(200 if ok else 403)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+
+def start_mock_ibm_server(generation_latency: float = 0.05, iam_latency: float = 0.01, port: int = 0):
+    """Start the mock IAM/watsonx server on a background thread; returns (server, base_url)"""
+    server = ThreadingHTTPServer(("127.0.0.1", port), MockIBMHandler)
+    server.daemon_threads = True
+    server.state = {
+        "lock": threading.Lock(),
+        "requests": {},
+        "in_flight": 0,
+        "max_in_flight": 0,
+        "generation_latency": generation_latency,
+        "iam_latency": iam_latency,
+    }
+    threading.Thread(target=server.serve_forever, name="mock-ibm", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
@@ -1,5 +1,5 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, Float
-from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, Float, Index, UniqueConstraint
+from sqlalchemy.orm import declarative_base
 from sqlalchemy.sql import func
 import datetime
 
@@ -8,11 +8,18 @@ Base = declarative_base()
 class UserQuery(Base):
     """Model to store user chat queries and responses"""
     __tablename__ = "user_queries"
+    # Session history is read newest-first per session; the composite indexes also serve session_id lookups
+    __table_args__ = (
+        Index("ix_user_queries_session_created", "session_id", "created_at"),
+        # Keyset pagination of /chat/history: WHERE session_id = ? AND id < ? ORDER BY id DESC
+        Index("ix_user_queries_session_id_id", "session_id", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
-    session_id = Column(String(255), index=True)
+    session_id = Column(String(255))
     user_query = Column(Text, nullable=False)
-    ai_response = Column(Text)
+    ai_response = Column(Text)  # inline text for rows written before chat_responses; NULL when response_id is set
+    response_id = Column(Integer)  # chat_responses.id: the answer text, stored once however often it repeats
     confidence_score = Column(Float, default=0.0)
     response_time_ms = Column(Integer, default=0)
     sources_used = Column(Text)  # JSON string of sources
@@ -22,18 +29,36 @@ class UserQuery(Base):
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, onupdate=func.now())
 
+class ChatResponse(Base):
+    """Distinct assistant answers; canned guidance is stored once and referenced from user_queries"""
+    __tablename__ = "chat_responses"
+
+    id = Column(Integer, primary_key=True)
+    digest = Column(String(64), unique=True, nullable=False)  # sha256 hex of body
+    body = Column(Text, nullable=False)
+    created_at = Column(DateTime, server_default=func.now())
+
 class UploadedDocument(Base):
     """Model to store information about uploaded documents"""
     __tablename__ = "uploaded_documents"
+    __table_args__ = (
+        Index("ix_uploaded_documents_session_created", "session_id", "created_at"),
+        # Processing queue scans: oldest documents in a given status first
+        Index("ix_uploaded_documents_status_created", "processing_status", "created_at"),
+        # Object downloads by key: only objects recorded as uploads are served
+        Index("ix_uploaded_documents_stored_filename", "stored_filename"),
+        Index("ix_uploaded_documents_cloud_storage_key", "cloud_storage_key"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
-    session_id = Column(String(255), index=True)
+    session_id = Column(String(255))
     original_filename = Column(String(500), nullable=False)
     stored_filename = Column(String(500), nullable=False)
     file_size = Column(Integer, nullable=False)
     file_type = Column(String(100), nullable=False)
     cloud_storage_url = Column(String(1000))
     cloud_storage_key = Column(String(500))
+    content_sha256 = Column(String(64))  # hashed at upload; the download ETag
     processing_status = Column(String(50), default='uploaded')  # uploaded, processing, processed, failed
     processing_error = Column(Text)
     chunks_created = Column(Integer, default=0)
@@ -56,3 +81,96 @@ class UserSession(Base):
     first_activity = Column(DateTime, server_default=func.now())
     last_activity = Column(DateTime, onupdate=func.now())
     is_active = Column(Boolean, default=True)
+
+class ProcessingJob(Base):
+    """Durable queue entry for extracting, chunking, embedding and indexing an upload"""
+    __tablename__ = "processing_jobs"
+    # Claim order: runnable jobs by status, then earliest run_after
+    __table_args__ = (Index("ix_processing_jobs_status_run_after", "status", "run_after"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    document_id = Column(Integer, index=True, nullable=False)
+    payload = Column(Text)  # JSON: local path, original filename, content type
+    status = Column(String(20), default='queued', nullable=False)  # queued, running, done, failed
+    attempts = Column(Integer, default=0, nullable=False)
+    max_attempts = Column(Integer, default=5, nullable=False)
+    run_after = Column(Float, nullable=False)  # epoch seconds; pushed out by retry backoff
+    locked_by = Column(String(100))
+    lease_expires = Column(Float)
+    last_error = Column(Text)
+    created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, onupdate=func.now())
+
+class CriterionInput(Base):
+    """Institution-provided data for one SSR sub-criterion, per session"""
+    __tablename__ = "criterion_inputs"
+    __table_args__ = (UniqueConstraint("session_id", "sub_criterion", name="uq_criterion_inputs_session_sub"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    session_id = Column(String(255), nullable=False)
+    criterion = Column(String(10), nullable=False)  # '1'..'7'
+    sub_criterion = Column(String(10), nullable=False)  # '1.1', '2.3', ...
+    institution_type = Column(String(100))
+    content = Column(Text)
+    created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+class SSRReport(Base):
+    """A generated Self Study Report (or part of one) assembled on disk"""
+    __tablename__ = "ssr_reports"
+    __table_args__ = (Index("ix_ssr_reports_session_created", "session_id", "created_at"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    session_id = Column(String(255), nullable=False)
+    title = Column(String(500))
+    institution_type = Column(String(100))
+    status = Column(String(20), default='generating', nullable=False)  # generating, completed, failed
+    builder = Column(String(255))  # host:pid building it while generating, so a restart can fail orphaned builds
+    sections_total = Column(Integer, default=0)
+    sections_generated = Column(Integer, default=0)
+    sections_cached = Column(Integer, default=0)
+    file_path = Column(String(1000))
+    file_size = Column(Integer)
+    error = Column(Text)
+    elapsed_ms = Column(Integer)
+    created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, onupdate=func.now())
+
+class SSRSectionCache(Base):
+    """Generated SSR section text keyed by a hash of everything that went into it"""
+    __tablename__ = "ssr_section_cache"
+
+    input_hash = Column(String(64), primary_key=True)
+    sub_criterion = Column(String(10), nullable=False)
+    generator = Column(String(200))
+    content = Column(Text, nullable=False)
+    created_at = Column(DateTime, server_default=func.now())
+
+class UsageRollup(Base):
+    """Pre-aggregated event counts and latency sketches per time bucket"""
+    __tablename__ = "usage_rollups"
+
+    resolution = Column(String(1), primary_key=True)  # 'm'inute, 'h'our, 'd'ay
+    event = Column(String(50), primary_key=True)  # chat, upload, generate, ...
+    bucket_start = Column(Integer, primary_key=True)  # epoch seconds, UTC, aligned to the resolution
+    count = Column(Integer, default=0, nullable=False)
+    errors = Column(Integer, default=0, nullable=False)
+    latency_sum_ms = Column(Float, default=0.0, nullable=False)
+    latency_max_ms = Column(Float, default=0.0, nullable=False)
+    sketch = Column(Text)  # serialized DDSketch of latency_ms
+
+class MetricEvidence(Base):
+    """NAAC metrics a processed document supports, written by the job worker"""
+    __tablename__ = "metric_evidence"
+    # Progress sync reads a session's rows newer than the last id it has seen, so ids are never reused
+    __table_args__ = (
+        Index("ix_metric_evidence_session_id", "session_id", "id"),
+        Index("ix_metric_evidence_document", "document_id"),
+        {"sqlite_autoincrement": True},
+    )
+
+    id = Column(Integer, primary_key=True)
+    session_id = Column(String(255), nullable=False)
+    document_id = Column(Integer, nullable=False)
+    metric_id = Column(String(10))  # '1.1.1'; NULL marks a document that supports none
+    created_at = Column(DateTime, server_default=func.now())
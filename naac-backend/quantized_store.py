@@ -0,0 +1,264 @@
+import os
+import sys
+import json
+import threading
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+MODES = ("int8", "binary")
+# Candidates rescored against the float vectors, as a multiple of top_k
+DEFAULT_OVERSAMPLE = {"int8": 4, "binary": 10}
+# Rows scored per block in the first pass: small enough that each block's float32 copy stays in cache
+SCAN_BLOCK_ROWS = 1024
+# Calibration reads at most this many float rows; it is redone each time the store doubles up to this size
+CALIBRATION_ROWS = 20000
+
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def _popcount_rows(bits: np.ndarray) -> np.ndarray:
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(bits).sum(axis=1, dtype=np.int32)
+    return _POPCOUNT[bits].sum(axis=1, dtype=np.int32)
+
+
+class _Rows:
+    """Append-only numpy buffer with capacity doubling"""
+
+    def __init__(self, width: int, dtype):
+        self.width = width
+        self.data = np.zeros((0, width), dtype=dtype)
+        self.count = 0
+
+    def ensure(self, count: int):
+        if count > len(self.data):
+            grown = np.zeros((max(count, 2 * len(self.data), 1024), self.width), dtype=self.data.dtype)
+            grown[:self.count] = self.data[:self.count]
+            self.data = grown
+        self.count = max(self.count, count)
+
+    def view(self) -> np.ndarray:
+        return self.data[:self.count]
+
+
+class QuantizedVectorIndex:
+    """Local vector store searching compact codes in memory and rescoring against memory-mapped floats
+
+    Same upsert / fetch / query / describe_index_stats calls as a Pinecone
+    index. The first pass scans int8 codes (per-dimension scales, 1 byte a
+    dimension) or sign bits of the centred vector (1 bit a dimension, Hamming
+    distance). The top ``oversample x top_k`` candidates are then rescored by
+    exact cosine against the float32 vectors in ``vectors.f32``, which are
+    memory-mapped, so only the rescored rows are paged in.
+
+    Files under ``directory``: vectors.f32, rows.jsonl (id and metadata per
+    row, last line for a row wins) and calibration.npy. Codes are rebuilt
+    from the floats on open.
+    """
+
+    def __init__(self, directory: str, dimension: int = 384, mode: str = "int8", oversample: Optional[int] = None):
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of {MODES}")
+        self.directory = directory
+        self.dimension = dimension
+        self.mode = mode
+        self.oversample = oversample or DEFAULT_OVERSAMPLE[mode]
+        self.ids: List[str] = []
+        self.rows: Dict[str, int] = {}
+        self._metadata_offsets = _Rows(1, np.int64)
+        width = dimension if mode == "int8" else (dimension + 7) // 8
+        self._codes = _Rows(width, np.int8 if mode == "int8" else np.uint8)
+        self._mean = np.zeros(dimension, dtype=np.float32)
+        self._scale = np.full(dimension, 1 / 127, dtype=np.float32)
+        self._calibrated_rows = 0
+        self._floats: Optional[np.memmap] = None
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._vectors_path = os.path.join(directory, "vectors.f32")
+        self._rows_path = os.path.join(directory, "rows.jsonl")
+        self._calibration_path = os.path.join(directory, "calibration.npy")
+        self._load()
+
+    # Storage
+
+    def _load(self):
+        if os.path.exists(self._rows_path):
+            with open(self._rows_path, "rb") as f:
+                offset = 0
+                for line in f:
+                    record = json.loads(line)
+                    row = record["row"]
+                    if row == len(self.ids):
+                        self.ids.append(record["id"])
+                        self._metadata_offsets.ensure(row + 1)
+                    self.rows[record["id"]] = row
+                    self._metadata_offsets.data[row, 0] = offset
+                    offset += len(line)
+        if not self.ids:
+            return
+        self._map(len(self.ids))
+        self._codes.ensure(len(self.ids))
+        if os.path.exists(self._calibration_path):
+            calibration = np.load(self._calibration_path)
+            self._mean, self._scale, self._calibrated_rows = calibration[0], calibration[1], int(calibration[2, 0])
+            self._encode_rows(0, len(self.ids))
+        else:
+            self._calibrate()
+
+    def _map(self, count: int):
+        size = count * self.dimension * 4
+        with open(self._vectors_path, "ab") as f:
+            if f.tell() < size:
+                f.truncate(size)
+        self._floats = np.memmap(self._vectors_path, dtype=np.float32, mode="r+", shape=(count, self.dimension))
+
+    def _encode(self, vectors: np.ndarray) -> np.ndarray:
+        if self.mode == "int8":
+            return np.clip(np.rint(vectors / self._scale), -127, 127).astype(np.int8)
+        return np.packbits(vectors > self._mean, axis=1)
+
+    def _encode_rows(self, start: int, stop: int):
+        for block in range(start, stop, SCAN_BLOCK_ROWS):
+            end = min(stop, block + SCAN_BLOCK_ROWS)
+            self._codes.data[block:end] = self._encode(np.asarray(self._floats[block:end]))
+
+    def _calibrate(self):
+        """Per-dimension mean and int8 scale from the stored floats, then re-encode every row"""
+        count = len(self.ids)
+        sample = np.asarray(self._floats[np.linspace(0, count - 1, min(count, CALIBRATION_ROWS)).astype(np.int64)])
+        self._mean = sample.mean(axis=0).astype(np.float32)
+        # 99.9th percentile rather than max, so a few outliers do not stretch the scale for every row
+        self._scale = np.maximum(np.percentile(np.abs(sample), 99.9, axis=0), 1e-6).astype(np.float32) / 127
+        self._calibrated_rows = count
+        np.save(self._calibration_path, np.stack([self._mean, self._scale, np.full(self.dimension, count, dtype=np.float32)]))
+        self._encode_rows(0, count)
+
+    # Pinecone-style API
+
+    def upsert(self, vectors: List[Dict[str, Any]], namespace: str = "") -> dict:
+        """Insert or overwrite vectors by id (same semantics as Pinecone upsert); values are stored unit-normalised"""
+        if not vectors:
+            return {"upserted_count": 0}
+        values = np.asarray([vector["values"] for vector in vectors], dtype=np.float32)
+        if values.ndim != 2 or values.shape[1] != self.dimension:
+            raise ValueError(f"Vector dimension {values.shape[-1]} does not match index dimension {self.dimension}")
+        values /= np.maximum(np.linalg.norm(values, axis=1, keepdims=True), 1e-12)
+        with self._lock:
+            rows = []
+            for vector in vectors:
+                row = self.rows.get(vector["id"])
+                if row is None:
+                    row = len(self.ids)
+                    self.ids.append(vector["id"])
+                    self.rows[vector["id"]] = row
+                rows.append(row)
+            count = len(self.ids)
+            if self._floats is None or len(self._floats) < count:
+                self._map(count)
+            rows = np.asarray(rows)
+            self._floats[rows] = values
+            self._floats.flush()
+            self._metadata_offsets.ensure(count)
+            with open(self._rows_path, "ab") as f:
+                offset = f.tell()
+                for row, vector in zip(rows, vectors):
+                    line = (json.dumps({"row": int(row), "id": vector["id"], "metadata": vector.get("metadata") or {}},
+                                       ensure_ascii=False) + "\n").encode("utf-8")
+                    f.write(line)
+                    self._metadata_offsets.data[row, 0] = offset
+                    offset += len(line)
+            self._codes.ensure(count)
+            if self._calibrated_rows < CALIBRATION_ROWS and count >= 2 * self._calibrated_rows:
+                self._calibrate()
+            else:
+                self._codes.data[rows] = self._encode(values)
+        return {"upserted_count": len(vectors)}
+
+    def _metadata(self, rows) -> List[Dict[str, Any]]:
+        out = []
+        with open(self._rows_path, "rb") as f:
+            for row in rows:
+                f.seek(int(self._metadata_offsets.data[row, 0]))
+                out.append(json.loads(f.readline())["metadata"])
+        return out
+
+    def fetch(self, ids: List[str], namespace: str = "") -> dict:
+        with self._lock:
+            found = [(i, self.rows[i]) for i in ids if i in self.rows]
+            metadata = self._metadata([row for _, row in found])
+            return {"vectors": {i: {"id": i, "values": self._floats[row].tolist(), "metadata": meta}
+                                for (i, row), meta in zip(found, metadata)}}
+
+    def _first_pass(self, query: np.ndarray, candidates: int) -> np.ndarray:
+        codes = self._codes.view()
+        if self.mode == "int8":
+            weights = (query * self._scale).astype(np.float32)
+            scores = np.concatenate([codes[start:start + SCAN_BLOCK_ROWS].astype(np.float32) @ weights
+                                     for start in range(0, len(codes), SCAN_BLOCK_ROWS)])
+        else:
+            bits = np.packbits(query > self._mean)
+            scores = -np.concatenate([_popcount_rows(np.bitwise_xor(codes[start:start + SCAN_BLOCK_ROWS], bits))
+                                      for start in range(0, len(codes), SCAN_BLOCK_ROWS)])
+        if candidates >= len(scores):
+            return np.arange(len(scores))
+        return np.argpartition(-scores, candidates)[:candidates]
+
+    def query(self, vector: List[float], top_k: int = 10, include_metadata: bool = True, filter: Optional[dict] = None,
+              namespace: str = "", oversample: Optional[int] = None) -> dict:
+        """Cosine top_k: quantized first pass, exact float rescoring of the candidates
+
+        A metadata ``filter`` (equality on each key) is applied to the
+        rescored candidates, unlike Pinecone which filters before ranking.
+        The pool starts four times wider for a filter and doubles until
+        top_k candidates match or every row has been rescored, so a
+        selective filter still fills top_k when enough rows match.
+        """
+        query = np.asarray(vector, dtype=np.float32)
+        query /= max(float(np.linalg.norm(query)), 1e-12)
+        with self._lock:
+            if not self.ids:
+                return {"matches": []}
+            candidates = top_k * (oversample or self.oversample) * (4 if filter else 1)
+            while True:
+                rows = np.sort(self._first_pass(query, candidates))
+                # Sorted rows read the memory-mapped floats in file order
+                exact = np.asarray(self._floats[rows]) @ query
+                order = rows[np.argsort(-exact)]
+                scores = dict(zip(rows.tolist(), exact.tolist()))
+                if not (filter or include_metadata):
+                    matches = [{"id": self.ids[row], "score": scores[int(row)], "metadata": None} for row in order[:top_k]]
+                    break
+                matches = []
+                for row, metadata in zip(order, self._metadata(order)):
+                    if filter and any(metadata.get(k) != v for k, v in filter.items()):
+                        continue
+                    matches.append({"id": self.ids[row], "score": scores[int(row)], "metadata": metadata if include_metadata else None})
+                    if len(matches) == top_k:
+                        break
+                if len(matches) == top_k or len(rows) >= len(self.ids):
+                    break
+                candidates *= 2
+        return {"matches": matches}
+
+    def describe_index_stats(self) -> dict:
+        with self._lock:
+            return {"dimension": self.dimension, "total_vector_count": len(self.ids), "mode": self.mode, **self.memory_bytes()}
+
+    def memory_bytes(self) -> Dict[str, int]:
+        """Resident search structures (codes, calibration, ids, row lookup, metadata offsets) vs the float file kept on disk"""
+        codes = int(self._codes.view().nbytes)
+        offsets = int(self._metadata_offsets.view().nbytes)
+        # The id strings are shared by the list and the dict keys, so they are counted once, with the list
+        ids = sys.getsizeof(self.ids) + sum(sys.getsizeof(i) for i in self.ids)
+        rows = sys.getsizeof(self.rows) + sum(sys.getsizeof(row) for row in self.rows.values())
+        calibration = int(self._mean.nbytes + self._scale.nbytes)
+        return {
+            "codes_bytes": codes,
+            "code_bytes_per_vector": int(self._codes.width * self._codes.data.itemsize),
+            "offsets_bytes": offsets,
+            "ids_bytes": ids,
+            "rows_bytes": rows,
+            "resident_bytes": codes + offsets + ids + rows + calibration,
+            "float_file_bytes": len(self.ids) * self.dimension * 4,
+        }
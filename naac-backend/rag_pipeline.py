@@ -0,0 +1,97 @@
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Any, List, Optional, Tuple
+
+from reranker import CrossEncoderReranker, estimate_tokens
+from context_packing import ContextPacker
+
+# Same instructions as LangChain's "stuff" RetrievalQA prompt used in the notebook
+PROMPT_TEMPLATE = """Use the following pieces of context to answer the question at the end. If you don't know the answer, just say that you don't know, don't try to make up an answer.
+
+{context}
+
+Question: {question}
+Helpful Answer:"""
+
+
+class StageTimings:
+    """Collects wall-clock milliseconds per pipeline stage"""
+
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = round((time.perf_counter() - t0) * 1000, 3)
+
+    def as_dict(self) -> Dict[str, float]:
+        return {**self.stages, "total": round(sum(self.stages.values()), 3)}
+
+
+class RAGPipeline:
+    """retrieve -> (optional) rerank -> (optional) pack -> generate, with per-stage timings"""
+
+    def __init__(
+        self,
+        retriever,
+        generate_fn: Optional[Callable[[str], str]] = None,
+        reranker: Optional[CrossEncoderReranker] = None,
+        packer: Optional[ContextPacker] = None,
+        candidates: int = 12,
+        top_n: int = 4,
+        token_budget: int = 1500,
+        prompt_template: str = PROMPT_TEMPLATE,
+    ):
+        self.retriever = retriever
+        self.generate_fn = generate_fn
+        self.reranker = reranker
+        self.packer = packer
+        # Without a reranker, only the top_n retrieved chunks are used (RetrievalQA k=4)
+        self.candidates = candidates if reranker else top_n
+        self.top_n = top_n
+        self.token_budget = token_budget
+        self.prompt_template = prompt_template
+
+    def select_context(self, query: str, criterion: Optional[int], timings: StageTimings) -> List[Dict[str, Any]]:
+        with timings.stage("retrieve"):
+            hits = self.retriever.search(query, top_k=self.candidates, criterion=criterion)
+        if self.reranker is None:
+            return hits
+        with timings.stage("rerank"):
+            return self.reranker.rerank(query, hits, top_n=self.top_n, token_budget=self.token_budget)
+
+    def build_prompt(self, query: str, context: List[Dict[str, Any]]) -> Tuple[str, List[Dict[str, Any]]]:
+        """Prompt text plus the sources it was built from"""
+        if self.packer is not None:
+            packed = self.packer.pack(context, token_budget=self.token_budget)
+            return self.prompt_template.format(context=packed["text"], question=query), packed["spans"]
+        sources = [
+            {"chunk_ids": [c["chunk_id"]], "source": c.get("metadata", {}).get("source"), "score": c.get("rerank_score", c.get("score"))}
+            for c in context
+        ]
+        return self.prompt_template.format(context="\n\n".join(c["content"] for c in context), question=query), sources
+
+    def prepare(self, query: str, criterion: Optional[int] = None, timings: Optional[StageTimings] = None) -> Dict[str, Any]:
+        """Retrieve, rerank and pack up to the prompt, for callers that run generation themselves"""
+        timings = timings or StageTimings()
+        context = self.select_context(query, criterion, timings)
+        with timings.stage("prompt"):
+            prompt, sources = self.build_prompt(query, context)
+        count_tokens = self.packer.count_tokens if self.packer is not None else estimate_tokens
+        return {"prompt": prompt, "sources": sources, "prompt_tokens": count_tokens(prompt)}
+
+    def answer(self, query: str, criterion: Optional[int] = None) -> Dict[str, Any]:
+        timings = StageTimings()
+        prepared = self.prepare(query, criterion, timings)
+        with timings.stage("generate"):
+            answer = self.generate_fn(prepared["prompt"])
+        return {
+            "answer": answer,
+            "sources": prepared["sources"],
+            "prompt_tokens": prepared["prompt_tokens"],
+            "timings_ms": timings.as_dict(),
+        }
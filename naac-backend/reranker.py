@@ -0,0 +1,111 @@
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Any, List, Optional, Sequence, Tuple
+
+DEFAULT_RERANK_MODEL = os.getenv("NAAC_RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token for English prose)"""
+    return max(1, len(text) // 4)
+
+
+class CrossEncoderReranker:
+    """Scores retrieved chunks against the query with a cross-encoder in one batched CPU pass"""
+
+    def __init__(
+        self,
+        model_name: str = DEFAULT_RERANK_MODEL,
+        cache_size: int = 10000,
+        max_length: int = 512,
+        scorer: Optional[Callable[[List[Tuple[str, str]]], Sequence[float]]] = None,
+    ):
+        self.model_name = model_name
+        self.cache_size = cache_size
+        self.max_length = max_length
+        # A custom scorer replaces the model entirely (used with local stand-ins)
+        self._scorer = scorer
+        self._model = None
+        self._load_error: Optional[Exception] = None
+        self._model_lock = threading.Lock()
+        self._cache: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+    def _load_model(self):
+        # Imported lazily: torch + sentence-transformers add seconds to startup
+        with self._model_lock:
+            if self._model is None and self._load_error is None:
+                try:
+                    from sentence_transformers import CrossEncoder
+                    self._model = CrossEncoder(self.model_name, max_length=self.max_length, device="cpu")
+                except Exception as e:
+                    # Not retried: a missing package or model would cost the import on every request
+                    print(f"Cross-encoder {self.model_name} unavailable, keeping retrieval order: {e}")
+                    self._load_error = e
+            if self._load_error is not None:
+                raise self._load_error
+        return self._model
+
+    def _score_pairs(self, pairs: List[Tuple[str, str]]) -> List[float]:
+        if self._scorer is not None:
+            return [float(s) for s in self._scorer(pairs)]
+        model = self._load_model()
+        # batch_size=len(pairs): every candidate goes through a single forward pass
+        return [float(s) for s in model.predict(pairs, batch_size=len(pairs), show_progress_bar=False)]
+
+    def score(self, query: str, candidates: List[Dict[str, Any]]) -> List[float]:
+        """Relevance score per candidate, reusing cached (query-hash, chunk_id) scores"""
+        query_hash = hashlib.sha1(query.strip().lower().encode("utf-8")).hexdigest()
+        scores: List[Optional[float]] = [None] * len(candidates)
+        missing = []
+        with self._cache_lock:
+            for i, candidate in enumerate(candidates):
+                key = (query_hash, candidate["chunk_id"])
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    scores[i] = self._cache[key]
+                else:
+                    missing.append(i)
+
+        if missing:
+            fresh = self._score_pairs([(query, candidates[i]["content"]) for i in missing])
+            with self._cache_lock:
+                for i, value in zip(missing, fresh):
+                    scores[i] = value
+                    self._cache[(query_hash, candidates[i]["chunk_id"])] = value
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return scores
+
+    def rerank(
+        self,
+        query: str,
+        candidates: List[Dict[str, Any]],
+        top_n: int = 4,
+        token_budget: Optional[int] = None,
+        count_tokens: Callable[[str], int] = estimate_tokens,
+    ) -> List[Dict[str, Any]]:
+        """Return at most top_n candidates, best first, whose combined text fits token_budget"""
+        if not candidates:
+            return []
+        try:
+            scores = self.score(query, candidates)
+            ranked = sorted(zip(candidates, scores), key=lambda item: item[1], reverse=True)
+        except Exception as e:
+            # Without scores the retriever's order still gives a usable (if longer-tailed) context
+            if e is not self._load_error:
+                print(f"Reranking failed, keeping retrieval order: {e}")
+            ranked = [(candidate, None) for candidate in candidates]
+
+        selected, used = [], 0
+        for candidate, score in ranked:
+            if len(selected) >= top_n:
+                break
+            tokens = count_tokens(candidate["content"])
+            if token_budget is not None and used + tokens > token_budget:
+                continue
+            used += tokens
+            selected.append({**candidate, "rerank_score": score} if score is not None else candidate)
+        return selected
@@ -0,0 +1,186 @@
+import os
+import gzip
+import json
+import zlib
+import threading
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", 1024))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", 6))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", 5))
+# Event streams must reach the client per event; everything else text-like is worth compressing
+COMPRESSIBLE_TYPES = ("application/json", "text/plain", "text/markdown", "text/html", "text/csv",
+                      "application/javascript", "text/css", "application/xml", "image/svg+xml")
+
+
+def dumps(content: Any) -> bytes:
+    """JSON bytes for a response body: orjson when installed, otherwise the stdlib with the same output"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+        except TypeError:
+            # Types orjson refuses (e.g. ints above 64 bits) fall through to the stdlib encoder
+            pass
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":"), default=str).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """Default response class: FastAPI's JSONResponse with the faster encoder"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Preferred content coding the client accepts: br (if available), then gzip"""
+    offered = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        offered[name.strip()] = quality
+    if brotli is not None and offered.get("br", 0) > 0:
+        return "br"
+    if offered.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+class _EncodedBodyCache:
+    """Compressed bodies of responses that carry an ETag, keyed by (ETag, coding)"""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[bytes, str], bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key) -> Optional[bytes]:
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+            return body
+
+    def put(self, key, body: bytes):
+        with self._lock:
+            self._entries[key] = body
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class _StreamCompressor:
+    def __init__(self, encoding: str):
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+            self._compress, self._flush, self._finish = self._compressor.process, self._compressor.flush, self._compressor.finish
+        else:
+            self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            self._compress = self._compressor.compress
+            self._flush = lambda: self._compressor.flush(zlib.Z_SYNC_FLUSH)
+            self._finish = self._compressor.flush
+
+    def chunk(self, data: bytes, more: bool) -> bytes:
+        out = self._compress(data)
+        return out + (self._flush() if more else self._finish())
+
+
+class CompressionMiddleware:
+    """ASGI middleware negotiating gzip/brotli by Accept-Encoding, size and content type
+
+    Responses that already carry a Content-Encoding (pre-compressed guidance
+    bodies) pass through untouched. Compressed copies of ETagged responses are
+    cached, so static bodies are compressed once rather than per request.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESS_MIN_BYTES, cache_entries: int = 256):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.cache = _EncodedBodyCache(cache_entries)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        accept = ""
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept = value.decode("latin-1")
+                break
+        encoding = choose_encoding(accept) if accept else None
+        if encoding is None:
+            return await self.app(scope, receive, send)
+
+        state = {"start": None, "compressor": None, "passthrough": False}
+
+        async def send_compressed(message):
+            if message["type"] == "http.response.start":
+                state["start"] = message
+                return
+            if state["passthrough"]:
+                return await send(message)
+            if message["type"] != "http.response.body":
+                # Zero-copy file sends (pathsend / zerocopysend) go out as they are
+                state["passthrough"] = True
+                await send(state["start"])
+                return await send(message)
+
+            start = state["start"]
+            body = message.get("body", b"")
+            more = message.get("more_body", False)
+            if state["compressor"] is not None:
+                return await send({"type": "http.response.body", "body": state["compressor"].chunk(body, more), "more_body": more})
+
+            headers = {k.lower(): v for k, v in start["headers"]}
+            content_type = headers.get(b"content-type", b"").decode("latin-1").split(";")[0].strip()
+            # Byte-range capable downloads must keep identity offsets, so they are never re-encoded here
+            if (b"content-encoding" in headers or b"accept-ranges" in headers or content_type not in COMPRESSIBLE_TYPES
+                    or (not more and len(body) < self.minimum_size) or start["status"] in (204, 304)):
+                state["passthrough"] = True
+                await send(start)
+                return await send(message)
+
+            raw_headers = [(k, v) for k, v in start["headers"] if k.lower() not in (b"content-length", b"content-encoding")]
+            raw_headers += [(b"content-encoding", encoding.encode()), (b"vary", b"Accept-Encoding")]
+            if more:
+                # Streamed body: compress chunk by chunk, flushing so each chunk is decodable on arrival
+                state["compressor"] = _StreamCompressor(encoding)
+                await send({**start, "headers": raw_headers})
+                return await send({"type": "http.response.body", "body": state["compressor"].chunk(body, more), "more_body": True})
+
+            etag = headers.get(b"etag")
+            compressed = self.cache.get((etag, encoding)) if etag else None
+            if compressed is None:
+                compressed = compress(body, encoding)
+                if etag:
+                    self.cache.put((etag, encoding), compressed)
+            if len(compressed) >= len(body):
+                state["passthrough"] = True
+                await send(start)
+                return await send(message)
+            raw_headers.append((b"content-length", str(len(compressed)).encode()))
+            await send({**start, "headers": raw_headers})
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_compressed)
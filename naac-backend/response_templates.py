@@ -0,0 +1,166 @@
+import os
+import gzip
+import json
+import hashlib
+import threading
+from typing import Dict, List, Optional
+
+from fastapi import Request, Response
+
+from response_encoding import choose_encoding
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+GUIDANCE_DIR = os.getenv("NAAC_GUIDANCE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "guidance"))
+MESSAGE_PLACEHOLDER = "{message}"
+DEFAULT_TEMPLATE_ID = "default"
+GUIDANCE_CACHE_CONTROL = "public, max-age=3600"
+
+
+def _json_fragment(value) -> bytes:
+    # Same encoding as FastAPI's JSONResponse
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class CachedBody:
+    """A response body serialized once, with its compressed variants and ETag"""
+
+    def __init__(self, body: bytes, media_type: str = "application/json"):
+        self.body = body
+        self.media_type = media_type
+        self.etag = '"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+        self.gzip = gzip.compress(body, compresslevel=9, mtime=0)
+        self.br = brotli.compress(body, quality=11) if brotli is not None else None
+
+    def respond(self, request: Request, cache_control: str = GUIDANCE_CACHE_CONTROL) -> Response:
+        headers = {"ETag": self.etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+        if self.etag in request.headers.get("if-none-match", ""):
+            return Response(status_code=304, headers=headers)
+        encoding = choose_encoding(request.headers.get("accept-encoding", ""))
+        if encoding == "br" and self.br is not None:
+            headers["Content-Encoding"] = "br"
+            return Response(self.br, media_type=self.media_type, headers=headers)
+        if encoding in ("br", "gzip"):
+            # br without the brotli package is never chosen; gzip when the client takes both
+            headers["Content-Encoding"] = "gzip"
+            return Response(self.gzip, media_type=self.media_type, headers=headers)
+        return Response(self.body, media_type=self.media_type, headers=headers)
+
+
+class ResponseTemplate:
+    """One guidance answer loaded from a data file, with its chat-response JSON pre-serialized"""
+
+    def __init__(self, template_id: str, title: str, keywords: List[str], confidence: float, sources: List[str], body: str):
+        self.id = template_id
+        self.title = title
+        self.keywords = keywords
+        self.confidence = confidence
+        self.sources = sources
+        self.body = body
+        self.dynamic = MESSAGE_PLACEHOLDER in body
+        tail = b',"confidence":' + _json_fragment(confidence) + b',"sources":' + _json_fragment(sources)
+        if self.dynamic:
+            # JSON string escaping is concatenative, so only the user's message is escaped per request
+            before, after = body.split(MESSAGE_PLACEHOLDER, 1)
+            self._head = b'{"response":' + _json_fragment(before)[:-1]
+            self._tail = _json_fragment(after)[1:] + tail
+        else:
+            self._head = b'{"response":' + _json_fragment(body) + tail
+            self._tail = b""
+        self.guidance = CachedBody(_json_fragment({
+            "id": template_id,
+            "title": title,
+            "response": body,
+            "confidence": confidence,
+            "sources": sources,
+            "keywords": keywords,
+        }))
+
+    def matches(self, message_lower: str) -> bool:
+        return any(word in message_lower for word in self.keywords)
+
+    def text(self, message: str) -> str:
+        return self.body.replace(MESSAGE_PLACEHOLDER, message, 1) if self.dynamic else self.body
+
+    def chat_body(self, message: str, session_id: str, timestamp: str) -> bytes:
+        """The /api/chat/message JSON body, built from pre-serialized pieces"""
+        head = self._head
+        if self.dynamic:
+            head += _json_fragment(message)[1:-1] + self._tail
+        return head + b',"timestamp":' + _json_fragment(timestamp) + b',"session_id":' + _json_fragment(session_id) + b"}"
+
+
+def parse_template_file(path: str) -> ResponseTemplate:
+    """A guidance file: a ``---`` header of ``key: value`` lines, then the markdown answer"""
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read()
+    _, header, body = text.split("---\n", 2)
+    fields = {}
+    for line in header.splitlines():
+        key, _, value = line.partition(":")
+        fields[key.strip()] = value.strip()
+    return ResponseTemplate(
+        template_id=fields.get("id") or os.path.splitext(os.path.basename(path))[0],
+        title=fields.get("title", ""),
+        keywords=[k.strip().lower() for k in fields.get("keywords", "").split(",") if k.strip()],
+        confidence=float(fields.get("confidence", 0.9)),
+        sources=[s.strip() for s in fields.get("sources", "").split(";") if s.strip()],
+        body=body[:-1] if body.endswith("\n") else body,
+    )
+
+
+class TemplateCache:
+    """Criterion and SSR guidance answers, loaded from GUIDANCE_DIR once
+
+    Files are matched in filename order (hence the numeric prefixes), first
+    keyword hit wins, and the ``default`` template answers everything else.
+    New criteria are added by dropping in another file.
+    """
+
+    def __init__(self, directory: str = GUIDANCE_DIR):
+        self.directory = directory
+        self._templates: Optional[List[ResponseTemplate]] = None
+        self._by_id: Dict[str, ResponseTemplate] = {}
+        self._index: Optional[CachedBody] = None
+        self._lock = threading.Lock()
+
+    def load(self) -> List[ResponseTemplate]:
+        with self._lock:
+            if self._templates is None:
+                templates = [
+                    parse_template_file(os.path.join(self.directory, name))
+                    for name in sorted(os.listdir(self.directory))
+                    if name.endswith(".md")
+                ]
+                self._by_id = {t.id: t for t in templates}
+                if DEFAULT_TEMPLATE_ID not in self._by_id:
+                    raise ValueError(f"No '{DEFAULT_TEMPLATE_ID}' template in {self.directory}")
+                self._index = CachedBody(_json_fragment({
+                    "topics": [{"id": t.id, "title": t.title, "keywords": t.keywords} for t in templates],
+                }))
+                self._templates = templates
+        return self._templates
+
+    def match(self, message: str) -> ResponseTemplate:
+        message_lower = message.lower()
+        for template in self._templates or self.load():
+            if template.id != DEFAULT_TEMPLATE_ID and template.matches(message_lower):
+                return template
+        return self._by_id[DEFAULT_TEMPLATE_ID]
+
+    def get(self, template_id: str) -> Optional[ResponseTemplate]:
+        if self._templates is None:
+            self.load()
+        return self._by_id.get(template_id)
+
+    def index(self) -> CachedBody:
+        if self._templates is None:
+            self.load()
+        return self._index
+
+
+# Global instance
+template_cache = TemplateCache()
@@ -0,0 +1,334 @@
+import os
+import re
+import html
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional
+
+from database import SQLITE_PATH
+from hybrid_retrieval import reciprocal_rank_fusion
+
+TOKENIZER = "porter unicode61 remove_diacritics 2"
+# Documents get a rowid block each, so re-indexing one is a cheap rowid-range delete
+CHUNK_ROWID_BITS = 20
+# bm25 has to score every candidate, so relevance ranks only the newest N matches of a query;
+# rare terms never reach the window and common ones cost the same at 100k rows or 50M
+RANK_WINDOW = int(os.getenv("SEARCH_RANK_WINDOW", 10000))
+# Deep relevance pages are capped; page "recent" results with before_id instead
+MAX_OFFSET = 1000
+SNIPPET_TOKENS = 16
+# Private-use markers, swapped for <mark> after the snippet text is HTML-escaped
+_HL_START, _HL_END = "\ue000", "\ue001"
+
+_ANSWER = "COALESCE({row}.ai_response, (SELECT body FROM chat_responses WHERE id = {row}.response_id))"
+SEARCH_DDL = [
+    # Answers live inline (older rows) or in chat_responses; the view gives FTS5 one text column either way
+    """CREATE VIEW IF NOT EXISTS chat_search_content AS
+        SELECT q.id, q.user_query, COALESCE(q.ai_response, r.body) AS ai_response, q.session_id
+        FROM user_queries q LEFT JOIN chat_responses r ON r.id = q.response_id""",
+    # External content: the index stores only postings, the text stays in user_queries / chat_responses
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS chat_search USING fts5(
+        user_query, ai_response, session_id,
+        content='chat_search_content', content_rowid='id', tokenize='{TOKENIZER}')""",
+    f"""CREATE TRIGGER IF NOT EXISTS user_queries_search_insert AFTER INSERT ON user_queries BEGIN
+        INSERT INTO chat_search(rowid, user_query, ai_response, session_id)
+        VALUES (new.id, new.user_query, {_ANSWER.format(row="new")}, new.session_id);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS user_queries_search_delete AFTER DELETE ON user_queries BEGIN
+        INSERT INTO chat_search(chat_search, rowid, user_query, ai_response, session_id)
+        VALUES ('delete', old.id, old.user_query, {_ANSWER.format(row="old")}, old.session_id);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS user_queries_search_update
+    AFTER UPDATE OF user_query, ai_response, response_id, session_id ON user_queries BEGIN
+        INSERT INTO chat_search(chat_search, rowid, user_query, ai_response, session_id)
+        VALUES ('delete', old.id, old.user_query, {_ANSWER.format(row="old")}, old.session_id);
+        INSERT INTO chat_search(rowid, user_query, ai_response, session_id)
+        VALUES (new.id, new.user_query, {_ANSWER.format(row="new")}, new.session_id);
+    END""",
+    # Extracted document text only exists in the job worker, which writes it here chunk by chunk
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS document_search USING fts5(
+        content, original_filename, session_id, document_id UNINDEXED, chunk_index UNINDEXED,
+        tokenize='{TOKENIZER}')""",
+]
+
+
+def create_search_tables(sync_conn):
+    """Create the FTS5 tables and sync triggers, backfilling chat history the first time"""
+    existing = sync_conn.exec_driver_sql(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'chat_search'"
+    ).first()
+    exists = existing is not None and "chat_search_content" in existing[0]
+    if existing is not None and not exists:
+        # Indexed straight from user_queries before answers moved to chat_responses: rebuild over the view
+        for trigger in ("insert", "delete", "update"):
+            sync_conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS user_queries_search_{trigger}")
+        sync_conn.exec_driver_sql("DROP TABLE chat_search")
+    for ddl in SEARCH_DDL:
+        sync_conn.exec_driver_sql(ddl)
+    # Persistent rank functions: a hit in the question outranks one in the answer, filenames count for half
+    sync_conn.exec_driver_sql("INSERT INTO chat_search(chat_search, rank) VALUES ('rank', 'bm25(2.0, 1.0, 0.0)')")
+    sync_conn.exec_driver_sql("INSERT INTO document_search(document_search, rank) VALUES ('rank', 'bm25(1.0, 0.5, 0.0)')")
+    if not exists:
+        sync_conn.exec_driver_sql("INSERT INTO chat_search(chat_search) VALUES ('rebuild')")
+
+
+_TERM_RE = re.compile(r'"([^"]+)"|(\w+\*?)', re.UNICODE)
+
+
+def build_match_query(text: str, any_terms: bool = False) -> Optional[str]:
+    """FTS5 MATCH expression from free text: every word (or any, for any_terms) must match, "quoted phrases" and prefix* kept"""
+    terms = []
+    for phrase, word in _TERM_RE.findall(text):
+        if phrase:
+            tokens = re.findall(r"\w+", phrase, re.UNICODE)
+            if tokens:
+                terms.append('"' + " ".join(tokens) + '"')
+        elif word.endswith("*"):
+            terms.append(f'"{word[:-1]}"*')
+        else:
+            terms.append(f'"{word}"')
+    return (" OR " if any_terms else " ").join(terms) if terms else None
+
+
+def _session_phrase(session_id: str) -> str:
+    # Narrows the match inside the index; the exact comparison is done on the few rows that survive
+    tokens = re.findall(r"\w+", session_id, re.UNICODE)
+    return '"' + " ".join(tokens) + '"' if tokens else '""'
+
+
+def _highlight(snippet: Optional[str]) -> str:
+    return html.escape(snippet or "").replace(_HL_START, "<mark>").replace(_HL_END, "</mark>")
+
+
+class SearchIndex:
+    """Ranked full-text search over chat history and uploaded document text (SQLite FTS5)
+
+    Chat rows are indexed by triggers on user_queries; document chunks are
+    written by the job worker. Relevance uses bm25 with the question weighted
+    above the answer, over at most RANK_WINDOW of the newest matches; "recent"
+    walks the index in rowid order and stops after one page. Either way the
+    cost is bounded by the page or the window, not by the table size.
+    """
+
+    def __init__(self, path: str = SQLITE_PATH):
+        self.path = path
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10.0, isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA busy_timeout=5000")
+            self._local.conn = conn
+        return conn
+
+    def index_document(self, document_id: int, original_filename: str, session_id: Optional[str], chunks: List[Dict[str, Any]]):
+        """Replace a document's chunks in the index (safe to repeat when a job is retried)"""
+        base = document_id << CHUNK_ROWID_BITS
+        rows = [
+            (base + i, chunk.get("content", ""), original_filename, session_id or "", document_id, i)
+            for i, chunk in enumerate(chunks[: 1 << CHUNK_ROWID_BITS])
+        ]
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM document_search WHERE rowid BETWEEN ? AND ?", (base, base + (1 << CHUNK_ROWID_BITS) - 1))
+            conn.executemany(
+                "INSERT INTO document_search(rowid, content, original_filename, session_id, document_id, chunk_index) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _rank_floor(self, table: str, expression: str) -> Optional[int]:
+        """Lowest rowid among the newest RANK_WINDOW matches, or None when there are fewer"""
+        row = self._conn().execute(
+            f"SELECT rowid FROM {table} WHERE {table} MATCH ? ORDER BY rowid DESC LIMIT 1 OFFSET ?",
+            (expression, RANK_WINDOW - 1),
+        ).fetchone()
+        return row[0] if row else None
+
+    def _search_chat(self, match: str, session_id: Optional[str], sort: str, limit: int, offset: int,
+                     before_id: Optional[int]) -> List[Dict[str, Any]]:
+        where, params = ["chat_search MATCH ?"], []
+        expression = f"{{user_query ai_response}} : ({match})"
+        if session_id:
+            expression += f" AND session_id : {_session_phrase(session_id)}"
+            where.append("q.session_id = ?")
+            params.append(session_id)
+        if before_id is not None:
+            where.append("chat_search.rowid < ?")
+            params.append(before_id)
+        floor = self._rank_floor("chat_search", expression) if sort == "relevance" else None
+        if floor is not None:
+            where.append("chat_search.rowid >= ?")
+            params.append(floor)
+        order = "rank" if sort == "relevance" else "chat_search.rowid DESC"
+        rows = self._conn().execute(
+            f"""
+            SELECT q.id, q.session_id, q.created_at, chat_search.rank AS score,
+                   snippet(chat_search, 0, ?1, ?2, '…', {SNIPPET_TOKENS * 2}) AS question,
+                   snippet(chat_search, 1, ?1, ?2, '…', {SNIPPET_TOKENS}) AS snippet
+            FROM chat_search JOIN user_queries q ON q.id = chat_search.rowid
+            WHERE {" AND ".join(where)}
+            ORDER BY {order}
+            LIMIT ? OFFSET ?
+            """,
+            (_HL_START, _HL_END, expression, *params, limit, offset),
+        ).fetchall()
+        return [
+            {
+                "type": "chat",
+                "id": row["id"],
+                "session_id": row["session_id"],
+                "question": _highlight(row["question"]),
+                "snippet": _highlight(row["snippet"]),
+                "created_at": row["created_at"],
+                "score": round(-row["score"], 6),
+            }
+            for row in rows
+        ]
+
+    def _search_documents(self, match: str, session_id: Optional[str], sort: str, limit: int, offset: int,
+                          before_id: Optional[int]) -> List[Dict[str, Any]]:
+        where, params = ["document_search MATCH ?"], []
+        expression = f"{{content original_filename}} : ({match})"
+        if session_id:
+            expression += f" AND session_id : {_session_phrase(session_id)}"
+            where.append("session_id = ?")
+            params.append(session_id)
+        if before_id is not None:
+            where.append("rowid < ?")
+            params.append(before_id)
+        floor = self._rank_floor("document_search", expression) if sort == "relevance" else None
+        if floor is not None:
+            where.append("rowid >= ?")
+            params.append(floor)
+        order = "rank" if sort == "relevance" else "rowid DESC"
+        rows = self._conn().execute(
+            f"""
+            SELECT rowid, document_id, chunk_index, original_filename, session_id, rank AS score,
+                   snippet(document_search, 0, ?, ?, '…', {SNIPPET_TOKENS}) AS snippet
+            FROM document_search
+            WHERE {" AND ".join(where)}
+            ORDER BY {order}
+            LIMIT ? OFFSET ?
+            """,
+            (_HL_START, _HL_END, expression, *params, limit, offset),
+        ).fetchall()
+        return [
+            {
+                "type": "document",
+                "id": row["rowid"],
+                "document_id": row["document_id"],
+                "chunk_index": row["chunk_index"],
+                "filename": row["original_filename"],
+                "session_id": row["session_id"] or None,
+                "snippet": _highlight(row["snippet"]),
+                "score": round(-row["score"], 6),
+            }
+            for row in rows
+        ]
+
+    def search(self, query: str, scope: str = "all", session_id: Optional[str] = None, sort: str = "relevance",
+               limit: int = 20, offset: int = 0, before_id: Optional[int] = None, any_terms: bool = False) -> Dict[str, Any]:
+        """One page of results; ``next_before_id`` continues a "recent" listing"""
+        if scope not in ("all", "chat", "documents"):
+            raise ValueError("scope must be one of: all, chat, documents")
+        if sort not in ("relevance", "recent"):
+            raise ValueError("sort must be one of: relevance, recent")
+        if sort == "recent" and scope == "all":
+            raise ValueError("sort=recent needs scope=chat or scope=documents")
+        if offset > MAX_OFFSET:
+            raise ValueError(f"offset may not exceed {MAX_OFFSET}; use sort=recent with before_id to page further")
+        limit = max(1, min(limit, 100))
+        page = {"query": query, "scope": scope, "sort": sort, "limit": limit, "offset": offset, "results": [],
+                "has_more": False, "next_before_id": None}
+        match = build_match_query(query, any_terms)
+        if match is None:
+            return page
+
+        # One extra row tells whether there is another page without counting every match
+        ranked = []
+        if scope in ("all", "chat"):
+            ranked.append(self._search_chat(match, session_id, sort, offset + limit + 1 if scope == "all" else limit + 1,
+                                            0 if scope == "all" else offset, before_id))
+        if scope in ("all", "documents"):
+            ranked.append(self._search_documents(match, session_id, sort, offset + limit + 1 if scope == "all" else limit + 1,
+                                                 0 if scope == "all" else offset, before_id))
+        if scope == "all":
+            # bm25 depends on each table's own document count and average length, so the two scores are not
+            # comparable; merge by rank instead. The first n fused results need at most n rows from each table.
+            by_key = {f"{r['type']}:{r['id']}": r for results in ranked for r in results}
+            fused = reciprocal_rank_fusion([[(f"{r['type']}:{r['id']}", r["score"]) for r in results] for results in ranked])
+            results = [by_key[key] for key, _ in fused][offset:]
+        else:
+            results = ranked[0]
+
+        page["has_more"] = len(results) > limit
+        page["results"] = results[:limit]
+        if sort == "recent" and page["has_more"]:
+            page["next_before_id"] = page["results"][-1]["id"]
+        return page
+
+    def document_chunks(self, query: str, session_id: Optional[str] = None, limit: int = 12) -> List[Dict[str, Any]]:
+        """Best-matching document chunks with their full text, in the shape RAGPipeline retrievers return"""
+        match = build_match_query(query, any_terms=True)
+        if match is None:
+            return []
+        where, params = ["document_search MATCH ?"], []
+        expression = f"{{content original_filename}} : ({match})"
+        if session_id:
+            expression += f" AND session_id : {_session_phrase(session_id)}"
+            where.append("session_id = ?")
+            params.append(session_id)
+        floor = self._rank_floor("document_search", expression)
+        if floor is not None:
+            where.append("rowid >= ?")
+            params.append(floor)
+        rows = self._conn().execute(
+            f"""
+            SELECT document_id, chunk_index, original_filename, content, rank AS score
+            FROM document_search
+            WHERE {" AND ".join(where)}
+            ORDER BY rank
+            LIMIT ?
+            """,
+            (expression, *params, limit),
+        ).fetchall()
+        return [
+            {
+                "chunk_id": f"{row['document_id']}:{row['chunk_index']}",
+                "content": row["content"],
+                "score": round(-row["score"], 6),
+                "metadata": {"source": f"document:{row['document_id']}", "filename": row["original_filename"],
+                             "chunk_index": row["chunk_index"]},
+            }
+            for row in rows
+        ]
+
+    def optimize(self):
+        """Merge FTS5 segments into one b-tree; worth running after bulk loads"""
+        conn = self._conn()
+        conn.execute("INSERT INTO chat_search(chat_search) VALUES ('optimize')")
+        conn.execute("INSERT INTO document_search(document_search) VALUES ('optimize')")
+
+
+class DocumentRetriever:
+    """One session's uploaded documents as a RAGPipeline retriever"""
+
+    def __init__(self, index: SearchIndex, session_id: Optional[str] = None):
+        self.index = index
+        self.session_id = session_id
+
+    def search(self, query: str, top_k: int = 4, criterion: Optional[int] = None) -> List[Dict[str, Any]]:
+        # Uploaded chunks are not tagged by criterion, so criterion is not used to filter
+        return self.index.document_chunks(query, self.session_id, limit=top_k)
+
+
+# Global instance
+search_index = SearchIndex()
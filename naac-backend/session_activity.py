@@ -0,0 +1,230 @@
+import math
+import asyncio
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+import database
+from models import UserSession
+
+
+class _SessionEntry:
+    __slots__ = ("session_id", "total_queries", "total_uploads", "pending_queries", "pending_uploads",
+                 "first_activity", "last_activity", "ip_address", "user_agent", "is_active", "loaded", "slot")
+
+    def __init__(self, session_id: str, now: datetime):
+        self.session_id = session_id
+        # Totals are only known once the persisted row has been read; pending_* are not yet flushed
+        self.total_queries = 0
+        self.total_uploads = 0
+        self.pending_queries = 0
+        self.pending_uploads = 0
+        self.first_activity = now
+        self.last_activity = now
+        self.ip_address = None
+        self.user_agent = None
+        self.is_active = True
+        self.loaded = False
+        self.slot: Optional[int] = None
+
+
+class SessionActivityTracker:
+    """Live per-session counters in an in-memory LRU, flushed to user_sessions in batches
+
+    ``record`` is O(1) and does no I/O. Dirty sessions are upserted with
+    additive deltas every ``flush_interval_s`` (so several workers can share the
+    table), and idle sessions are expired through a timer wheel rather than by
+    scanning the table.
+    """
+
+    def __init__(self, max_sessions: int = 10000, flush_interval_s: float = 2.0,
+                 idle_timeout_s: float = 1800.0, wheel_tick_s: float = 10.0):
+        self.max_sessions = max_sessions
+        self.flush_interval_s = flush_interval_s
+        self.idle_timeout_s = idle_timeout_s
+        self.wheel_tick_s = wheel_tick_s
+        self._sessions: "OrderedDict[str, _SessionEntry]" = OrderedDict()
+        self._dirty: Set[str] = set()
+        # Entries dropped from memory (idle or LRU-evicted) that still owe a final write
+        self._evicted: List[_SessionEntry] = []
+        # Timer wheel: a session touched now expires ticks_to_idle slots ahead of the cursor
+        self._ticks_to_idle = max(1, math.ceil(idle_timeout_s / wheel_tick_s))
+        self._wheel: List[Set[str]] = [set() for _ in range(self._ticks_to_idle + 1)]
+        self._cursor = 0
+        self._db_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.counters = {"flushes": 0, "rows_flushed": 0, "expired": 0, "evicted": 0}
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def _schedule(self, entry: _SessionEntry):
+        if entry.slot is not None:
+            self._wheel[entry.slot].discard(entry.session_id)
+        entry.slot = (self._cursor + self._ticks_to_idle) % len(self._wheel)
+        self._wheel[entry.slot].add(entry.session_id)
+
+    def _drop(self, session_id: str, expired: bool):
+        entry = self._sessions.pop(session_id)
+        if entry.slot is not None:
+            self._wheel[entry.slot].discard(session_id)
+        self._dirty.discard(session_id)
+        if expired:
+            entry.is_active = False
+            self.counters["expired"] += 1
+        else:
+            self.counters["evicted"] += 1
+        self._evicted.append(entry)
+
+    def record(self, session_id: str, kind: str = "query", ip_address: Optional[str] = None, user_agent: Optional[str] = None):
+        """Count one chat query or upload for a session"""
+        now = datetime.utcnow()
+        entry = self._sessions.get(session_id)
+        if entry is None:
+            entry = _SessionEntry(session_id, now)
+            self._sessions[session_id] = entry
+            if len(self._sessions) > self.max_sessions:
+                self._drop(next(iter(self._sessions)), expired=False)
+        else:
+            self._sessions.move_to_end(session_id)
+        if kind == "upload":
+            entry.pending_uploads += 1
+            entry.total_uploads += 1
+        else:
+            entry.pending_queries += 1
+            entry.total_queries += 1
+        entry.last_activity = now
+        entry.is_active = True
+        entry.ip_address = ip_address or entry.ip_address
+        entry.user_agent = user_agent or entry.user_agent
+        self._dirty.add(session_id)
+        self._schedule(entry)
+
+    def tick(self):
+        """Advance the wheel one slot and expire the sessions that fall due"""
+        self._cursor = (self._cursor + 1) % len(self._wheel)
+        due, self._wheel[self._cursor] = self._wheel[self._cursor], set()
+        for session_id in due:
+            if session_id in self._sessions:
+                self._sessions[session_id].slot = None
+                self._drop(session_id, expired=True)
+
+    async def flush(self) -> int:
+        """Upsert every dirty session in one statement; returns the number of rows written"""
+        async with self._db_lock:
+            entries = self._evicted + [self._sessions[s] for s in self._dirty if s in self._sessions]
+            self._evicted, self._dirty = [], set()
+            if not entries:
+                return 0
+            rows = []
+            for entry in entries:
+                rows.append({
+                    "session_id": entry.session_id,
+                    "ip_address": entry.ip_address,
+                    "user_agent": (entry.user_agent or "")[:500] or None,
+                    "total_queries": entry.pending_queries,
+                    "total_uploads": entry.pending_uploads,
+                    "first_activity": entry.first_activity,
+                    "last_activity": entry.last_activity,
+                    "is_active": entry.is_active,
+                })
+                entry.pending_queries = entry.pending_uploads = 0
+            stmt = sqlite_insert(UserSession.__table__)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["session_id"],
+                set_={
+                    # Deltas, not totals: other workers may have counted the same session
+                    "total_queries": UserSession.__table__.c.total_queries + stmt.excluded.total_queries,
+                    "total_uploads": UserSession.__table__.c.total_uploads + stmt.excluded.total_uploads,
+                    "last_activity": stmt.excluded.last_activity,
+                    "ip_address": stmt.excluded.ip_address,
+                    "user_agent": stmt.excluded.user_agent,
+                    "is_active": stmt.excluded.is_active,
+                },
+            )
+            try:
+                await database.init_database()
+                async with database.async_engine.begin() as conn:
+                    await conn.execute(stmt, rows)
+            except Exception:
+                # Put the deltas back so the next flush retries them
+                for entry, row in zip(entries, rows):
+                    entry.pending_queries += row["total_queries"]
+                    entry.pending_uploads += row["total_uploads"]
+                    if entry.session_id in self._sessions:
+                        self._dirty.add(entry.session_id)
+                    else:
+                        self._evicted.append(entry)
+                raise
+            self.counters["flushes"] += 1
+            self.counters["rows_flushed"] += len(rows)
+            return len(rows)
+
+    async def get_stats(self, session_id: str) -> Optional[Dict]:
+        """SessionStats for a session: from memory, reading the persisted row at most once"""
+        entry = self._sessions.get(session_id)
+        if entry is not None and entry.loaded:
+            return self._as_stats(entry)
+        async with self._db_lock:
+            await database.init_database()
+            async with database.async_engine.connect() as conn:
+                row = (await conn.execute(
+                    select(UserSession.__table__).where(UserSession.session_id == session_id)
+                )).mappings().first()
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return self._row_as_stats(row) if row else None
+            if row is not None:
+                # The row already contains everything flushed; add what is still pending
+                entry.total_queries = (row["total_queries"] or 0) + entry.pending_queries
+                entry.total_uploads = (row["total_uploads"] or 0) + entry.pending_uploads
+                entry.first_activity = row["first_activity"] or entry.first_activity
+            entry.loaded = True
+            return self._as_stats(entry)
+
+    @staticmethod
+    def _as_stats(entry: _SessionEntry) -> Dict:
+        return {
+            "session_id": entry.session_id,
+            "total_queries": entry.total_queries,
+            "total_uploads": entry.total_uploads,
+            "first_activity": entry.first_activity,
+            "last_activity": entry.last_activity,
+        }
+
+    @staticmethod
+    def _row_as_stats(row) -> Dict:
+        return {
+            "session_id": row["session_id"],
+            "total_queries": row["total_queries"] or 0,
+            "total_uploads": row["total_uploads"] or 0,
+            "first_activity": row["first_activity"],
+            "last_activity": row["last_activity"] or row["first_activity"],
+        }
+
+    async def _run(self):
+        next_tick = self.wheel_tick_s
+        while True:
+            await asyncio.sleep(self.flush_interval_s)
+            next_tick -= self.flush_interval_s
+            while next_tick <= 0:
+                self.tick()
+                next_tick += self.wheel_tick_s
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"Session activity flush error: {e}")
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
@@ -0,0 +1,103 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from typing import Any, Dict, Optional
+
+DEFAULT_SHARED_STATE_PATH = os.getenv("NAAC_SHARED_STATE_PATH", "naac_shared_state.db")
+
+
+class SharedState:
+    """Key/value store, counters and leases shared by every uvicorn worker on the host
+
+    Backed by a local SQLite file in WAL mode: readers never block the single
+    writer, and each thread keeps one connection open, so a read is a
+    primary-key lookup without a connect.
+    """
+
+    def __init__(self, path: str = DEFAULT_SHARED_STATE_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialized = False
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._init_lock:
+                if not self._initialized:
+                    conn.execute(
+                        "CREATE TABLE IF NOT EXISTS shared_kv (key TEXT PRIMARY KEY, value, expires_at REAL)"
+                    )
+                    conn.execute(
+                        "CREATE TABLE IF NOT EXISTS shared_leases (name TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL)"
+                    )
+                    self._initialized = True
+        return conn
+
+    @staticmethod
+    def _decode(value):
+        # Counters are stored as SQLite numbers, everything else as JSON text
+        return json.loads(value) if isinstance(value, str) else value
+
+    def get(self, key: str, default: Any = None) -> Any:
+        row = self._conn().execute(
+            "SELECT value FROM shared_kv WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)", (key, time.time())
+        ).fetchone()
+        return self._decode(row[0]) if row else default
+
+    def get_prefix(self, prefix: str) -> Dict[str, Any]:
+        """All live entries whose key starts with prefix (per-worker publications)"""
+        rows = self._conn().execute(
+            "SELECT key, value FROM shared_kv WHERE key >= ? AND key < ? AND (expires_at IS NULL OR expires_at > ?)",
+            (prefix, prefix + "\uffff", time.time()),
+        ).fetchall()
+        return {key: self._decode(value) for key, value in rows}
+
+    def set(self, key: str, value: Any, ttl_s: Optional[float] = None):
+        expires_at = time.time() + ttl_s if ttl_s is not None else None
+        self._conn().execute(
+            "INSERT INTO shared_kv (key, value, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at",
+            (key, json.dumps(value, default=str), expires_at),
+        )
+
+    def delete(self, key: str):
+        self._conn().execute("DELETE FROM shared_kv WHERE key = ?", (key,))
+
+    def incr(self, key: str, amount: float = 1) -> float:
+        """Atomically add to a counter and return its new value"""
+        row = self._conn().execute(
+            "INSERT INTO shared_kv (key, value) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = shared_kv.value + excluded.value RETURNING value",
+            (key, amount),
+        ).fetchall()[0]
+        return row[0]
+
+    def acquire_lease(self, name: str, owner: str, ttl_s: float) -> bool:
+        """Take or renew a named lease; True while this owner holds it"""
+        now = time.time()
+        # fetchall() steps RETURNING statements to completion so the write lock is released at once
+        row = self._conn().execute(
+            "INSERT INTO shared_leases (name, owner, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+            "WHERE shared_leases.owner = excluded.owner OR shared_leases.expires_at < ? "
+            "RETURNING owner",
+            (name, owner, now + ttl_s, now),
+        ).fetchall()
+        return bool(row) and row[0][0] == owner
+
+    def release_lease(self, name: str, owner: str):
+        self._conn().execute("DELETE FROM shared_leases WHERE name = ? AND owner = ?", (name, owner))
+
+    def purge_expired(self):
+        self._conn().execute("DELETE FROM shared_kv WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),))
+
+
+# Global instance
+shared_state = SharedState()
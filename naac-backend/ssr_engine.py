@@ -0,0 +1,370 @@
+import os
+import re
+import html
+import json
+import time
+import asyncio
+import socket
+import hashlib
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import select, update, insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+import database
+from models import CriterionInput, SSRReport, SSRSectionCache
+from search_index import search_index
+
+CRITERIA = {
+    "1": "Curricular Aspects",
+    "2": "Teaching-Learning and Evaluation",
+    "3": "Research, Innovations and Extension",
+    "4": "Infrastructure and Learning Resources",
+    "5": "Student Support and Progression",
+    "6": "Governance, Leadership and Management",
+    "7": "Institutional Values and Best Practices",
+}
+
+# Same sub-criteria as the SSRGenerator page
+SUB_CRITERIA = {
+    "1": [("1.1", "Curricular Planning and Implementation"), ("1.2", "Academic Flexibility"), ("1.3", "Curriculum Enrichment"), ("1.4", "Feedback System")],
+    "2": [("2.1", "Student Enrollment and Profile"), ("2.2", "Student Teacher Ratio"), ("2.3", "Teaching- Learning Process"),
+          ("2.4", "Teacher Profile and Quality"), ("2.5", "Evaluation Process and Reforms"), ("2.6", "Student Performance and Learning Outcomes")],
+    "3": [("3.1", "Resource Mobilization for Research"), ("3.2", "Innovation Ecosystem"), ("3.3", "Research Publications and Awards"),
+          ("3.4", "Extension Activities"), ("3.5", "Collaboration")],
+    "4": [("4.1", "Physical Facilities"), ("4.2", "Library as a Learning Resource"), ("4.3", "IT Infrastructure"), ("4.4", "Maintenance of Campus Infrastructure")],
+    "5": [("5.1", "Student Support"), ("5.2", "Student Progression"), ("5.3", "Student Participation and Activities"), ("5.4", "Alumni Engagement")],
+    "6": [("6.1", "Institutional Vision and Leadership"), ("6.2", "Strategy Development and Deployment"), ("6.3", "Faculty Empowerment Strategies"),
+          ("6.4", "Financial Management and Resource Mobilization"), ("6.5", "Internal Quality Assurance System")],
+    "7": [("7.1", "Institutional Values and Social Responsibilities"), ("7.2", "Best Practices"), ("7.3", "Institutional Distinctiveness")],
+}
+SUB_CRITERION_TITLES = {sub: title for subs in SUB_CRITERIA.values() for sub, title in subs}
+
+# Bump when the prompt or the section layout changes, so cached sections are regenerated
+SECTION_FORMAT_VERSION = 1
+SSR_OUTPUT_DIR = os.getenv("SSR_OUTPUT_DIR", os.path.join("data", "ssr"))
+EVIDENCE_PER_SECTION = 5
+_STOPWORDS = {"and", "the", "of", "for", "as", "a", "in", "on", "to"}
+_SUB_RE = re.compile(r"^\s*(?:criterion\s*)?([1-7])(?:\.(\d))?", re.IGNORECASE)
+
+
+def parse_sub_criterion(value: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    """(criterion, sub_criterion) from '1', '1.1', '1.1 Curricular Planning...' or 'Criterion 1: ...'"""
+    match = _SUB_RE.match(value or "")
+    if not match:
+        return None, None
+    criterion = match.group(1)
+    sub = f"{criterion}.{match.group(2)}" if match.group(2) else None
+    return criterion, sub if sub in SUB_CRITERION_TITLES else None
+
+
+def plan_sections(criterion: Optional[str] = None, sub_criterion: Optional[str] = None) -> List[Tuple[str, str, str]]:
+    """(criterion, sub_criterion, title) for one sub-criterion, one criterion, or the whole report"""
+    if sub_criterion:
+        return [(sub_criterion.split(".")[0], sub_criterion, SUB_CRITERION_TITLES[sub_criterion])]
+    criteria = [criterion] if criterion else list(SUB_CRITERIA)
+    return [(c, sub, title) for c in criteria for sub, title in SUB_CRITERIA[c]]
+
+
+class SectionTask:
+    __slots__ = ("criterion", "sub_criterion", "title", "inputs", "evidence", "input_hash", "cached")
+
+    def __init__(self, criterion: str, sub_criterion: str, title: str, inputs: str):
+        self.criterion = criterion
+        self.sub_criterion = sub_criterion
+        self.title = title
+        self.inputs = inputs
+        self.evidence: List[Dict[str, Any]] = []
+        self.input_hash = ""
+        self.cached = False
+
+
+# Written on each report row while it is generating; see SSREngine.fail_interrupted
+BUILDER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _builder_alive(builder: Optional[str]) -> bool:
+    """Whether the host:pid that started a build is still running (on this host; other hosts count as gone)"""
+    host, _, pid = (builder or "").rpartition(":")
+    if host != socket.gethostname() or not pid.isdigit():
+        return False
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _plain(snippet: str) -> str:
+    return html.unescape(snippet.replace("<mark>", "").replace("</mark>", ""))
+
+
+def build_prompt(task: SectionTask, institution_type: str, context: str) -> str:
+    evidence = "\n".join(f"- [{e['filename']}] {e['text']}" for e in task.evidence) or "- (no uploaded evidence matched this sub-criterion)"
+    return (
+        f"You are drafting the NAAC Self Study Report section {task.sub_criterion} {task.title} "
+        f"(Criterion {task.criterion}: {CRITERIA[task.criterion]}) for a {institution_type or 'higher education institution'}.\n"
+        "Write formal SSR prose in markdown, 3-5 paragraphs, grounded only in the institutional data and evidence below. "
+        "Do not invent figures; say what evidence is missing instead.\n\n"
+        f"Institutional data:\n{task.inputs or '(none provided)'}\n\n"
+        f"Evidence excerpts:\n{evidence}\n\n"
+        f"Additional context: {context or '(none)'}\n\nSection text:"
+    )
+
+
+def template_section(task: SectionTask, institution_type: str, context: str) -> str:
+    """Section text without a language model: the saved inputs and evidence, laid out as an SSR draft"""
+    parts = [
+        f"This section describes {task.title.lower()} at the institution"
+        f"{' (' + institution_type + ')' if institution_type else ''}, in line with NAAC Criterion {task.criterion}: {CRITERIA[task.criterion]}.",
+        task.inputs or "_No institutional data has been saved for this sub-criterion yet._",
+    ]
+    if task.evidence:
+        parts.append("**Supporting evidence**\n\n" + "\n".join(f"- *{e['filename']}*: {e['text']}" for e in task.evidence))
+    else:
+        parts.append("**Supporting evidence**\n\n_No uploaded document matched this sub-criterion; attach the relevant records._")
+    if context:
+        parts.append(f"**Additional context**\n\n{context}")
+    return "\n\n".join(parts)
+
+
+class SSREngine:
+    """Builds SSR sections as independent tasks on a bounded pool and streams the report to disk
+
+    Each section's output is cached under a hash of its inputs, retrieved
+    evidence, institution type, context and generator, so regenerating a
+    report only runs the sections whose inputs changed. Sections are written
+    to the output file in order as soon as every earlier one is done.
+    """
+
+    def __init__(self, generator: Callable[[], Tuple[str, Optional[Callable[[str], Awaitable[str]]]]],
+                 output_dir: str = SSR_OUTPUT_DIR, max_parallel: int = 4):
+        self.generator = generator
+        self.output_dir = output_dir
+        self._slots = asyncio.Semaphore(max_parallel)
+        self._tasks = set()
+        self.counters = {"sections_generated": 0, "sections_cached": 0, "sections_fallback": 0, "reports": 0}
+
+    async def save_input(self, session_id: str, sub_criterion: str, content: str, institution_type: Optional[str] = None):
+        await database.init_database()
+        stmt = sqlite_insert(CriterionInput.__table__).values(
+            session_id=session_id, criterion=sub_criterion.split(".")[0], sub_criterion=sub_criterion,
+            institution_type=institution_type, content=content,
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["session_id", "sub_criterion"],
+            set_={"content": stmt.excluded.content, "institution_type": stmt.excluded.institution_type, "updated_at": datetime.utcnow()},
+        )
+        async with database.async_engine.begin() as conn:
+            await conn.execute(stmt)
+
+    async def _load_inputs(self, session_id: str, subs: List[str]) -> Dict[str, str]:
+        async with database.async_engine.connect() as conn:
+            rows = (await conn.execute(
+                select(CriterionInput.sub_criterion, CriterionInput.content)
+                .where(CriterionInput.session_id == session_id, CriterionInput.sub_criterion.in_(subs))
+            )).all()
+        return {sub: content or "" for sub, content in rows}
+
+    async def _retrieve_evidence(self, task: SectionTask, session_id: str):
+        terms = " ".join(w for w in re.findall(r"\w+", task.title.lower()) if w not in _STOPWORDS and len(w) > 2)
+        page = await asyncio.to_thread(search_index.search, terms, "documents", session_id, "relevance",
+                                       EVIDENCE_PER_SECTION, 0, None, True)
+        task.evidence = [{"filename": r["filename"], "document_id": r["document_id"], "chunk_index": r["chunk_index"],
+                          "text": _plain(r["snippet"])} for r in page["results"]]
+
+    async def _build_section(self, task: SectionTask, session_id: str, institution_type: str, context: str) -> str:
+        async with self._slots:
+            await self._retrieve_evidence(task, session_id)
+            generator_name, generate_fn = self.generator()
+            task.input_hash = hashlib.sha256(json.dumps({
+                "version": SECTION_FORMAT_VERSION, "generator": generator_name, "sub_criterion": task.sub_criterion,
+                "institution_type": institution_type, "context": context, "inputs": task.inputs, "evidence": task.evidence,
+            }, sort_keys=True).encode("utf-8")).hexdigest()
+
+            async with database.async_engine.connect() as conn:
+                cached = (await conn.execute(
+                    select(SSRSectionCache.content).where(SSRSectionCache.input_hash == task.input_hash)
+                )).scalar()
+            if cached is not None:
+                task.cached = True
+                self.counters["sections_cached"] += 1
+                return cached
+
+            cacheable = True
+            if generate_fn is None:
+                content = template_section(task, institution_type, context)
+            else:
+                try:
+                    content = (await generate_fn(build_prompt(task, institution_type, context))).strip()
+                except Exception as e:
+                    # Keep the report complete; the fallback is not cached so the next run retries the model
+                    print(f"SSR section {task.sub_criterion} generation failed, using template: {e}")
+                    content, cacheable = template_section(task, institution_type, context), False
+                    self.counters["sections_fallback"] += 1
+            if cacheable:
+                async with database.async_engine.begin() as conn:
+                    await conn.execute(sqlite_insert(SSRSectionCache.__table__).values(
+                        input_hash=task.input_hash, sub_criterion=task.sub_criterion, generator=generator_name, content=content,
+                    ).on_conflict_do_nothing())
+            self.counters["sections_generated"] += 1
+            return content
+
+    @staticmethod
+    def _header(title: str, institution_type: str) -> str:
+        lines = [f"# Self Study Report: {title}", ""]
+        if institution_type:
+            lines.append(f"**Institution type:** {institution_type}  ")
+        lines += [f"**Generated:** {datetime.utcnow().strftime('%Y-%m-%d %H:%M UTC')}", "", ""]
+        return "\n".join(lines)
+
+    async def _run(self, report_id: int, session_id: str, title: str, sections: List[Tuple[str, str, str]],
+                   institution_type: str, context: str) -> Dict[str, Any]:
+        started = time.perf_counter()
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = os.path.join(self.output_dir, f"ssr_{report_id}.md")
+        partial = path + ".part"
+        try:
+            inputs = await self._load_inputs(session_id, [sub for _, sub, _ in sections])
+            tasks = [SectionTask(c, sub, t, inputs.get(sub, "")) for c, sub, t in sections]
+            async def build(index: int, task: SectionTask):
+                return index, await self._build_section(task, session_id, institution_type, context)
+
+            futures = [asyncio.ensure_future(build(i, task)) for i, task in enumerate(tasks)]
+            results: List[Optional[str]] = [None] * len(tasks)
+            next_index, criterion_open = 0, None
+            with open(partial, "w", encoding="utf-8") as out:
+                await asyncio.to_thread(out.write, self._header(title, institution_type))
+                try:
+                    for done in asyncio.as_completed(futures):
+                        index, results[index] = await done
+                        # Write every section whose predecessors are all written, then drop its text
+                        chunk = []
+                        while next_index < len(tasks) and results[next_index] is not None:
+                            task = tasks[next_index]
+                            if task.criterion != criterion_open:
+                                chunk.append(f"## Criterion {task.criterion}: {CRITERIA[task.criterion]}\n\n")
+                                criterion_open = task.criterion
+                            chunk.append(f"### {task.sub_criterion} {task.title}\n\n{results[next_index]}\n\n")
+                            results[next_index] = ""
+                            next_index += 1
+                        if chunk:
+                            await asyncio.to_thread(out.write, "".join(chunk))
+                except BaseException:
+                    for future in futures:
+                        future.cancel()
+                    raise
+            os.replace(partial, path)
+            generated = sum(1 for task in tasks if not task.cached)
+            fields = {
+                "status": "completed", "sections_generated": generated, "sections_cached": len(tasks) - generated,
+                "file_path": path, "file_size": os.path.getsize(path), "elapsed_ms": int((time.perf_counter() - started) * 1000),
+            }
+            sections_info = [{"sub_criterion": t.sub_criterion, "title": t.title, "cached": t.cached, "evidence": len(t.evidence)} for t in tasks]
+        except Exception as e:
+            if os.path.exists(partial):
+                os.remove(partial)
+            fields, sections_info = {"status": "failed", "error": str(e)[:2000], "elapsed_ms": int((time.perf_counter() - started) * 1000)}, []
+            print(f"SSR report {report_id} failed: {e}")
+        except BaseException:
+            # Cancelled (shutdown) or interrupted: never leave the row generating or the partial file behind
+            if os.path.exists(partial):
+                os.remove(partial)
+            await asyncio.shield(self._mark_failed(report_id, "Generation was interrupted by a server shutdown",
+                                                   int((time.perf_counter() - started) * 1000)))
+            raise
+        async with database.async_engine.begin() as conn:
+            await conn.execute(update(SSRReport.__table__).where(SSRReport.id == report_id).values(**fields, updated_at=datetime.utcnow()))
+        report = await self.get(report_id)
+        report["sections"] = sections_info
+        return report
+
+    async def _mark_failed(self, report_id: int, error: str, elapsed_ms: Optional[int] = None):
+        async with database.async_engine.begin() as conn:
+            await conn.execute(update(SSRReport.__table__).where(SSRReport.id == report_id, SSRReport.status == "generating").values(
+                status="failed", error=error, elapsed_ms=elapsed_ms, updated_at=datetime.utcnow()))
+
+    async def fail_interrupted(self) -> List[int]:
+        """At startup: fail reports left generating by a process that is gone, and remove their partial files
+
+        Rows built by a live process (another uvicorn worker on this host) are left alone.
+        """
+        await database.init_database()
+        async with database.async_engine.connect() as conn:
+            rows = (await conn.execute(
+                select(SSRReport.id, SSRReport.builder).where(SSRReport.status == "generating")
+            )).all()
+        orphaned = [report_id for report_id, builder in rows if not _builder_alive(builder)]
+        for report_id in orphaned:
+            partial = os.path.join(self.output_dir, f"ssr_{report_id}.md.part")
+            if os.path.exists(partial):
+                os.remove(partial)
+            await self._mark_failed(report_id, "Generation was interrupted by a server restart")
+        if orphaned:
+            print(f"Marked {len(orphaned)} interrupted SSR report(s) failed")
+        return orphaned
+
+    async def generate(self, session_id: str, criterion: Optional[str] = None, sub_criterion: Optional[str] = None,
+                       institution_type: str = "", context: str = "", wait: bool = True) -> Dict[str, Any]:
+        """Create a report row and build it; with wait=False the build continues in the background"""
+        await database.init_database()
+        sections = plan_sections(criterion, sub_criterion)
+        if sub_criterion:
+            title = f"{sub_criterion} {SUB_CRITERION_TITLES[sub_criterion]}"
+        elif criterion:
+            title = f"Criterion {criterion}: {CRITERIA[criterion]}"
+        else:
+            title = "Full report"
+        async with database.async_engine.begin() as conn:
+            report_id = (await conn.execute(insert(SSRReport.__table__).values(
+                session_id=session_id, title=title, institution_type=institution_type or None,
+                status="generating", sections_total=len(sections), builder=BUILDER_ID,
+            ))).inserted_primary_key[0]
+        self.counters["reports"] += 1
+        run = self._run(report_id, session_id, title, sections, institution_type, context)
+        if wait:
+            return await run
+        task = asyncio.get_running_loop().create_task(run)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return await self.get(report_id)
+
+    async def get(self, report_id: int) -> Optional[Dict[str, Any]]:
+        await database.init_database()
+        async with database.async_engine.connect() as conn:
+            row = (await conn.execute(select(SSRReport.__table__).where(SSRReport.id == report_id))).mappings().first()
+        return self._as_dict(row) if row else None
+
+    async def history(self, session_id: str, limit: int = 50) -> List[Dict[str, Any]]:
+        """One session's reports, newest first"""
+        await database.init_database()
+        stmt = select(SSRReport.__table__).where(SSRReport.session_id == session_id).order_by(SSRReport.id.desc()).limit(limit)
+        async with database.async_engine.connect() as conn:
+            rows = (await conn.execute(stmt)).mappings().all()
+        return [self._as_dict(row) for row in rows]
+
+    @staticmethod
+    def _as_dict(row) -> Dict[str, Any]:
+        report = {k: row[k] for k in ("session_id", "title", "institution_type", "status", "sections_total",
+                                      "sections_generated", "sections_cached", "file_size", "error", "elapsed_ms",
+                                      "created_at", "updated_at")}
+        report["ssr_id"] = row["id"]
+        report["download_url"] = f"/ssr/download/{row['id']}" if row["status"] == "completed" else None
+        return report
+
+    async def report_file(self, report_id: int) -> Optional[str]:
+        """Path of a completed report's markdown file"""
+        await database.init_database()
+        async with database.async_engine.connect() as conn:
+            row = (await conn.execute(
+                select(SSRReport.file_path).where(SSRReport.id == report_id, SSRReport.status == "completed")
+            )).first()
+        return row[0] if row else None
+
+    async def stop(self):
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
@@ -0,0 +1,19 @@
+"""Shared setup: a scratch database and upload directory, set before any backend module is imported
+
+Run from naac-backend/:
+    python -m pytest tests
+"""
+import os
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+WORKDIR = tempfile.mkdtemp(prefix="naac-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(WORKDIR, 'test.db')}"
+os.environ["UPLOAD_DIR"] = os.path.join(WORKDIR, "uploads")
+os.environ["NAAC_SHARED_STATE_PATH"] = os.path.join(WORKDIR, "shared_state.json")
+os.environ["EMBEDDED_JOB_WORKERS"] = "0"
+# Relative paths some modules default to (databases, local storage, report output) land in the scratch directory
+os.chdir(WORKDIR)
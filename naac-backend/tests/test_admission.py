@@ -0,0 +1,100 @@
+import asyncio
+
+import httpx
+from fastapi import FastAPI, Request
+
+from admission import AdmissionControl, AdmissionMiddleware, EndpointClass, TokenBuckets
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _app(endpoint_class, trusted_proxy_hops=0):
+    app = FastAPI()
+
+    @app.post("/api/chat/message")
+    async def chat(request: Request):
+        return {"received": await request.json()}
+
+    control = AdmissionControl({"chat": endpoint_class}, {"/api/chat/message": "chat"})
+    return AdmissionMiddleware(app, control, trusted_proxy_hops=trusted_proxy_hops)
+
+
+def _post_all(app, requests):
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://t") as client:
+            return [await client.post("/api/chat/message", json=body, headers=headers) for body, headers in requests]
+    return asyncio.run(run())
+
+
+def test_token_bucket_refills_and_forgets_idle_keys():
+    clock = Clock()
+    buckets = TokenBuckets(rate=2, burst=3, clock=clock)
+    assert [buckets.take("a") for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert buckets.take("a") == 0.5
+    clock.now += 0.5
+    assert buckets.take("a") == 0.0
+    buckets.take("b")
+    clock.now += 1.0
+    buckets.take("c")
+    assert len(buckets) == 3
+    # a and b have been idle for burst/rate seconds: full again, so no longer tracked
+    clock.now += 0.5
+    buckets.take("c")
+    assert len(buckets) == 1
+
+
+def test_session_limit_answers_429_with_retry_after():
+    app = _app(EndpointClass("chat", max_in_flight=8, session_rate=0.25, session_burst=2, ip_rate=100, ip_burst=100))
+    responses = _post_all(app, [({"message": f"hi {i}", "session_id": "admit-a"}, {}) for i in range(3)]
+                          + [({"message": "other", "session_id": "admit-b"}, {})])
+    assert [r.status_code for r in responses] == [200, 200, 429, 200]
+    rejected = responses[2]
+    assert rejected.headers["retry-after"] == "4" and rejected.json()["reason"] == "session_rate"
+    # The peeked body still reaches the endpoint
+    assert responses[0].json()["received"] == {"message": "hi 0", "session_id": "admit-a"}
+
+
+def test_default_session_is_only_limited_per_ip():
+    app = _app(EndpointClass("chat", max_in_flight=8, session_rate=0.1, session_burst=1, ip_rate=0.1, ip_burst=3))
+    responses = _post_all(app, [({"message": "hi", "session_id": "default"}, {}) for _ in range(4)])
+    assert [r.status_code for r in responses] == [200, 200, 200, 429]
+    assert responses[-1].json()["reason"] == "ip_rate"
+
+
+def test_client_ip_uses_the_trusted_proxy_hops_from_the_right():
+    scope = {"client": ("10.0.0.9", 5000)}
+    header = {b"x-forwarded-for": b"6.6.6.6, 203.0.113.7, 10.1.1.1"}
+    assert AdmissionMiddleware(None, None, trusted_proxy_hops=0).client_ip(scope, header) == "10.0.0.9"
+    assert AdmissionMiddleware(None, None, trusted_proxy_hops=1).client_ip(scope, header) == "10.1.1.1"
+    assert AdmissionMiddleware(None, None, trusted_proxy_hops=2).client_ip(scope, header) == "203.0.113.7"
+    assert AdmissionMiddleware(None, None, trusted_proxy_hops=1).client_ip(scope, {}) == "10.0.0.9"
+
+
+def test_per_ip_limits_follow_the_forwarded_address():
+    app = _app(EndpointClass("chat", max_in_flight=8, session_rate=100, session_burst=100, ip_rate=0.1, ip_burst=1),
+               trusted_proxy_hops=1)
+    responses = _post_all(app, [
+        ({"message": "a"}, {"X-Forwarded-For": "203.0.113.1"}),
+        ({"message": "b"}, {"X-Forwarded-For": "203.0.113.2"}),
+        # A spoofed left-hand entry does not give the same client a fresh bucket
+        ({"message": "c"}, {"X-Forwarded-For": "1.2.3.4, 203.0.113.1"}),
+    ])
+    assert [r.status_code for r in responses] == [200, 200, 429]
+
+
+def test_concurrency_cap_and_returned_tokens():
+    endpoint_class = EndpointClass("generation", max_in_flight=1, session_rate=1, session_burst=1, ip_rate=1, ip_burst=2)
+    assert endpoint_class.admit("s1", "1.1.1.1") == (None, 0.0)
+    assert endpoint_class.admit("s2", "1.1.1.1")[0] == "concurrency"
+    endpoint_class.release()
+    endpoint_class.admit("s1", "1.1.1.1")
+    endpoint_class.release()
+    assert endpoint_class.admit("s1", "1.1.1.1")[0] == "session_rate"
+    # The IP token taken for the refused request was given back
+    assert endpoint_class.admit("s3", "1.1.1.1")[0] is None
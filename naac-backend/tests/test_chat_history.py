@@ -0,0 +1,84 @@
+import asyncio
+
+import httpx
+from sqlalchemy import func, select
+
+import database
+from chat_history import chat_history
+from models import ChatResponse
+
+
+async def _record(session_id, rows):
+    try:
+        await database.init_database()
+        for question, answer in rows:
+            await database.record_query(session_id, question, answer)
+    finally:
+        await database.close_database()
+
+
+def _page(session_id, limit, before_id=None):
+    async def run():
+        try:
+            return await chat_history.page(session_id, limit=limit, before_id=before_id)
+        finally:
+            await database.close_database()
+    return asyncio.run(run())
+
+
+def test_before_id_walks_back_through_the_session_without_gaps():
+    asyncio.run(_record("history-a", [(f"question {i}", "Shared guidance answer") for i in range(7)]))
+    asyncio.run(_record("history-b", [("other session", "Shared guidance answer")]))
+
+    pages, before_id = [], None
+    while True:
+        page = _page("history-a", 3, before_id)
+        pages.append([m["message"] for m in page["messages"]])
+        before_id = page["next_before_id"]
+        if not page["has_more"]:
+            assert before_id is None
+            break
+    assert pages == [["question 4", "question 5", "question 6"], ["question 1", "question 2", "question 3"], ["question 0"]]
+
+
+def test_pages_are_stable_while_new_messages_arrive():
+    asyncio.run(_record("history-live", [(f"old {i}", f"answer {i}") for i in range(4)]))
+    first = _page("history-live", 2)
+    asyncio.run(_record("history-live", [("new 0", "answer new")]))
+    second = _page("history-live", 2, first["next_before_id"])
+    assert [m["message"] for m in second["messages"]] == ["old 0", "old 1"]
+    assert [m["response"] for m in second["messages"]] == ["answer 0", "answer 1"]
+    assert not second["has_more"]
+
+
+def test_repeated_answers_are_stored_once():
+    asyncio.run(_record("history-dedup", [(f"q{i}", "One canned answer for history-dedup") for i in range(5)]))
+
+    async def count():
+        try:
+            async with database.async_engine.connect() as conn:
+                return (await conn.execute(select(func.count()).select_from(ChatResponse.__table__)
+                                           .where(ChatResponse.body == "One canned answer for history-dedup"))).scalar()
+        finally:
+            await database.close_database()
+
+    assert asyncio.run(count()) == 1
+    assert {m["response"] for m in _page("history-dedup", 10)["messages"]} == {"One canned answer for history-dedup"}
+
+
+def test_history_endpoint_pages_with_before_id():
+    asyncio.run(_record("history-api", [(f"api {i}", "ok") for i in range(3)]))
+    import main
+
+    async def run():
+        try:
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://t") as client:
+                first = (await client.get("/api/chat/history/history-api", params={"limit": 2})).json()
+                rest = (await client.get("/chat/history/history-api", params={"limit": 2, "before_id": first["next_before_id"]})).json()
+                return first, rest
+        finally:
+            await database.close_database()
+
+    first, rest = asyncio.run(run())
+    assert [m["message"] for m in first["messages"]] == ["api 1", "api 2"] and first["has_more"]
+    assert [m["message"] for m in rest["messages"]] == ["api 0"] and rest["next_before_id"] is None
@@ -0,0 +1,21 @@
+import asyncio
+import os
+
+from cloud_storage import IBMCloudStorageService
+
+
+def test_settings_are_read_on_use(monkeypatch):
+    storage = IBMCloudStorageService()
+    monkeypatch.setenv("IBM_COS_BUCKET_NAME", "loaded-from-dotenv")
+    monkeypatch.setenv("IBM_COS_ENDPOINT_URL", "https://cos.example")
+    assert storage.bucket_name == "loaded-from-dotenv"
+    assert storage.endpoint_url == "https://cos.example"
+
+
+def test_store_locally_writes_the_file(monkeypatch, tmp_path):
+    monkeypatch.setenv("LOCAL_STORAGE_DIR", str(tmp_path))
+    result = asyncio.run(IBMCloudStorageService().store_locally(b"%PDF-1.4", "ssr.pdf", "storage-test"))
+    assert result["success"] and result["stored_locally"]
+    with open(result["local_path"], "rb") as f:
+        assert f.read() == b"%PDF-1.4"
+    assert os.path.dirname(result["local_path"]) == str(tmp_path / "storage-test")
@@ -0,0 +1,59 @@
+from context_packing import ContextPacker, estimated_jaccard, minhash_signature
+
+SOURCE = " ".join(f"word{i}" for i in range(400))
+
+
+def _words(text):
+    return len(text.split())
+
+
+def _hit(chunk_id, start, end, index, source="ssr.pdf"):
+    return {"chunk_id": chunk_id, "content": SOURCE[start:end], "metadata": {"source": source, "chunk_index": index, "start_index": start}}
+
+
+def test_overlapping_and_touching_chunks_merge_into_one_exact_span():
+    packer = ContextPacker(token_budget=10_000, count_tokens=_words)
+    hits = [_hit("b", 80, 200, 1), _hit("a", 0, 100, 0), _hit("c", 200, 260, 2)]
+    packed = packer.pack(hits)
+    [span] = packed["spans"]
+    assert span["chunk_ids"] == ["a", "b", "c"]
+    assert (span["start"], span["end"]) == (0, 260)
+    assert packed["text"] == SOURCE[0:260]
+
+
+def test_chunks_with_a_gap_stay_separate_spans():
+    packer = ContextPacker(token_budget=10_000, count_tokens=_words)
+    packed = packer.pack([_hit("a", 0, 100, 0), _hit("b", 150, 250, 1)])
+    assert [(s["start"], s["end"]) for s in packed["spans"]] == [(0, 100), (150, 250)]
+    for span, part in zip(packed["spans"], packed["text"].split(packer.separator)):
+        assert SOURCE[span["start"]:span["end"]] == part
+
+
+def test_chunks_without_offsets_merge_only_on_shared_text():
+    packer = ContextPacker(token_budget=10_000, count_tokens=_words)
+    overlapping = [{"chunk_id": "a", "content": SOURCE[0:120], "metadata": {"source": "s", "chunk_index": 0}},
+                   {"chunk_id": "b", "content": SOURCE[100:220], "metadata": {"source": "s", "chunk_index": 1}}]
+    assert packer.pack(overlapping)["text"] == SOURCE[0:220]
+    disjoint = [{"chunk_id": "a", "content": SOURCE[0:100], "metadata": {"source": "s", "chunk_index": 0}},
+                {"chunk_id": "b", "content": SOURCE[300:400], "metadata": {"source": "s", "chunk_index": 1}}]
+    assert len(packer.pack(disjoint)["spans"]) == 2
+
+
+def test_budget_truncates_the_last_passage_at_a_word_boundary():
+    packer = ContextPacker(token_budget=25, count_tokens=_words)
+    packed = packer.pack([_hit("a", 0, 150, 0, source="one"), _hit("b", 300, 600, 0, source="two")])
+    assert packed["tokens"] <= 25
+    first, second = packed["spans"]
+    assert not first["truncated"] and second["truncated"]
+    assert packed["text"].split(packer.separator)[1] == SOURCE[second["start"]:second["end"]]
+    assert packed["text"].split()[-1] in SOURCE.split()
+
+
+def test_near_duplicates_keep_the_better_ranked_copy():
+    text = "The institution has a grievance redressal cell and an anti ragging committee " * 5
+    assert estimated_jaccard(minhash_signature(text), minhash_signature(text + " updated")) > 0.8
+    hits = [{"chunk_id": "first", "content": text, "metadata": {"source": "a"}},
+            {"chunk_id": "copy", "content": text + " updated", "metadata": {"source": "b"}},
+            {"chunk_id": "other", "content": SOURCE[:200], "metadata": {"source": "c"}}]
+    packed = ContextPacker(token_budget=10_000, count_tokens=_words).pack(hits)
+    assert [s["chunk_ids"] for s in packed["spans"]] == [["first"], ["other"]]
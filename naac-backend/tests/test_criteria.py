@@ -0,0 +1,59 @@
+import asyncio
+
+import httpx
+
+import database
+from criteria_progress import match_metrics
+
+
+def _call(requests):
+    import main
+
+    async def run():
+        try:
+            transport = httpx.ASGITransport(app=main.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://t") as client:
+                return [await client.request(method, url, **kwargs) for method, url, kwargs in requests]
+        finally:
+            await database.close_database()
+
+    return asyncio.run(run())
+
+
+def _input(path, session_id="criteria-test", **body):
+    return ("POST", f"/api/criteria/{path}/input", {"json": {"session_id": session_id, "content": "Evidence", **body}})
+
+
+def test_criterion_input_saves_key_indicators_of_the_path_criterion():
+    saved, dotted, other = _call([
+        _input("1", subCriterion="1.2"),
+        _input("1.1"),
+        _input("2", subCriterion="1.2"),
+    ])
+    assert saved.status_code == 200 and saved.json()["sub_criterion"] == "1.2"
+    assert dotted.status_code == 200 and dotted.json()["sub_criterion"] == "1.1"
+    assert other.status_code == 400
+
+
+def test_saved_input_raises_criterion_progress():
+    before, saved, after = _call([
+        ("GET", "/api/criteria/3?session_id=criteria-progress", {}),
+        _input("3", session_id="criteria-progress", subCriterion="3.1",
+               content="Research grants received from government agencies, seed money for teachers and research facilities"),
+        ("GET", "/api/criteria/3?session_id=criteria-progress", {}),
+    ])
+    assert saved.status_code == 200
+    assert after.json()["progress"] > before.json()["progress"]
+
+
+def test_match_metrics_finds_metric_codes():
+    assert "3.1.1" in match_metrics("Grants for research projects, metric 3.1.1")
+
+
+def test_criterion_input_parses_the_path_criterion():
+    prefixed, unknown = _call([
+        _input("Criterion 1", subCriterion="1.2"),
+        _input("9", subCriterion="1.2"),
+    ])
+    assert prefixed.status_code == 200 and prefixed.json()["sub_criterion"] == "1.2"
+    assert unknown.status_code == 404
@@ -0,0 +1,61 @@
+import asyncio
+import random
+
+import database
+from models import UserQuery, UploadedDocument
+
+STATUSES = ["uploaded", "processing", "processed", "failed"]
+
+
+async def _seed(rows: int = 5000):
+    await database.init_database()
+    sessions = [f"session-{i}" for i in range(rows // 50)]
+    async with database.async_engine.begin() as conn:
+        await conn.execute(UserQuery.__table__.insert(), [
+            {"session_id": random.choice(sessions), "user_query": f"question {i}", "ai_response": "answer"}
+            for i in range(rows)
+        ])
+        await conn.execute(UploadedDocument.__table__.insert(), [
+            {"session_id": random.choice(sessions), "original_filename": f"doc{i}.pdf", "stored_filename": f"plan-doc{i}.pdf",
+             "file_size": 1024, "file_type": "application/pdf", "processing_status": random.choice(STATUSES)}
+            for i in range(rows // 10)
+        ])
+        await conn.exec_driver_sql("ANALYZE")
+    return sessions[0]
+
+
+async def _plans():
+    try:
+        session_id = await _seed()
+        return (
+            await database.explain_query_plan(database.session_queries_stmt(session_id, 20)),
+            await database.explain_query_plan(database.documents_by_status_stmt("processing", 50)),
+        )
+    finally:
+        await database.close_database()
+
+
+def test_hot_queries_use_composite_indexes_without_temp_sort():
+    session_plan, status_plan = asyncio.run(_plans())
+    for plan, index in [(session_plan, "ix_user_queries_session_created"), (status_plan, "ix_uploaded_documents_status_created")]:
+        assert any(index in line for line in plan), plan
+        assert not any("TEMP B-TREE" in line for line in plan), plan
+
+
+async def _batched_inserts(count: int):
+    inserter = database.BatchInserter(UserQuery.__table__, max_batch=16)
+    try:
+        await asyncio.gather(*(inserter.insert({"session_id": "batched", "user_query": f"q{i}", "ai_response": "a"})
+                               for i in range(count)))
+        stored = await database.session_queries("batched", limit=count + 1)
+        # Outlive the last window timer so every flush task has finished and run its done-callback
+        await asyncio.sleep(inserter.window * 5)
+        return len(stored), len(inserter._tasks)
+    finally:
+        await database.close_database()
+
+
+def test_batch_inserter_commits_every_row_and_releases_its_tasks():
+    stored, pending = asyncio.run(_batched_inserts(100))
+    assert stored == 100
+    assert pending == 0
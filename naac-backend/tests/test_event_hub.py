@@ -0,0 +1,139 @@
+import asyncio
+
+import pytest
+
+from event_hub import EventHub, EventStream
+
+
+class CountingSource:
+    def __init__(self):
+        self.calls = []
+        self.values = {}
+
+    async def __call__(self, topics):
+        self.calls.append(sorted(topics))
+        return {topic: self.values.get(topic, 0) for topic in topics}
+
+
+def _hub(source, **kwargs):
+    hub = EventHub(coalesce_s=0.01, heartbeat_s=5, **kwargs)
+    hub.add_source("job", source, interval_s=5, final=lambda job: job == "done")
+    return hub
+
+
+async def _next_batch(subscriber, hub):
+    batches = subscriber.batches(hub.coalesce_s, hub.heartbeat_s)
+    try:
+        return await asyncio.wait_for(batches.__anext__(), 1)
+    finally:
+        await batches.aclose()
+
+
+def test_one_fetch_fans_out_to_every_subscriber():
+    source = CountingSource()
+    source.values["job:1"] = "queued"
+
+    async def run():
+        hub = _hub(source)
+        subscribers = [hub.connect() for _ in range(3)]
+        for subscriber in subscribers:
+            hub.subscribe(subscriber, ["job:1"])
+        hub.start()
+        try:
+            batches = [await _next_batch(s, hub) for s in subscribers]
+            late = hub.connect()
+            hub.subscribe(late, ["job:1"])
+            return hub, batches, await _next_batch(late, hub)
+        finally:
+            await hub.stop()
+
+    hub, batches, late = asyncio.run(run())
+    assert batches == [[("job:1", "queued")]] * 3 and late == [("job:1", "queued")]
+    assert source.calls == [["job:1"]] and hub.published == 1
+
+
+def test_unchanged_values_are_not_republished_and_bursts_coalesce():
+    async def run():
+        hub = _hub(CountingSource())
+        subscriber = hub.connect()
+        hub.subscribe(subscriber, ["job:7"])
+        for status in ("queued", "running", "running", "done"):
+            hub.publish("job:7", status)
+        return hub, subscriber, await _next_batch(subscriber, hub)
+
+    hub, subscriber, batch = asyncio.run(run())
+    assert batch == [("job:7", "done")]
+    assert hub.published == 3 and subscriber.coalesced == 2
+
+
+def test_disconnect_releases_topics_and_stops_polling():
+    source = CountingSource()
+
+    async def run():
+        hub = _hub(source)
+        first, second = hub.connect(), hub.connect()
+        hub.subscribe(first, ["job:1", "job:2"])
+        hub.subscribe(second, ["job:2"])
+        hub.disconnect(first)
+        assert set(hub._topics) == {"job:2"} and hub._sources[0].topics == {"job:2"}
+        hub.disconnect(second)
+        hub.start()
+        hub.refresh("job")
+        await asyncio.sleep(0.05)
+        await hub.stop()
+        return hub
+
+    hub = asyncio.run(run())
+    assert hub.subscribers == {} and hub._topics == {} and hub._last == {}
+    assert source.calls == []
+
+
+def test_unknown_topics_and_topic_limits_are_rejected():
+    hub = _hub(CountingSource(), max_topics=2)
+    subscriber = hub.connect()
+    with pytest.raises(ValueError):
+        hub.subscribe(subscriber, ["billing"])
+    with pytest.raises(ValueError):
+        hub.subscribe(subscriber, ["job:1", "job:2", "job:3"])
+    assert subscriber.topics == set()
+
+
+def test_a_stalled_client_is_dropped():
+    async def run():
+        hub = _hub(CountingSource(), send_timeout_s=0.05)
+        subscriber = hub.connect()
+        hub.subscribe(subscriber, ["job:1"])
+        hub.publish("job:1", "running")
+
+        async def stuck(batch):
+            await asyncio.sleep(10)
+
+        await asyncio.wait_for(hub.pump(subscriber, stuck), 1)
+        return hub
+
+    assert asyncio.run(run()).dropped == 1
+
+
+def test_event_stream_cleans_up_when_the_client_disconnects():
+    async def run():
+        hub = _hub(CountingSource())
+        subscriber = hub.connect()
+        hub.subscribe(subscriber, ["job:3"])
+        hub.publish("job:3", "running")
+        sent, disconnected = [], asyncio.Event()
+
+        async def receive():
+            await disconnected.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            sent.append(message)
+            if b"event: job" in message.get("body", b""):
+                disconnected.set()
+
+        await asyncio.wait_for(EventStream(hub, subscriber)({"type": "http"}, receive, send), 1)
+        return hub, b"".join(m.get("body", b"") for m in sent)
+
+    hub, body = asyncio.run(run())
+    assert body.startswith(b"event: hello\n") and b'"topic": "job:3"' in body
+    assert hub.subscribers == {} and hub._topics == {}
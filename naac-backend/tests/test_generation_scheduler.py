@@ -0,0 +1,90 @@
+import asyncio
+
+import httpx
+import pytest
+
+from generation_scheduler import DeadlineExceededError, GenerationScheduler
+from granite_client import GraniteClient
+from mock_services import start_mock_ibm_server
+
+GENERATION_PATH = "/ml/v1/text/generation"
+
+
+@pytest.fixture
+def mock_granite(monkeypatch):
+    server, base_url = start_mock_ibm_server(generation_latency=0.2, iam_latency=0.0)
+    monkeypatch.setenv("IBM_CLOUD_API_KEY", "test-key")
+    monkeypatch.setenv("IBM_WATSONX_PROJECT_ID", "test-project")
+    monkeypatch.setenv("IBM_IAM_URL", f"{base_url}/identity/token")
+    monkeypatch.setenv("IBM_WATSONX_URL", f"{base_url}{GENERATION_PATH}")
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _generations(server) -> int:
+    with server.state["lock"]:
+        return server.state["requests"].get(GENERATION_PATH, 0)
+
+
+def test_full_queue_is_shed_with_503_and_retry_after(mock_granite, monkeypatch):
+    import main
+    monkeypatch.setattr(main, "generation_scheduler", GenerationScheduler(main.granite_client, max_in_flight=1, max_queue=1))
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://t") as client:
+            return await asyncio.gather(*(
+                client.post("/api/chat/generate", json={"message": f"question {i}", "session_id": f"shed-{i}"}) for i in range(4)
+            ))
+
+    responses = asyncio.run(run())
+    statuses = sorted(r.status_code for r in responses)
+    assert statuses[0] == 200 and statuses.count(503) >= 2
+    assert all(r.headers["retry-after"] == "1" for r in responses if r.status_code == 503)
+    assert main.generation_scheduler.counters["rejected"] == statuses.count(503)
+    assert _generations(mock_granite) == statuses.count(200)
+
+
+def test_expired_requests_fail_and_are_never_sent(mock_granite):
+    scheduler = GenerationScheduler(GraniteClient(), max_in_flight=1)
+
+    async def run():
+        running = asyncio.create_task(scheduler.submit("first", session_id="a"))
+        await asyncio.sleep(0.01)
+        with pytest.raises(DeadlineExceededError):
+            await scheduler.submit("second", session_id="b", deadline_s=0.05)
+        return await running
+
+    assert asyncio.run(run()).startswith("Mock Granite answer to: first")
+    assert scheduler.counters["expired"] == 1
+    assert _generations(mock_granite) == 1
+
+
+def test_deadline_maps_to_504(mock_granite):
+    import main
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://t") as client:
+            return await client.post("/api/chat/generate", json={"message": "slow", "session_id": "deadline", "deadline_s": 0.05})
+
+    assert asyncio.run(run()).status_code == 504
+
+
+def test_sessions_are_served_round_robin(mock_granite):
+    mock_granite.state["generation_latency"] = 0.02
+    scheduler = GenerationScheduler(GraniteClient(), max_in_flight=1)
+    finished = []
+
+    async def ask(session_id, prompt):
+        await scheduler.submit(prompt, session_id=session_id)
+        finished.append(prompt)
+
+    async def run():
+        busy = [asyncio.create_task(ask("busy", f"busy-{i}")) for i in range(4)]
+        await asyncio.sleep(0)
+        await asyncio.gather(ask("quiet", "quiet-0"), *busy)
+
+    asyncio.run(run())
+    # busy-0 is already in flight and busy-1 is next in line; the quiet session goes before busy-2
+    assert finished.index("quiet-0") < finished.index("busy-2")
+    assert [p for p in finished if p.startswith("busy")] == [f"busy-{i}" for i in range(4)]
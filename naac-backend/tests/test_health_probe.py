@@ -0,0 +1,109 @@
+import time
+import asyncio
+
+import httpx
+import pytest
+
+from health_probe import HealthProber, Probe, _result, default_probes
+from mock_services import start_mock_ibm_server
+
+REMOTE_PROBES = ["iam", "granite", "cloud_storage", "pinecone"]
+
+
+@pytest.fixture
+def mock_ibm(monkeypatch):
+    server, base_url = start_mock_ibm_server(generation_latency=0.0, iam_latency=0.0)
+    monkeypatch.setenv("IBM_CLOUD_API_KEY", "test-key")
+    monkeypatch.setenv("IBM_WATSONX_PROJECT_ID", "test-project")
+    monkeypatch.setenv("IBM_IAM_URL", f"{base_url}/identity/token")
+    monkeypatch.setenv("IBM_WATSONX_URL", f"{base_url}/ml/v1/text/generation")
+    monkeypatch.setenv("IBM_COS_ENDPOINT_URL", base_url)
+    monkeypatch.setenv("PINECONE_API_KEY", "test-key")
+    monkeypatch.setenv("PINECONE_INDEXES_URL", f"{base_url}/indexes")
+    monkeypatch.delenv("WATSON_NLP_URL", raising=False)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _outbound(server) -> int:
+    with server.state["lock"]:
+        return sum(server.state["requests"].values())
+
+
+def test_snapshot_reports_every_dependency(mock_ibm, tmp_path):
+    prober = HealthProber(default_probes(str(tmp_path / "probe.db"), str(tmp_path / "uploads")))
+    assert all(entry["status"] == "checking" for entry in prober.snapshot()["services"].values())
+
+    asyncio.run(prober.refresh())
+    snapshot = prober.snapshot()
+    services = snapshot["services"]
+    assert services["database"]["status"] == "connected"
+    assert services["local_storage"]["status"] == "connected"
+    assert all(services[name]["status"] == "connected" for name in REMOTE_PROBES), services
+    assert services["watson_nlp"]["status"] == "not_configured"
+    assert snapshot["overall_status"] == "healthy" and snapshot["failing"] == []
+    assert all(not entry["stale"] and entry["latency_ms"] is not None for entry in services.values())
+
+
+def test_remote_probes_fail_when_the_service_goes_away(mock_ibm, tmp_path):
+    prober = HealthProber(default_probes(str(tmp_path / "probe.db"), str(tmp_path / "uploads")))
+    asyncio.run(prober.refresh())
+    assert prober.snapshot()["overall_status"] == "healthy"
+
+    mock_ibm.shutdown()
+    mock_ibm.server_close()
+    asyncio.run(prober.refresh())
+    snapshot = prober.snapshot()
+    assert snapshot["overall_status"] == "degraded"
+    assert set(REMOTE_PROBES) <= set(snapshot["failing"])
+    assert all(snapshot["services"][name]["error"] for name in REMOTE_PROBES)
+    assert snapshot["services"]["database"]["status"] == "connected"
+
+
+def test_probe_transitions_and_staleness():
+    state = {"up": True}
+
+    def check(timeout):
+        if not state["up"]:
+            raise ConnectionError("connection refused")
+        return _result("connected", "ok")
+
+    prober = HealthProber([Probe("svc", "Service", check, interval_s=60, timeout_s=1)])
+    asyncio.run(prober.refresh())
+    assert prober.get("svc")["status"] == "connected"
+
+    state["up"] = False
+    asyncio.run(prober.refresh())
+    entry = prober.get("svc")
+    assert entry["status"] == "error" and "connection refused" in entry["error"]
+    assert prober.snapshot()["failing"] == ["svc"]
+
+    state["up"] = True
+    asyncio.run(prober.refresh())
+    assert prober.snapshot()["overall_status"] == "healthy"
+
+    # A result older than two missed rounds is reported stale, and counts as failing
+    prober._snapshot["svc"]["checked_at"] = time.time() - 200
+    assert prober.get("svc")["stale"] and prober.snapshot()["failing"] == ["svc"]
+
+
+def test_health_endpoints_make_no_outbound_calls(mock_ibm):
+    import main
+
+    async def run():
+        await main.health_prober.refresh()
+        before = _outbound(mock_ibm)
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://t") as client:
+            responses = [await client.get(f"/api/health/check/{name}") for name in main.FRONTEND_HEALTH_SERVICES]
+            responses += [await client.get("/api/health/services"), await client.get("/health")]
+        return before, responses
+
+    before, responses = asyncio.run(run())
+    assert before > 0
+    assert _outbound(mock_ibm) == before
+    assert all(response.status_code == 200 for response in responses)
+    checks = {name: response.json() for name, response in zip(main.FRONTEND_HEALTH_SERVICES, responses)}
+    assert checks["ibm-granite-llm"]["status"] == "connected"
+    assert checks["pinecone-vector-db"]["status"] == "connected"
@@ -0,0 +1,72 @@
+from hybrid_retrieval import HybridRetriever, reciprocal_rank_fusion
+from lexical_index import LexicalIndex, criteria_mask, tokenize
+
+
+def _chunk(chunk_id, content, criterion=None):
+    metadata = {"chunk_id": chunk_id}
+    if criterion is not None:
+        metadata["criterion"] = criterion
+    return {"content": content, "metadata": metadata}
+
+
+CHUNKS = [
+    _chunk("plo", "Programme learning outcomes (PLOs) are published for metric 2.6.1", 2),
+    _chunk("library", "Library budget and e-resources for the learning resources metric 4.2.2", 4),
+    _chunk("both", "Criterion II and Criterion IV: outcomes and library usage"),
+    _chunk("other", "Alumni engagement and alumni association contributions", [5]),
+]
+
+
+def test_tokenize_keeps_metric_codes_and_folds_plurals():
+    assert tokenize("The PLOs for metric 2.6.1") == ["plo", "metric", "2.6.1"]
+
+
+def test_criteria_mask_from_tags_and_content():
+    assert criteria_mask(_chunk("a", "", [1, "3.2", 7])) == 0b1000101
+    assert criteria_mask(_chunk("c", "Criterion IV and metric 2.1.1")) == 0b1010
+
+
+def test_search_ranks_by_bm25_and_filters_by_criterion():
+    index = LexicalIndex.build(CHUNKS + [CHUNKS[0]])
+    assert len(index) == 4
+    assert index.search("library budget")[0][0] == "library"
+    assert {chunk_id for chunk_id, _ in index.search("outcomes library", criterion=2)} == {"plo", "both"}
+    assert index.search("unrelated words") == []
+    assert index.matches_criterion("both", 4) and not index.matches_criterion("other", 4)
+    assert index.matches_criterion("other", None)
+
+
+def test_reciprocal_rank_fusion_uses_ranks_not_scores():
+    fused = reciprocal_rank_fusion([[("a", 100.0), ("b", 50.0)], [("b", 0.9), ("c", 0.8)]], k=60)
+    assert [chunk_id for chunk_id, _ in fused] == ["b", "a", "c"]
+
+
+def test_hybrid_retriever_fuses_dense_results_and_survives_dense_failure():
+    index = LexicalIndex.build(CHUNKS)
+    retriever = HybridRetriever(index, dense_search=lambda query, k: [("other", 0.9), ("library", 0.8)])
+    results = retriever.search("library budget", top_k=2)
+    assert results[0]["chunk_id"] == "library"
+    assert results[0]["lexical_rank"] == 1 and results[0]["dense_rank"] == 2
+    # Dense hits are filtered with the lexical index's criterion masks
+    assert [r["chunk_id"] for r in retriever.search("alumni library", top_k=4, criterion=4)] == ["library", "both"]
+
+    def broken(query, k):
+        raise ConnectionError("vector store unavailable")
+
+    fallback = HybridRetriever(index, dense_search=broken).search("library budget", top_k=1)
+    assert fallback[0]["chunk_id"] == "library" and fallback[0]["dense_rank"] is None
+
+
+def test_out_of_range_tags_are_ignored_and_filters_match_nothing():
+    assert criteria_mask(_chunk("b", "", [0, 8, 9, 255, "x", None])) == 0
+    index = LexicalIndex.build([
+        _chunk("tagged", "library budget and resources", [4, 9]),
+        _chunk("zero", "library budget for the year", 0),
+        _chunk("untagged", "library budget overview"),
+    ])
+    assert {chunk_id for chunk_id, _ in index.search("library budget", criterion=4)} == {"tagged"}
+    assert len(index.search("library budget")) == 3
+    for criterion in (0, 8, -1):
+        assert index.search("library budget", criterion=criterion) == []
+        assert not index.matches_criterion("tagged", criterion)
+    assert index.matches_criterion("tagged", 4) and index.matches_criterion("zero", None)
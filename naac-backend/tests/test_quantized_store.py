@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from quantized_store import QuantizedVectorIndex
+
+DIMENSION = 64
+
+
+def _embeddings(count, rng=None):
+    # Clustered like sentence embeddings: a few topics plus per-chunk noise
+    rng = rng or np.random.default_rng(3)
+    centres = np.random.default_rng(3).normal(size=(20, DIMENSION))
+    vectors = centres[rng.integers(0, 20, count)] + 0.6 * rng.normal(size=(count, DIMENSION))
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def _fill(index, vectors):
+    for start in range(0, len(vectors), 500):
+        index.upsert([{"id": f"v{i}", "values": vectors[i].tolist(), "metadata": {"criterion": i % 7 + 1}}
+                      for i in range(start, min(start + 500, len(vectors)))])
+
+
+@pytest.mark.parametrize("mode, minimum", [("int8", 0.98), ("binary", 0.85)])
+def test_recall_against_exact_float_search(tmp_path, mode, minimum):
+    vectors = _embeddings(3000)
+    index = QuantizedVectorIndex(str(tmp_path), dimension=DIMENSION, mode=mode)
+    _fill(index, vectors)
+    # Questions about the same topics, not copies of stored chunks
+    queries = _embeddings(50, np.random.default_rng(11))
+    recall = []
+    for query in queries:
+        exact = {f"v{i}" for i in np.argsort(-(vectors @ query))[:10]}
+        found = {m["id"] for m in index.query(query.tolist(), top_k=10, include_metadata=False)["matches"]}
+        recall.append(len(exact & found) / 10)
+    assert np.mean(recall) >= minimum
+    stats = index.describe_index_stats()
+    assert stats["code_bytes_per_vector"] == (DIMENSION if mode == "int8" else DIMENSION // 8)
+
+
+def test_scores_are_exact_cosine_and_survive_reopening(tmp_path):
+    vectors = _embeddings(600)
+    index = QuantizedVectorIndex(str(tmp_path), dimension=DIMENSION)
+    _fill(index, vectors)
+    query = vectors[42]
+    first = index.query(query.tolist(), top_k=5)["matches"]
+    assert first[0]["id"] == "v42" and first[0]["score"] == pytest.approx(1.0, abs=1e-5)
+    assert first[0]["metadata"] == {"criterion": 42 % 7 + 1}
+
+    reopened = QuantizedVectorIndex(str(tmp_path), dimension=DIMENSION)
+    assert [m["id"] for m in reopened.query(query.tolist(), top_k=5)["matches"]] == [m["id"] for m in first]
+    assert reopened.describe_index_stats()["total_vector_count"] == 600
+
+
+def test_upsert_overwrites_and_filters_fill_top_k(tmp_path):
+    vectors = _embeddings(700)
+    index = QuantizedVectorIndex(str(tmp_path), dimension=DIMENSION)
+    _fill(index, vectors)
+    index.upsert([{"id": "v1", "values": (-vectors[1]).tolist(), "metadata": {"criterion": 7, "replaced": True}}])
+    fetched = index.fetch(["v1", "missing"])["vectors"]
+    assert list(fetched) == ["v1"] and fetched["v1"]["metadata"]["replaced"]
+    assert np.allclose(fetched["v1"]["values"], -vectors[1], atol=1e-6)
+    assert index.describe_index_stats()["total_vector_count"] == 700
+
+    matches = index.query(vectors[0].tolist(), top_k=10, filter={"criterion": 3})["matches"]
+    assert len(matches) == 10 and all(m["metadata"]["criterion"] == 3 for m in matches)
+    with pytest.raises(ValueError):
+        index.upsert([{"id": "bad", "values": [0.0] * (DIMENSION - 1)}])
@@ -0,0 +1,113 @@
+import sys
+import asyncio
+
+import httpx
+import pytest
+
+import database
+from mock_services import start_mock_ibm_server
+from rag_pipeline import RAGPipeline
+from reranker import CrossEncoderReranker
+from search_index import DocumentRetriever, SearchIndex
+
+CANDIDATES = [
+    {"chunk_id": "library", "content": "The library subscribes to e-journals and e-books.", "score": 3.0},
+    {"chunk_id": "iqac", "content": "The IQAC meets quarterly and reviews academic audits.", "score": 2.0},
+    {"chunk_id": "hostel", "content": "Hostels have separate blocks with wardens.", "score": 1.0},
+]
+
+
+class StubScorer:
+    """Scores a pair by how many query words appear in the passage and records every call"""
+
+    def __init__(self):
+        self.pairs = []
+
+    def __call__(self, pairs):
+        self.pairs += pairs
+        return [sum(word in passage.lower() for word in query.lower().split()) for query, passage in pairs]
+
+
+def test_rerank_orders_by_score_and_cuts_to_top_n_within_budget():
+    reranker = CrossEncoderReranker(scorer=StubScorer())
+    selected = reranker.rerank("iqac academic audits", CANDIDATES, top_n=1)
+    assert [c["chunk_id"] for c in selected] == ["iqac"] and selected[0]["rerank_score"] == 3
+
+    budgeted = reranker.rerank("iqac academic audits", CANDIDATES, top_n=3, token_budget=2, count_tokens=lambda text: 1)
+    assert len(budgeted) == 2
+
+
+def test_scores_are_cached_per_query_and_chunk():
+    scorer = StubScorer()
+    reranker = CrossEncoderReranker(scorer=scorer, cache_size=4)
+    reranker.rerank("IQAC audits", CANDIDATES)
+    reranker.rerank("  iqac AUDITS ", CANDIDATES)
+    assert len(scorer.pairs) == 3
+    reranker.rerank("IQAC audits", CANDIDATES + [{"chunk_id": "new", "content": "IQAC annual report"}])
+    assert len(scorer.pairs) == 4
+    reranker.rerank("library", CANDIDATES)
+    assert len(reranker._cache) == 4
+
+
+def test_unavailable_model_keeps_retrieval_order(monkeypatch):
+    monkeypatch.setitem(sys.modules, "sentence_transformers", None)
+    reranker = CrossEncoderReranker(model_name="missing/cross-encoder")
+    for _ in range(2):
+        selected = reranker.rerank("hostel wardens", CANDIDATES, top_n=2)
+        assert [c["chunk_id"] for c in selected] == ["library", "iqac"]
+        assert "rerank_score" not in selected[0]
+    assert isinstance(reranker._load_error, ImportError)
+
+
+def test_pipeline_grounds_prompts_in_the_sessions_documents():
+    asyncio.run(_init())
+    index = SearchIndex(database.SQLITE_PATH)
+    index.index_document(9101, "iqac.pdf", "rerank-a", [{"content": text} for text in (
+        "The IQAC meets quarterly.", "Academic audits are reviewed by the IQAC.", "Canteen menus change weekly.")])
+    index.index_document(9102, "other.pdf", "rerank-b", [{"content": "The IQAC of another college."}])
+
+    reranker = CrossEncoderReranker(scorer=StubScorer())
+    pipeline = RAGPipeline(DocumentRetriever(index, "rerank-a"), generate_fn=lambda prompt: prompt, reranker=reranker, top_n=1)
+    result = pipeline.answer("academic audits IQAC")
+    assert [s["chunk_ids"] for s in result["sources"]] == [["9101:1"]]
+    assert "Academic audits are reviewed" in result["answer"] and "another college" not in result["answer"]
+    assert set(result["timings_ms"]) == {"retrieve", "rerank", "prompt", "generate", "total"}
+
+
+def test_chat_generate_with_use_documents_returns_sources(monkeypatch):
+    server, base_url = start_mock_ibm_server(generation_latency=0.0, iam_latency=0.0)
+    monkeypatch.setenv("IBM_CLOUD_API_KEY", "test-key")
+    monkeypatch.setenv("IBM_WATSONX_PROJECT_ID", "test-project")
+    monkeypatch.setenv("IBM_IAM_URL", f"{base_url}/identity/token")
+    monkeypatch.setenv("IBM_WATSONX_URL", f"{base_url}/ml/v1/text/generation")
+    import main
+
+    async def run():
+        await database.init_database()
+        try:
+            main.search_index.index_document(9201, "criteria.pdf", "rerank-api", [{"content": "Student feedback is collected every semester."}])
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://t") as client:
+                plain = await client.post("/api/chat/generate", json={"message": "student feedback", "session_id": "rerank-api"})
+                grounded = await client.post("/api/chat/generate", json={"message": "student feedback", "session_id": "rerank-api",
+                                                                         "use_documents": True})
+                return plain, grounded
+        finally:
+            await database.close_database()
+
+    try:
+        plain, grounded = asyncio.run(run())
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert plain.status_code == 200 and "sources" not in plain.json()
+    assert grounded.status_code == 200
+    body = grounded.json()
+    assert [s["chunk_ids"] for s in body["sources"]] == [["9201:0"]]
+    assert {"retrieve", "prompt", "generate"} <= set(body["timings_ms"])
+
+
+async def _init():
+    try:
+        await database.init_database()
+    finally:
+        await database.close_database()
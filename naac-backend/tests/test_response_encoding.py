@@ -0,0 +1,67 @@
+import gzip
+import asyncio
+
+import httpx
+from fastapi import FastAPI, Response
+
+from response_encoding import CompressionMiddleware, brotli, choose_encoding
+
+LARGE = b'{"items":[' + b",".join(b'{"criterion":%d,"text":"Curricular aspects"}' % i for i in range(200)) + b"]}"
+
+
+def _get(app, path, headers=None):
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://t") as client:
+            return await client.get(path, headers=headers or {})
+    return asyncio.run(run())
+
+
+def test_choose_encoding_honours_q_values():
+    assert choose_encoding("gzip, deflate") == "gzip"
+    assert choose_encoding("gzip;q=0, deflate") is None
+    assert choose_encoding("identity") is None
+    assert choose_encoding("br;q=1.0, gzip;q=0.5") == ("br" if brotli is not None else "gzip")
+
+
+def test_guidance_is_etagged_and_revalidates_with_304():
+    import main
+    first = _get(main.app, "/api/guidance/criterion-1", {"Accept-Encoding": "identity"})
+    assert first.status_code == 200 and first.headers["etag"] and "content-encoding" not in first.headers
+    again = _get(main.app, "/api/guidance/criterion-1", {"If-None-Match": first.headers["etag"]})
+    assert again.status_code == 304 and again.content == b"" and again.headers["etag"] == first.headers["etag"]
+    assert _get(main.app, "/api/guidance/no-such-topic").status_code == 404
+
+
+def test_guidance_is_served_precompressed():
+    import main
+    plain = _get(main.app, "/api/guidance", {"Accept-Encoding": "identity"})
+    zipped = _get(main.app, "/api/guidance", {"Accept-Encoding": "gzip"})
+    assert zipped.headers["content-encoding"] == "gzip" and zipped.headers["vary"] == "Accept-Encoding"
+    assert zipped.json() == plain.json() and zipped.headers["etag"] == plain.headers["etag"]
+
+
+def test_middleware_compresses_large_text_bodies_only():
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=512)
+    app.get("/large")(lambda: Response(LARGE, media_type="application/json", headers={"ETag": '"large-v1"'}))
+    app.get("/small")(lambda: Response(b'{"ok":true}', media_type="application/json"))
+    app.get("/image")(lambda: Response(LARGE, media_type="image/png"))
+    app.get("/ranged")(lambda: Response(LARGE, media_type="text/plain", headers={"Accept-Ranges": "bytes"}))
+
+    compressed = _get(app, "/large", {"Accept-Encoding": "gzip"})
+    assert compressed.headers["content-encoding"] == "gzip" and compressed.content == LARGE
+    assert int(compressed.headers["content-length"]) < len(LARGE)
+    assert "content-encoding" not in _get(app, "/large", {"Accept-Encoding": "identity"}).headers
+    for path in ("/small", "/image", "/ranged"):
+        assert "content-encoding" not in _get(app, path, {"Accept-Encoding": "gzip"}).headers, path
+
+
+def test_middleware_reuses_compressed_bodies_by_etag():
+    app = FastAPI()
+    middleware = CompressionMiddleware(app, minimum_size=512)
+    app.get("/large")(lambda: Response(LARGE, media_type="application/json", headers={"ETag": '"large-v1"'}))
+    _get(middleware, "/large", {"Accept-Encoding": "gzip"})
+    cached = middleware.cache.get((b'"large-v1"', "gzip"))
+    assert cached is not None and gzip.decompress(cached) == LARGE
+    middleware.cache.put((b'"large-v1"', "gzip"), gzip.compress(b'{"from":"cache"}'))
+    assert _get(middleware, "/large", {"Accept-Encoding": "gzip"}).json() == {"from": "cache"}
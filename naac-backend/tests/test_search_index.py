@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+
+import database
+from search_index import SearchIndex
+
+
+async def _record(session_id, rows):
+    try:
+        await database.init_database()
+        for question, answer in rows:
+            await database.record_query(session_id, question, answer)
+    finally:
+        await database.close_database()
+
+
+def test_chat_search_ranks_highlights_and_filters_by_session():
+    asyncio.run(_record("search-a", [("How is the IQAC constituted?", "The IQAC has a chairperson and members."),
+                                     ("What is the library budget?", "About five lakh per year.")]))
+    asyncio.run(_record("search-b", [("IQAC meeting minutes", "Four meetings a year.")]))
+    index = SearchIndex(database.SQLITE_PATH)
+
+    page = index.search("IQAC", scope="chat", session_id="search-a")
+    assert [r["session_id"] for r in page["results"]] == ["search-a"]
+    assert "<mark>IQAC</mark>" in page["results"][0]["snippet"]
+    assert {r["session_id"] for r in index.search("IQAC", scope="chat")["results"]} >= {"search-a", "search-b"}
+    assert index.search("   ", scope="chat")["results"] == []
+
+
+def test_recent_listing_pages_with_before_id():
+    asyncio.run(_record("search-recent", [(f"Naac recent question {i}", "answer") for i in range(7)]))
+    index = SearchIndex(database.SQLITE_PATH)
+    seen, before_id = [], None
+    while True:
+        page = index.search("recent", scope="chat", session_id="search-recent", sort="recent", limit=3, before_id=before_id)
+        seen += [r["id"] for r in page["results"]]
+        before_id = page["next_before_id"]
+        if not page["has_more"]:
+            break
+    assert len(seen) == 7 and seen == sorted(seen, reverse=True)
+
+
+def test_document_reindex_replaces_chunks():
+    index = SearchIndex(database.SQLITE_PATH)
+    index.index_document(7001, "policy.pdf", "search-docs", [{"content": "grievance redressal policy"}, {"content": "anti ragging committee"}])
+    assert len(index.search("grievance", scope="documents", session_id="search-docs")["results"]) == 1
+    index.index_document(7001, "policy.pdf", "search-docs", [{"content": "anti ragging committee"}])
+    assert index.search("grievance", scope="documents", session_id="search-docs")["results"] == []
+    result = index.search("ragging", scope="documents", session_id="search-docs")["results"][0]
+    assert (result["document_id"], result["filename"]) == (7001, "policy.pdf")
+
+
+def test_invalid_parameters_are_rejected():
+    index = SearchIndex(database.SQLITE_PATH)
+    with pytest.raises(ValueError):
+        index.search("iqac", scope="everything")
+    with pytest.raises(ValueError):
+        index.search("iqac", sort="recent")
+
+
+def test_all_scope_interleaves_tables_by_rank_and_pages_consistently():
+    asyncio.run(_record("search-test", [(f"What is the accreditation cycle for criterion {i}?", "Five years.") for i in range(12)]))
+    index = SearchIndex(database.SQLITE_PATH)
+    # Long chunks score far below short chat rows under bm25, so a merge by raw score would list every chat row first
+    filler = " ".join(["institutional quality assurance"] * 40)
+    index.index_document(9001, "cycle.pdf", "search-test", [{"content": f"accreditation cycle {filler} {i}"} for i in range(12)])
+
+    full = index.search("accreditation cycle", scope="all", session_id="search-test", limit=24)["results"]
+    assert [r["type"] for r in full[:4]] == ["chat", "document", "chat", "document"]
+
+    first = index.search("accreditation cycle", scope="all", session_id="search-test", limit=5)
+    second = index.search("accreditation cycle", scope="all", session_id="search-test", limit=5, offset=5)
+    assert first["has_more"]
+    keys = [(r["type"], r["id"]) for r in first["results"] + second["results"]]
+    assert keys == [(r["type"], r["id"]) for r in full[:10]]
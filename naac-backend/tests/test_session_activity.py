@@ -0,0 +1,112 @@
+import asyncio
+
+import httpx
+from sqlalchemy import select
+
+import database
+from models import UserSession
+from session_activity import SessionActivityTracker
+
+
+async def _rows(*session_ids):
+    async with database.async_engine.connect() as conn:
+        rows = (await conn.execute(
+            select(UserSession.__table__).where(UserSession.session_id.in_(session_ids))
+        )).mappings().all()
+    return {row["session_id"]: row for row in rows}
+
+
+def test_flush_adds_deltas_so_workers_can_share_a_session():
+    async def run():
+        try:
+            first, second = SessionActivityTracker(), SessionActivityTracker()
+            first.record("activity-shared", "query", "10.0.0.1", "pytest")
+            first.record("activity-shared", "upload")
+            second.record("activity-shared", "query")
+            assert await first.flush() == 1 and await second.flush() == 1
+            assert await first.flush() == 0
+            first.record("activity-shared", "query")
+            await first.flush()
+            row = (await _rows("activity-shared"))["activity-shared"]
+            assert (row["total_queries"], row["total_uploads"], row["ip_address"]) == (3, 1, "10.0.0.1")
+        finally:
+            await database.close_database()
+
+    asyncio.run(run())
+
+
+def test_stats_combine_the_persisted_row_with_pending_counts():
+    async def run():
+        try:
+            writer = SessionActivityTracker()
+            for _ in range(3):
+                writer.record("activity-stats", "query")
+            await writer.flush()
+
+            reader = SessionActivityTracker()
+            reader.record("activity-stats", "upload")
+            stats = await reader.get_stats("activity-stats")
+            assert (stats["total_queries"], stats["total_uploads"]) == (3, 1)
+            reader.record("activity-stats", "query")
+            assert (await reader.get_stats("activity-stats"))["total_queries"] == 4
+            assert await reader.get_stats("activity-missing") is None
+        finally:
+            await database.close_database()
+
+    asyncio.run(run())
+
+
+def test_idle_sessions_expire_on_the_wheel_and_are_written_inactive():
+    async def run():
+        try:
+            tracker = SessionActivityTracker(idle_timeout_s=20, wheel_tick_s=10)
+            tracker.record("activity-idle")
+            tracker.tick()
+            tracker.record("activity-busy")
+            tracker.tick()
+            assert "activity-idle" not in tracker._sessions and len(tracker) == 1
+            tracker.tick()
+            assert len(tracker) == 0 and tracker.counters["expired"] == 2
+            await tracker.flush()
+            rows = await _rows("activity-idle", "activity-busy")
+            assert not rows["activity-idle"]["is_active"] and not rows["activity-busy"]["is_active"]
+        finally:
+            await database.close_database()
+
+    asyncio.run(run())
+
+
+def test_lru_eviction_keeps_the_evicted_counts():
+    async def run():
+        try:
+            tracker = SessionActivityTracker(max_sessions=2)
+            for session_id in ("activity-lru-a", "activity-lru-b", "activity-lru-a", "activity-lru-c"):
+                tracker.record(session_id)
+            assert list(tracker._sessions) == ["activity-lru-a", "activity-lru-c"]
+            assert tracker.counters["evicted"] == 1
+            assert await tracker.flush() == 3
+            rows = await _rows("activity-lru-a", "activity-lru-b", "activity-lru-c")
+            assert rows["activity-lru-b"]["total_queries"] == 1 and rows["activity-lru-b"]["is_active"]
+            assert rows["activity-lru-a"]["total_queries"] == 2
+        finally:
+            await database.close_database()
+
+    asyncio.run(run())
+
+
+def test_session_stats_endpoint():
+    import main
+
+    async def run():
+        try:
+            main.session_tracker.record("activity-api", "query")
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://t") as client:
+                found = await client.get("/api/sessions/activity-api/stats")
+                missing = await client.get("/api/sessions/activity-nobody/stats")
+            return found, missing
+        finally:
+            await database.close_database()
+
+    found, missing = asyncio.run(run())
+    assert found.status_code == 200 and found.json()["total_queries"] == 1
+    assert missing.status_code == 404
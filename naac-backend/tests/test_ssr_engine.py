@@ -0,0 +1,89 @@
+import asyncio
+
+import httpx
+
+import database
+from ssr_engine import SSREngine
+
+
+class CountingGenerator:
+    def __init__(self):
+        self.prompts = []
+
+    def __call__(self):
+        return "stub-model", self.generate
+
+    async def generate(self, prompt):
+        self.prompts.append(prompt)
+        return f"Drafted section {len(self.prompts)}"
+
+
+def test_unchanged_sections_come_from_the_cache(tmp_path):
+    generator = CountingGenerator()
+    engine = SSREngine(generator, output_dir=str(tmp_path))
+
+    async def run():
+        try:
+            await engine.save_input("ssr-cache", "1.1", "Syllabus revised in 2023 with 40% new courses.")
+            first = await engine.generate("ssr-cache", criterion="1", institution_type="University")
+            again = await engine.generate("ssr-cache", criterion="1", institution_type="University")
+            await engine.save_input("ssr-cache", "1.2", "Choice based credit system in all programmes.")
+            changed = await engine.generate("ssr-cache", criterion="1", institution_type="University")
+            return first, again, changed
+        finally:
+            await database.close_database()
+
+    first, again, changed = asyncio.run(run())
+    assert (first["status"], first["sections_generated"], first["sections_cached"]) == ("completed", 4, 0)
+    assert (again["sections_generated"], again["sections_cached"]) == (0, 4)
+    assert (changed["sections_generated"], changed["sections_cached"]) == (1, 3)
+    assert [s["sub_criterion"] for s in changed["sections"] if not s["cached"]] == ["1.2"]
+    assert len(generator.prompts) == 5 and "40% new courses" in generator.prompts[0]
+
+
+def test_failed_generation_falls_back_and_is_not_cached(tmp_path):
+    calls = []
+
+    async def failing(prompt):
+        calls.append(prompt)
+        raise ConnectionError("watsonx unavailable")
+
+    engine = SSREngine(lambda: ("flaky-model", failing), output_dir=str(tmp_path))
+
+    async def run():
+        try:
+            await engine.generate("ssr-fallback", sub_criterion="4.2")
+            return await engine.generate("ssr-fallback", sub_criterion="4.2")
+        finally:
+            await database.close_database()
+
+    report = asyncio.run(run())
+    assert report["status"] == "completed" and report["sections_cached"] == 0
+    assert len(calls) == 2 and engine.counters["sections_fallback"] == 2
+    assert "Library as a Learning Resource" in (tmp_path / f"ssr_{report['ssr_id']}.md").read_text(encoding="utf-8")
+
+
+def test_report_download_history_and_ranges():
+    import main
+
+    async def run():
+        try:
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://t") as client:
+                await client.post("/ssr/save", json={"session_id": "ssr-api", "subCriterion": "7.2", "content": "Green campus audit."})
+                report = (await client.post("/ssr/generate", json={"session_id": "ssr-api", "subCriterion": "7.2"})).json()
+                await client.post("/ssr/generate", json={"session_id": "ssr-api-other", "subCriterion": "7.1"})
+                full = await client.get(report["download_url"])
+                partial = await client.get(report["download_url"], headers={"Range": "bytes=0-9"})
+                history = (await client.get("/ssr/history", params={"session_id": "ssr-api"})).json()
+                missing = await client.get("/ssr/download/999999")
+            return report, full, partial, history, missing
+        finally:
+            await database.close_database()
+
+    report, full, partial, history, missing = asyncio.run(run())
+    assert report["status"] == "completed" and "Green campus audit." in report["content"]
+    assert full.status_code == 200 and full.text == report["content"]
+    assert f"SSR_{report['ssr_id']}.md" in full.headers["content-disposition"] and full.headers["etag"]
+    assert partial.status_code == 206 and partial.content == full.content[:10]
+    assert {r["session_id"] for r in history["reports"]} == {"ssr-api"}
+    assert missing.status_code == 404
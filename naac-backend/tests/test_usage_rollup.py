@@ -0,0 +1,89 @@
+import random
+import asyncio
+
+import httpx
+import pytest
+
+import database
+from usage_rollup import DDSketch, UsageRollups
+
+# A fixed hour boundary well before any other test's events: 2021-01-01T00:00:00Z
+NOW = 1609459200
+
+
+def _rollups():
+    asyncio.run(_init())
+    return UsageRollups(database.SQLITE_PATH)
+
+
+async def _init():
+    try:
+        await database.init_database()
+    finally:
+        await database.close_database()
+
+
+def test_sketch_quantiles_stay_within_relative_accuracy_after_merging():
+    rng = random.Random(7)
+    values = [rng.lognormvariate(4, 1) for _ in range(5000)]
+    left, right = DDSketch(), DDSketch()
+    for i, value in enumerate(values):
+        (left if i % 2 else right).add(value)
+    left.merge(DDSketch.from_json(right.to_json()))
+    values.sort()
+    for q in (0.5, 0.95, 0.99):
+        exact = values[int(q * (len(values) - 1))]
+        assert abs(left.quantile(q) - exact) <= 0.011 * exact
+
+
+def test_24h_rolls_events_into_hour_buckets():
+    rollups = _rollups()
+    for offset, latency in ((-7200 + 5, 100), (-7200 + 1800, 300), (-60, 50), (-30 * 3600, 999)):
+        rollups.record("upload", latency, ts=NOW + offset)
+    rollups.record("upload", error=True, ts=NOW - 10)
+    rollups.flush()
+
+    report = rollups.query("24h", events=("upload",), now=NOW + 1)
+    assert report["resolution"] == "hour" and len(report["buckets"]) == 24
+    by_start = {b["start"]: b["upload"] for b in report["buckets"]}
+    assert by_start["2020-12-31T22:00:00+00:00"]["count"] == 2
+    assert by_start["2020-12-31T23:00:00+00:00"] == {"count": 2, "errors": 1, "p50_ms": pytest.approx(50, rel=0.02),
+                                                     "p95_ms": pytest.approx(50, rel=0.02), "p99_ms": pytest.approx(50, rel=0.02)}
+    totals = report["totals"]["upload"]
+    assert (totals["count"], totals["errors"], totals["max_ms"]) == (4, 1, 300)
+    assert totals["avg_ms"] == 150
+
+
+def test_7d_reads_hours_and_flushes_merge_into_existing_rows():
+    rollups = _rollups()
+    rollups.record("generate", 200, ts=NOW - 3 * 86400)
+    rollups.flush()
+    rollups.record("generate", 400, ts=NOW - 3 * 86400 + 60)
+    UsageRollups(database.SQLITE_PATH).flush()
+    rollups.flush()
+
+    report = rollups.query("week", events=("generate",), now=NOW + 1)
+    assert report["resolution"] == "hour" and len(report["buckets"]) == 7 * 24
+    [busy] = [b["generate"] for b in report["buckets"] if b["generate"]["count"]]
+    assert busy["count"] == 2 and busy["p50_ms"] == pytest.approx(200, rel=0.02)
+    monthly = rollups.query("30d", events=("generate",), now=NOW + 1)["totals"]["generate"]
+    assert (monthly["count"], monthly["max_ms"]) == (2, 400)
+
+
+def test_unknown_period_is_rejected():
+    with pytest.raises(ValueError):
+        _rollups().query("fortnight")
+
+    import main
+
+    async def run():
+        try:
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://t") as client:
+                return await client.get("/api/analytics/usage", params={"period": "fortnight"}), \
+                    await client.get("/api/analytics/usage", params={"period": "24h"})
+        finally:
+            await database.close_database()
+
+    bad, good = asyncio.run(run())
+    assert bad.status_code == 400 and "period must be one of" in bad.json()["detail"]
+    assert good.status_code == 200 and len(good.json()["buckets"]) == 24
@@ -0,0 +1,81 @@
+import pytest
+
+from vector_upload import InMemoryVectorIndex, UploadCheckpoint, VectorUploadStage
+
+DIMENSION = 8
+
+
+def _chunks(count, start=0):
+    return [{"content": f"NAAC chunk {i}", "metadata": {"chunk_id": f"c{i}", "criterion": i % 7 + 1}} for i in range(start, start + count)]
+
+
+class CountingEmbedder:
+    def __init__(self):
+        self.texts = 0
+
+    def __call__(self, texts):
+        self.texts += len(texts)
+        return [[float(len(text))] + [1.0] * (DIMENSION - 1) for text in texts]
+
+
+class FlakyIndex(InMemoryVectorIndex):
+    """Fails the first ``failures`` upserts, then behaves like the stub"""
+
+    def __init__(self, failures):
+        super().__init__(dimension=DIMENSION)
+        self.failures = failures
+
+    def upsert(self, vectors, namespace=""):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("index unavailable")
+        return super().upsert(vectors, namespace)
+
+
+def test_checkpoint_resumes_an_interrupted_upload(tmp_path):
+    path = str(tmp_path / "upload.checkpoint")
+    index = InMemoryVectorIndex(dimension=DIMENSION)
+    first = VectorUploadStage(index, CountingEmbedder(), dimension=DIMENSION, batch_size=10, checkpoint_path=path).run(_chunks(30))
+    assert first["uploaded"] == 30 and len(UploadCheckpoint(path)) == 30
+
+    embedder = CountingEmbedder()
+    second = VectorUploadStage(index, embedder, dimension=DIMENSION, batch_size=10, checkpoint_path=path).run(_chunks(40))
+    assert (second["skipped"], second["uploaded"]) == (30, 10)
+    assert embedder.texts == 10
+    assert index.describe_index_stats()["total_vector_count"] == 40
+
+
+def test_failed_upserts_are_retried_without_re_embedding():
+    index, embedder = FlakyIndex(failures=2), CountingEmbedder()
+    stats = VectorUploadStage(index, embedder, dimension=DIMENSION, batch_size=5, max_concurrency=1, backoff_base=0.001).run(_chunks(5))
+    assert (stats["uploaded"], stats["retries"], stats["failed"]) == (5, 2, 0)
+    assert embedder.texts == 5
+
+
+def test_a_batch_that_keeps_failing_is_reported_and_not_checkpointed(tmp_path):
+    path = str(tmp_path / "upload.checkpoint")
+    stage = VectorUploadStage(FlakyIndex(failures=10), CountingEmbedder(), dimension=DIMENSION, batch_size=5, max_retries=2,
+                              backoff_base=0.001, checkpoint_path=path)
+    stats = stage.run(_chunks(5))
+    assert (stats["uploaded"], stats["failed"], stats["retries"]) == (0, 5, 2)
+    assert sorted(stats["failed_ids"]) == [f"c{i}" for i in range(5)]
+    assert len(UploadCheckpoint(path)) == 0
+
+
+def test_batches_respect_the_request_byte_limit():
+    chunks = [{"content": "x" * 900, "metadata": {"chunk_id": f"big{i}"}} for i in range(10)]
+    index = InMemoryVectorIndex(dimension=DIMENSION)
+    stats = VectorUploadStage(index, CountingEmbedder(), dimension=DIMENSION, batch_size=100, max_request_bytes=3000).run(chunks + chunks[:3])
+    assert stats["uploaded"] == 10 and stats["skipped"] == 3
+    assert stats["batches"] == index.upsert_calls > 1
+
+
+def test_in_memory_stub_queries_filters_and_checks_dimensions():
+    index = InMemoryVectorIndex(dimension=2)
+    index.upsert([{"id": "a", "values": [1.0, 0.0], "metadata": {"criterion": 1}},
+                  {"id": "b", "values": [0.0, 1.0], "metadata": {"criterion": 2}}])
+    assert [m["id"] for m in index.query([0.9, 0.1], top_k=2)["matches"]] == ["a", "b"]
+    assert [m["id"] for m in index.query([0.9, 0.1], filter={"criterion": 2})["matches"]] == ["b"]
+    assert index.fetch(["a", "missing"])["vectors"].keys() == {"a"}
+    with pytest.raises(ValueError):
+        index.upsert([{"id": "c", "values": [1.0, 0.0, 0.0]}])
@@ -0,0 +1,350 @@
+import os
+import math
+import json
+import time
+import sqlite3
+import asyncio
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from database import SQLITE_PATH
+
+RESOLUTIONS = {"m": 60, "h": 3600, "d": 86400}
+# Fine buckets are only read for short periods; hour and day rows already hold the same events
+RETENTION_S = {
+    "m": float(os.getenv("USAGE_MINUTE_RETENTION_S", 2 * 86400)),
+    "h": float(os.getenv("USAGE_HOUR_RETENTION_S", 90 * 86400)),
+    "d": float(os.getenv("USAGE_DAY_RETENTION_S", 5 * 365 * 86400)),
+}
+# period -> (resolution, span in seconds); every period reads at most a few hundred rows per event
+PERIODS = {
+    "1h": ("m", 3600), "hour": ("m", 3600),
+    "24h": ("h", 86400), "day": ("h", 86400),
+    "7d": ("h", 7 * 86400), "week": ("h", 7 * 86400),
+    "30d": ("d", 30 * 86400), "month": ("d", 30 * 86400),
+    "90d": ("d", 90 * 86400), "quarter": ("d", 90 * 86400),
+    "365d": ("d", 365 * 86400), "year": ("d", 365 * 86400),
+}
+EVENTS = ("chat", "upload", "generate")
+
+
+class DDSketch:
+    """Mergeable quantile sketch with relative-error guarantees (DDSketch, logarithmic buckets)
+
+    Any quantile is within ``relative_accuracy`` of the true value, and two
+    sketches merge by adding bucket counts, so per-minute sketches combine
+    exactly into hour, day and period percentiles.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01, max_bins: int = 2048):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.max_bins = max_bins
+        self.bins: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+
+    def add(self, value: float, count: int = 1):
+        if value <= 0:
+            self.zero_count += count
+        else:
+            key = math.ceil(math.log(value) / self._log_gamma)
+            self.bins[key] = self.bins.get(key, 0) + count
+            if len(self.bins) > self.max_bins:
+                self._collapse()
+        self.count += count
+
+    def _collapse(self):
+        # Fold the lowest buckets together: only the smallest latencies lose accuracy
+        keys = sorted(self.bins)
+        excess = len(keys) - self.max_bins
+        folded = sum(self.bins.pop(k) for k in keys[:excess + 1])
+        self.bins[keys[excess]] = self.bins.get(keys[excess], 0) + folded
+
+    def merge(self, other: "DDSketch"):
+        for key, count in other.bins.items():
+            self.bins[key] = self.bins.get(key, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        if len(self.bins) > self.max_bins:
+            self._collapse()
+
+    def quantile(self, q: float) -> Optional[float]:
+        return self.quantiles((q,))[0]
+
+    def quantiles(self, qs: Tuple[float, ...]) -> List[Optional[float]]:
+        """Several quantiles (ascending) in one pass over the sorted buckets"""
+        if self.count == 0:
+            return [None] * len(qs)
+        out: List[Optional[float]] = []
+        ranks = iter(q * (self.count - 1) for q in qs)
+        rank = next(ranks)
+        seen = self.zero_count
+        while rank < seen:
+            out.append(0.0)
+            rank = next(ranks, None)
+            if rank is None:
+                return out
+        for key in sorted(self.bins):
+            seen += self.bins[key]
+            while rank < seen:
+                out.append(2 * self.gamma ** key / (self.gamma + 1))
+                rank = next(ranks, None)
+                if rank is None:
+                    return out
+        top = 2 * self.gamma ** max(self.bins) / (self.gamma + 1)
+        return out + [top] * (len(qs) - len(out))
+
+    def to_json(self) -> str:
+        # Dense counts from the lowest bucket: compact, and cheap to decode for every row a query reads
+        data = {"a": self.relative_accuracy, "z": self.zero_count}
+        if self.bins:
+            low = min(self.bins)
+            data["o"] = low
+            data["c"] = [self.bins.get(k, 0) for k in range(low, max(self.bins) + 1)]
+        return json.dumps(data, separators=(",", ":"))
+
+    @classmethod
+    def from_json(cls, text: Optional[str]) -> "DDSketch":
+        if not text:
+            return cls()
+        data = json.loads(text)
+        sketch = cls(relative_accuracy=data.get("a", 0.01))
+        sketch.zero_count = data.get("z", 0)
+        low = data.get("o", 0)
+        sketch.bins = {low + i: c for i, c in enumerate(data.get("c", ())) if c}
+        sketch.count = sketch.zero_count + sum(sketch.bins.values())
+        return sketch
+
+
+class _Bucket:
+    __slots__ = ("count", "errors", "latency_sum_ms", "latency_max_ms", "sketch")
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.latency_sum_ms = 0.0
+        self.latency_max_ms = 0.0
+        self.sketch = DDSketch()
+
+
+class UsageRollups:
+    """Chat/upload/generation events rolled into minute, hour and day buckets as they happen
+
+    ``record`` only touches in-memory buckets. ``flush`` merges them into
+    usage_rollups under one write transaction (counts add, sketches merge),
+    so any number of workers can share the table. Period queries read the
+    pre-aggregated rows for one resolution: a bounded number regardless of
+    how many events there were.
+    """
+
+    def __init__(self, path: str = SQLITE_PATH, flush_interval_s: float = 5.0, retention_interval_s: float = 600.0):
+        self.path = path
+        self.flush_interval_s = flush_interval_s
+        self.retention_interval_s = retention_interval_s
+        self._pending: Dict[Tuple[str, str, int], _Bucket] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._task: Optional[asyncio.Task] = None
+        self._last_retention = 0.0
+        self.counters = {"recorded": 0, "flushes": 0, "rows_flushed": 0, "rows_expired": 0}
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA busy_timeout=5000")
+            self._local.conn = conn
+        return conn
+
+    def record(self, event: str, latency_ms: Optional[float] = None, error: bool = False, ts: Optional[float] = None):
+        ts = time.time() if ts is None else ts
+        with self._lock:
+            for resolution, width in RESOLUTIONS.items():
+                key = (resolution, event, int(ts // width * width))
+                bucket = self._pending.get(key)
+                if bucket is None:
+                    bucket = self._pending[key] = _Bucket()
+                bucket.count += 1
+                bucket.errors += 1 if error else 0
+                if latency_ms is not None:
+                    bucket.latency_sum_ms += latency_ms
+                    bucket.latency_max_ms = max(bucket.latency_max_ms, latency_ms)
+                    bucket.sketch.add(latency_ms)
+            self.counters["recorded"] += 1
+
+    def flush(self) -> int:
+        """Merge pending buckets into the table; returns the number of rows written"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+        conn = self._conn()
+        try:
+            # IMMEDIATE: read-merge-write of the sketches must not interleave with another worker's flush
+            conn.execute("BEGIN IMMEDIATE")
+        except Exception:
+            # Locked by another writer: no transaction was opened, so there is nothing to roll back
+            self._merge_back(pending)
+            raise
+        try:
+            for (resolution, event, start), bucket in pending.items():
+                row = conn.execute(
+                    "SELECT sketch FROM usage_rollups WHERE resolution = ? AND event = ? AND bucket_start = ?",
+                    (resolution, event, start),
+                ).fetchone()
+                sketch = bucket.sketch
+                if row is not None and row[0]:
+                    sketch = DDSketch.from_json(row[0])
+                    sketch.merge(bucket.sketch)
+                conn.execute(
+                    """
+                    INSERT INTO usage_rollups (resolution, event, bucket_start, count, errors, latency_sum_ms, latency_max_ms, sketch)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (resolution, event, bucket_start) DO UPDATE SET
+                        count = count + excluded.count,
+                        errors = errors + excluded.errors,
+                        latency_sum_ms = latency_sum_ms + excluded.latency_sum_ms,
+                        latency_max_ms = MAX(latency_max_ms, excluded.latency_max_ms),
+                        sketch = excluded.sketch
+                    """,
+                    (resolution, event, start, bucket.count, bucket.errors, bucket.latency_sum_ms, bucket.latency_max_ms,
+                     sketch.to_json() if sketch.count else None),
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            self._merge_back(pending)
+            raise
+        self.counters["flushes"] += 1
+        self.counters["rows_flushed"] += len(pending)
+        return len(pending)
+
+    def _merge_back(self, pending: Dict[Tuple[str, str, int], _Bucket]):
+        """Return unflushed buckets to the pending set so the next flush retries them"""
+        with self._lock:
+            for key, bucket in pending.items():
+                current = self._pending.get(key)
+                if current is None:
+                    self._pending[key] = bucket
+                else:
+                    current.count += bucket.count
+                    current.errors += bucket.errors
+                    current.latency_sum_ms += bucket.latency_sum_ms
+                    current.latency_max_ms = max(current.latency_max_ms, bucket.latency_max_ms)
+                    current.sketch.merge(bucket.sketch)
+
+    def apply_retention(self, now: Optional[float] = None) -> int:
+        """Drop buckets past their resolution's retention; coarser rows keep the totals"""
+        now = time.time() if now is None else now
+        removed = 0
+        conn = self._conn()
+        for resolution, keep_s in RETENTION_S.items():
+            for event in self._events(conn, resolution):
+                removed += conn.execute(
+                    "DELETE FROM usage_rollups WHERE resolution = ? AND event = ? AND bucket_start < ?",
+                    (resolution, event, int(now - keep_s)),
+                ).rowcount
+        self.counters["rows_expired"] += removed
+        return removed
+
+    @staticmethod
+    def _events(conn: sqlite3.Connection, resolution: str) -> List[str]:
+        rows = conn.execute("SELECT DISTINCT event FROM usage_rollups WHERE resolution = ?", (resolution,)).fetchall()
+        return sorted({row[0] for row in rows} | set(EVENTS))
+
+    def query(self, period: str = "7d", events: Tuple[str, ...] = EVENTS, now: Optional[float] = None) -> Dict[str, Any]:
+        """Per-bucket counts and latency percentiles for a period, plus merged totals"""
+        if period not in PERIODS:
+            raise ValueError(f"period must be one of: {', '.join(PERIODS)}")
+        resolution, span = PERIODS[period]
+        width = RESOLUTIONS[resolution]
+        now = time.time() if now is None else now
+        end = int(now // width * width)
+        start = end - span + width
+        placeholders = ", ".join("?" for _ in events)
+        rows = self._conn().execute(
+            f"""
+            SELECT event, bucket_start, count, errors, latency_sum_ms, latency_max_ms, sketch FROM usage_rollups
+            WHERE resolution = ? AND event IN ({placeholders}) AND bucket_start BETWEEN ? AND ?
+            ORDER BY bucket_start
+            """,
+            (resolution, *events, start, end),
+        ).fetchall()
+
+        buckets: Dict[int, Dict[str, Any]] = {}
+        totals = {event: {"count": 0, "errors": 0, "latency_sum_ms": 0.0, "latency_max_ms": 0.0, "sketch": DDSketch()} for event in events}
+        for event, bucket_start, count, errors, latency_sum, latency_max, sketch_json in rows:
+            sketch = DDSketch.from_json(sketch_json)
+            entry = buckets.setdefault(bucket_start, {"start": _iso(bucket_start)})
+            entry[event] = {"count": count, "errors": errors, **_percentiles(sketch)}
+            total = totals[event]
+            total["count"] += count
+            total["errors"] += errors
+            total["latency_sum_ms"] += latency_sum
+            total["latency_max_ms"] = max(total["latency_max_ms"], latency_max)
+            total["sketch"].merge(sketch)
+
+        series = []
+        for bucket_start in range(start, end + 1, width):
+            entry = buckets.get(bucket_start, {"start": _iso(bucket_start)})
+            for event in events:
+                entry.setdefault(event, {"count": 0, "errors": 0, "p50_ms": None, "p95_ms": None, "p99_ms": None})
+            series.append(entry)
+        return {
+            "period": period,
+            "resolution": {"m": "minute", "h": "hour", "d": "day"}[resolution],
+            "start": _iso(start),
+            "end": _iso(end + width),
+            "buckets": series,
+            "totals": {
+                event: {
+                    "count": t["count"],
+                    "errors": t["errors"],
+                    "avg_ms": round(t["latency_sum_ms"] / t["sketch"].count, 1) if t["sketch"].count else None,
+                    "max_ms": round(t["latency_max_ms"], 1) if t["sketch"].count else None,
+                    **_percentiles(t["sketch"]),
+                }
+                for event, t in totals.items()
+            },
+        }
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval_s)
+            try:
+                await asyncio.to_thread(self.flush)
+                if time.time() - self._last_retention >= self.retention_interval_s:
+                    self._last_retention = time.time()
+                    await asyncio.to_thread(self.apply_retention)
+            except Exception as e:
+                print(f"Usage rollup flush error: {e}")
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        try:
+            await asyncio.to_thread(self.flush)
+        except Exception as e:
+            print(f"Usage rollup flush error: {e}")
+
+
+def _iso(epoch: int) -> str:
+    return datetime.fromtimestamp(epoch, tz=timezone.utc).isoformat()
+
+
+def _percentiles(sketch: DDSketch) -> Dict[str, Optional[float]]:
+    values = sketch.quantiles((0.5, 0.95, 0.99))
+    return {name: (round(v, 1) if v is not None else None) for name, v in zip(("p50_ms", "p95_ms", "p99_ms"), values)}
+
+
+# Global instance
+usage_rollups = UsageRollups(flush_interval_s=float(os.getenv("USAGE_FLUSH_INTERVAL_S", 5)))
@@ -0,0 +1,270 @@
+import os
+import json
+import math
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Any, Iterable, List, Optional
+
+from chunk_store import chunk_id_for
+
+# Pinecone rejects upsert requests above 2MB or 1000 vectors
+MAX_REQUEST_BYTES = 2 * 1024 * 1024
+MAX_BATCH_VECTORS = 1000
+# Same truncation as the notebook's upload_to_pinecone
+METADATA_TEXT_LIMIT = 1000
+
+
+class InMemoryVectorIndex:
+    """Local stand-in for a Pinecone index, used for testing the upload stage"""
+
+    def __init__(self, dimension: int = 384, fail_rate: float = 0.0, latency: float = 0.0, seed: Optional[int] = None):
+        self.dimension = dimension
+        self.fail_rate = fail_rate
+        self.latency = latency
+        self.vectors: Dict[str, Dict[str, Any]] = {}
+        self.upsert_calls = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def upsert(self, vectors: List[Dict[str, Any]], namespace: str = "") -> dict:
+        """Insert or overwrite vectors by id (same semantics as Pinecone upsert)"""
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.upsert_calls += 1
+            if self.fail_rate and self._rng.random() < self.fail_rate:
+                raise ConnectionError("Simulated upsert failure")
+            for vector in vectors:
+                if len(vector["values"]) != self.dimension:
+                    raise ValueError(f"Vector dimension {len(vector['values'])} does not match index dimension {self.dimension}")
+                self.vectors[vector["id"]] = vector
+        return {"upserted_count": len(vectors)}
+
+    def fetch(self, ids: List[str], namespace: str = "") -> dict:
+        with self._lock:
+            return {"vectors": {i: self.vectors[i] for i in ids if i in self.vectors}}
+
+    def query(self, vector: List[float], top_k: int = 10, include_metadata: bool = True, filter: Optional[dict] = None, namespace: str = "") -> dict:
+        """Brute-force cosine similarity search"""
+        def norm(v):
+            return math.sqrt(sum(x * x for x in v)) or 1.0
+
+        query_norm = norm(vector)
+        with self._lock:
+            candidates = list(self.vectors.values())
+        matches = []
+        for item in candidates:
+            metadata = item.get("metadata", {})
+            if filter and any(metadata.get(k) != v for k, v in filter.items()):
+                continue
+            score = sum(a * b for a, b in zip(vector, item["values"])) / (query_norm * norm(item["values"]))
+            matches.append({"id": item["id"], "score": score, "metadata": metadata if include_metadata else None})
+        matches.sort(key=lambda m: m["score"], reverse=True)
+        return {"matches": matches[:top_k]}
+
+    def describe_index_stats(self) -> dict:
+        with self._lock:
+            return {"dimension": self.dimension, "total_vector_count": len(self.vectors)}
+
+
+class JsonlVectorIndex:
+    """Append-only local vector store used when Pinecone is not configured
+
+    Several job-worker processes may upsert at once, so each append holds an
+    exclusive file lock; later records for the same id supersede earlier ones.
+    """
+
+    def __init__(self, path: str, dimension: int = 384):
+        self.path = path
+        self.dimension = dimension
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    def upsert(self, vectors: List[Dict[str, Any]], namespace: str = "") -> dict:
+        import fcntl
+        payload = "".join(json.dumps({**vector, "namespace": namespace}, ensure_ascii=False) + "\n" for vector in vectors)
+        with open(self.path, "a", encoding="utf-8") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.write(payload)
+                f.flush()
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+        return {"upserted_count": len(vectors)}
+
+
+def vector_index_from_env(dimension: int = 384):
+    """Pinecone index when PINECONE_API_KEY is set and the client is installed, else a local store
+
+    The local store is the quantized one (int8 or binary codes, see
+    quantized_store) when NAAC_QUANTIZED_VECTORS_DIR is set, else the JSONL log.
+    """
+    api_key = os.getenv("PINECONE_API_KEY")
+    if api_key:
+        try:
+            from pinecone import Pinecone
+            return Pinecone(api_key=api_key).Index(os.getenv("PINECONE_INDEX_NAME", "naac-documents"))
+        except ImportError:
+            print("PINECONE_API_KEY is set but the pinecone client is not installed; using the local vector store")
+    quantized_dir = os.getenv("NAAC_QUANTIZED_VECTORS_DIR")
+    if quantized_dir:
+        from quantized_store import QuantizedVectorIndex
+        return QuantizedVectorIndex(quantized_dir, dimension, mode=os.getenv("NAAC_QUANTIZED_MODE", "int8"))
+    return JsonlVectorIndex(os.getenv("NAAC_LOCAL_VECTORS_PATH", os.path.join("data", "processed", "uploaded_vectors.jsonl")), dimension)
+
+
+class UploadCheckpoint:
+    """Append-only log of chunk_ids the index has acknowledged, so interrupted uploads resume"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.done = set()
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        self.done.add(line)
+
+    def __contains__(self, chunk_id: str) -> bool:
+        return chunk_id in self.done
+
+    def __len__(self) -> int:
+        return len(self.done)
+
+    def record(self, chunk_ids: List[str]):
+        """Persist a completed batch before it is counted as uploaded"""
+        with self._lock:
+            self.done.update(chunk_ids)
+            if not self.path:
+                return
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write("\n".join(chunk_ids))
+                f.write("\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+
+def build_vector_record(chunk: Dict[str, Any], values: List[float]) -> Dict[str, Any]:
+    """Format a chunk as a Pinecone vector with flat, scalar-only metadata"""
+    content = chunk.get("content", "")
+    metadata = {"text": content[:METADATA_TEXT_LIMIT], "length": len(content)}
+    for key, value in (chunk.get("metadata") or {}).items():
+        if key != "text" and isinstance(value, (str, int, float, bool)):
+            metadata[key] = value
+    return {"id": chunk_id_for(chunk), "values": values, "metadata": metadata}
+
+
+class VectorUploadStage:
+    """Streams chunks into a vector index in size-bounded batches with bounded concurrency"""
+
+    def __init__(
+        self,
+        index,
+        embed_fn: Callable[[List[str]], List[List[float]]],
+        dimension: int = 384,
+        batch_size: int = 100,
+        max_concurrency: int = 4,
+        max_request_bytes: int = MAX_REQUEST_BYTES,
+        max_retries: int = 5,
+        backoff_base: float = 0.5,
+        checkpoint_path: Optional[str] = None,
+        namespace: str = "",
+    ):
+        self.index = index
+        self.embed_fn = embed_fn
+        self.dimension = dimension
+        self.batch_size = min(batch_size, MAX_BATCH_VECTORS)
+        self.max_concurrency = max_concurrency
+        # Leave headroom for the JSON envelope and encoding differences
+        self.max_request_bytes = int(max_request_bytes * 0.9)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.namespace = namespace
+        self.checkpoint = UploadCheckpoint(checkpoint_path)
+        self._stats_lock = threading.Lock()
+
+    def _estimate_bytes(self, chunk: Dict[str, Any]) -> int:
+        """Rough wire size of one vector: JSON floats plus metadata"""
+        metadata = chunk.get("metadata") or {}
+        text_bytes = len(chunk.get("content", "")[:METADATA_TEXT_LIMIT].encode("utf-8"))
+        return self.dimension * 12 + text_bytes + len(json.dumps(metadata, ensure_ascii=False)) + 64
+
+    def _batches(self, chunks: Iterable[Dict[str, Any]], stats: dict):
+        """Group unprocessed chunks into batches under both the vector and byte limits"""
+        batch, batch_bytes, seen = [], 0, set()
+        for chunk in chunks:
+            chunk_id = chunk_id_for(chunk)
+            if chunk_id in self.checkpoint or chunk_id in seen:
+                stats["skipped"] += 1
+                continue
+            seen.add(chunk_id)
+            size = self._estimate_bytes(chunk)
+            if batch and (len(batch) >= self.batch_size or batch_bytes + size > self.max_request_bytes):
+                yield batch
+                batch, batch_bytes = [], 0
+            batch.append(chunk)
+            batch_bytes += size
+        if batch:
+            yield batch
+
+    def _upload_batch(self, batch: List[Dict[str, Any]], stats: dict):
+        """Embed one batch once, then upsert it, retrying only the upsert with exponential backoff"""
+        ids = [chunk_id_for(chunk) for chunk in batch]
+        try:
+            values = self.embed_fn([chunk.get("content", "") for chunk in batch])
+            vectors = [build_vector_record(chunk, list(v)) for chunk, v in zip(batch, values)]
+        except Exception as e:
+            # A local model failure is not transient like an index error, so it is not retried
+            print(f"Vector upload batch failed to embed: {e}")
+            self._record_failure(ids, 0, stats)
+            return
+        for attempt in range(self.max_retries + 1):
+            try:
+                # Upsert is keyed by chunk_id, so replaying a half-applied batch is harmless
+                self.index.upsert(vectors=vectors, namespace=self.namespace)
+                self.checkpoint.record(ids)
+                with self._stats_lock:
+                    stats["uploaded"] += len(ids)
+                    stats["batches"] += 1
+                    stats["retries"] += attempt
+                return
+            except Exception as e:
+                if attempt == self.max_retries:
+                    print(f"Vector upload batch failed after {attempt + 1} attempts: {e}")
+                    self._record_failure(ids, attempt, stats)
+                    return
+                # Full jitter keeps retrying workers from hitting the index in lockstep
+                time.sleep(random.uniform(0, self.backoff_base * (2 ** attempt)))
+
+    def _record_failure(self, ids: List[str], retries: int, stats: dict):
+        with self._stats_lock:
+            stats["failed"] += len(ids)
+            stats["failed_ids"].extend(ids)
+            stats["retries"] += retries
+
+    def run(self, chunks: Iterable[Dict[str, Any]]) -> dict:
+        """Upload all chunks not yet in the checkpoint and return upload statistics"""
+        stats = {"uploaded": 0, "skipped": 0, "failed": 0, "batches": 0, "retries": 0, "failed_ids": []}
+        t0 = time.time()
+        # Backpressure: at most 2x max_concurrency batches are embedded or in flight at once,
+        # so the producer never materialises the full corpus in memory
+        slots = threading.BoundedSemaphore(self.max_concurrency * 2)
+
+        def task(batch):
+            try:
+                self._upload_batch(batch, stats)
+            finally:
+                slots.release()
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="vector-upload") as pool:
+            for batch in self._batches(chunks, stats):
+                slots.acquire()
+                pool.submit(task, batch)
+
+        elapsed = time.time() - t0
+        stats["elapsed_s"] = round(elapsed, 3)
+        stats["vectors_per_s"] = round(stats["uploaded"] / elapsed, 1) if elapsed > 0 else 0.0
+        return stats
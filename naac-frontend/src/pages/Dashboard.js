@@ -53,6 +53,7 @@ import {
 import DocumentProcessor from '../components/DocumentProcessor';
 import QueryProcessor from '../components/QueryProcessor';
 import { analyticsAPI } from '../services/api';
+import { eventsAPI } from '../services/apiExtensions';
 
 const Dashboard = () => {
   const navigate = useNavigate();
@@ -89,6 +90,15 @@ const Dashboard = () => {
       setLoading(false);
     };
     fetchStats();
+    // Keep the counters live as documents and queries come in
+    return eventsAPI.subscribe(['analytics'], (topic, data) => {
+      setSystemStats({
+        documentsProcessed: data.documentsProcessed || 0,
+        queriesHandled: data.queriesHandled || 0,
+        reportsGenerated: data.reportsGenerated || 0,
+        criteriaCompleted: data.criteriaCompleted || 0,
+      });
+    });
   }, []);
 
   const handleTabChange = (event, newValue) => {
@@ -174,9 +174,9 @@ export const enhancedIBMAPI = {
   },
 
   // Download from storage
-  downloadFromStorage: async (fileName, bucketName = 'NAAC_fr') => {
+  downloadFromStorage: async (fileName) => {
     const response = await api.get('/ibm/cos/download', {
-      params: { fileName, bucket: bucketName },
+      params: { fileName },
       responseType: 'blob',
     });
     return response.data;
@@ -203,3 +203,19 @@ export const configAPI = {
     return response.data;
   },
 };
+
+// Server-pushed updates: one stream per tab instead of polling status, analytics and health
+export const eventsAPI = {
+  // topics e.g. ['analytics', 'health', `job:${jobId}`]; onEvent(topic, data) runs on every change.
+  // Returns a function that closes the stream
+  subscribe: (topics, onEvent) => {
+    const source = new EventSource(`${api.defaults.baseURL}/events?topics=${encodeURIComponent(topics.join(','))}`);
+    ['job', 'analytics', 'health'].forEach((type) => {
+      source.addEventListener(type, (event) => {
+        const { topic, data } = JSON.parse(event.data);
+        onEvent(topic, data);
+      });
+    });
+    return () => source.close();
+  },
+};